@@ -0,0 +1,120 @@
+"""
+Process-wide registry of the OAuth API clients used to call other services.
+
+Building an OAuthAPIClient for every call means a new requests.Session, new connection pools and a cache lookup,
+or a new request, for the access token. The clients returned by get_oauth_api_client are shared by every caller
+in the process that uses the same site and credentials, so connections and tokens are reused between calls.
+"""
+import datetime
+import logging
+import os
+import threading
+
+from django.conf import settings
+from edx_rest_api_client.client import (
+    ACCESS_TOKEN_EXPIRED_THRESHOLD_SECONDS,
+    OAuthAPIClient,
+    get_and_cache_oauth_access_token
+)
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class PooledOAuthAPIClient(OAuthAPIClient):
+    """
+    An OAuthAPIClient with persistent, sized connection pools and an access token kept until it expires.
+
+    Connections are only retried when they could not be established, so requests are never sent twice.
+    """
+
+    def __init__(self, base_url, client_id, client_secret, pool_connections=10, pool_maxsize=10, max_retries=0,
+                 **kwargs):
+        super(PooledOAuthAPIClient, self).__init__(base_url, client_id, client_secret, **kwargs)
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self._token_expires_at = None
+
+        for prefix in ('http://', 'https://'):
+            self.mount(prefix, HTTPAdapter(
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                max_retries=Retry(total=max_retries, read=0, redirect=False, status=0),
+            ))
+
+    def _ensure_authentication(self):
+        """
+        Ensures that the Session's auth.token is set with an unexpired token, without looking it up
+        in the cache while the token this client holds is still valid.
+        """
+        if self._token_expires_at and datetime.datetime.utcnow() < self._token_expires_at:
+            return
+
+        oauth_url = self._base_url if not self.oauth_uri else self._base_url + self.oauth_uri
+        self.auth.token, expires_at = get_and_cache_oauth_access_token(
+            oauth_url,
+            self._client_id,
+            self._client_secret,
+            grant_type='client_credentials',
+            timeout=self._timeout,
+        )
+        self._token_expires_at = expires_at - datetime.timedelta(seconds=ACCESS_TOKEN_EXPIRED_THRESHOLD_SECONDS)
+
+    def get_connection_stats(self):
+        """
+        Returns the number of requests sent, and of connections opened, by the connection pools of this client.
+
+        Every request sent over an already open connection counts as reused.
+        """
+        requests_count = connections_count = 0
+        for adapter in self.adapters.values():
+            for key in adapter.poolmanager.pools.keys():
+                pool = adapter.poolmanager.pools[key]
+                requests_count += pool.num_requests
+                connections_count += pool.num_connections
+
+        return {
+            'requests': requests_count,
+            'connections': connections_count,
+            'reused': requests_count - connections_count,
+        }
+
+
+def get_oauth_api_client(site, base_url, client_id, client_secret):
+    """
+    Returns the shared OAuth API client of a site and set of credentials, creating it if needed.
+
+    Clients are not shared with forked processes, which get their own connection pools.
+    """
+    key = (os.getpid(), site.id, base_url, client_id, client_secret)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                logger.info('Creating an OAuth API client for site [%s] and client [%s].', site.domain, client_id)
+                client = PooledOAuthAPIClient(
+                    base_url,
+                    client_id,
+                    client_secret,
+                    pool_connections=settings.OAUTH_API_CLIENT_POOL_CONNECTIONS,
+                    pool_maxsize=settings.OAUTH_API_CLIENT_POOL_MAXSIZE,
+                    max_retries=settings.OAUTH_API_CLIENT_MAX_RETRIES,
+                )
+                _clients[key] = client
+    return client
+
+
+def clear_oauth_api_clients():
+    """
+    Closes and forgets every shared OAuth API client, e.g. after credentials were rotated or between tests.
+    """
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
@@ -0,0 +1,113 @@
+"""
+Django management command to compare the SDN fallback matcher with the original record-by-record check.
+See docs/decisions/0007-sdn-fallback.rst for more details about the SDN fallback.
+
+"""
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from ecommerce.extensions.payment.core.sdn import (
+    SDN_FALLBACK_SOURCE,
+    SDN_FALLBACK_TYPE,
+    SDNFallbackMatcher,
+    process_sdn_csv,
+    process_text
+)
+
+
+def count_hits_by_scanning(records, name, city, country):
+    """
+    The original checkSDNFallback comparison: filter the records by country, then compare the
+    name and city against every remaining record.
+    """
+    hit_count = 0
+    processed_name, processed_city = process_text(name) or set(), process_text(city) or set()
+    for __, names, addresses, countries in records:
+        if country not in countries:
+            continue
+        if processed_name.issubset(set(names.split())) and processed_city.issubset(set(addresses.split())):
+            hit_count += 1
+    return hit_count
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the SDN fallback matcher against the original record-by-record check using an SDN csv.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'csv_file',
+            help='Path to the consolidated screening list csv, as downloaded by populate_sdn_fallback_data_and_metadata'
+        )
+        parser.add_argument(
+            '--queries',
+            metavar='N',
+            type=int,
+            default=500,
+            help='Number of checks to time. Half are built from listed individuals, half are random misses.'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed used to pick the checks.'
+        )
+
+    def handle(self, *args, **options):
+        with open(options['csv_file'], encoding='utf-8') as csv_file:
+            sdn_csv_string = csv_file.read()
+
+        # These are the records the database query in checkSDNFallback returns before filtering by country.
+        records = [
+            (record_id, fields['names'], fields['addresses'], fields['countries'])
+            for record_id, fields in enumerate(process_sdn_csv(sdn_csv_string))
+            if fields['source'] == SDN_FALLBACK_SOURCE and fields['sdn_type'] == SDN_FALLBACK_TYPE
+        ]
+        queries = self._build_queries(records, options['queries'], random.Random(options['seed']))
+
+        start = time.perf_counter()
+        matcher = SDNFallbackMatcher(records)
+        build_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scan_results = [count_hits_by_scanning(records, *query) for query in queries]
+        scan_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        matcher_results = [matcher.count_hits(*query) for query in queries]
+        matcher_seconds = time.perf_counter() - start
+
+        mismatches = sum(1 for scan, match in zip(scan_results, matcher_results) if scan != match)
+
+        self.stdout.write('SDN individuals: {}'.format(len(records)))
+        self.stdout.write('Checks: {} ({} hits)'.format(len(queries), sum(1 for hits in scan_results if hits)))
+        self.stdout.write('Matcher build: {:.3f}s'.format(build_seconds))
+        self.stdout.write('Record scan: {:.3f}s ({:.3f}ms per check)'.format(
+            scan_seconds, 1000 * scan_seconds / max(len(queries), 1)
+        ))
+        self.stdout.write('Matcher: {:.3f}s ({:.3f}ms per check)'.format(
+            matcher_seconds, 1000 * matcher_seconds / max(len(queries), 1)
+        ))
+        if mismatches:
+            self.stdout.write(self.style.ERROR('{} check(s) returned different hit counts.'.format(mismatches)))
+        else:
+            self.stdout.write(self.style.SUCCESS('All checks returned the same hit counts.'))
+
+    @staticmethod
+    def _build_queries(records, count, rng):
+        """ Build (name, city, country) checks: half from listed individuals, half random misses. """
+        listed = [record for record in records if record[1] and record[2] and record[3]]
+        queries = []
+        for index in range(count):
+            if listed and index % 2 == 0:
+                __, names, addresses, countries = rng.choice(listed)
+                names, addresses = names.split(), addresses.split()
+                queries.append((
+                    ' '.join(rng.sample(names, min(2, len(names)))),
+                    rng.choice(addresses),
+                    rng.choice(countries.split()),
+                ))
+            else:
+                queries.append(('Jane Doe {}'.format(index), 'Springfield', 'US'))
+        return queries
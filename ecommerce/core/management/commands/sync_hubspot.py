@@ -7,21 +7,26 @@ import json
 import logging
 import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from decimal import Decimal as D
 from urllib.parse import urljoin
 
 import requests
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.management.base import BaseCommand, CommandError
-from django.db.models import Q
+from django.db.models import Prefetch, Q
+from django.utils import timezone
 from oscar.core.loading import get_class, get_model
 from requests.exceptions import HTTPError, RequestException
 
+from ecommerce.core.utils import use_read_replica_if_available
 from ecommerce.extensions.fulfillment.status import ORDER
 
 Basket = get_model('basket', 'Basket')
 CartLine = get_model('basket', 'Line')
+HubSpotSyncCheckpoint = get_model('core', 'HubSpotSyncCheckpoint')
 Order = get_model('order', 'Order')
 OrderLine = get_model('order', 'Line')
 OrderNumberGenerator = get_class('order.utils', 'OrderNumberGenerator')
@@ -174,6 +179,10 @@ PRODUCT = "PRODUCT"
 LINE_ITEM = "LINE_ITEM"
 DEAL = "DEAL"
 BATCH_SIZE = 200
+DEFAULT_PAGE_SIZE = 1000
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_MAX_RETRIES = 3
+RETRY_BACKOFF_SECONDS = 1
 
 EXPECTED_METHODS = ["GET", "POST", "PUT"]
 
@@ -181,6 +190,9 @@ EXPECTED_METHODS = ["GET", "POST", "PUT"]
 class Command(BaseCommand):
     help = 'Sync Product, Orders and Lines to Hubspot server.'
     initial_sync_days = None
+    page_size = DEFAULT_PAGE_SIZE
+    max_workers = DEFAULT_MAX_WORKERS
+    max_retries = DEFAULT_MAX_RETRIES
 
     def _get_hubspot_enable_sites(self):
         """
@@ -263,10 +275,11 @@ class Command(BaseCommand):
             timestamp = time.time()
         return int(timestamp * 1000)
 
-    def _get_carts_extra_properties(self, cart):
+    def _get_carts_extra_properties(self, cart, lines=None):
         total_price = D(0.0)
         description = ''
-        lines = cart.all_lines()
+        if lines is None:
+            lines = cart.all_lines()
         for line in lines:
             total_price += self._get_cart_line_prices(line, 'price_incl_tax')
             description += self._get_cart_line_information(line)
@@ -303,9 +316,12 @@ class Command(BaseCommand):
             })
         return hubspot_contacts
 
-    def _get_hubspot_deal_structure(self, carts, partner):
+    def _get_hubspot_deal_structure(self, carts, partner, orders_by_basket_id=None, lines_by_basket_id=None):
         """
         Returns list of dicts, each dict represents hubspot DEAL.
+
+        The orders of submitted carts are looked up in orders_by_basket_id and the lines of carts in
+        lines_by_basket_id when given, and queried otherwise.
         """
         hubspot_deals = []
         for cart in carts:
@@ -315,9 +331,13 @@ class Command(BaseCommand):
                 'changeOccurredTimestamp': self._get_timestamp(),
                 'propertyNameToValues': {}
             }
-            total_price, description = self._get_carts_extra_properties(cart)
+            lines = None if lines_by_basket_id is None else lines_by_basket_id.get(cart.id, [])
+            total_price, description = self._get_carts_extra_properties(cart, lines)
             if cart.status == Basket.SUBMITTED:
-                order = Order.objects.filter(basket=cart).first()
+                if orders_by_basket_id is None:
+                    order = Order.objects.filter(basket=cart).first()
+                else:
+                    order = orders_by_basket_id.get(cart.id)
                 deal['propertyNameToValues'] = {
                     'deal_name': order.number,
                     'total_incl_tax': float(order.total_incl_tax),
@@ -350,7 +370,7 @@ class Command(BaseCommand):
                 'action': 'UPSERT',
                 'changeOccurredTimestamp': self._get_timestamp(),
                 'propertyNameToValues': {
-                    'order_id': str(line.basket.id),
+                    'order_id': str(line.basket_id),
                     'price_currency': str(line.price_currency),
                     'tax': float(line_price_incl_tax - line_price_excl_tax),
                     'product_id': str(line.product.id),
@@ -499,6 +519,150 @@ class Command(BaseCommand):
         else:
             self.stdout.write('No data found to sync for site {site}'.format(site=site_configuration.site.domain))
 
+    def _upsert_hubspot_batch(self, object_type, batch, site_configuration):
+        """
+        Calls the sync message endpoint on a batch of objects, retrying with an exponential backoff
+        when HubSpot cannot be reached, rate limits the call or fails with a server error.
+
+        Returns:
+            bool: Whether the batch was synced.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._hubspot_endpoint(
+                    object_type,
+                    'extensions/ecomm/v1/sync-messages/',
+                    'PUT',
+                    body=batch,
+                    hapikey=site_configuration.hubspot_secret_key
+                )
+                return True
+            except (HTTPError, RequestException) as ex:
+                status_code = ex.response.status_code if ex.response is not None else None
+                retryable = status_code is None or status_code == 429 or status_code >= 500
+                if not retryable or attempt == self.max_retries:
+                    self.stderr.write(
+                        'An error occurred while upserting {object_type} for site {site}: {message}'.format(
+                            object_type=object_type, site=site_configuration.site.domain, message=ex
+                        )
+                    )
+                    return False
+                time.sleep(RETRY_BACKOFF_SECONDS * 2 ** attempt)
+        return False  # pragma: no cover
+
+    def _upsert_hubspot_objects_concurrently(self, executor, object_type, objects, site_configuration):
+        """
+        Calls the sync message endpoint on batches of 200 (BATCH_SIZE) objects in parallel.
+
+        Returns:
+            bool: Whether every batch was synced.
+        """
+        batches = [objects[start:start + BATCH_SIZE] for start in range(0, len(objects), BATCH_SIZE)]
+        results = executor.map(
+            lambda batch: self._upsert_hubspot_batch(object_type, batch, site_configuration), batches
+        )
+        return all(list(results))
+
+    def _iter_unsynced_cart_pages(self, site_configuration, start, end):
+        """
+        Yields pages of the carts created or submitted, or with lines added, between start and end, read
+        from the read replica when there is one, and paginated on their primary key.
+        """
+        carts = use_read_replica_if_available(Basket.objects.filter(
+            Q(date_created__gte=start, date_created__lt=end) |
+            Q(date_submitted__gte=start, date_submitted__lt=end) |
+            Q(lines__date_created__gte=start, lines__date_created__lt=end),
+            site=site_configuration.site,
+            lines__isnull=False,
+        )).distinct().select_related('owner').order_by('id')
+
+        last_id = 0
+        while True:
+            page = list(carts.filter(id__gt=last_id).prefetch_related(
+                Prefetch('lines', queryset=CartLine.objects.select_related('product__course').order_by('id'))
+            )[:self.page_size])
+            if not page:
+                return
+            yield page
+            last_id = page[-1].id
+
+    def _sync_cart_page(self, executor, carts, site_configuration):
+        """
+        Syncs the contacts, products, deals and line items of a page of carts. Objects of a type are
+        synced in parallel batches, once every object of the previous type has been synced.
+
+        Returns:
+            bool: Whether every object was synced.
+        """
+        cart_ids = [cart.id for cart in carts]
+        lines_by_basket_id = {cart.id: list(cart.lines.all()) for cart in carts}
+        # we need to exclude the CartLines without product
+        # because product is required in hubspot for LINE_ITEM.
+        cart_lines = [line for lines in lines_by_basket_id.values() for line in lines if line.product_id]
+        products = {line.product_id: line.product for line in cart_lines}
+        users = {cart.owner_id: cart.owner for cart in carts if cart.owner_id}
+        orders_by_basket_id = {
+            order.basket_id: order
+            for order in use_read_replica_if_available(
+                Order.objects.filter(basket_id__in=cart_ids).select_related('user').order_by('date_placed')
+            )
+        }
+
+        synced = True
+        for object_type, objects in (
+                (CONTACT, self._get_hubspot_contact_structure(users.values())),
+                (PRODUCT, self._get_hubspot_product_structure(products.values())),
+                (DEAL, self._get_hubspot_deal_structure(
+                    carts, site_configuration.partner, orders_by_basket_id, lines_by_basket_id
+                )),
+                (LINE_ITEM, self._get_hubspot_line_item_structure(cart_lines)),
+        ):
+            synced &= self._upsert_hubspot_objects_concurrently(executor, object_type, objects, site_configuration)
+        return synced
+
+    def _sync_data_incrementally(self, site_configuration):
+        """
+        Syncs the carts created, submitted or with lines added since the site's high-water mark, and moves
+        the mark forward when every object has been synced.
+
+        The mark is kept HUBSPOT_SYNC_SAFETY_MARGIN behind the current time, as carts are read from the read
+        replica, which may not have caught up with the latest changes yet.
+        """
+        end = timezone.now() - settings.HUBSPOT_SYNC_SAFETY_MARGIN
+        checkpoint = HubSpotSyncCheckpoint.objects.filter(site_configuration=site_configuration).first()
+        start = checkpoint.synced_until if checkpoint else end - timedelta(days=self.initial_sync_days)
+
+        synced = True
+        count = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for carts in self._iter_unsynced_cart_pages(site_configuration, start, end):
+                count += len(carts)
+                self.stdout.write(
+                    'Syncing {count} carts for site {site}'.format(
+                        count=len(carts), site=site_configuration.site.domain
+                    )
+                )
+                synced &= self._sync_cart_page(executor, carts, site_configuration)
+
+        if not count:
+            self.stdout.write('No data found to sync for site {site}'.format(site=site_configuration.site.domain))
+
+        if synced:
+            HubSpotSyncCheckpoint.objects.update_or_create(
+                site_configuration=site_configuration, defaults={'synced_until': end}
+            )
+            self.stdout.write(
+                'Synced {count} carts for site {site} from {start} to {end}'.format(
+                    count=count, site=site_configuration.site.domain, start=start, end=end
+                )
+            )
+        else:
+            self.stderr.write(
+                'Some objects could not be synced for site {site}, they will be synced again from {start}'.format(
+                    site=site_configuration.site.domain, start=start
+                )
+            )
+
     def add_arguments(self, parser):
         parser.add_argument(
             '--initial-sync-days',
@@ -507,12 +671,43 @@ class Command(BaseCommand):
             type=int,
             help='Number of days before today to start initial sync',
         )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            dest='incremental',
+            help='Sync the carts created or submitted since the last incremental sync of each site, instead of '
+                 'the carts of a single day. The first incremental sync starts --initial-sync-days ago.',
+        )
+        parser.add_argument(
+            '--page-size',
+            default=DEFAULT_PAGE_SIZE,
+            dest='page_size',
+            type=int,
+            help='Number of carts loaded at a time by an incremental sync',
+        )
+        parser.add_argument(
+            '--max-workers',
+            default=DEFAULT_MAX_WORKERS,
+            dest='max_workers',
+            type=int,
+            help='Number of batches uploaded in parallel by an incremental sync',
+        )
+        parser.add_argument(
+            '--max-retries',
+            default=DEFAULT_MAX_RETRIES,
+            dest='max_retries',
+            type=int,
+            help='Number of times an incremental sync retries a batch that failed',
+        )
 
     def handle(self, *args, **options):
         """
         Main command handler.
         """
         self.initial_sync_days = options['initial_sync_days']
+        self.page_size = options['page_size']
+        self.max_workers = options['max_workers']
+        self.max_retries = options['max_retries']
         try:
             site_configurations = self._get_hubspot_enable_sites()
             if not site_configurations:
@@ -522,7 +717,10 @@ class Command(BaseCommand):
             for site_configuration in site_configurations:
                 if self._install_hubspot_ecommerce_bridge(site_configuration):
                     if self._define_hubspot_ecommerce_settings(site_configuration):
-                        self._sync_data(site_configuration)
+                        if options['incremental']:
+                            self._sync_data_incrementally(site_configuration)
+                        else:
+                            self._sync_data(site_configuration)
                         self._call_sync_errors_messages_endpoint(site_configuration)
         except Exception as ex:
             traceback.print_exc()
@@ -0,0 +1,32 @@
+"""
+Tests for Django management command to benchmark the SDN fallback matcher.
+"""
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+
+from ecommerce.tests.testcases import TestCase
+
+# pylint: disable=line-too-long
+CSV_STRING = """_id,source,entity_number,type,programs,name,title,addresses,federal_register_notice,start_date,end_date,standard_order,license_requirement,license_policy,call_sign,vessel_type,gross_tonnage,gross_registered_tonnage,vessel_flag,vessel_owner,remarks,source_list_url,alt_names,citizenships,dates_of_birth,nationalities,places_of_birth,source_information_url,ids
+94734218,Specially Designated Nationals (SDN) - Treasury Department,96663868,Individual,material,Juan Cruz,Dr.,"17472 Christie Stream Apt. 976 North Kristinaport, HI 91033, SN",,,,,,,,,,,,,,https://www.juarez-collier.org/,,DJ,1944-03-05,Faroe Islands,PK,http://richardson-richardson.org/,CI
+94734219,Specially Designated Nationals (SDN) - Treasury Department,96663869,Individual,material,Sarah Jones,Dr.,"1 Main Street, Springfield, IQ",,,,,,,,,,,,,,https://www.juarez-collier.org/,Sally Jones,DJ,1944-03-05,Faroe Islands,PK,http://richardson-richardson.org/,CI
+94734220,Denied Persons List (DPL) - Bureau of Industry and Security,,,,Mickey Mouse,,"123 S. TEST DRIVE, SCOTTSDALE, AZ, 85251",,,,,,,,,,,,,,,,,,,,,"""
+# pylint: enable=line-too-long
+
+
+class TestBenchmarkSdnFallbackCommand(TestCase):
+
+    def test_handle(self):
+        """ Verify the matcher and the record scan agree on every check. """
+        out = StringIO()
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as csv_file:
+            csv_file.write(CSV_STRING)
+            csv_file.flush()
+            call_command('benchmark_sdn_fallback', csv_file.name, '--queries=20', stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('SDN individuals: 2', output)
+        self.assertIn('Checks: 20', output)
+        self.assertIn('All checks returned the same hit counts.', output)
@@ -8,8 +8,10 @@ from io import StringIO
 
 from django.core.management import call_command
 from django.core.management.base import CommandError
+from django.test import override_settings
+from django.utils import timezone
 from factory.django import get_model
-from mock import patch
+from mock import Mock, patch
 from requests.exceptions import HTTPError
 
 from ecommerce.core.management.commands.sync_hubspot import EXPECTED_METHODS
@@ -18,6 +20,7 @@ from ecommerce.extensions.test.factories import create_basket, create_order
 from ecommerce.tests.factories import SiteConfigurationFactory, UserFactory
 from ecommerce.tests.testcases import TestCase
 
+HubSpotSyncCheckpoint = get_model('core', 'HubSpotSyncCheckpoint')
 SiteConfiguration = get_model('core', 'SiteConfiguration')
 Basket = get_model('basket', 'Basket')
 
@@ -234,3 +237,97 @@ class TestSyncHubspotCommand(TestCase):
                 api_url="fake_url",
                 method=unsupported_method
             )
+
+    def _call_incremental_sync(self):
+        out = StringIO()
+        err = StringIO()
+        call_command('sync_hubspot', '--incremental', '--initial-sync-days=2', '--page-size=1', stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def _synced_object_types(self, mocked_hubspot):
+        return [
+            call[0][0] for call in mocked_hubspot.call_args_list
+            if call[0][1] == 'extensions/ecomm/v1/sync-messages/'
+        ]
+
+    @patch.object(sync_command, '_hubspot_endpoint')
+    def test_incremental_sync(self, mocked_hubspot):
+        """
+        Test the incremental sync pages through the carts since the high-water mark, then moves it forward.
+        """
+        output, __ = self._call_incremental_sync()
+
+        # One page per cart, each syncing a contact, a product, a deal and a line item.
+        self.assertEqual(self._synced_object_types(mocked_hubspot), ['CONTACT', 'PRODUCT', 'DEAL', 'LINE_ITEM'] * 2)
+        self.assertIn('Synced 2 carts for site {}'.format(self.hubspot_site_configuration.site.domain), output)
+        checkpoint = HubSpotSyncCheckpoint.objects.get(site_configuration=self.hubspot_site_configuration)
+        synced_until = checkpoint.synced_until
+
+        mocked_hubspot.reset_mock()
+        output, __ = self._call_incremental_sync()
+        self.assertEqual(self._synced_object_types(mocked_hubspot), [])
+        self.assertIn(
+            'No data found to sync for site {site}'.format(site=self.hubspot_site_configuration.site.domain), output
+        )
+        checkpoint.refresh_from_db()
+        self.assertGreater(checkpoint.synced_until, synced_until)
+
+    @patch.object(sync_command, '_hubspot_endpoint')
+    def test_incremental_sync_lines_added(self, mocked_hubspot):
+        """
+        Test the incremental sync picks up carts created before the high-water mark whose lines were added
+        after it, and keeps the mark behind the current time by the safety margin.
+        """
+        HubSpotSyncCheckpoint.objects.create(
+            site_configuration=self.hubspot_site_configuration, synced_until=timezone.now() - timedelta(hours=1)
+        )
+        basket = create_basket(site=self.hubspot_site_configuration.site)
+        Basket.objects.filter(id=basket.id).update(date_created=timezone.now() - timedelta(days=2))
+        basket.lines.update(date_created=timezone.now() - timedelta(minutes=30))
+
+        with override_settings(HUBSPOT_SYNC_SAFETY_MARGIN=timedelta(minutes=10)):
+            output, __ = self._call_incremental_sync()
+
+        self.assertEqual(self._synced_object_types(mocked_hubspot), ['CONTACT', 'PRODUCT', 'DEAL', 'LINE_ITEM'])
+        self.assertIn('Synced 1 carts for site {}'.format(self.hubspot_site_configuration.site.domain), output)
+        checkpoint = HubSpotSyncCheckpoint.objects.get(site_configuration=self.hubspot_site_configuration)
+        self.assertLessEqual(checkpoint.synced_until, timezone.now() - timedelta(minutes=10))
+
+    @patch('ecommerce.core.management.commands.sync_hubspot.time.sleep')
+    @patch.object(sync_command, '_hubspot_endpoint')
+    def test_incremental_sync_retries(self, mocked_hubspot, mocked_sleep):
+        """
+        Test batches are retried with a backoff when HubSpot fails with a server error.
+        """
+        failures = [HTTPError(response=Mock(status_code=503)), HTTPError(response=Mock(status_code=429))]
+
+        def hubspot_endpoint(object_type, api_url, method, body=None, **kwargs):  # pylint: disable=unused-argument
+            if object_type == 'DEAL' and failures:
+                raise failures.pop(0)
+            return {'results': []}
+
+        mocked_hubspot.side_effect = hubspot_endpoint
+        __, errors = self._call_incremental_sync()
+
+        self.assertEqual(errors, '')
+        self.assertEqual([call[0][0] for call in mocked_sleep.call_args_list], [1, 2])
+        self.assertTrue(HubSpotSyncCheckpoint.objects.filter(site_configuration=self.hubspot_site_configuration))
+
+    @patch('ecommerce.core.management.commands.sync_hubspot.time.sleep')
+    @patch.object(sync_command, '_hubspot_endpoint')
+    def test_incremental_sync_failure(self, mocked_hubspot, mocked_sleep):
+        """
+        Test the high-water mark does not move when a batch cannot be synced.
+        """
+        def hubspot_endpoint(object_type, api_url, method, body=None, **kwargs):  # pylint: disable=unused-argument
+            if object_type == 'PRODUCT':
+                raise HTTPError(response=Mock(status_code=400))
+            return {'results': []}
+
+        mocked_hubspot.side_effect = hubspot_endpoint
+        __, errors = self._call_incremental_sync()
+
+        mocked_sleep.assert_not_called()
+        self.assertIn('An error occurred while upserting PRODUCT', errors)
+        self.assertIn('Some objects could not be synced', errors)
+        self.assertFalse(HubSpotSyncCheckpoint.objects.filter(site_configuration=self.hubspot_site_configuration))
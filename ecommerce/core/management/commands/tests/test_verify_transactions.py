@@ -6,15 +6,22 @@ Tests for Django management command to verify ecommerce transactions.
 import datetime
 
 import ddt
+import mock
 import pytz
 from django.core.management import call_command
 from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from oscar.core.loading import get_class, get_model
 from oscar.test.factories import OrderFactory, OrderLineFactory, ProductFactory
 
 from ecommerce.core.constants import SEAT_PRODUCT_CLASS_NAME
 from ecommerce.core.management.commands.tests.factories import PaymentEventFactory
-from ecommerce.core.management.commands.verify_transactions import DEFAULT_END_DELTA_TIME, DEFAULT_START_DELTA_TIME
+from ecommerce.core.management.commands.verify_transactions import (
+    DEFAULT_END_DELTA_TIME,
+    DEFAULT_START_DELTA_TIME,
+    split_time_window
+)
 from ecommerce.tests.testcases import TestCase
 
 PaymentEventType = get_model('order', 'PaymentEventType')
@@ -22,6 +29,22 @@ PaymentEventTypeName = get_class('order.constants', 'PaymentEventTypeName')
 ProductClass = get_model('catalogue', 'ProductClass')
 
 
+class SynchronousExecutor:
+    """ Stand-in for ProcessPoolExecutor that runs the work in the test process, on the test database. """
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def map(self, func, iterable):
+        return map(func, iterable)
+
+
 @ddt.ddt
 class VerifyTransactionsTest(TestCase):
 
@@ -252,3 +275,47 @@ class VerifyTransactionsTest(TestCase):
         self.assertIn(str(refund.id), exception)
         self.assertIn('"amount": 90.0', exception)
         self.assertIn('"amount": 100.0', exception)
+
+    def test_queries_do_not_grow_with_orders(self):
+        """ Test verify_transactions computes payment totals for all orders at once """
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                with self.assertRaises(CommandError):
+                    call_command('verify_transactions')
+            return len(queries)
+
+        num_queries = count_queries()
+        for i in range(5):
+            order = OrderFactory(total_incl_tax=50, date_placed=self.timestamp)
+            OrderLineFactory(order=order, product=self.product, partner_sku='test_sku')
+            PaymentEventFactory(order=order, amount=40 + i, event_type_id=self.payevent.id)
+            PaymentEventFactory(order=order, amount=50, event_type_id=self.refundevent.id)
+
+        self.assertEqual(count_queries(), num_queries)
+
+    def test_workers(self):
+        """ Test verify_transactions merges the errors found in every part of the time window """
+        order = OrderFactory(
+            total_incl_tax=50, date_placed=datetime.datetime.now(pytz.utc) - datetime.timedelta(minutes=200)
+        )
+        OrderLineFactory(order=order, product=self.product, partner_sku='test_sku')
+
+        with mock.patch(
+            'ecommerce.core.management.commands.verify_transactions.ProcessPoolExecutor', SynchronousExecutor
+        ):
+            with self.assertRaises(CommandError) as cm:
+                call_command('verify_transactions', '--workers=3')
+        exception = str(cm.exception)
+        self.assertIn("The following orders are without payments", exception)
+        self.assertIn('"order_id": {}'.format(self.order.id), exception)
+        self.assertIn('"order_id": {}'.format(order.id), exception)
+
+    def test_split_time_window(self):
+        """ Test the time window is split into consecutive windows of the same length """
+        start = datetime.datetime(2020, 1, 1, tzinfo=pytz.utc)
+        end = start + datetime.timedelta(hours=3)
+        self.assertEqual(split_time_window(start, end, 3), [
+            (start, start + datetime.timedelta(hours=1)),
+            (start + datetime.timedelta(hours=1), start + datetime.timedelta(hours=2)),
+            (start + datetime.timedelta(hours=2), end),
+        ])
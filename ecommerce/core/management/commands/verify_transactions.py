@@ -16,6 +16,10 @@ After considering each order in the time window the errors are input into the
 exit_errors dictionary. If any errors exist at the end of the script a
 CommandError is raised and the dictionary is printed as a string log.
 
+Payment and refund totals are computed for all orders in the time window with
+one grouped query. Long time windows can be split across processes with
+--workers.
+
 Example output:
     CommandError:
     Errors in transactions: {'orders_no_pay':
@@ -29,16 +33,20 @@ Example output:
 import datetime
 import json
 import logging
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
 import pytz
 from django.core.management.base import BaseCommand, CommandError
-from django.db.models import Sum
+from django.db import connections
+from django.db.models import Count, Q, Sum
 from oscar.core.loading import get_class, get_model
 
 from ecommerce.core.constants import COURSE_ENTITLEMENT_PRODUCT_CLASS_NAME, SEAT_PRODUCT_CLASS_NAME
 from ecommerce.core.utils import use_read_replica_if_available
 
 logger = logging.getLogger(__name__)
+Line = get_model('order', 'Line')
 Order = get_model('order', 'Order')
 PaymentEvent = get_model('order', 'PaymentEvent')
 PaymentEventType = get_model('order', 'PaymentEventType')
@@ -49,6 +57,27 @@ DEFAULT_END_DELTA_TIME = 60
 VALID_PRODUCT_CLASS_NAMES = [SEAT_PRODUCT_CLASS_NAME, COURSE_ENTITLEMENT_PRODUCT_CLASS_NAME]
 
 
+def verify_time_window(window):
+    """
+    Verify the orders placed in a (start, end, support) time window, and return the errors found.
+
+    This runs in a worker process when the command is run with more than one worker.
+    """
+    start, end, support = window
+    command = Command()
+    command.ERRORS_DICT = {}
+    command.load_event_types()
+    command.verify_orders(start, end, support)
+    return command.ERRORS_DICT
+
+
+def split_time_window(start, end, count):
+    """ Split the time window from start to end into count consecutive windows of the same length. """
+    step = (end - start) / count
+    boundaries = [start + step * index for index in range(count)] + [end]
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
 class Command(BaseCommand):
     ERRORS_DICT = None
     PAID_EVENT_TYPE = None
@@ -84,52 +113,113 @@ class Command(BaseCommand):
             action='store_true',
             help='Mismatched orders to go to Support'
         )
+        parser.add_argument(
+            '--workers',
+            metavar='N',
+            action='store',
+            type=int,
+            default=1,
+            help='Number of processes to split the time window across.'
+        )
 
     def handle(self, *args, **options):
         logger.info("Verify transactions with options: %r", options)
 
         self.ERRORS_DICT = {}
-        self.PAID_EVENT_TYPE = PaymentEventType.objects.get(name=PaymentEventTypeName.PAID)
-        self.REFUNDED_EVENT_TYPE = PaymentEventType.objects.get(name=PaymentEventTypeName.REFUNDED)
+        self.load_event_types()
 
         support = options['support']
         start_delta = options['start_delta']
         end_delta = options['end_delta']
         threshold = max(options['threshold'], 0)
+        workers = max(options['workers'], 1)
 
         start = datetime.datetime.now(pytz.utc) - datetime.timedelta(minutes=start_delta)
         end = datetime.datetime.now(pytz.utc) - datetime.timedelta(minutes=end_delta)
         logger.info("Start time: %s  --  End time: %s", start, end)
 
-        orders = use_read_replica_if_available(Order.objects.all()
-                                               .filter(date_placed__gte=start, date_placed__lt=end)
-                                               .prefetch_related('payment_events__event_type'))
-        logger.info("Number of orders to verify: %s", orders.count())
-        if orders.count() == 0:
+        order_count = self.get_orders(start, end).count()
+        logger.info("Number of orders to verify: %s", order_count)
+        if order_count == 0:
             logger.info("No orders, DONE")
             return
 
+        if workers > 1:
+            self.verify_orders_in_parallel(start, end, support, workers)
+        else:
+            self.verify_orders(start, end, support)
+
+        if support:
+            self.handle_support(order_count)
+        else:
+            self.handle_alert(order_count, threshold)
+
+    def load_event_types(self):
+        self.PAID_EVENT_TYPE = PaymentEventType.objects.get(name=PaymentEventTypeName.PAID)
+        self.REFUNDED_EVENT_TYPE = PaymentEventType.objects.get(name=PaymentEventTypeName.REFUNDED)
+
+    def get_orders(self, start, end):
+        return use_read_replica_if_available(Order.objects.filter(date_placed__gte=start, date_placed__lt=end))
+
+    def verify_orders_in_parallel(self, start, end, support, workers):
+        windows = [(window_start, window_end, support) for window_start, window_end in split_time_window(
+            start, end, workers
+        )]
+        # Worker processes must open their own database connections.
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for errors in executor.map(verify_time_window, windows):
+                for tag, tag_errors in errors.items():
+                    if tag not in self.ERRORS_DICT:
+                        self.ERRORS_DICT[tag] = {"message": tag_errors["message"], "errors": []}
+                    self.ERRORS_DICT[tag]["errors"].extend(tag_errors["errors"])
+
+    def verify_orders(self, start, end, support=False):
+        """
+        Verify the orders placed between start and end, using payment totals computed with a single grouped query.
+        """
+        totals = self.get_payment_totals(start, end)
+        orders = self.get_orders(start, end).only('id', 'number', 'total_incl_tax', 'guest_email')
         if support:
-            self.handle_support(orders)
+            self.validate_orders_support(orders, totals)
         else:
-            self.handle_alert(orders, threshold)
+            self.validate_orders(orders, totals)
+
+    def get_payment_totals(self, start, end):
+        """
+        Return the sum and number of payments and refunds of every order placed between start and end,
+        keyed on (order id, event type id).
+        """
+        totals = use_read_replica_if_available(PaymentEvent.objects.filter(
+            order__date_placed__gte=start,
+            order__date_placed__lt=end,
+            event_type_id__in=[self.PAID_EVENT_TYPE.id, self.REFUNDED_EVENT_TYPE.id],
+        )).order_by().values('order_id', 'event_type_id').annotate(total=Sum('amount'), count=Count('id'))
+        return {(item['order_id'], item['event_type_id']): (item['total'], item['count']) for item in totals}
+
+    def get_payment_events(self, order_ids):
+        """ Return the payment events of the given orders, keyed on (order id, event type id). """
+        payment_events = defaultdict(list)
+        events = use_read_replica_if_available(
+            PaymentEvent.objects.filter(order_id__in=order_ids).select_related('event_type').order_by('id')
+        )
+        for event in events:
+            payment_events[(event.order_id, event.event_type_id)].append(event)
+        return payment_events
 
-    def process_errors(self, orders):
+    def process_errors(self, order_count):
         # FIXME: it is possible for an order to have more than one error, so this really should
         # count "unique orders with errors", not number of errors
         error_count = sum([len(v["errors"]) for v in self.ERRORS_DICT.values()])
         exit_errors = json.dumps(self.ERRORS_DICT)
-        error_rate = float(error_count) / orders.count()
+        error_rate = float(error_count) / order_count
 
         logger.info("Summary: %d errors, %.1f %%", error_count, error_rate * 100.0)
 
         return error_count, exit_errors, error_rate
 
-    def handle_alert(self, orders, threshold):
-        for order in orders:
-            self.validate_order(order)
-
-        error_count, exit_errors, error_rate = self.process_errors(orders)
+    def handle_alert(self, order_count, threshold):
+        error_count, exit_errors, error_rate = self.process_errors(order_count)
 
         if threshold == 0 or threshold >= 1:
             threshold = int(threshold)
@@ -142,80 +232,108 @@ class Command(BaseCommand):
         if self.ERRORS_DICT:
             logger.warning("Errors in transactions within threshold (%r): %s", threshold, exit_errors)
 
-    def handle_support(self, orders):
-        for order in orders:
-            all_payment_events = order.payment_events
-            payments = all_payment_events.filter(event_type=self.PAID_EVENT_TYPE)
-
-            # If the payment total and the order total do not match, flag for review.
-            if payments.count() == 1 and payments[0].amount != order.total_incl_tax:
-                mismatch_total = float(payments[0].amount - order.total_incl_tax)
-                # FIXME: validate_order should be changed to log _all_ errors related to an order
-                # If payment amount > order amount, a refund is required from Support
-                if mismatch_total > 0:
-                    error_dict = {
-                        "order_number": order.number,
-                        "order_id": order.id,
-                        "order_amount": float(order.total_incl_tax),
-                        # Assuming just one payment since we do not support multi-payment
-                        "payment_id": payments[0].id,
-                        "payment_amount": float(payments[0].amount),
-                        "user_email": order.guest_email,
-                        "refund_amount": mismatch_total
-                    }
-                    self.add_error(
-                        "orders_mismatched_totals_support",
-                        "There was a mismatch in the totals in the following order that require a refund",
-                        error_dict=error_dict,
-                    )
-
-        error_count, exit_errors, error_rate = self.process_errors(orders)
+    def handle_support(self, order_count):
+        error_count, exit_errors, error_rate = self.process_errors(order_count)
         if error_count and error_rate > 0:
             raise CommandError("Errors in transactions: {errors}".format(errors=exit_errors))
 
-    def validate_order(self, order):
-        all_payment_events = order.payment_events
-        refunds = all_payment_events.filter(event_type=self.REFUNDED_EVENT_TYPE)
-        payments = all_payment_events.filter(event_type=self.PAID_EVENT_TYPE)
+    def validate_orders_support(self, orders, totals):
+        paid_event_type_id = self.PAID_EVENT_TYPE.id
+        mismatched_orders = []
+        for order in orders.iterator():
+            payment_total, payment_count = totals.get((order.id, paid_event_type_id), (None, 0))
+
+            # If the payment total and the order total do not match, flag for review.
+            # FIXME: validate_order should be changed to log _all_ errors related to an order
+            # If payment amount > order amount, a refund is required from Support
+            if payment_count == 1 and payment_total > order.total_incl_tax:
+                mismatched_orders.append(order)
+
+        payment_events = self.get_payment_events([order.id for order in mismatched_orders])
+        for order in mismatched_orders:
+            # Assuming just one payment since we do not support multi-payment
+            payment = payment_events[(order.id, paid_event_type_id)][0]
+            error_dict = {
+                "order_number": order.number,
+                "order_id": order.id,
+                "order_amount": float(order.total_incl_tax),
+                "payment_id": payment.id,
+                "payment_amount": float(payment.amount),
+                "user_email": order.guest_email,
+                "refund_amount": float(payment.amount - order.total_incl_tax)
+            }
+            self.add_error(
+                "orders_mismatched_totals_support",
+                "There was a mismatch in the totals in the following order that require a refund",
+                error_dict=error_dict,
+            )
+
+    def validate_orders(self, orders, totals):
+        """
+        Flag orders without payments, with multiple payments, with payments that do not match
+        the order total, or with refunds exceeding the payments.
+        """
+        orders = list(orders.iterator())
+        orders_requiring_payment = self.get_orders_requiring_payment([
+            order.id for order in orders
+            if (order.id, self.PAID_EVENT_TYPE.id) not in totals and order.total_incl_tax > 0
+        ])
+
+        errors = []
+        for order in orders:
+            errors.extend(self.validate_order(order, totals, orders_requiring_payment))
+
+        payment_events = self.get_payment_events([order.id for __, __, order, __ in errors])
+        for tag, msg, order, event_type in errors:
+            payments = payment_events[(order.id, event_type.id)] if event_type else None
+            self.add_error(tag, msg, order, payments)
+
+    def validate_order(self, order, totals, orders_requiring_payment):
+        """
+        Return the (tag, message, order, event type of the payments to report) errors of an order.
+        """
+        errors = []
+        payment_total, payment_count = totals.get((order.id, self.PAID_EVENT_TYPE.id), (None, 0))
+        refund_total, __ = totals.get((order.id, self.REFUNDED_EVENT_TYPE.id), (None, 0))
 
         # If a coupon is used to purchase a product for the full price, there will be no PaymentEvent
         # so we must also verify that order had a price > 0.
-        if payments.count() == 0:
-            if self.order_requires_payment(order) and order.total_incl_tax > 0:
-                self.add_error(
+        if payment_count == 0:
+            if order.id in orders_requiring_payment:
+                errors.append((
                     "orders_no_payment",
                     "The following orders are without payments",
-                    order
-                )
+                    order,
+                    None
+                ))
 
         # We do not support multi-payment today, so flag this for review.
-        elif payments.count() > 1:
-            self.add_error(
+        elif payment_count > 1:
+            errors.append((
                 "orders_multi_payment",
                 "The following orders had multiple payments",
                 order,
-                payments
-            )
+                self.PAID_EVENT_TYPE
+            ))
 
         # If the payment total and the order total do not match, flag for review.
-        elif payments.aggregate(total=Sum('amount')).get('total') != order.total_incl_tax:
+        elif payment_total != order.total_incl_tax:
             # FIXME: validate_order should be changed to log _all_ errors related to an order
-            self.add_error(
+            errors.append((
                 "orders_mismatched_totals",
                 "The following order totals mismatch payments received",
                 order,
-                payments
-            )
+                self.PAID_EVENT_TYPE
+            ))
 
-        refund_total = refunds.aggregate(total=Sum('amount')).get('total')
-        payment_total = payments.aggregate(total=Sum('amount')).get('total')
-        if refund_total is not None and refund_total > payment_total:
-            self.add_error(
+        if refund_total is not None and refund_total > (payment_total or 0):
+            errors.append((
                 "orders_refund_exceeded",
                 "The following orders had excessive refunds",
                 order,
-                refunds
-            )
+                self.REFUNDED_EVENT_TYPE
+            ))
+        return errors
 
     def add_error(self, tag, msg, order=None, payments=None, error_dict=None):
         if tag not in self.ERRORS_DICT:
@@ -244,12 +362,15 @@ class Command(BaseCommand):
             ]
         return d
 
-    def order_requires_payment(self, order):
+    def get_orders_requiring_payment(self, order_ids):
+        """
+        Return the ids of the given orders that we expect an immediate payment for.
+        """
         # We only expect immediate payments for Seats and Entitlements.
         # Filter out orders that were flagged as being without payment for other product types
-        # FIXME: there are better ways to do this
-        for line in order.lines.all():
-            name = line.product.get_product_class().name
-            if name in VALID_PRODUCT_CLASS_NAMES:
-                return True
-        return False
+        # Child products, such as seats, take their product class from their parent.
+        return set(use_read_replica_if_available(Line.objects.filter(
+            Q(product__product_class__name__in=VALID_PRODUCT_CLASS_NAMES) |
+            Q(product__parent__product_class__name__in=VALID_PRODUCT_CLASS_NAMES),
+            order_id__in=order_ids,
+        )).order_by().values_list('order_id', flat=True).distinct())
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-17 06:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0066_remove_account_microfrontend_url_field_from_SiteConfiguration'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HubSpotSyncCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('synced_until', models.DateTimeField(help_text='Baskets created or submitted before this time have been synced to HubSpot.')),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('site_configuration', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='hubspot_sync_checkpoint', to='core.siteconfiguration')),
+            ],
+        ),
+    ]
@@ -12,12 +12,12 @@ from django.utils.functional import cached_property
 from django.utils.translation import ugettext_lazy as _
 from edx_django_utils import monitoring as monitoring_utils
 from edx_rbac.models import UserRole, UserRoleAssignment
-from edx_rest_api_client.client import OAuthAPIClient
 from jsonfield.fields import JSONField
 from requests.exceptions import ConnectionError as ReqConnectionError
 from requests.exceptions import RequestException, Timeout
 from simple_history.models import HistoricalRecords
 
+from ecommerce.core.api_clients import get_oauth_api_client
 from ecommerce.core.constants import ALL_ACCESS_CONTEXT, ALLOW_MISSING_LMS_USER_ID
 from ecommerce.core.exceptions import MissingLmsUserIdException
 from ecommerce.core.utils import log_message_and_raise_validation_error
@@ -390,10 +390,13 @@ class SiteConfiguration(models.Model):
         """
         This client is authenticated with the configured oauth settings and automatically cached.
 
+        The client is shared by every caller in the process, so its connections and access token are reused.
+
         Returns:
             requests.Session: API client
         """
-        return OAuthAPIClient(
+        return get_oauth_api_client(
+            self.site,
             settings.BACKEND_SERVICE_EDX_OAUTH2_PROVIDER_URL,
             settings.BACKEND_SERVICE_EDX_OAUTH2_KEY,
             settings.BACKEND_SERVICE_EDX_OAUTH2_SECRET,
@@ -780,3 +783,21 @@ class EcommerceFeatureRoleAssignment(UserRoleAssignment):
         Return uniquely identifying string representation.
         """
         return self.__str__()
+
+
+class HubSpotSyncCheckpoint(models.Model):
+    """
+    High-water mark of the incremental sync of a site's baskets to HubSpot.
+     .. no_pii:
+    """
+
+    site_configuration = models.OneToOneField(
+        SiteConfiguration, on_delete=models.CASCADE, related_name='hubspot_sync_checkpoint'
+    )
+    synced_until = models.DateTimeField(
+        help_text=_('Baskets created or submitted before this time have been synced to HubSpot.')
+    )
+    modified = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return '{site}: {synced_until}'.format(site=self.site_configuration.site.domain, synced_until=self.synced_until)
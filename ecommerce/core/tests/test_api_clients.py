@@ -0,0 +1,96 @@
+import datetime
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import mock
+import responses
+from django.test import override_settings
+
+from ecommerce.core.api_clients import PooledOAuthAPIClient, clear_oauth_api_clients, get_oauth_api_client
+from ecommerce.tests.factories import SiteConfigurationFactory
+from ecommerce.tests.testcases import TestCase
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+class OAuthAPIClientRegistryTests(TestCase):
+    """ Tests for the shared OAuth API clients. """
+
+    base_url = 'http://lms.example.com/oauth2'
+
+    def test_get_oauth_api_client(self):
+        """ Verify clients are shared per site and credentials. """
+        other_site = SiteConfigurationFactory().site
+        client = get_oauth_api_client(self.site, self.base_url, 'key', 'secret')
+
+        self.assertIs(get_oauth_api_client(self.site, self.base_url, 'key', 'secret'), client)
+        self.assertIsNot(get_oauth_api_client(other_site, self.base_url, 'key', 'secret'), client)
+        self.assertIsNot(get_oauth_api_client(self.site, self.base_url, 'key', 'other-secret'), client)
+
+        clear_oauth_api_clients()
+        self.assertIsNot(get_oauth_api_client(self.site, self.base_url, 'key', 'secret'), client)
+
+    @override_settings(
+        OAUTH_API_CLIENT_POOL_CONNECTIONS=4, OAUTH_API_CLIENT_POOL_MAXSIZE=20, OAUTH_API_CLIENT_MAX_RETRIES=2
+    )
+    def test_pool_settings(self):
+        """ Verify the connection pools and retries are configured from settings. """
+        client = get_oauth_api_client(self.site, self.base_url, 'key', 'secret')
+        adapter = client.get_adapter('https://lms.example.com/')
+
+        self.assertEqual(adapter._pool_connections, 4)  # pylint: disable=protected-access
+        self.assertEqual(adapter._pool_maxsize, 20)  # pylint: disable=protected-access
+        self.assertEqual(adapter.max_retries.total, 2)
+        self.assertEqual(adapter.max_retries.read, 0)
+
+    @responses.activate
+    def test_token_kept_until_expired(self):
+        """ Verify the access token is only requested again once it expires. """
+        responses.add(responses.GET, 'http://lms.example.com/api/', json={})
+        client = PooledOAuthAPIClient(self.base_url, 'key', 'secret')
+        expires_at = datetime.datetime.utcnow() + datetime.timedelta(seconds=3600)
+
+        with mock.patch(
+            'ecommerce.core.api_clients.get_and_cache_oauth_access_token', return_value=('abc123', expires_at)
+        ) as get_token:
+            client.get('http://lms.example.com/api/')
+            client.get('http://lms.example.com/api/')
+            self.assertEqual(get_token.call_count, 1)
+            self.assertEqual(responses.calls[-1].request.headers['Authorization'], 'JWT abc123')
+
+            client._token_expires_at = datetime.datetime.utcnow()  # pylint: disable=protected-access
+            client.get('http://lms.example.com/api/')
+            self.assertEqual(get_token.call_count, 2)
+
+    def test_connection_stats(self):
+        """ Verify requests to the same host reuse an open connection. """
+        server = HTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        url = 'http://127.0.0.1:{}/'.format(server.server_port)
+        client = PooledOAuthAPIClient(self.base_url, 'key', 'secret')
+        self.assertEqual(client.get_connection_stats(), {'requests': 0, 'connections': 0, 'reused': 0})
+
+        expires_at = datetime.datetime.utcnow() + datetime.timedelta(seconds=3600)
+        with mock.patch(
+            'ecommerce.core.api_clients.get_and_cache_oauth_access_token', return_value=('abc123', expires_at)
+        ):
+            for __ in range(3):
+                client.get(url).raise_for_status()
+
+        self.assertEqual(client.get_connection_stats(), {'requests': 3, 'connections': 1, 'reused': 2})
+        client.close()
@@ -0,0 +1,74 @@
+import threading
+import time
+
+from django.core.cache import cache
+from edx_django_utils.cache import DEFAULT_REQUEST_CACHE
+
+from ecommerce.core.utils import CallCoalescer, get_many_cached_responses, set_many_all_tiers
+from ecommerce.tests.testcases import TestCase
+
+
+class TieredCacheMultiKeyTests(TestCase):
+    """ Tests for the multi-key tiered cache helpers. """
+
+    def test_set_and_get_many(self):
+        """ Verify values set in both tiers are returned, and missing keys are omitted. """
+        set_many_all_tiers({'a': 1, 'b': 0}, 60)
+        self.assertEqual(cache.get_many(['a', 'b']), {'a': 1, 'b': 0})
+        self.assertEqual(get_many_cached_responses(['a', 'b', 'c']), {'a': 1, 'b': 0})
+
+    def test_get_many_populates_request_cache(self):
+        """ Verify django cache hits are added to the request cache. """
+        cache.set('a', 1)
+        self.assertFalse(DEFAULT_REQUEST_CACHE.get_cached_response('a').is_found)
+
+        self.assertEqual(get_many_cached_responses(['a']), {'a': 1})
+        self.assertEqual(DEFAULT_REQUEST_CACHE.get_cached_response('a').value, 1)
+
+        cache.delete('a')
+        self.assertEqual(get_many_cached_responses(['a']), {'a': 1})
+
+
+class CallCoalescerTests(TestCase):
+    """ Tests for CallCoalescer. """
+
+    def test_concurrent_calls_share_result(self):
+        """ Verify callers with the same key while a call is in flight share its result. """
+        coalescer = CallCoalescer()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def slow_call():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 'result'
+
+        leader = threading.Thread(target=lambda: results.append(coalescer.call('key', slow_call)))
+        leader.start()
+        started.wait(5)
+        follower = threading.Thread(target=lambda: results.append(coalescer.call('key', slow_call)))
+        follower.start()
+        # Give the follower time to find the in-flight call before letting it complete.
+        time.sleep(0.1)
+        release.set()
+        leader.join(5)
+        follower.join(5)
+
+        self.assertEqual(results, ['result', 'result'])
+        self.assertEqual(len(calls), 1)
+        # Once the call has completed, a new call is made.
+        self.assertEqual(coalescer.call('key', lambda: 'new result'), 'new result')
+
+    def test_exception_propagates(self):
+        """ Verify exceptions are raised to the caller and the key is released. """
+        coalescer = CallCoalescer()
+
+        def failing_call():
+            raise ValueError
+
+        with self.assertRaises(ValueError):
+            coalescer.call('key', failing_call)
+        self.assertEqual(coalescer.call('key', lambda: 1), 1)
@@ -373,10 +373,15 @@ class SiteConfigurationTests(TestCase):
         token = self.mock_access_token_response()
         site_config = SiteConfigurationFactory()
         client = site_config.oauth_api_client
-        self.assertEqual(type(client), OAuthAPIClient)
+        self.assertIsInstance(client, OAuthAPIClient)
         self.assertEqual(client.get_jwt_access_token(), token)
         self.assertEqual(len(responses.calls), 1)
 
+        # The client, and its token, are shared by later callers.
+        self.assertIs(site_config.oauth_api_client, client)
+        self.assertEqual(site_config.oauth_api_client.get_jwt_access_token(), token)
+        self.assertEqual(len(responses.calls), 1)
+
 
 class EcommerceFeatureRoleTests(TestCase):
     def test_str(self):
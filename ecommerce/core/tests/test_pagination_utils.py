@@ -0,0 +1,68 @@
+import ddt
+import mock
+
+from ecommerce.core.utils import (
+    deprecated_traverse_pagination,
+    get_pagination_metrics,
+    reset_pagination_metrics,
+    traverse_pagination
+)
+from ecommerce.tests.testcases import TestCase
+
+API_URL = 'https://api.example.com/resources/'
+
+
+@ddt.ddt
+class TraversePaginationTests(TestCase):
+    """ Tests for traverse_pagination. """
+
+    def setUp(self):
+        super(TraversePaginationTests, self).setUp()
+        reset_pagination_metrics()
+        self.addCleanup(reset_pagination_metrics)
+        self.pages = [
+            {'results': [{'id': 1}, {'id': 2}], 'next': API_URL + '?page=2'},
+            {'results': [{'id': 3}], 'next': API_URL + '?page=3&search='},
+            {'results': [{'id': 4}], 'next': None},
+        ]
+        self.client = mock.Mock()
+        self.client.get.side_effect = self._get
+
+    def _get(self, url, params):  # pylint: disable=unused-argument
+        response = mock.Mock()
+        response.json.return_value = self.pages[int(params['page'][0]) - 1]
+        return response
+
+    @ddt.data(False, True)
+    def test_traverse(self, prefetch):
+        """ Verify the results of every page are yielded, following the next links. """
+        results = traverse_pagination(self.pages[0], self.client, API_URL, prefetch=prefetch)
+
+        self.assertEqual([result['id'] for result in results], [1, 2, 3, 4])
+        self.client.get.assert_has_calls([
+            mock.call(API_URL, params={'page': ['2']}),
+            mock.call(API_URL, params={'page': ['3'], 'search': ['']}),
+        ], any_order=True)
+        self.assertEqual(get_pagination_metrics()[API_URL]['pages'], 2)
+
+    def test_stop_early(self):
+        """ Verify pages after the one holding the last consumed result are not requested. """
+        results = traverse_pagination(self.pages[0], self.client, API_URL)
+
+        self.assertEqual(next(record for record in results if record['id'] == 2), {'id': 2})
+        results.close()
+        self.client.get.assert_not_called()
+        self.assertEqual(get_pagination_metrics(), {})
+
+    def test_single_page(self):
+        """ Verify a response without a next link is not traversed. """
+        self.assertEqual(deprecated_traverse_pagination(self.pages[2], self.client, API_URL), [{'id': 4}])
+        self.client.get.assert_not_called()
+
+    @ddt.data(False, True)
+    def test_error(self, prefetch):
+        """ Verify errors raised while requesting a page are raised to the caller. """
+        self.client.get.side_effect = ValueError
+
+        with self.assertRaises(ValueError):
+            list(traverse_pagination(self.pages[0], self.client, API_URL, prefetch=prefetch))
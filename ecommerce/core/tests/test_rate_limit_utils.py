@@ -0,0 +1,26 @@
+import mock
+
+from ecommerce.core.utils import RateLimiter
+from ecommerce.tests.testcases import TestCase
+
+
+class RateLimiterTests(TestCase):
+    """ Tests for RateLimiter. """
+
+    def test_wait(self):
+        """ Verify calls are spaced out to the rate. """
+        limiter = RateLimiter(rate=2)
+        with mock.patch('ecommerce.core.utils.time.monotonic', return_value=100.0), \
+                mock.patch('ecommerce.core.utils.time.sleep') as mock_sleep:
+            for __ in range(3):
+                limiter.wait()
+
+        self.assertEqual([call[0][0] for call in mock_sleep.call_args_list], [0.5, 1.0])
+
+    def test_no_rate(self):
+        """ Verify calls are not spaced out without a rate. """
+        limiter = RateLimiter()
+        with mock.patch('ecommerce.core.utils.time.sleep') as mock_sleep:
+            limiter.wait()
+
+        mock_sleep.assert_not_called()
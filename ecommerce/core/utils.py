@@ -1,11 +1,16 @@
 
 
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import parse_qs, urlparse
 
 import waffle
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
+from edx_django_utils.cache import DEFAULT_REQUEST_CACHE
 from edx_django_utils.cache import get_cache_key as get_django_cache_key
 
 logger = logging.getLogger(__name__)
@@ -32,12 +37,214 @@ def get_cache_key(**kwargs):
     return get_django_cache_key(**kwargs)
 
 
+def get_many_cached_responses(keys):
+    """
+    Multi-key equivalent of TieredCache.get_cached_response.
+
+    Keys found in the request cache are served from it. The remaining keys are fetched from the
+    django cache in a single get_many call, and any hits are added to the request cache.
+
+    Arguments:
+        keys (iterable of str): Cache keys to look up.
+
+    Returns:
+        dict: Cached values keyed by cache key, for the keys that were found.
+    """
+    found = {}
+    missing_keys = []
+    for key in keys:
+        cached_response = DEFAULT_REQUEST_CACHE.get_cached_response(key)
+        if cached_response.is_found:
+            found[key] = cached_response.value
+        else:
+            missing_keys.append(key)
+
+    if missing_keys:
+        django_cached_values = cache.get_many(missing_keys)
+        for key, value in django_cached_values.items():
+            DEFAULT_REQUEST_CACHE.set(key, value)
+        found.update(django_cached_values)
+
+    return found
+
+
+def set_many_all_tiers(values, django_cache_timeout):
+    """
+    Multi-key equivalent of TieredCache.set_all_tiers, storing the values with a single set_many call.
+
+    Arguments:
+        values (dict): Values to cache, keyed by cache key.
+        django_cache_timeout (int): Timeout of the values in the django cache.
+    """
+    for key, value in values.items():
+        DEFAULT_REQUEST_CACHE.set(key, value)
+    cache.set_many(values, django_cache_timeout)
+
+
+class _InFlightCall:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class CallCoalescer:
+    """
+    Lets concurrent callers that need the same result share a single call.
+
+    The first caller for a key makes the call; callers arriving with the same key while it is
+    in flight wait for it and receive its result (or its exception) instead of repeating it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def call(self, key, func, *args, **kwargs):
+        with self._lock:
+            in_flight = self._calls.get(key)
+            is_leader = in_flight is None
+            if is_leader:
+                in_flight = self._calls[key] = _InFlightCall()
+
+        if not is_leader:
+            in_flight.done.wait()
+            if in_flight.error is not None:
+                raise in_flight.error
+            return in_flight.result
+
+        try:
+            in_flight.result = func(*args, **kwargs)
+        except Exception as error:
+            in_flight.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            in_flight.done.set()
+
+        return in_flight.result
+
+
+class RateLimiter:
+    """ Spaces out calls to wait, from any number of threads, to at most rate calls per second. """
+
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate else 0
+        self._lock = threading.Lock()
+        self._next_call = 0
+
+    def wait(self):
+        if not self.interval:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_call - now
+            self._next_call = max(now, self._next_call) + self.interval
+
+        if delay > 0:
+            time.sleep(delay)
+
+
+_pagination_metrics = {}
+_pagination_metrics_lock = threading.Lock()
+
+
+def _record_pagination_metrics(api_url, pages, seconds):
+    with _pagination_metrics_lock:
+        metrics = _pagination_metrics.setdefault(api_url, {'calls': 0, 'pages': 0, 'seconds': 0.0})
+        metrics['calls'] += 1
+        metrics['pages'] += pages
+        metrics['seconds'] += seconds
+
+
+def get_pagination_metrics():
+    """
+    Returns the pages fetched by traverse_pagination, and the seconds spent waiting for them, per endpoint.
+
+    Returns:
+        dict: {api_url: {'calls': int, 'pages': int, 'seconds': float}}
+    """
+    with _pagination_metrics_lock:
+        return {api_url: dict(metrics) for api_url, metrics in _pagination_metrics.items()}
+
+
+def reset_pagination_metrics():
+    """
+    Forgets the pagination metrics collected so far.
+    """
+    with _pagination_metrics_lock:
+        _pagination_metrics.clear()
+
+
+def _get_page(client, api_url, next_page):
+    querystring = parse_qs(urlparse(next_page).query, keep_blank_values=True)
+    response = client.get(api_url, params=querystring)
+    response.raise_for_status()
+    return response.json()
+
+
+def traverse_pagination(response, client, api_url, prefetch=False):
+    """
+    Lazily traverse a paginated API response.
+
+    Yields the "results" (list of dict) returned by DRF-powered APIs one page at a time, following
+    the "next" links only as far as the caller iterates, so callers looking for a single record can
+    stop early and no page is kept once its results have been consumed.
+
+    When prefetch is set, the next page is requested in a background thread while the results of
+    the current page are being consumed. The client is then used from that thread, so callers must
+    not use it themselves while iterating.
+
+    Arguments:
+        response (Dict): Current response dict from service API
+        client (requests.Session): OAuthAPIClient object from edx-rest-api-client
+        api_url (str): API endpoint URL
+        prefetch (bool): Whether to request the next page while the current one is consumed
+
+    Yields:
+        dict
+    """
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    pending_page = None
+    pages = 0
+    seconds = 0.0
+    try:
+        while True:
+            next_page = response.get('next')
+            if next_page and executor:
+                pending_page = executor.submit(_get_page, client, api_url, next_page)
+
+            yield from response.get('results', [])
+
+            if not next_page:
+                break
+
+            if waffle.switch_is_active("debug_logging_for_deprecated_traverse_pagination"):  # pragma: no cover
+                logger.info("traverse_pagination method is called for endpoint %s", api_url)
+            start = time.perf_counter()
+            if pending_page:
+                response, pending_page = pending_page.result(), None
+            else:
+                response = _get_page(client, api_url, next_page)
+            seconds += time.perf_counter() - start
+            pages += 1
+    finally:
+        if executor:
+            if pending_page:
+                pending_page.cancel()
+            executor.shutdown(wait=False)
+        if pages:
+            _record_pagination_metrics(api_url, pages, seconds)
+
+
 def deprecated_traverse_pagination(response, client, api_url):
     """
     Traverse a paginated API response.
 
     Note: This method should be deprecated since it defeats the purpose
-    of pagination.
+    of pagination. Use traverse_pagination, which yields the results lazily, instead.
 
     Extracts and concatenates "results" (list of dict) returned by DRF-powered
     APIs.
@@ -51,20 +258,7 @@ def deprecated_traverse_pagination(response, client, api_url):
         list of dict.
 
     """
-    results = response.get('results', [])
-
-    next_page = response.get('next')
-    while next_page:
-        if waffle.switch_is_active("debug_logging_for_deprecated_traverse_pagination"):  # pragma: no cover
-            logger.info("deprecated_traverse_pagination method is called for endpoint %s", api_url)
-        querystring = parse_qs(urlparse(next_page).query, keep_blank_values=True)
-        response = client.get(api_url, params=querystring)
-        response.raise_for_status()
-        response = response.json()
-        results += response.get('results', [])
-        next_page = response.get('next')
-
-    return results
+    return list(traverse_pagination(response, client, api_url))
 
 
 def use_read_replica_if_available(queryset):
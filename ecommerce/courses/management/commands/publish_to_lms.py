@@ -7,6 +7,7 @@ import os
 from django.core.management import BaseCommand, CommandError
 
 from ecommerce.courses.models import Course
+from ecommerce.courses.publishers import BulkLMSPublisher
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +27,18 @@ class Command(BaseCommand):
                             dest='course_ids_file',
                             default=None,
                             help='Path to file to read courses from.')
+        parser.add_argument('--max-workers',
+                            action='store',
+                            dest='max_workers',
+                            default=8,
+                            type=int,
+                            help='Number of courses to publish at the same time.')
+        parser.add_argument('--rate',
+                            action='store',
+                            dest='rate',
+                            default=10,
+                            type=float,
+                            help='Maximum number of courses to publish per second. 0 for no limit.')
 
     def handle(self, *args, **options):
         failed = 0
@@ -34,26 +47,26 @@ class Command(BaseCommand):
             raise CommandError("Pass the correct absolute path to course ids file as --course_ids_file argument.")
 
         with open(course_ids_file, 'r') as file_handler:  # pylint: disable=unspecified-encoding
-            course_ids = file_handler.readlines()
-            total_courses = len(course_ids)
-            logger.info("Publishing %d courses.", total_courses)
-            for index, course_id in enumerate(course_ids, start=1):
-                try:
-                    course_id = course_id.strip()
-                    course = Course.objects.get(id=course_id)
-                    publishing_error = course.publish_to_lms()
-                    if publishing_error:
-                        failed += 1
-                        logger.error(
-                            u"(%d/%d) Failed to publish %s: %s", index, total_courses, course_id, publishing_error
-                        )
-                    else:
-                        logger.info(u"(%d/%d) Successfully published %s.", index, total_courses, course_id)
-                except Course.DoesNotExist:
-                    failed += 1
-                    logger.error(
-                        u"(%d/%d) Failed to publish %s: Course does not exist.", index, total_courses, course_id
-                    )
+            course_ids = [course_id.strip() for course_id in file_handler.readlines()]
+
+        total_courses = len(course_ids)
+        logger.info("Publishing %d courses.", total_courses)
+        courses = Course.objects.filter(id__in=course_ids).select_related('partner__default_site__siteconfiguration')
+        results = BulkLMSPublisher(max_workers=options['max_workers'], rate=options['rate']).publish_courses(courses)
+
+        for index, course_id in enumerate(course_ids, start=1):
+            if course_id not in results:
+                failed += 1
+                logger.error(
+                    u"(%d/%d) Failed to publish %s: Course does not exist.", index, total_courses, course_id
+                )
+            elif results[course_id]:
+                failed += 1
+                logger.error(
+                    u"(%d/%d) Failed to publish %s: %s", index, total_courses, course_id, results[course_id]
+                )
+            else:
+                logger.info(u"(%d/%d) Successfully published %s.", index, total_courses, course_id)
         if failed:
             logger.error("Completed publishing courses. %d of %d failed.", failed, total_courses)
         else:
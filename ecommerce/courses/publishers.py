@@ -2,25 +2,33 @@
 
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urljoin
 
 from django.db.models import Q
 from django.utils.translation import ugettext_lazy as _
-from oscar.core.loading import get_model
+from oscar.core.loading import get_class, get_model
 from requests.exceptions import HTTPError
 
-from ecommerce.core.constants import ENROLLMENT_CODE_SEAT_TYPES
+from ecommerce.core.constants import (
+    ENROLLMENT_CODE_PRODUCT_CLASS_NAME,
+    ENROLLMENT_CODE_SEAT_TYPES,
+    SEAT_PRODUCT_CLASS_NAME
+)
+from ecommerce.core.utils import RateLimiter
 from ecommerce.courses.constants import CertificateType
 from ecommerce.courses.utils import mode_for_product
 
 logger = logging.getLogger(__name__)
 Product = get_model('catalogue', 'Product')
+ProductAttributeSnapshot = get_model('catalogue', 'ProductAttributeSnapshot')
+Selector = get_class('partner.strategy', 'Selector')
 StockRecord = get_model('partner', 'StockRecord')
 
 
 class LMSPublisher:
     def get_seat_expiration(self, seat):
-        if not seat.expires or 'professional' in getattr(seat.attr, 'certificate_type', ''):
+        if not seat.expires or 'professional' in (seat.get_attribute_snapshot().certificate_type or ''):
             return None
 
         return seat.expires.isoformat()
@@ -28,27 +36,41 @@ class LMSPublisher:
     def get_course_verification_deadline(self, course):
         return course.verification_deadline.isoformat() if course.verification_deadline else None
 
+    def get_seat_stock_record(self, seat):
+        return seat.stockrecords.first()
+
+    def get_enrollment_code_sku(self, seat):
+        """ Returns the SKU of the enrollment code of the course of a seat, if it is available. """
+        enrollment_code = seat.course.enrollment_code_product
+        if enrollment_code:
+            return enrollment_code.stockrecords.first().partner_sku
+        return None
+
+    def get_mobile_skus(self, seat):
+        """ Returns the SKUs of the Android and iOS seats of the parent of a seat. """
+        android_stock_record = StockRecord.objects.filter(
+            product__parent=seat.parent, partner_sku__contains='mobile.android').first()
+        ios_stock_record = StockRecord.objects.filter(
+            product__parent=seat.parent, partner_sku__contains='mobile.ios').first()
+        return (
+            android_stock_record.partner_sku if android_stock_record else None,
+            ios_stock_record.partner_sku if ios_stock_record else None,
+        )
+
     def serialize_seat_for_commerce_api(self, seat):
         """ Serializes a course seat product to a dict that can be further serialized to JSON. """
-        stock_record = seat.stockrecords.first()
+        stock_record = self.get_seat_stock_record(seat)
+
+        certificate_type = seat.get_attribute_snapshot().certificate_type or ''
 
         bulk_sku = None
-        if getattr(seat.attr, 'certificate_type', '') in ENROLLMENT_CODE_SEAT_TYPES:
-            enrollment_code = seat.course.enrollment_code_product
-            if enrollment_code:
-                bulk_sku = enrollment_code.stockrecords.first().partner_sku
+        if certificate_type in ENROLLMENT_CODE_SEAT_TYPES:
+            bulk_sku = self.get_enrollment_code_sku(seat)
 
         android_sku = None
         ios_sku = None
-        if getattr(seat.attr, 'certificate_type', '') == CertificateType.VERIFIED:
-            android_stock_record = StockRecord.objects.filter(
-                product__parent=seat.parent, partner_sku__contains='mobile.android').first()
-            ios_stock_record = StockRecord.objects.filter(
-                product__parent=seat.parent, partner_sku__contains='mobile.ios').first()
-            if android_stock_record:
-                android_sku = android_stock_record.partner_sku
-            if ios_stock_record:
-                ios_sku = ios_stock_record.partner_sku
+        if certificate_type == CertificateType.VERIFIED:
+            android_sku, ios_sku = self.get_mobile_skus(seat)
 
         return {
             'name': mode_for_product(seat),
@@ -73,18 +95,33 @@ class LMSPublisher:
         Returns:
             None, if publish operation succeeded; otherwise, error message.
         """
-        site = course.partner.default_site
-        course_id = course.id
-        error_message = _('Failed to publish commerce data for {course_id} to LMS.').format(course_id=course_id)
-
-        name = course.name
-        verification_deadline = self.get_course_verification_deadline(course)
-
         # Do not fetch mobile seats to create Course modes. Mobile skus are
         # added to the verified course mode in serialize_seat_for_commerce_api()
         seat_products = course.seat_products.filter(~Q(stockrecords__partner_sku__contains="mobile"))
+        ProductAttributeSnapshot.load(seat_products)
         modes = [self.serialize_seat_for_commerce_api(seat) for seat in seat_products]
 
+        return self.publish_modes(
+            course.partner.default_site, course.id, course.name, self.get_course_verification_deadline(course), modes
+        )
+
+    def publish_modes(self, site, course_id, name, verification_deadline, modes):
+        """ Publish the serialized modes of a course to LMS.
+
+        Does not read from the database, so it can be called from any thread once the modes are serialized.
+
+        Arguments:
+            site (Site): Site of the partner of the course.
+            course_id (str): ID of the course.
+            name (str): Name of the course.
+            verification_deadline (str): Verification deadline of the course, in ISO 8601 format.
+            modes (list): Seats of the course, serialized with serialize_seat_for_commerce_api.
+
+        Returns:
+            None, if publish operation succeeded; otherwise, error message.
+        """
+        error_message = _('Failed to publish commerce data for {course_id} to LMS.').format(course_id=course_id)
+
         has_credit = 'credit' in [mode['name'] for mode in modes]
         if has_credit:
             try:
@@ -159,3 +196,124 @@ class LMSPublisher:
             return ' '.join([default_error_message, message])
 
         return default_error_message
+
+
+class BulkLMSPublisher(LMSPublisher):
+    """ Publishes the commerce data of many courses to LMS.
+
+    Seats, stock records, enrollment codes and mobile seats of all courses are loaded with a few queries,
+    then the courses are published by a pool of threads, optionally limited to a number of courses per second.
+
+    Arguments:
+        max_workers (int): Number of courses published at the same time.
+        rate (float): Maximum number of courses published per second. None, or 0, for no limit.
+    """
+
+    def __init__(self, max_workers=8, rate=None):
+        self.max_workers = max_workers
+        self.rate_limiter = RateLimiter(rate)
+        self._enrollment_code_skus = {}
+        self._mobile_skus = {}
+
+    def get_seat_stock_record(self, seat):
+        stock_records = seat.stockrecords.all()
+        return stock_records[0] if stock_records else None
+
+    def get_enrollment_code_sku(self, seat):
+        return self._enrollment_code_skus.get(seat.parent.course_id)
+
+    def get_mobile_skus(self, seat):
+        skus = self._mobile_skus.get(seat.parent_id, {})
+        return skus.get('android'), skus.get('ios')
+
+    def _load_skus(self, course_ids):
+        """ Load the enrollment code and mobile seat SKUs of the courses. """
+        enrollment_codes = Product.objects.filter(
+            product_class__name=ENROLLMENT_CODE_PRODUCT_CLASS_NAME, course_id__in=course_ids
+        ).select_related('product_class').prefetch_related('stockrecords')
+        strategy = Selector().strategy()
+        for enrollment_code in enrollment_codes:
+            if strategy.fetch_for_product(enrollment_code).availability.is_available_to_buy:
+                self._enrollment_code_skus[enrollment_code.course_id] = self.get_seat_stock_record(
+                    enrollment_code
+                ).partner_sku
+
+        mobile_stock_records = StockRecord.objects.filter(
+            product__parent__course_id__in=course_ids, partner_sku__contains='mobile.'
+        ).order_by('id').values_list('product__parent_id', 'partner_sku')
+        for parent_id, partner_sku in mobile_stock_records:
+            for platform in ('android', 'ios'):
+                if 'mobile.{}'.format(platform) in partner_sku:
+                    self._mobile_skus.setdefault(parent_id, {}).setdefault(platform, partner_sku)
+
+    def serialize_courses(self, courses):
+        """ Serialize the seats of the courses.
+
+        Returns:
+            dict: The serialized modes of each course with a seat parent product, by course ID.
+        """
+        course_ids = [course.id for course in courses]
+        self._load_skus(course_ids)
+        seat_course_ids = Product.objects.filter(
+            course_id__in=course_ids, product_class__name=SEAT_PRODUCT_CLASS_NAME, structure=Product.PARENT
+        ).values_list('course_id', flat=True)
+
+        # Do not fetch mobile seats to create Course modes. Mobile skus are
+        # added to the verified course mode in serialize_seat_for_commerce_api()
+        seats = list(Product.objects.filter(
+            parent__course_id__in=course_ids,
+            parent__product_class__name=SEAT_PRODUCT_CLASS_NAME,
+            parent__structure=Product.PARENT,
+        ).filter(
+            ~Q(stockrecords__partner_sku__contains="mobile")
+        ).select_related('attribute_snapshot', 'parent').prefetch_related('stockrecords'))
+        ProductAttributeSnapshot.load(seats)
+
+        modes = {course_id: [] for course_id in seat_course_ids}
+        for seat in seats:
+            modes[seat.parent.course_id].append(self.serialize_seat_for_commerce_api(seat))
+        return modes
+
+    def publish_courses(self, courses):
+        """ Publish courses to LMS.
+
+        Arguments:
+            courses (list): Courses to publish, with their partner's default site.
+
+        Returns:
+            dict: None for every course that was published, otherwise an error message, by course ID.
+        """
+        courses = list(courses)
+        modes = self.serialize_courses(courses)
+
+        # Courses without a seat parent product are not published, which would remove their modes from LMS.
+        results = {}
+        for course in courses:
+            if course.id not in modes:
+                logger.error('Failed to publish commerce data for [%s] to LMS. It has no seats.', course.id)
+                error_message = _('Failed to publish commerce data for {course_id} to LMS.').format(course_id=course.id)
+                results[course.id] = ' '.join([error_message, 'Product matching query does not exist.'])
+        courses = [course for course in courses if course.id in modes]
+        courses_data = [
+            (
+                course.partner.default_site,
+                course.id,
+                course.name,
+                self.get_course_verification_deadline(course),
+                modes[course.id],
+            )
+            for course in courses
+        ]
+        for site in {site for site, __, __, __, __ in courses_data}:
+            # Load the site configurations, which threads cannot do.
+            site.siteconfiguration  # pylint: disable=pointless-statement
+
+        def publish(course_data):
+            self.rate_limiter.wait()
+            return self.publish_modes(*course_data)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            published = list(executor.map(publish, courses_data))
+
+        results.update({course.id: result for course, result in zip(courses, published)})
+        return results
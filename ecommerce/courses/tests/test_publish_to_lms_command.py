@@ -9,7 +9,7 @@ import mock
 from django.core.management import CommandError, call_command
 from testfixtures import LogCapture
 
-from ecommerce.courses.models import Course
+from ecommerce.courses.publishers import BulkLMSPublisher
 from ecommerce.courses.tests.factories import CourseFactory
 from ecommerce.extensions.catalogue.tests.mixins import DiscoveryTestMixin
 from ecommerce.tests.testcases import TransactionTestCase
@@ -100,14 +100,14 @@ class PublishCoursesToLMSTests(DiscoveryTestMixin, TransactionTestCase):
                 "All 2 courses successfully published."
             )
         )
-        with mock.patch.object(Course, 'publish_to_lms', autospec=True) as mock_publish:
+        with mock.patch.object(BulkLMSPublisher, 'publish_modes', autospec=True) as mock_publish:
             mock_publish.return_value = None
             with LogCapture(LOGGER_NAME) as lc:
                 call_command('publish_to_lms', course_ids_file=self.tmp_file_path)
                 lc.check(*expected)
-        # Check that the mocked function was called twice.
-        self.assertListEqual(
-            mock_publish.call_args_list, [mock.call(self.course), mock.call(second_course)]
+        # Check that the mocked function was called for both courses.
+        self.assertEqual(
+            sorted(call[0][2] for call in mock_publish.call_args_list), sorted([self.course.id, second_course.id])
         )
 
     def test_course_publish_failed(self):
@@ -131,12 +131,12 @@ class PublishCoursesToLMSTests(DiscoveryTestMixin, TransactionTestCase):
                 "Completed publishing courses. 1 of 1 failed."
             )
         )
-        with mock.patch.object(Course, 'publish_to_lms') as mock_publish:
+        with mock.patch.object(BulkLMSPublisher, 'publish_modes') as mock_publish:
             mock_publish.return_value = error_msg
             with LogCapture(LOGGER_NAME) as lc:
                 call_command('publish_to_lms', course_ids_file=self.tmp_file_path)
                 lc.check(*expected)
-            mock_publish.assert_called_once_with()
+            mock_publish.assert_called_once_with(self.site, self.course.id, self.course.name, None, [])
 
     def test_unicode_file_name(self):
         """ Verify the unicode files name are read correctly."""
@@ -159,11 +159,11 @@ class PublishCoursesToLMSTests(DiscoveryTestMixin, TransactionTestCase):
                 "All 1 courses successfully published."
             )
         )
-        with mock.patch.object(Course, 'publish_to_lms') as mock_publish:
+        with mock.patch.object(BulkLMSPublisher, 'publish_modes') as mock_publish:
             mock_publish.return_value = None
             with LogCapture(LOGGER_NAME) as lc:
                 call_command('publish_to_lms', course_ids_file=unicode_file)
                 lc.check(*expected)
 
-        mock_publish.assert_called_once_with()
+        mock_publish.assert_called_once_with(self.site, self.course.id, self.course.name, None, [])
         os.remove(unicode_file)
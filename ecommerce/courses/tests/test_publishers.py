@@ -15,7 +15,7 @@ from testfixtures import LogCapture
 
 from ecommerce.core.constants import ENROLLMENT_CODE_PRODUCT_CLASS_NAME
 from ecommerce.core.url_utils import get_lms_url
-from ecommerce.courses.publishers import LMSPublisher
+from ecommerce.courses.publishers import BulkLMSPublisher, LMSPublisher
 from ecommerce.courses.tests.factories import CourseFactory
 from ecommerce.extensions.catalogue.models import Product
 from ecommerce.extensions.catalogue.tests.mixins import DiscoveryTestMixin
@@ -24,6 +24,7 @@ from ecommerce.tests.testcases import TestCase
 JSON = 'application/json'
 LOGGER_NAME = 'ecommerce.courses.publishers'
 
+ProductAttributeSnapshot = get_model('catalogue', 'ProductAttributeSnapshot')
 StockRecord = get_model('partner', 'StockRecord')
 
 
@@ -308,3 +309,87 @@ class LMSPublisherTests(DiscoveryTestMixin, TestCase):
         actual = self.attempt_credit_publication(500)
         expected = 'Failed to publish commerce data for {} to LMS.'.format(self.course.id)
         self.assertEqual(actual, expected)
+
+
+class BulkLMSPublisherTests(DiscoveryTestMixin, TestCase):
+    def setUp(self):
+        super(BulkLMSPublisherTests, self).setUp()
+
+        self.mock_access_token_response()
+        self.courses = [self._create_course(index) for index in range(3)]
+
+    def _create_course(self, index):
+        course = CourseFactory(
+            id='course-v1:test+bulk+{}'.format(index),
+            verification_deadline=timezone.now() + datetime.timedelta(days=7),
+            partner=self.partner
+        )
+        course.create_or_update_seat('honor', False, 0)
+        course.create_or_update_seat('verified', True, 50 + index, create_enrollment_code=True)
+        course.create_or_update_seat('professional', False, 100 + index)
+        return course
+
+    def _mock_commerce_api(self, course, status=200):
+        url = self.site_configuration.build_lms_url('/api/commerce/v1/courses/{}/'.format(course.id))
+        responses.add(responses.PUT, url, status=status, json={}, content_type=JSON)
+
+    def test_serialize_courses(self):
+        """ Verify courses are serialized like LMSPublisher does, with a number of queries independent of courses. """
+        expected = {
+            course.id: [
+                LMSPublisher().serialize_seat_for_commerce_api(seat)
+                for seat in course.seat_products.filter(~Q(stockrecords__partner_sku__contains="mobile"))
+            ]
+            for course in self.courses
+        }
+
+        with self.assertNumQueries(6):
+            actual = BulkLMSPublisher().serialize_courses(self.courses)
+        self.assertDictEqual(actual, expected)
+
+        more_courses = self.courses + [self._create_course(index) for index in range(3, 6)]
+        ProductAttributeSnapshot.load(Product.objects.filter(course__in=more_courses))
+        with self.assertNumQueries(6):
+            BulkLMSPublisher().serialize_courses(more_courses)
+
+    @responses.activate
+    def test_publish_courses(self):
+        """ Verify every course is published and a result is reported for each one. """
+        self._mock_commerce_api(self.courses[0])
+        self._mock_commerce_api(self.courses[1], status=400)
+        self._mock_commerce_api(self.courses[2])
+
+        results = BulkLMSPublisher(max_workers=2).publish_courses(self.courses)
+
+        self.assertEqual(results, {
+            self.courses[0].id: None,
+            self.courses[1].id: 'Failed to publish commerce data for {} to LMS.'.format(self.courses[1].id),
+            self.courses[2].id: None,
+        })
+        published = {
+            call.request.url: json.loads(call.request.body) for call in responses.calls if call.request.method == 'PUT'
+        }
+        self.assertEqual(len(published), 3)
+        for body in published.values():
+            self.assertEqual(len(body['modes']), 3)
+
+    @responses.activate
+    def test_publish_course_without_seats(self):
+        """ Verify a course without seats is reported as failed, and its modes are not replaced in LMS. """
+        course = CourseFactory(id='course-v1:test+bulk+noseats', partner=self.partner)
+        course.parent_seat_product.delete()
+        self._mock_commerce_api(self.courses[0])
+        self._mock_commerce_api(course)
+
+        results = BulkLMSPublisher().publish_courses([self.courses[0], course])
+
+        self.assertEqual(results, {
+            self.courses[0].id: None,
+            course.id: 'Failed to publish commerce data for {} to LMS. Product matching query does not exist.'.format(
+                course.id
+            ),
+        })
+        self.assertEqual(
+            [call.request.url for call in responses.calls if call.request.method == 'PUT'],
+            [self.site_configuration.build_lms_url('/api/commerce/v1/courses/{}/'.format(self.courses[0].id))],
+        )
@@ -6,7 +6,7 @@ from django.utils.translation import ugettext_lazy as _
 from edx_django_utils.cache import TieredCache
 from opaque_keys.edx.keys import CourseKey
 
-from ecommerce.core.utils import deprecated_traverse_pagination, get_cache_key
+from ecommerce.core.utils import get_cache_key, traverse_pagination
 
 
 def mode_for_product(product):
@@ -16,10 +16,11 @@ def mode_for_product(product):
     bulk purchase "enrollment code" product variant of the single-seat product, so we attempt
     to locate the 'seat_type' attribute in its place.
     """
-    mode = getattr(product.attr, 'certificate_type', getattr(product.attr, 'seat_type', None))
+    snapshot = product.get_attribute_snapshot()
+    mode = snapshot.certificate_type if snapshot.certificate_type is not None else snapshot.seat_type
     if not mode:
         return 'audit'
-    if mode == 'professional' and not getattr(product.attr, 'id_verification_required', False):
+    if mode == 'professional' and not snapshot.id_verification_required:
         return 'no-id-professional'
     return mode
 
@@ -58,7 +59,7 @@ def _get_discovery_response(site, cache_key, resource, resource_id):
     result = response.json()
 
     if resource_id is None:
-        result = deprecated_traverse_pagination(result, api_client, discovery_api_url)
+        result = list(traverse_pagination(result, api_client, discovery_api_url, prefetch=True))
 
     TieredCache.set_all_tiers(cache_key, result, settings.COURSES_API_CACHE_TIMEOUT)
     return result
@@ -104,10 +105,11 @@ def get_course_run_detail(site, course_run_key):
 
 def get_course_info_from_catalog(site, product):
     """ Get course or course_run information from Discovery Service and cache """
+    snapshot = product.get_attribute_snapshot()
     if product.is_course_entitlement_product:
-        response = get_course_detail(site, product.attr.UUID)
+        response = get_course_detail(site, snapshot.uuid)
     else:
-        response = get_course_run_detail(site, CourseKey.from_string(product.attr.course_key))
+        response = get_course_run_detail(site, CourseKey.from_string(snapshot.course_key))
     return response
 
 
@@ -116,9 +116,41 @@ def fetch_enterprise_learner_data(site, user):
     return result
 
 
+def _get_course_run_membership_cache_key(site, resource, course_run_id):
+    return get_cache_key(
+        site_domain=site.domain,
+        resource='{resource}-contains_content_item'.format(resource=resource),
+        course_run_id=course_run_id,
+    )
+
+
+def _get_cached_course_run_membership(site, resource, course_run_ids):
+    """
+    Answer whether a catalog contains course runs from the membership cached for each course run, if possible.
+
+    Membership is only cached for questions about a single course run. The answer about several course runs
+    is only known if every one of them is cached with the same membership.
+    """
+    memberships = set()
+    for course_run_id in course_run_ids:
+        cached_response = TieredCache.get_cached_response(
+            _get_course_run_membership_cache_key(site, resource, course_run_id)
+        )
+        if not cached_response.is_found:
+            return None
+        memberships.add(cached_response.value)
+
+    if len(memberships) == 1:
+        return memberships.pop()
+    return None
+
+
 def catalog_contains_course_runs(site, course_run_ids, enterprise_customer_uuid, enterprise_customer_catalog_uuid=None):
     """
     Determine if course runs are associated with the EnterpriseCustomer.
+
+    Answers about a single course run are cached for that course run, and reused for later questions about
+    several course runs, e.g. a basket of course runs that were each checked on their own before.
     """
     query_params = {'course_run_ids': course_run_ids}
     api_client = site.siteconfiguration.oauth_api_client
@@ -130,12 +162,14 @@ def catalog_contains_course_runs(site, course_run_ids, enterprise_customer_uuid,
         api_resource_name = 'enterprise-catalogs'
         api_resource_id = enterprise_customer_catalog_uuid
 
+    resource = '{resource}-{resource_id}'.format(resource=api_resource_name, resource_id=api_resource_id)
+    contains_content = _get_cached_course_run_membership(site, resource, course_run_ids)
+    if contains_content is not None:
+        return contains_content
+
     cache_key = get_cache_key(
         site_domain=site.domain,
-        resource='{resource}-{resource_id}-contains_content_items'.format(
-            resource=api_resource_name,
-            resource_id=api_resource_id,
-        ),
+        resource='{resource}-contains_content_items'.format(resource=resource),
         query_params=urlencode(query_params, True)
     )
 
@@ -150,6 +184,8 @@ def catalog_contains_course_runs(site, course_run_ids, enterprise_customer_uuid,
     response = api_client.get(api_url, params=query_params)
     response.raise_for_status()
     contains_content = response.json()['contains_content_items']
+    if len(course_run_ids) == 1:
+        cache_key = _get_course_run_membership_cache_key(site, resource, course_run_ids[0])
     TieredCache.set_all_tiers(cache_key, contains_content, settings.ENTERPRISE_API_CACHE_TIMEOUT)
     return contains_content
 
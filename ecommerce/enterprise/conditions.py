@@ -6,7 +6,6 @@ from uuid import UUID
 
 import crum
 from django.contrib import messages
-from django.db.models import Sum
 from django.utils.translation import ugettext as _
 from oscar.core.loading import get_model
 from requests.exceptions import ConnectionError as ReqConnectionError
@@ -16,12 +15,10 @@ from ecommerce.courses.utils import get_course_info_from_catalog
 from ecommerce.enterprise.api import catalog_contains_course_runs, get_enterprise_id_for_user
 from ecommerce.enterprise.utils import get_or_create_enterprise_customer_user
 from ecommerce.extensions.basket.utils import ENTERPRISE_CATALOG_ATTRIBUTE_TYPE
-from ecommerce.extensions.fulfillment.status import ORDER
 from ecommerce.extensions.offer.constants import OFFER_ASSIGNMENT_REVOKED, OFFER_REDEEMED
 from ecommerce.extensions.offer.mixins import ConditionWithoutRangeMixin, SingleItemConsumptionConditionMixin
 from ecommerce.extensions.offer.models import OFFER_PRIORITY_ENTERPRISE
 from ecommerce.extensions.offer.utils import get_benefit_type, get_discount_value
-from ecommerce.extensions.refund.status import REFUND
 
 BasketAttribute = get_model('basket', 'BasketAttribute')
 BasketAttributeType = get_model('basket', 'BasketAttributeType')
@@ -29,24 +26,15 @@ Benefit = get_model('offer', 'Benefit')
 Condition = get_model('offer', 'Condition')
 ConditionalOffer = get_model('offer', 'ConditionalOffer')
 OfferAssignment = get_model('offer', 'OfferAssignment')
+OfferUserDiscount = get_model('offer', 'OfferUserDiscount')
 Order = get_model('order', 'Order')
-OrderDiscount = get_model('order', 'OrderDiscount')
-Refund = get_model('refund', 'Refund')
 StockRecord = get_model('partner', 'StockRecord')
 Voucher = get_model('voucher', 'Voucher')
 logger = logging.getLogger(__name__)
 
 
 def sum_user_discounts_for_offer(user, offer):
-    refunded_order_ids = Refund.objects.filter(
-        user_id=user.id, status=REFUND.COMPLETE
-    ).values_list('order_id', flat=True)
-
-    sum_user_discounts = OrderDiscount.objects.filter(
-        offer_id=offer.id, order__user_id=user.id, order__status=ORDER.COMPLETE
-    ).exclude(order_id__in=refunded_order_ids).aggregate(Sum('amount'))['amount__sum'] or Decimal(0.00)
-
-    return sum_user_discounts
+    return OfferUserDiscount.get_total(offer, user)
 
 
 def is_offer_max_user_discount_available(basket, offer):
@@ -80,7 +68,11 @@ def is_offer_max_discount_available(basket, offer):
 
 def _get_basket_discount_value(basket, offer):
     """Calculate the discount value based on benefit type and value"""
-    sum_basket_lines = basket.all_lines().aggregate(total=Sum('stockrecord__price'))['total'] or Decimal(0.0)
+    # Lines are cached on the basket with their stock records, so they are summed without a query.
+    sum_basket_lines = sum(
+        (line.stockrecord.price for line in basket.all_lines() if line.stockrecord and line.stockrecord.price),
+        Decimal(0.0)
+    )
     # calculate discount value that will be covered by the offer
     benefit_type = get_benefit_type(offer.benefit)
     benefit_value = offer.benefit.value
@@ -159,7 +151,7 @@ class EnterpriseCustomerCondition(ConditionWithoutRangeMixin, SingleItemConsumpt
                         exc,
                         enterprise_in_condition,
                         enterprise_catalog,
-                        line.product.attr.UUID
+                        line.product.get_attribute_snapshot().uuid
                     )
                     return False
                 else:
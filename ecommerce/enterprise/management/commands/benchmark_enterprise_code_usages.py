@@ -0,0 +1,179 @@
+"""
+Django management command to benchmark the enterprise coupon code usage queries on a large coupon.
+"""
+import datetime
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import prefetch_related_objects
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from oscar.core.loading import get_model
+
+from ecommerce.enterprise.benefits import BENEFIT_MAP as ENTERPRISE_BENEFIT_MAP
+from ecommerce.enterprise.conditions import AssignableEnterpriseCustomerCondition
+from ecommerce.extensions.offer.constants import OFFER_ASSIGNED, OFFER_REDEEMED
+from ecommerce.extensions.offer.models import OFFER_PRIORITY_VOUCHER
+from ecommerce.extensions.voucher.utils import get_not_redeemed_assignments, get_vouchers_with_unassigned_slots
+from ecommerce.programs.custom import class_path
+
+Benefit = get_model('offer', 'Benefit')
+Condition = get_model('offer', 'Condition')
+ConditionalOffer = get_model('offer', 'ConditionalOffer')
+OfferAssignment = get_model('offer', 'OfferAssignment')
+Voucher = get_model('voucher', 'Voucher')
+VoucherOffer = get_model('voucher', 'Voucher_offers')
+
+
+def get_not_assigned_codes_in_python(vouchers):
+    """ The original EnterpriseCouponViewSet implementation, which computed slots for every voucher in Python. """
+    prefetch_related_objects(vouchers, 'offers', 'offers__condition', 'offers__offerassignment_set')
+    vouchers_with_slots = [voucher.id for voucher in vouchers if voucher.slots_available_for_assignment != 0]
+    return Voucher.objects.filter(id__in=vouchers_with_slots).values('code').order_by('code')
+
+
+def get_not_redeemed_codes_in_python(vouchers):
+    """ The original EnterpriseCouponViewSet implementation, which collected assignments of every voucher in Python. """
+    prefetch_related_objects(vouchers, 'applications', 'applications__user', 'offers', 'offers__condition',
+                             'offers__offerassignment_set')
+    not_redeemed_assignments = []
+    for voucher in vouchers:
+        not_redeemed_assignments.extend(voucher.not_redeemed_assignment_ids or [])
+    return OfferAssignment.objects.filter(
+        id__in=not_redeemed_assignments
+    ).values('code', 'user_email').order_by('user_email').distinct()
+
+
+class Command(BaseCommand):
+    """
+    Time the first page of the unassigned and unredeemed code filters of the enterprise coupon codes
+    endpoint, computed in Python and in the database, on a generated coupon.
+
+    The coupon is created inside a transaction that is rolled back, so nothing is left behind.
+    Every second code is assigned, and every fifth code has been redeemed.
+
+    Example:
+
+        ./manage.py benchmark_enterprise_code_usages --codes 50000
+    """
+
+    help = 'Benchmark the enterprise coupon code usage queries on a generated coupon.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--codes',
+            dest='codes',
+            default=50000,
+            help='Number of codes of the generated coupon.',
+            type=int,
+        )
+        parser.add_argument(
+            '--page-size',
+            dest='page_size',
+            default=50,
+            help='Number of results to load, as the first page of the endpoint would.',
+            type=int,
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            vouchers = self._create_coupon_vouchers(options['codes'])
+            self.stdout.write('Generated a coupon with {} codes.'.format(options['codes']))
+
+            for label, python_queryset, sql_queryset in (
+                    (
+                        'unassigned',
+                        get_not_assigned_codes_in_python,
+                        lambda vouchers: get_vouchers_with_unassigned_slots(vouchers).values('code').order_by('code'),
+                    ),
+                    (
+                        'unredeemed',
+                        get_not_redeemed_codes_in_python,
+                        lambda vouchers: get_not_redeemed_assignments(vouchers).values(
+                            'code', 'user_email'
+                        ).order_by('user_email').distinct(),
+                    ),
+            ):
+                python_page = self._time_first_page(
+                    '{} (python)'.format(label), python_queryset, vouchers, options['page_size']
+                )
+                sql_page = self._time_first_page('{} (sql)'.format(label), sql_queryset, vouchers, options['page_size'])
+                if python_page != sql_page:
+                    self.stdout.write(self.style.ERROR('{}: the first pages differ.'.format(label)))
+
+            transaction.set_rollback(True)
+
+    def _time_first_page(self, label, build_queryset, vouchers, page_size):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            queryset = build_queryset(vouchers.all())
+            count = queryset.count()
+            page = list(queryset[:page_size])
+            seconds = time.perf_counter() - start
+
+        self.stdout.write('{}: {:.3f}s, {} queries, {} results'.format(label, seconds, len(queries), count))
+        return page
+
+    def _create_coupon_vouchers(self, quantity):
+        prefix = uuid.uuid4().hex[:8].upper()
+        condition = Condition.objects.create(
+            proxy_class=class_path(AssignableEnterpriseCustomerCondition),
+            enterprise_customer_uuid=uuid.uuid4(),
+            enterprise_customer_name='Benchmark enterprise',
+            enterprise_customer_catalog_uuid=uuid.uuid4(),
+            type=Condition.COUNT,
+            value=1,
+        )
+        benefit = Benefit.objects.create(
+            proxy_class=class_path(ENTERPRISE_BENEFIT_MAP[Benefit.PERCENTAGE]),
+            value=100,
+            max_affected_items=1,
+        )
+        ConditionalOffer.objects.bulk_create([
+            ConditionalOffer(
+                name='Benchmark {} {}'.format(prefix, index),
+                slug='benchmark-{}-{}'.format(prefix.lower(), index),
+                offer_type=ConditionalOffer.VOUCHER,
+                condition=condition,
+                benefit=benefit,
+                max_global_applications=3,
+                priority=OFFER_PRIORITY_VOUCHER,
+            )
+            for index in range(quantity)
+        ], batch_size=1000)
+        offer_ids = dict(ConditionalOffer.objects.filter(condition=condition).values_list('name', 'id'))
+
+        start_datetime = timezone.now()
+        Voucher.objects.bulk_create([
+            Voucher(
+                name='{}{:07d}'.format(prefix, index),
+                code='{}{:07d}'.format(prefix, index),
+                usage=Voucher.MULTI_USE,
+                start_datetime=start_datetime,
+                end_datetime=start_datetime + datetime.timedelta(days=365),
+                num_orders=1 if index % 5 == 0 else 0,
+            )
+            for index in range(quantity)
+        ], batch_size=1000)
+        vouchers = Voucher.objects.filter(code__startswith=prefix)
+        voucher_ids = dict(vouchers.values_list('code', 'id'))
+
+        voucher_offers = []
+        assignments = []
+        for index in range(quantity):
+            code = '{}{:07d}'.format(prefix, index)
+            offer_id = offer_ids['Benchmark {} {}'.format(prefix, index)]
+            voucher_offers.append(VoucherOffer(voucher_id=voucher_ids[code], conditionaloffer_id=offer_id))
+            if index % 2 == 0:
+                assignments.append(OfferAssignment(
+                    offer_id=offer_id,
+                    code=code,
+                    user_email='learner{}@example.com'.format(index),
+                    status=OFFER_REDEEMED if index % 5 == 0 else OFFER_ASSIGNED,
+                ))
+        VoucherOffer.objects.bulk_create(voucher_offers, batch_size=1000)
+        OfferAssignment.objects.bulk_create(assignments, batch_size=1000)
+
+        return vouchers
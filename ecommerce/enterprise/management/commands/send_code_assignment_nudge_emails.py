@@ -13,9 +13,10 @@ from ecommerce.core.models import User
 from ecommerce.enterprise.utils import (
     get_enterprise_customer_reply_to_email,
     get_enterprise_customer_sender_alias,
-    get_enterprise_customer_uuid
+    get_enterprise_customer_uuid,
+    get_enterprise_customer_uuid_from_voucher
 )
-from ecommerce.extensions.offer.constants import AUTOMATIC_EMAIL
+from ecommerce.extensions.offer.constants import AUTOMATIC_EMAIL, OFFER_ASSIGNMENT_BATCH_SIZE
 from ecommerce.extensions.voucher.utils import get_cached_voucher
 from ecommerce.programs.custom import get_model
 
@@ -32,8 +33,23 @@ logger.setLevel(logging.INFO)
 class Command(BaseCommand):
     """
     Send the code assignment nudge emails.
+
+    With --batch-size, the nudge emails are processed in chunks: the vouchers, enterprise customers and LMS users
+    of a chunk are resolved together and its rows are written in bulk.
+
+    Example:
+
+        ./manage.py send_code_assignment_nudge_emails --batch-size 200
     """
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Process the nudge emails scheduled for today in chunks of this size.'
+        )
+
     @staticmethod
     def _get_nudge_emails():
         """
@@ -86,7 +102,6 @@ class Command(BaseCommand):
         return get_enterprise_customer_reply_to_email(site, enterprise_customer_uuid)
 
     def handle(self, *args, **options):
-        send_nudge_email_count = 0
         site = Site.objects.get_current()
         nudge_emails = self._get_nudge_emails()
         total_nudge_emails_count = nudge_emails.count()
@@ -94,6 +109,24 @@ class Command(BaseCommand):
             '[Code Assignment Nudge Email] Total count of Enterprise Nudge Emails that are scheduled for today is %s.',
             total_nudge_emails_count
         )
+        if options['batch_size']:
+            send_nudge_email_count = self._send_nudge_emails_in_batches(site, nudge_emails, options['batch_size'])
+        else:
+            send_nudge_email_count = self._send_nudge_emails(site, nudge_emails)
+        logger.info(
+            '[Code Assignment Nudge Email] %s out of %s added to the email sending queue.',
+            send_nudge_email_count,
+            total_nudge_emails_count
+        )
+
+    def _send_nudge_emails(self, site, nudge_emails):
+        """
+        Sends the nudge emails one at a time.
+
+        Returns:
+            int: The number of nudge emails added to the email sending queue.
+        """
+        send_nudge_email_count = 0
         for nudge_email in nudge_emails:
             try:
                 voucher = get_cached_voucher(nudge_email.code)
@@ -130,11 +163,119 @@ class Command(BaseCommand):
                 )
                 self.set_last_reminder_date(nudge_email.user_email, nudge_email.code)
                 self._create_email_sent_record(site, nudge_email)
-        logger.info(
-            '[Code Assignment Nudge Email] %s out of %s added to the email sending queue.',
-            send_nudge_email_count,
-            total_nudge_emails_count
+        return send_nudge_email_count
+
+    def _send_nudge_emails_in_batches(self, site, nudge_emails, batch_size):
+        """
+        Sends the nudge emails in chunks of batch_size.
+
+        Returns:
+            int: The number of nudge emails added to the email sending queue.
+        """
+        send_nudge_email_count = 0
+        # Sender alias and reply to of every enterprise customer, fetched once for the whole run.
+        enterprise_customers = {}
+        # The ids are read upfront as sending a chunk takes its rows out of the nudge emails queryset.
+        nudge_email_ids = list(nudge_emails.order_by('id').values_list('id', flat=True))
+        for start in range(0, len(nudge_email_ids), batch_size):
+            batch = CodeAssignmentNudgeEmails.objects.filter(
+                id__in=nudge_email_ids[start:start + batch_size]
+            ).select_related('email_template').order_by('id')
+            send_nudge_email_count += self._send_nudge_email_batch(site, list(batch), enterprise_customers)
+        return send_nudge_email_count
+
+    def _send_nudge_email_batch(self, site, nudge_emails, enterprise_customers):
+        """
+        Sends a chunk of nudge emails, with a fixed number of queries and a single LMS user search.
+
+        Arguments:
+            nudge_emails (list): CodeAssignmentNudgeEmails to send.
+            enterprise_customers (dict): (sender alias, reply to) of the enterprise customers already resolved,
+                by enterprise customer uuid. Updated with the customers of this chunk.
+
+        Returns:
+            int: The number of nudge emails added to the email sending queue.
+        """
+        vouchers = Voucher.objects.filter(
+            code__in={nudge_email.code for nudge_email in nudge_emails}
+        ).prefetch_related('offers__condition', 'offers__benefit__range')
+        vouchers = {voucher.code: voucher for voucher in vouchers}
+
+        expired_nudge_emails = []
+        nudge_emails_to_send = []
+        for nudge_email in nudge_emails:
+            voucher = vouchers.get(nudge_email.code)
+            if voucher is None:
+                continue
+            if voucher.is_expired():
+                expired_nudge_emails.append(nudge_email)
+                continue
+
+            base_enterprise_url = nudge_email.options.get('base_enterprise_url', '')
+            email_body, email_subject = nudge_email.email_template.get_email_content(
+                nudge_email.user_email,
+                nudge_email.code,
+                base_enterprise_url=base_enterprise_url,
+                voucher=voucher,
+            )
+            if email_body:
+                nudge_emails_to_send.append((nudge_email, voucher, email_subject, email_body, base_enterprise_url))
+
+        if expired_nudge_emails:
+            # Every code unsubscribed here is expired, so no pair of these codes and emails should be nudged again.
+            CodeAssignmentNudgeEmails.unsubscribe_from_nudging(
+                codes={nudge_email.code for nudge_email in expired_nudge_emails},
+                user_emails={nudge_email.user_email for nudge_email in expired_nudge_emails}
+            )
+        if not nudge_emails_to_send:
+            return 0
+
+        current_date_time = timezone.now()
+        sent_nudge_emails = [nudge_email for nudge_email, *__ in nudge_emails_to_send]
+        for nudge_email in sent_nudge_emails:
+            nudge_email.already_sent = True
+            nudge_email.modified = current_date_time
+        CodeAssignmentNudgeEmails.objects.bulk_update(sent_nudge_emails, ['already_sent', 'modified'])
+
+        user_emails = sorted({nudge_email.user_email for nudge_email in sent_nudge_emails})
+        lms_user_ids = {
+            lms_user['email']: lms_user['id']
+            for lms_user in User.get_bulk_lms_users_using_emails(site, user_emails)
+        }
+
+        email_sent_records = []
+        for nudge_email, voucher, email_subject, email_body, base_enterprise_url in nudge_emails_to_send:
+            enterprise_customer_uuid = get_enterprise_customer_uuid_from_voucher(voucher)
+            if enterprise_customer_uuid not in enterprise_customers:
+                enterprise_customers[enterprise_customer_uuid] = (
+                    get_enterprise_customer_sender_alias(site, enterprise_customer_uuid),
+                    get_enterprise_customer_reply_to_email(site, enterprise_customer_uuid),
+                )
+            sender_alias, reply_to = enterprise_customers[enterprise_customer_uuid]
+            send_code_assignment_nudge_email.delay(
+                nudge_email.user_email,
+                email_subject,
+                email_body,
+                sender_alias,
+                reply_to,
+                base_enterprise_url=base_enterprise_url,
+            )
+            email_sent_records.append(OfferAssignmentEmailSentRecord(
+                enterprise_customer=enterprise_customer_uuid,
+                email_type=nudge_email.email_template.email_type,
+                template_content_object=nudge_email.email_template,
+                sender_category=AUTOMATIC_EMAIL,
+                code=nudge_email.code,
+                user_email=nudge_email.user_email,
+                receiver_id=lms_user_ids.get(nudge_email.user_email),
+            ))
+
+        self.set_last_reminder_dates(
+            {(nudge_email.user_email, nudge_email.code) for nudge_email in sent_nudge_emails},
+            current_date_time
         )
+        OfferAssignmentEmailSentRecord.objects.bulk_create(email_sent_records, batch_size=OFFER_ASSIGNMENT_BATCH_SIZE)
+        return len(nudge_emails_to_send)
 
     @staticmethod
     def set_last_reminder_date(email, code):
@@ -143,3 +284,22 @@ class Command(BaseCommand):
         """
         current_date_time = timezone.now()
         OfferAssignment.objects.filter(code=code, user_email=email).update(last_reminder_date=current_date_time)
+
+    @staticmethod
+    def set_last_reminder_dates(email_codes, current_date_time):
+        """
+        Set reminder date for offer assignments of every (email, code) pair in `email_codes`.
+        """
+        offer_assignments = OfferAssignment.objects.filter(
+            user_email__in={email for email, __ in email_codes},
+            code__in={code for __, code in email_codes},
+        ).only('id', 'code', 'user_email')
+        offer_assignments = [
+            offer_assignment for offer_assignment in offer_assignments
+            if (offer_assignment.user_email, offer_assignment.code) in email_codes
+        ]
+        for offer_assignment in offer_assignments:
+            offer_assignment.last_reminder_date = current_date_time
+        OfferAssignment.objects.bulk_update(
+            offer_assignments, ['last_reminder_date'], batch_size=OFFER_ASSIGNMENT_BATCH_SIZE
+        )
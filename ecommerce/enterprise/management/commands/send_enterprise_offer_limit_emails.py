@@ -6,16 +6,14 @@ import logging
 from datetime import datetime
 
 from django.core.management import BaseCommand
-from django.db.models import Sum
 from ecommerce_worker.email.v1.api import send_offer_usage_email
 
-from ecommerce.extensions.fulfillment.status import ORDER
 from ecommerce.extensions.offer.constants import OfferUsageEmailTypes
 from ecommerce.programs.custom import get_model
 
 ConditionalOffer = get_model('offer', 'ConditionalOffer')
 OfferUsageEmail = get_model('offer', 'OfferUsageEmail')
-OrderDiscount = get_model('order', 'OrderDiscount')
+OfferUtilization = get_model('offer', 'OfferUtilization')
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -64,26 +62,25 @@ class Command(BaseCommand):
         return int(offer.max_global_applications), percentage_usage, int(offer.num_orders)
 
     @staticmethod
-    def get_booking_limits(offer):
+    def get_booking_limits(offer, utilization=None):
         """
         Return the total discount limit, percentage usage and current usage of booking limit.
+
+        The current usage is read from the utilization summary of the offer, which is looked up unless it is given.
         """
-        total_used_discount_amount = OrderDiscount.objects.filter(
-            offer_id=offer.id,
-            order__status=ORDER.COMPLETE
-        ).aggregate(Sum('amount'))['amount__sum']
-        total_used_discount_amount = total_used_discount_amount if total_used_discount_amount else 0
+        utilization = utilization or OfferUtilization.get_utilization(offer)
+        total_used_discount_amount = utilization.total_discount
 
         percentage_usage = int((total_used_discount_amount / offer.max_discount) * 100)
         return int(offer.max_discount), percentage_usage, int(total_used_discount_amount)
 
-    def get_email_content(self, offer):
+    def get_email_content(self, offer, utilization=None):
         """
         Return the appropriate email body and subject of given offer.
         """
         is_enrollment_limit_offer = bool(offer.max_global_applications)
         total_limit, percentage_usage, current_usage = self.get_enrollment_limits(offer) if is_enrollment_limit_offer \
-            else self.get_booking_limits(offer)
+            else self.get_booking_limits(offer, utilization)
 
         email_body = EMAIL_BODY.format(
             percentage_usage=percentage_usage,
@@ -106,9 +103,11 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         send_enterprise_offer_count = 0
-        enterprise_offers = self._get_enterprise_offers()
-        total_enterprise_offers_count = enterprise_offers.count()
+        enterprise_offers = list(self._get_enterprise_offers())
+        total_enterprise_offers_count = len(enterprise_offers)
         logger.info('[Offer Usage Alert] Total count of enterprise offers is %s.', total_enterprise_offers_count)
+        # The usage of every offer is read in a single query, instead of an aggregate per offer.
+        utilizations = OfferUtilization.get_utilizations(enterprise_offers)
         for enterprise_offer in enterprise_offers:
             if self.is_eligible_for_alert(enterprise_offer):
                 logger.info(
@@ -117,7 +116,9 @@ class Command(BaseCommand):
                     enterprise_offer.id
                 )
                 send_enterprise_offer_count += 1
-                email_body, email_subject = self.get_email_content(enterprise_offer)
+                email_body, email_subject = self.get_email_content(
+                    enterprise_offer, utilizations[enterprise_offer.id]
+                )
                 OfferUsageEmail.create_record(
                     offer=enterprise_offer,
                     email_type=OfferUsageEmailTypes.DIGEST,
@@ -149,6 +149,48 @@ class EnterpriseAPITests(EnterpriseServiceMockMixin, DiscoveryTestMixin, TestCas
             self._assert_contains_course_runs(True, [self.course_run.id], 'fake-uuid', None)
             self.assertEqual(mocked_set_all_tiers.call_count, 2)
 
+    @ddt.data(True, False)
+    @responses.activate
+    def test_catalog_contains_course_runs_cached_per_course_run(self, contains_content):
+        """
+        Verify answers about single course runs are reused for questions about several course runs.
+        """
+        other_course_run = CourseFactory()
+        course_run_ids = [self.course_run.id, other_course_run.id]
+        for course_run_id in course_run_ids:
+            self.mock_catalog_contains_course_runs(
+                [course_run_id], 'fake-uuid', enterprise_customer_catalog_uuid='fake-catalog-uuid',
+                contains_content=contains_content,
+            )
+            self._assert_contains_course_runs(contains_content, [course_run_id], 'fake-uuid', 'fake-catalog-uuid')
+        num_requests = len(responses.calls)
+
+        self._assert_contains_course_runs(contains_content, course_run_ids, 'fake-uuid', 'fake-catalog-uuid')
+        self._assert_num_requests(num_requests)
+
+        # The membership is cached for the catalog only.
+        self.mock_catalog_contains_course_runs(course_run_ids, 'fake-uuid', contains_content=contains_content)
+        self._assert_contains_course_runs(contains_content, course_run_ids, 'fake-uuid', None)
+        self._assert_num_requests(num_requests + 1)
+
+    @responses.activate
+    def test_catalog_contains_course_runs_mixed_membership(self):
+        """
+        Verify course runs cached with different memberships are checked with the Enterprise Catalog API.
+        """
+        other_course_run = CourseFactory()
+        for course_run_id, contains_content in ((self.course_run.id, True), (other_course_run.id, False)):
+            self.mock_catalog_contains_course_runs(
+                [course_run_id], 'fake-uuid', contains_content=contains_content,
+            )
+            self._assert_contains_course_runs(contains_content, [course_run_id], 'fake-uuid', None)
+        num_requests = len(responses.calls)
+
+        course_run_ids = [self.course_run.id, other_course_run.id]
+        self.mock_catalog_contains_course_runs(course_run_ids, 'fake-uuid', contains_content=False)
+        self._assert_contains_course_runs(False, course_run_ids, 'fake-uuid', None)
+        self._assert_num_requests(num_requests + 1)
+
     @responses.activate
     def test_catalog_contains_course_runs_with_api_exception(self):
         """
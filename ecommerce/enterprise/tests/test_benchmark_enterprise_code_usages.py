@@ -0,0 +1,28 @@
+"""
+Tests for the benchmark_enterprise_code_usages management command.
+"""
+from io import StringIO
+
+from django.core.management import call_command
+from oscar.core.loading import get_model
+
+from ecommerce.tests.testcases import TestCase
+
+Voucher = get_model('voucher', 'Voucher')
+
+
+class BenchmarkEnterpriseCodeUsagesTests(TestCase):
+    """
+    Tests the benchmark_enterprise_code_usages command.
+    """
+
+    def test_benchmark(self):
+        """ Verify both implementations are timed, agree on the first page, and the coupon is rolled back. """
+        out = StringIO()
+        call_command('benchmark_enterprise_code_usages', codes=20, page_size=5, stdout=out)
+
+        output = out.getvalue()
+        for label in ('unassigned (python)', 'unassigned (sql)', 'unredeemed (python)', 'unredeemed (sql)'):
+            self.assertIn(label, output)
+        self.assertNotIn('differ', output)
+        self.assertFalse(Voucher.objects.exists())
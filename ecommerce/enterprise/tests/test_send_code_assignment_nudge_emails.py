@@ -5,6 +5,7 @@ Contains the tests for sending the enterprise code assignment nudge emails comma
 import datetime
 import logging
 
+import ddt
 import mock
 import pytz
 from dateutil.relativedelta import relativedelta
@@ -29,6 +30,7 @@ LOGGER_NAME = 'ecommerce.enterprise.management.commands.send_code_assignment_nud
 MODEL_LOGGER_NAME = 'ecommerce.extensions.offer.models'
 
 
+@ddt.ddt
 class SendCodeAssignmentNudgeEmailsTests(TestCase):
     """
     Tests the sending code assignment nudge emails command.
@@ -62,14 +64,14 @@ class SendCodeAssignmentNudgeEmailsTests(TestCase):
         for offer_assignment in OfferAssignment.objects.all():
             assert offer_assignment.last_reminder_date.date() == current_date_time.date()
 
-    def _assert_sent_count(self):
+    def _assert_sent_count(self, *args):
         nudge_email = CodeAssignmentNudgeEmails.objects.all()
         assert nudge_email.filter(already_sent=True).count() == 0
         cmd_path = 'ecommerce.enterprise.management.commands.send_code_assignment_nudge_emails'
         with mock.patch(cmd_path + '.send_code_assignment_nudge_email.delay') as mock_send_email:
             with LogCapture(level=logging.INFO) as log:
                 mock_send_email.return_value = mock.Mock()
-                call_command('send_code_assignment_nudge_emails')
+                call_command('send_code_assignment_nudge_emails', *args)
                 assert mock_send_email.call_count == self.total_nudge_emails_for_today
                 assert nudge_email.filter(already_sent=True).count() == self.total_nudge_emails_for_today
         return log
@@ -153,3 +155,54 @@ class SendCodeAssignmentNudgeEmailsTests(TestCase):
             assert nudge_email.filter(already_sent=True).count() == 0
             # assert that nudge emails are unsubscribed if voucher is expired
             assert nudge_email.filter(is_subscribed=False).count() == self.total_nudge_emails_for_today
+
+    @ddt.data(2, 100)
+    def test_command_in_batches(self, batch_size):
+        """
+        Test that the nudge emails are sent in chunks, with vouchers, enterprise customers and LMS users
+        resolved once per chunk.
+        """
+        CodeAssignmentNudgeEmailsFactory(code='dummy-code')
+        lms_users = [
+            {'email': nudge_email.user_email, 'id': index}
+            for index, nudge_email in enumerate(self.nudge_emails)
+        ]
+        cmd_path = 'ecommerce.enterprise.management.commands.send_code_assignment_nudge_emails'
+        with mock.patch(cmd_path + '.User.get_bulk_lms_users_using_emails', return_value=lms_users) as mock_lms, \
+                mock.patch(cmd_path + '.get_enterprise_customer_sender_alias', return_value='') as mock_alias, \
+                mock.patch(cmd_path + '.get_enterprise_customer_reply_to_email', return_value=''):
+            log = self._assert_sent_count('--batch-size', str(batch_size))
+
+        batch_count = -(-(self.total_nudge_emails_for_today + 1) // batch_size)
+        assert mock_lms.call_count == batch_count
+        assert mock_alias.call_count == 1
+        self.assert_last_reminder_date()
+        assert sorted(OfferAssignmentEmailSentRecord.objects.values_list('receiver_id', flat=True)) == list(
+            range(self.total_nudge_emails_for_today)
+        )
+        log.check_present(
+            (
+                LOGGER_NAME,
+                'INFO',
+                '[Code Assignment Nudge Email] {send_nudge_emails_count} out of {total_nudge_emails} added to the '
+                'email sending queue.'.format(
+                    total_nudge_emails=self.total_nudge_emails_for_today + 1,
+                    send_nudge_emails_count=self.total_nudge_emails_for_today
+                )
+            )
+        )
+
+    def test_nudge_email_in_batches_with_expired_voucher(self):
+        """
+        Test that nudge emails of an expired voucher are unsubscribed, and not sent, in batch mode.
+        """
+        self.voucher.end_datetime = datetime.datetime.now(pytz.UTC) - datetime.timedelta(days=1)
+        self.voucher.save(update_fields=['end_datetime'])
+        nudge_email = CodeAssignmentNudgeEmails.objects.all()
+        cmd_path = 'ecommerce.enterprise.management.commands.send_code_assignment_nudge_emails'
+        with mock.patch(cmd_path + '.send_code_assignment_nudge_email.delay') as mock_send_email:
+            call_command('send_code_assignment_nudge_emails', '--batch-size', '2')
+            assert mock_send_email.call_count == 0
+            assert nudge_email.filter(already_sent=True).count() == 0
+            assert nudge_email.filter(is_subscribed=False).count() == self.total_nudge_emails_for_today
+            assert OfferAssignmentEmailSentRecord.objects.count() == 0
@@ -10,9 +10,11 @@ import mock
 import responses
 from django.conf import settings
 from django.core.management import call_command
+from oscar.test import factories
 from testfixtures import LogCapture
 
 from ecommerce.enterprise.tests.mixins import EnterpriseServiceMockMixin
+from ecommerce.extensions.fulfillment.status import ORDER
 from ecommerce.extensions.offer.constants import OfferUsageEmailTypes
 from ecommerce.extensions.test.factories import EnterpriseOfferFactory
 from ecommerce.programs.custom import get_model
@@ -21,6 +23,7 @@ from ecommerce.tests.testcases import TestCase
 
 ConditionalOffer = get_model('offer', 'ConditionalOffer')
 OfferUsageEmail = get_model('offer', 'OfferUsageEmail')
+OfferUtilization = get_model('offer', 'OfferUtilization')
 
 BASE_COMMAND_PATH = 'ecommerce.enterprise.management.commands'
 API_TRIGGERED_PATH = BASE_COMMAND_PATH + '.send_api_triggered_offer_emails'
@@ -486,3 +489,24 @@ class SendEnterpriseOfferLimitEmailsTests(TestCase, SiteMixin, EnterpriseService
                 )
             )
         )
+
+    def test_deprecated_command_booking_usage(self):
+        """
+        Test the deprecated version of the command reads the booking usage of every offer from their utilization
+        summaries.
+        """
+        ConditionalOffer.objects.all().delete()
+        OfferUsageEmail.objects.all().delete()
+
+        offers = [EnterpriseOfferFactory(max_discount=100, emails_for_usage_alert='example_1@example.com')
+                  for __ in range(3)]
+        for offer in offers:
+            order = factories.OrderFactory(status=ORDER.COMPLETE)
+            factories.OrderDiscountFactory(order=order, offer_id=offer.id, amount=25)
+
+        with mock.patch(DEPRECATED_PATH + '.send_offer_usage_email.delay') as mock_send_email:
+            call_command('send_enterprise_offer_limit_emails')
+            assert mock_send_email.call_count == 3
+            assert all('Bookings Redeemed: 25$' in call[0][2] for call in mock_send_email.call_args_list)
+
+        assert OfferUtilization.objects.count() == 3
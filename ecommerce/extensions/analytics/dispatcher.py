@@ -0,0 +1,187 @@
+"""
+In-process dispatcher of the events sent to Braze.
+
+Events are added to a bounded queue by the request handlers and sent by a background thread, several
+per users/track request, so requests never wait for Braze. When Braze cannot keep up and the queue is
+full, new events are dropped rather than slowing requests down.
+
+Segment events need no dispatcher: the Segment client already queues them and sends them in batches
+from its own thread.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+import requests
+from django.conf import settings
+from edx_django_utils import monitoring as monitoring_utils
+
+logger = logging.getLogger(__name__)
+
+_dispatchers = {}
+_dispatchers_lock = threading.Lock()
+
+
+class BrazeEventDispatcher:
+    """
+    Sends the queued Braze events in batches from a background thread, started with the first event.
+    """
+
+    def __init__(self, event_url, api_key, max_queue_size=1000, batch_size=75, flush_interval=1, timeout=5):
+        self.event_url = event_url
+        self.api_key = api_key
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._metrics = {'sent': 0, 'failed': 0, 'dropped': 0, 'batches': 0}
+
+    def enqueue(self, event):
+        """
+        Queues an event, in the users/track format, to be sent.
+
+        Returns:
+            bool: False if the queue was full and the event was dropped.
+        """
+        self._start()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self._increment('dropped')
+            monitoring_utils.set_custom_attribute('braze_event_dropped', event['name'])
+            logger.warning('Dropped Braze event [%s]: the event queue is full.', event['name'])
+            return False
+
+        monitoring_utils.set_custom_attribute('braze_event_queue_depth', self._queue.qsize())
+        return True
+
+    def flush(self):
+        """
+        Sends the queued events from the calling thread, then waits for the batch being sent by the
+        background thread, if any.
+        """
+        while True:
+            batch = self._get_batch(block=False)
+            if not batch:
+                break
+            self._send(batch)
+        self._queue.join()
+
+    def get_metrics(self):
+        """
+        Returns the number of queued events, and of events sent, failed and dropped since the dispatcher started.
+        """
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        metrics['queue_depth'] = self._queue.qsize()
+        return metrics
+
+    def _start(self):
+        if self._thread is not None:
+            return
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='braze-event-dispatcher', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            batch = self._get_batch(block=True)
+            try:
+                self._send(batch)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception('Failed to send events to Braze.')
+
+    def _get_batch(self, block):
+        """
+        Takes up to batch_size events from the queue. When blocking, waits for a first event, then
+        for more events until the batch is full or flush_interval seconds have passed.
+        """
+        batch = []
+        try:
+            batch.append(self._queue.get(block=block))
+        except queue.Empty:
+            return batch
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                remaining = deadline - time.monotonic()
+                if block and remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _send(self, batch):
+        event_names = ', '.join(event['name'] for event in batch)
+        try:
+            response = requests.post(
+                self.event_url,
+                headers={'Authorization': 'Bearer ' + self.api_key},
+                json={'events': batch},
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+        # Just going to log it out. If we miss the events, it's unfortunate, but not worth raising an error
+        except requests.exceptions.HTTPError:
+            # https://www.braze.com/docs/api/errors/
+            message = response.json().get('message', 'Unknown error')
+            logger.debug('Failed to send event [%s] to Braze: %s', event_names, message)
+            self._increment('failed', len(batch))
+        # Log out the exception since it could be a symptom we might want to look into.
+        except requests.exceptions.RequestException:
+            logger.exception('Failed to send event to Braze due to request exception.')
+            self._increment('failed', len(batch))
+        else:
+            self._increment('sent', len(batch))
+        finally:
+            self._increment('batches')
+            for __ in batch:
+                self._queue.task_done()
+
+    def _increment(self, name, value=1):
+        with self._metrics_lock:
+            self._metrics[name] += value
+
+
+def get_braze_event_dispatcher():
+    """
+    Returns the Braze event dispatcher of this process, creating it if needed.
+
+    Forked processes get a dispatcher, and a background thread, of their own.
+
+    Returns:
+        BrazeEventDispatcher
+        None if Braze is not configured
+    """
+    if not (getattr(settings, 'BRAZE_EVENT_REST_ENDPOINT', None) or getattr(settings, 'BRAZE_API_KEY', None)):
+        return None
+
+    event_url = 'https://{url}/users/track'.format(url=getattr(settings, 'BRAZE_EVENT_REST_ENDPOINT'))
+    api_key = getattr(settings, 'BRAZE_API_KEY')
+    key = (os.getpid(), event_url, api_key)
+    dispatcher = _dispatchers.get(key)
+    if dispatcher is None:
+        with _dispatchers_lock:
+            dispatcher = _dispatchers.get(key)
+            if dispatcher is None:
+                dispatcher = BrazeEventDispatcher(
+                    event_url,
+                    api_key,
+                    max_queue_size=settings.BRAZE_EVENT_QUEUE_SIZE,
+                    batch_size=settings.BRAZE_EVENT_BATCH_SIZE,
+                    flush_interval=settings.BRAZE_EVENT_FLUSH_INTERVAL,
+                    timeout=settings.BRAZE_EVENT_TIMEOUT,
+                )
+                _dispatchers[key] = dispatcher
+    return dispatcher
@@ -0,0 +1,53 @@
+import json
+
+import mock
+import responses
+
+from ecommerce.extensions.analytics.dispatcher import BrazeEventDispatcher
+from ecommerce.tests.testcases import TestCase
+
+BRAZE_URL = 'https://rest.braze.com/users/track'
+
+
+@mock.patch.object(BrazeEventDispatcher, '_start', mock.Mock())
+class BrazeEventDispatcherTests(TestCase):
+    """ Tests for BrazeEventDispatcher, with events sent from the test thread by flush. """
+
+    def _event(self, index):
+        return {'external_id': index, 'name': 'event-{}'.format(index), 'time': '', 'properties': {}}
+
+    @responses.activate
+    def test_events_are_sent_in_batches(self):
+        """ Verify queued events are sent, at most batch_size per users/track request. """
+        responses.add(responses.POST, BRAZE_URL, json={'message': 'success'})
+        dispatcher = BrazeEventDispatcher(BRAZE_URL, 'test-api-key', batch_size=2)
+        for index in range(3):
+            self.assertTrue(dispatcher.enqueue(self._event(index)))
+        self.assertEqual(dispatcher.get_metrics()['queue_depth'], 3)
+
+        dispatcher.flush()
+
+        self.assertEqual(
+            [[event['name'] for event in json.loads(call.request.body)['events']] for call in responses.calls],
+            [['event-0', 'event-1'], ['event-2']]
+        )
+        self.assertEqual(responses.calls[0].request.headers['Authorization'], 'Bearer test-api-key')
+        self.assertEqual(
+            dispatcher.get_metrics(), {'sent': 3, 'failed': 0, 'dropped': 0, 'batches': 2, 'queue_depth': 0}
+        )
+
+    @responses.activate
+    def test_events_are_dropped_when_queue_is_full(self):
+        """ Verify events are dropped, instead of waiting, when the queue is full. """
+        responses.add(responses.POST, BRAZE_URL, json={'message': 'error'}, status=500)
+        dispatcher = BrazeEventDispatcher(BRAZE_URL, 'test-api-key', max_queue_size=1)
+        self.assertTrue(dispatcher.enqueue(self._event(0)))
+
+        with mock.patch('ecommerce.extensions.analytics.dispatcher.logger.warning') as mock_warning:
+            self.assertFalse(dispatcher.enqueue(self._event(1)))
+            mock_warning.assert_called_once_with('Dropped Braze event [%s]: the event queue is full.', 'event-1')
+
+        dispatcher.flush()
+        self.assertEqual(
+            dispatcher.get_metrics(), {'sent': 0, 'failed': 1, 'dropped': 1, 'batches': 1, 'queue_depth': 0}
+        )
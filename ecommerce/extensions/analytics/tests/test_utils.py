@@ -14,6 +14,7 @@ from requests.exceptions import RequestException
 
 from ecommerce.core.models import User  # pylint: disable=unused-import
 from ecommerce.courses.tests.factories import CourseFactory
+from ecommerce.extensions.analytics.dispatcher import get_braze_event_dispatcher
 from ecommerce.extensions.analytics.utils import (
     ECOM_TRACKING_ID_FMT,
     get_google_analytics_client_id,
@@ -193,7 +194,7 @@ class UtilsTest(DiscoveryTestMixin, BasketMixin, TransactionTestCase):
         """ If the braze settings aren't set, the function should log a debug message and NOT send an event."""
         with mock.patch('ecommerce.extensions.analytics.utils.logger.debug') as mock_debug:
             user = self.create_user()
-            self.assertIsNone(track_braze_event(user, 'edx.bi.ecommerce.cart.viewed', {}))
+            self.assertFalse(track_braze_event(user, 'edx.bi.ecommerce.cart.viewed', {}))
             mock_debug.assert_called_with('Failed to send event to Braze: Missing required settings.')
 
     @override_settings(
@@ -210,9 +211,10 @@ class UtilsTest(DiscoveryTestMixin, BasketMixin, TransactionTestCase):
             content_type='application/json',
             status=500,
         )
-        with mock.patch('ecommerce.extensions.analytics.utils.logger.debug') as mock_debug:
+        with mock.patch('ecommerce.extensions.analytics.dispatcher.logger.debug') as mock_debug:
             user = self.create_user()
             track_braze_event(user, 'edx.bi.ecommerce.cart.viewed', {})
+            get_braze_event_dispatcher().flush()
             mock_debug.assert_called_with('Failed to send event [%s] to Braze: %s',
                                           'edx.bi.ecommerce.cart.viewed', 'Braze encountered an error.')
 
@@ -223,10 +225,11 @@ class UtilsTest(DiscoveryTestMixin, BasketMixin, TransactionTestCase):
     @responses.activate
     def test_track_braze_event_with_request_error(self):
         """ If the request receives an error, the function should log an exception message and NOT send an event."""
-        with mock.patch('ecommerce.extensions.analytics.utils.requests.post', side_effect=RequestException):
-            with mock.patch('ecommerce.extensions.analytics.utils.logger.exception') as mock_exception:
+        with mock.patch('ecommerce.extensions.analytics.dispatcher.requests.post', side_effect=RequestException):
+            with mock.patch('ecommerce.extensions.analytics.dispatcher.logger.exception') as mock_exception:
                 user = self.create_user()
                 track_braze_event(user, 'edx.bi.ecommerce.cart.viewed', {})
+                get_braze_event_dispatcher().flush()
                 mock_exception.assert_called_with('Failed to send event to Braze due to request exception.')
 
     @override_settings(
@@ -235,14 +238,20 @@ class UtilsTest(DiscoveryTestMixin, BasketMixin, TransactionTestCase):
     )
     @responses.activate
     def test_track_braze_event_success(self):
-        """ If the braze settings aren't set, the function should log a debug message and NOT send an event."""
+        """ If the braze settings are set, the event should be queued and sent to Braze. """
         braze_url = 'https://{url}/users/track'.format(url=getattr(settings, 'BRAZE_EVENT_REST_ENDPOINT'))
         responses.add(
             responses.POST, braze_url,
             json={'events_processed': 1, 'message': 'success'},
             content_type='application/json',
         )
-        with mock.patch('ecommerce.extensions.analytics.utils.logger.debug') as mock_debug:
+        with mock.patch('ecommerce.extensions.analytics.dispatcher.logger.debug') as mock_debug:
             user = self.create_user()
-            self.assertIsNone(track_braze_event(user, 'edx.bi.ecommerce.cart.viewed', {'prop': 123}))
+            self.assertTrue(track_braze_event(user, 'edx.bi.ecommerce.cart.viewed', {'prop': 123}))
+            get_braze_event_dispatcher().flush()
             mock_debug.assert_not_called()
+
+        self.assertEqual(len(responses.calls), 1)
+        events = json.loads(responses.calls[0].request.body)['events']
+        self.assertEqual([(event['name'], event['properties']) for event in events],
+                         [('edx.bi.ecommerce.cart.viewed', {'prop': 123})])
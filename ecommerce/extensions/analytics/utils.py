@@ -6,11 +6,10 @@ from datetime import datetime, timezone
 from functools import wraps
 from urllib.parse import urlunsplit
 
-import requests
-from django.conf import settings
 from django.db import transaction
 
 from ecommerce.courses.utils import mode_for_product
+from ecommerce.extensions.analytics.dispatcher import get_braze_event_dispatcher
 
 logger = logging.getLogger(__name__)
 
@@ -226,43 +225,26 @@ def get_google_analytics_client_id(request):
 
 def track_braze_event(user, event, properties):
     """
-    Sends an event directly to Braze.
+    Queues an event to be sent to Braze.
+
+    Events are sent in batches by the Braze event dispatcher, from a background thread.
 
     Args:
         user (User): User to which the event should be associated.
         event (str): Event name.
         properties (dict): Event properties.
+
+    Returns:
+        bool: Whether the event was queued.
     """
-    if not (getattr(settings, 'BRAZE_EVENT_REST_ENDPOINT', None) or getattr(settings, 'BRAZE_API_KEY', None)):
+    dispatcher = get_braze_event_dispatcher()
+    if dispatcher is None:
         logger.debug('Failed to send event to Braze: Missing required settings.')
-        return
-
-    event_url = 'https://{url}/users/track'.format(url=getattr(settings, 'BRAZE_EVENT_REST_ENDPOINT'))
-    headers = {'Authorization': 'Bearer ' + getattr(settings, 'BRAZE_API_KEY')}
-    try:
-        response = requests.post(
-            event_url,
-            headers=headers,
-            json={
-                'events': [
-                    {
-                        'external_id': user.lms_user_id_with_metric(usage='Braze event: ' + event),
-                        'name': event,
-                        'time': datetime.now(timezone.utc).isoformat(),
-                        'properties': properties
-                    }
-                ]
-            }
-        )
-    # Log out the exception since it could be a symptom we might want to look into.
-    except requests.exceptions.RequestException:
-        logger.exception('Failed to send event to Braze due to request exception.')
-        return
-
-    try:
-        response.raise_for_status()
-    # Just going to log it out. If we miss the event, it's unfortunate, but not worth raising an error
-    except requests.exceptions.HTTPError:
-        # https://www.braze.com/docs/api/errors/
-        message = response.json().get('message', 'Unknown error')
-        logger.debug('Failed to send event [%s] to Braze: %s', event, message)
+        return False
+
+    return dispatcher.enqueue({
+        'external_id': user.lms_user_id_with_metric(usage='Braze event: ' + event),
+        'name': event,
+        'time': datetime.now(timezone.utc).isoformat(),
+        'properties': properties
+    })
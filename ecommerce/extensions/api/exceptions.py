@@ -29,6 +29,15 @@ class ProductNotFoundError(ApiError):
     """Raised when the provided SKU does not correspond to a product in the catalog."""
 
 
+class BasketOwnerError(ApiError):
+    """Raised when the owner of a basket to be calculated cannot be determined from the request."""
+
+    def __init__(self, status_code, message):
+        super(BasketOwnerError, self).__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
 class BadRequestException(APIException):
     status_code = status.HTTP_400_BAD_REQUEST
 
@@ -2,7 +2,7 @@
 
 import logging
 import re
-from collections import OrderedDict
+from collections import OrderedDict, defaultdict
 from decimal import Decimal
 from urllib.parse import urljoin
 
@@ -12,8 +12,9 @@ from dateutil.parser import parse
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
-from django.db import transaction
-from django.db.models import Count, Q, Sum, prefetch_related_objects
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, prefetch_related_objects
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from opaque_keys.edx.keys import CourseKey
@@ -30,7 +31,6 @@ from ecommerce.core.constants import (
 )
 from ecommerce.core.url_utils import get_ecommerce_url
 from ecommerce.core.utils import log_message_and_raise_validation_error
-from ecommerce.coupons.utils import is_coupon_available
 from ecommerce.courses.models import Course
 from ecommerce.enterprise.benefits import BENEFIT_MAP as ENTERPRISE_BENEFIT_MAP
 from ecommerce.enterprise.conditions import sum_user_discounts_for_offer
@@ -61,6 +61,7 @@ from ecommerce.extensions.offer.constants import (
     AUTOMATIC_EMAIL,
     MANUAL_EMAIL,
     OFFER_ASSIGNED,
+    OFFER_ASSIGNMENT_BATCH_SIZE,
     OFFER_ASSIGNMENT_EMAIL_BOUNCED,
     OFFER_ASSIGNMENT_EMAIL_PENDING,
     OFFER_ASSIGNMENT_EMAIL_SUBJECT_LIMIT,
@@ -73,7 +74,7 @@ from ecommerce.extensions.offer.constants import (
 )
 from ecommerce.extensions.offer.utils import (
     get_benefit_type,
-    send_assigned_offer_email,
+    send_assigned_offer_emails,
     send_assigned_offer_reminder_email,
     send_revoked_offer_email
 )
@@ -88,6 +89,7 @@ BasketLine = get_model('basket', 'Line')
 Benefit = get_model('offer', 'Benefit')
 BillingAddress = get_model('order', 'BillingAddress')
 Catalog = get_model('catalogue', 'Catalog')
+CouponVouchers = get_model('voucher', 'CouponVouchers')
 CodeAssignmentNudgeEmails = get_model('offer', 'CodeAssignmentNudgeEmails')
 Category = get_model('catalogue', 'Category')
 Line = get_model('order', 'Line')
@@ -97,8 +99,10 @@ OfferAssignmentEmailTemplates = get_model('offer', 'OfferAssignmentEmailTemplate
 TemplateFileAttachment = get_model('offer', 'TemplateFileAttachment')
 OfferAssignmentEmailSentRecord = get_model('offer', 'OfferAssignmentEmailSentRecord')
 Order = get_model('order', 'Order')
+OrderDiscount = get_model('order', 'OrderDiscount')
 Partner = get_model('partner', 'Partner')
 Product = get_model('catalogue', 'Product')
+ProductAttributeSnapshot = get_model('catalogue', 'ProductAttributeSnapshot')
 ProductAttributeValue = get_model('catalogue', 'ProductAttributeValue')
 ProductCategory = get_model('catalogue', 'ProductCategory')
 Refund = get_model('refund', 'Refund')
@@ -194,8 +198,16 @@ def retrieve_enterprise_customer_catalog(coupon):
     Helper method to retrieve the Enterprise Customer Catalog UUID
     attached to a given coupon.
     """
-    offer_range = retrieve_range(coupon)
-    offer_condition = retrieve_condition(coupon)
+    return retrieve_voucher_enterprise_customer_catalog(retrieve_voucher(coupon))
+
+
+def retrieve_voucher_enterprise_customer_catalog(voucher):
+    """
+    Helper method to retrieve the Enterprise Customer Catalog UUID
+    attached to the offers of a given voucher.
+    """
+    offer_range = voucher.original_offer.condition.range
+    offer_condition = voucher.best_offer.condition
     if offer_range and offer_range.enterprise_customer_catalog:
         return offer_range.enterprise_customer_catalog
     if offer_condition.enterprise_customer_catalog_uuid:
@@ -243,6 +255,44 @@ def create_offer_assignment_email_sent_record(
     )
 
 
+def create_offer_assignment_email_sent_records(
+        enterprise_customer_uuid,
+        email_type,
+        template,
+        receivers,
+        sender_id=None,
+):
+    """
+    Helper method to save the entries in OfferAssignmentEmailSentRecord of emails sent in bulk, with a fixed number
+    of queries.
+    Arguments:
+        enterprise_customer_uuid (str): UUID of enterprise customer
+        email_type (str): the type of email sent e:g ASSIGN, REMIND, REVOKE
+        template (OfferAssignmentEmailTemplates): The template used to send the emails
+        receivers (list): (code, user_email, receiver_id) of every email sent
+        sender_id (str): lms_user_id of the admin who sent the emails
+
+    """
+    sender_category = MANUAL_EMAIL if sender_id else AUTOMATIC_EMAIL
+
+    OfferAssignmentEmailSentRecord.objects.bulk_create(
+        [
+            OfferAssignmentEmailSentRecord(
+                user_email=user_email,
+                code=code,
+                receiver_id=receiver_id,
+                sender_id=sender_id,
+                sender_category=sender_category,
+                template_content_object=template,
+                enterprise_customer=enterprise_customer_uuid,
+                email_type=email_type
+            )
+            for code, user_email, receiver_id in receivers
+        ],
+        batch_size=OFFER_ASSIGNMENT_BATCH_SIZE,
+    )
+
+
 class CouponMixin:
     """ Mixin class used for Coupon Serializers using model Product having COUPON Product Class"""
 
@@ -349,10 +399,26 @@ class ProductSerializer(ProductPaymentInfoMixin, serializers.HyperlinkedModelSer
     is_enrollment_code_product = serializers.SerializerMethodField()
     stockrecords = StockRecordSerializer(many=True, read_only=True)
 
+    @staticmethod
+    def _get_attribute_values(product):
+        """
+        Returns the attribute values of the product, including those inherited from its parent, from the values
+        prefetched with them if any.
+        """
+        products = [product, product.parent] if product.is_child else [product]
+        if not all('attribute_values' in getattr(item, '_prefetched_objects_cache', {}) for item in products):
+            return product.attr
+
+        values = list(product.attribute_values.all())
+        if product.is_child:
+            codes = {value.attribute.code for value in values}
+            values.extend(value for value in product.parent.attribute_values.all() if value.attribute.code not in codes)
+        return sorted(values, key=lambda value: value.id)
+
     def get_attribute_values(self, product):
         request = self.context.get('request')
         serializer = ProductAttributeValueSerializer(
-            product.attr,
+            self._get_attribute_values(product),
             many=True,
             read_only=True,
             context={'request': request}
@@ -404,8 +470,39 @@ class LineSerializer(serializers.ModelSerializer):
         )
 
 
+class OrderBulkSerializer(serializers.ListSerializer):  # pylint: disable=abstract-method
+    """
+    Serializer for a page of orders, e.g. the order history of a learner.
+
+    The related objects of every order on the page are loaded up front, with a fixed number of queries.
+    """
+
+    def to_representation(self, data):
+        orders = list(data.all() if isinstance(data, models.Manager) else data)
+        self.child.prefetch_orders(orders)
+        return super(OrderBulkSerializer, self).to_representation(orders)
+
+
 class OrderSerializer(serializers.ModelSerializer):
     """Serializer for parsing order data."""
+    # Related objects read while serializing an order, loaded for a whole page of orders by prefetch_orders.
+    PREFETCHED_RELATIONS = (
+        'basket__basketattribute_set__attribute_type',
+        'basket__vouchers__offers__benefit',
+        'basket__vouchers__offers__condition',
+        'billing_address',
+        'discounts',
+        'lines__attributes',
+        'lines__product__attribute_values__attribute',
+        'lines__product__course',
+        'lines__product__parent__attribute_values__attribute',
+        'lines__product__parent__product_class',
+        'lines__product__product_class',
+        'lines__product__stockrecords',
+        'sources__source_type',
+        'user',
+    )
+
     basket_discounts = serializers.SerializerMethodField()
     billing_address = BillingAddressSerializer(allow_null=True)
     contains_credit_seat = serializers.SerializerMethodField()
@@ -423,22 +520,66 @@ class OrderSerializer(serializers.ModelSerializer):
     total_before_discounts_incl_tax = serializers.SerializerMethodField()
     order_product_ids = serializers.SerializerMethodField()
 
+    def prefetch_orders(self, orders):
+        """
+        Loads the related objects of the orders, and the offers and vouchers of their discounts, in bulk.
+        """
+        prefetch_related_objects(orders, *self.PREFETCHED_RELATIONS)
+
+        discounts = [discount for order in orders for discount in order.discounts.all()]
+        # pylint: disable=attribute-defined-outside-init
+        self._discount_offers = ConditionalOffer.objects.select_related('condition__range').in_bulk(
+            {discount.offer_id for discount in discounts if discount.offer_id}
+        )
+        self._condition_names = {}
+        self._discount_vouchers = Voucher.objects.prefetch_related('offers__benefit').in_bulk(
+            {discount.voucher_id for discount in discounts if discount.voucher_id}
+        )
+
+        products = {line.product_id: line.product for order in orders for line in order.lines.all() if line.product}
+        ProductAttributeSnapshot.load(products.values())
+
+    def _get_discount_offer_and_voucher(self, discount):
+        """ Returns the offer and voucher of a discount, from those loaded by prefetch_orders if any. """
+        discount_offers = getattr(self, '_discount_offers', None)
+        discount_vouchers = getattr(self, '_discount_vouchers', None)
+        if discount_offers is None or discount_vouchers is None:
+            return discount.offer, discount.voucher
+        return discount_offers.get(discount.offer_id), discount_vouchers.get(discount.voucher_id)
+
+    def _get_condition_name(self, offer):
+        """ Returns the name of the condition of an offer, built once per offer when the offers were loaded. """
+        condition_names = getattr(self, '_condition_names', None)
+        if condition_names is None:
+            return offer.condition.name
+        if offer.id not in condition_names:
+            condition_names[offer.id] = offer.condition.name
+        return condition_names[offer.id]
+
+    def _get_enterprise_customer_user(self, request):
+        """ Returns the active enterprise customer user of the request, looked up once per serializer. """
+        if not hasattr(self, '_enterprise_customer_user'):
+            # pylint: disable=attribute-defined-outside-init
+            self._enterprise_customer_user = ReceiptResponseView().get_metadata_for_enterprise_user(request)
+        return self._enterprise_customer_user
+
     def get_basket_discounts(self, obj):
         basket_discounts = []
         try:
-            discounts = obj.basket_discounts
+            # The discounts are filtered here, rather than with obj.basket_discounts, to use the prefetched ones.
+            discounts = [discount for discount in obj.discounts.all() if discount.category == OrderDiscount.BASKET]
             if discounts:
                 for discount in discounts:
+                    offer, voucher = self._get_discount_offer_and_voucher(discount)
                     basket_discount = {
                         'amount': discount.amount,
-                        'benefit_value': discount.voucher.benefit.value if discount.voucher else None,
+                        'benefit_value': voucher.benefit.value if voucher else None,
                         'code': discount.voucher_code,
-                        'condition_name': discount.offer.condition.name if discount.offer else None,
-                        'contains_offer': bool(discount.offer),
+                        'condition_name': self._get_condition_name(offer) if offer else None,
+                        'contains_offer': bool(offer),
                         'currency': obj.currency,
-                        'enterprise_customer_name':
-                            discount.offer.condition.enterprise_customer_name if discount.offer else None,
-                        'offer_type': discount.offer.offer_type if discount.offer else None,
+                        'enterprise_customer_name': offer.condition.enterprise_customer_name if offer else None,
+                        'offer_type': offer.offer_type if offer else None,
                     }
                     basket_discounts.append(basket_discount)
         except (AttributeError, TypeError, ValueError):
@@ -492,8 +633,12 @@ class OrderSerializer(serializers.ModelSerializer):
 
     def get_enable_hoist_order_history(self, obj):
         try:
-            request = self.context.get('request')
-            return waffle.flag_is_active(request, ENABLE_HOIST_ORDER_HISTORY)
+            if not hasattr(self, '_enable_hoist_order_history'):
+                # pylint: disable=attribute-defined-outside-init
+                self._enable_hoist_order_history = waffle.flag_is_active(
+                    self.context.get('request'), ENABLE_HOIST_ORDER_HISTORY
+                )
+            return self._enable_hoist_order_history
         except ValueError:
             logger.exception(
                 'An error occurred while attempting to get ENABLE_HOIST_ORDER_HISTORY flag for order [%s]',
@@ -515,14 +660,16 @@ class OrderSerializer(serializers.ModelSerializer):
     def get_enterprise_learner_portal_url(self, obj):
         try:
             request = self.context['request']
-            enterprise_customer_user = ReceiptResponseView().get_metadata_for_enterprise_user(request)
+            enterprise_customer_user = self._get_enterprise_customer_user(request)
             if not enterprise_customer_user:
                 return None
-            enterprise_customer = enterprise_customer_user['enterprise_customer']
-            learner_portal_url = ReceiptResponseView().get_enterprise_learner_portal_url(
-                request, enterprise_customer
-            )
-            return learner_portal_url
+            if not hasattr(self, '_enterprise_learner_portal_url'):
+                enterprise_customer = enterprise_customer_user['enterprise_customer']  # pylint: disable=unsubscriptable-object
+                # pylint: disable=attribute-defined-outside-init
+                self._enterprise_learner_portal_url = ReceiptResponseView().get_enterprise_learner_portal_url(
+                    request, enterprise_customer
+                )
+            return self._enterprise_learner_portal_url
         except (AttributeError, ValueError):
             logger.exception(
                 '[Receipt MFE] Failed to retrieve enterprise learner portal URL for order [%s]',
@@ -532,13 +679,18 @@ class OrderSerializer(serializers.ModelSerializer):
 
     def get_total_before_discounts_incl_tax(self, obj):
         try:
-            return str(obj.total_before_discounts_incl_tax)
+            # The same total as obj.total_before_discounts_incl_tax, which aggregates the lines with a query,
+            # summed from the prefetched lines. Like the property, shipping discounts are not added back.
+            lines = obj.lines.all()
+            if not lines:
+                return None
+            return str(sum(line.line_price_before_discounts_incl_tax for line in lines) + obj.shipping_incl_tax)
         except ValueError:
             return None
 
     def get_order_product_ids(self, obj):
         try:
-            return ','.join(map(str, obj.lines.values_list('product_id', flat=True)))
+            return ','.join(str(line.product_id) for line in obj.lines.all())
         except (AttributeError, ValueError):
             logger.exception(
                 '[Receipt MFE] Failed to retrieve order product IDs for order [%s]',
@@ -581,6 +733,7 @@ class OrderSerializer(serializers.ModelSerializer):
             'user',
             'vouchers',
         )
+        list_serializer_class = OrderBulkSerializer
 
 
 class BasketSerializer(serializers.ModelSerializer):
@@ -1346,45 +1499,72 @@ class OfferAssignmentEmailTemplatesSerializer(serializers.ModelSerializer):
         return files.data
 
 
+class EnterpriseCouponOverviewBulkSerializer(serializers.ListSerializer):  # pylint: disable=abstract-method
+    """
+    Serializer for a page of Enterprise Coupons list overview.
+
+    The overview data of every coupon on the page is gathered up front, with a fixed number of queries.
+    """
+
+    def to_representation(self, data):
+        coupons = list(data.all() if isinstance(data, models.Manager) else data)
+        self.overviews = self.child.get_overviews(coupons)  # pylint: disable=attribute-defined-outside-init
+        return super(EnterpriseCouponOverviewBulkSerializer, self).to_representation(coupons)
+
+
 class EnterpriseCouponOverviewListSerializer(serializers.ModelSerializer):
     """
     Serializer for Enterprise Coupons list overview.
     """
 
-    def _get_num_unassigned(self, vouchers):
+    @staticmethod
+    def _get_first_vouchers(coupon_ids):
         """
-        Return number of available assignments.
+        Return the first voucher of every coupon, keyed on coupon id, with their offers prefetched.
         """
-        all_slots_available = 0
-        enterprise_offer = vouchers.first().enterprise_offer
+        first_voucher_ids = dict(
+            CouponVouchers.objects.filter(coupon_id__in=coupon_ids).annotate(
+                first_voucher_id=Subquery(
+                    Voucher.objects.filter(coupon_vouchers=OuterRef('pk')).order_by('-date_created').values('id')[:1]
+                )
+            ).values_list('coupon_id', 'first_voucher_id')
+        )
+        vouchers = Voucher.objects.filter(id__in=first_voucher_ids.values()).prefetch_related(
+            'offers__condition__range'
+        ).in_bulk()
+        return {coupon_id: vouchers[voucher_id] for coupon_id, voucher_id in first_voucher_ids.items()}
 
-        assignments = OfferAssignment.objects.filter(code__in=vouchers.values_list('code', flat=True)).exclude(
+    @staticmethod
+    def _get_voucher_usages(coupon_ids):
+        """
+        Return the vouchers of every coupon, grouped on the values needed to count uses and available slots.
+        """
+        num_assignments = OfferAssignment.objects.filter(code=OuterRef('code')).exclude(
             status__in=[OFFER_REDEEMED, OFFER_ASSIGNMENT_REVOKED]
-        ).values('code').annotate(num_assignments=Count('code')).order_by('code')
-
-        vouchers_num_assignments = {item['code']: item['num_assignments'] for item in assignments}
+        ).order_by().values('code').annotate(num_assignments=Count('id')).values('num_assignments')
 
-        for voucher in vouchers:
-            num_assignments = vouchers_num_assignments.get(voucher.code, 0)
-            voucher_slots_available = voucher.calculate_available_slots(
-                enterprise_offer.max_global_applications,
-                num_assignments
-            )
-            if voucher_slots_available > 0:
-                all_slots_available += voucher_slots_available
+        return Voucher.objects.filter(coupon_vouchers__coupon_id__in=coupon_ids).annotate(
+            coupon_id=F('coupon_vouchers__coupon_id'),
+            num_assignments=Coalesce(Subquery(num_assignments), 0),
+        ).order_by().values('coupon_id', 'usage', 'num_orders', 'num_assignments').annotate(num_vouchers=Count('id'))
 
-        return all_slots_available
-
-    def _get_errors(self, coupon):
+    @staticmethod
+    def _get_errors(coupon_ids):
         """
-        Returns a list of OfferAssignment errors associated with coupon.
+        Returns the OfferAssignment errors associated with every coupon, keyed on coupon id.
         """
-        codes = coupon.attr.coupon_vouchers.vouchers.values_list('code', flat=True)
+        coupon_vouchers = Voucher.objects.filter(coupon_vouchers__coupon_id__in=coupon_ids)
         offer_assignments_with_error = OfferAssignment.objects.filter(
-            code__in=codes,
+            code__in=coupon_vouchers.values('code'),
             status=OFFER_ASSIGNMENT_EMAIL_BOUNCED
-        )
-        return OfferAssignmentSerializer(offer_assignments_with_error, many=True).data
+        ).annotate(
+            coupon_id=Subquery(coupon_vouchers.filter(code=OuterRef('code')).values('coupon_vouchers__coupon_id')[:1])
+        ).order_by('id')
+
+        errors = defaultdict(list)
+        for offer_assignment in offer_assignments_with_error:
+            errors[offer_assignment.coupon_id].append(OfferAssignmentSerializer(offer_assignment).data)
+        return errors
 
     # Max number of codes available (Maximum Coupon Usage).
     def _get_max_uses(self, voucher, voucher_usage, voucher_count):
@@ -1400,33 +1580,56 @@ class EnterpriseCouponOverviewListSerializer(serializers.ModelSerializer):
 
         return max_uses_per_code * voucher_count
 
+    def get_overviews(self, coupons):
+        """
+        Return the overview data of the given coupons, keyed on coupon id.
+        """
+        coupon_ids = [coupon.id for coupon in coupons]
+        first_vouchers = self._get_first_vouchers(coupon_ids)
+        errors = self._get_errors(coupon_ids)
+        voucher_usages = defaultdict(list)
+        for voucher_usage in self._get_voucher_usages(coupon_ids):
+            voucher_usages[voucher_usage['coupon_id']].append(voucher_usage)
+
+        overviews = {}
+        current_datetime = timezone.now()
+        for coupon_id in coupon_ids:
+            voucher = first_vouchers[coupon_id]
+            max_global_applications = voucher.enterprise_offer.max_global_applications
+            count = num_uses = num_unassigned = 0
+            for voucher_usage in voucher_usages[coupon_id]:
+                count += voucher_usage['num_vouchers']
+                num_uses += voucher_usage['num_orders'] * voucher_usage['num_vouchers']
+                slots_available = Voucher(
+                    usage=voucher_usage['usage'], num_orders=voucher_usage['num_orders']
+                ).calculate_available_slots(max_global_applications, voucher_usage['num_assignments'])
+                if slots_available > 0:
+                    num_unassigned += slots_available * voucher_usage['num_vouchers']
+
+            overviews[coupon_id] = {
+                'start_date': voucher.start_datetime,
+                'end_date': voucher.end_datetime,
+                'num_uses': num_uses,
+                'usage_limitation': voucher.usage,
+                'num_codes': count,
+                'max_uses': self._get_max_uses(voucher, voucher.usage, count),
+                'num_unassigned': num_unassigned,
+                'errors': errors[coupon_id],
+                'available': voucher.start_datetime < current_datetime < voucher.end_datetime,
+                'enterprise_catalog_uuid': retrieve_voucher_enterprise_customer_catalog(voucher),
+            }
+        return overviews
+
     def to_representation(self, coupon):  # pylint: disable=arguments-differ
         representation = super(EnterpriseCouponOverviewListSerializer, self).to_representation(coupon)
 
-        vouchers = coupon.attr.coupon_vouchers.vouchers.all()
-        voucher = vouchers.first()
-        usage = voucher.usage
-        count = vouchers.count()
-        num_orders = vouchers.aggregate(Sum('num_orders'))
-
-        data = {
-            'start_date': voucher.start_datetime,
-            'end_date': voucher.end_datetime,
-            'num_uses': num_orders['num_orders__sum'],
-            'usage_limitation': usage,
-            'num_codes': count,
-            'max_uses': self._get_max_uses(voucher, usage, count),
-            'num_unassigned': self._get_num_unassigned(vouchers),
-            'errors': self._get_errors(coupon),
-            'available': is_coupon_available(coupon),
-            'enterprise_catalog_uuid': retrieve_enterprise_customer_catalog(coupon),
-        }
-
-        return dict(representation, **data)
+        overviews = getattr(self.parent, 'overviews', None) or self.get_overviews([coupon])
+        return dict(representation, **overviews[coupon.id])
 
     class Meta:
         model = Product
         fields = ('id', 'title')
+        list_serializer_class = EnterpriseCouponOverviewBulkSerializer
 
 
 class EnterpriseCouponSearchSerializer(serializers.Serializer):  # pylint: disable=abstract-method
@@ -1849,6 +2052,8 @@ class CouponCodeAssignmentSerializer(serializers.Serializer):  # pylint: disable
     def create(self, validated_data):
         """
         Create OfferAssignment objects for each users_detail and the available_assignments determined from validation.
+
+        Assignments and email records are written in bulk, and the emails are sent by tasks each sending a batch.
         """
         users = validated_data['users']
         voucher_usage_type = validated_data.pop('voucher_usage_type')
@@ -1862,8 +2067,8 @@ class CouponCodeAssignmentSerializer(serializers.Serializer):  # pylint: disable
         enable_nudge_emails = validated_data.pop('enable_nudge_emails')
         available_assignments = validated_data.pop('available_assignments')
         users_iterator = iter(users)
-        offer_assignments = []
-        emails_already_sent = set()
+        new_offer_assignments = []
+        receiver_ids = {}
         current_date_time = timezone.now()
         base_enterprise_url = validated_data.pop('base_enterprise_url', '')
         site = self.context.get('site')
@@ -1874,42 +2079,65 @@ class CouponCodeAssignmentSerializer(serializers.Serializer):  # pylint: disable
             user = next(users_iterator) if voucher_usage_type == Voucher.MULTI_USE_PER_CUSTOMER else None
             for _ in range(available_assignments[code]['num_slots']):
                 user_detail = user or next(users_iterator)
-                new_offer_assignment = OfferAssignment.objects.create(
+                new_offer_assignments.append(OfferAssignment(
                     offer=offer,
                     code=code,
                     user_email=user_detail['email'],
                     assignment_date=current_date_time,
+                ))
+                receiver_ids.setdefault((user_detail['email'], code), user_detail.get('lms_user_id'))
+
+        OfferAssignment.objects.bulk_create(new_offer_assignments, batch_size=OFFER_ASSIGNMENT_BATCH_SIZE)
+        if all(assignment.id for assignment in new_offer_assignments):
+            offer_assignments = new_offer_assignments
+        else:
+            # bulk_create does not set the ids on MySQL, so the assignments are read back. Only the learner and
+            # code pairs assigned here are kept, in case another request assigned codes at the same time.
+            offers = {assignment.offer_id: assignment.offer for assignment in new_offer_assignments}
+            assigned_pairs = {(assignment.user_email, assignment.code) for assignment in new_offer_assignments}
+            offer_assignments = [
+                assignment
+                for assignment in OfferAssignment.objects.filter(
+                    offer_id__in=offers,
+                    code__in=available_assignments,
+                    user_email__in={user_email for user_email, __ in assigned_pairs},
+                    assignment_date=current_date_time,
+                ).order_by('id')
+                if (assignment.user_email, assignment.code) in assigned_pairs
+            ]
+            for assignment in offer_assignments:
+                assignment.offer = offers[assignment.offer_id]
+        OfferAssignment.history.bulk_history_create(offer_assignments, batch_size=OFFER_ASSIGNMENT_BATCH_SIZE)
+
+        if notify_learners:
+            # For MULTI_USE_PER_CUSTOMER, a single email is sent per learner and code.
+            emailed_offer_assignments = {}
+            for assignment in offer_assignments:
+                emailed_offer_assignments.setdefault((assignment.user_email, assignment.code), assignment)
+
+            # subscribe the users for nudge emails if enable_nudge_emails flag is on.
+            if enable_nudge_emails:
+                CodeAssignmentNudgeEmails.bulk_subscribe_nudge_emails(
+                    emailed_offer_assignments, base_enterprise_url=base_enterprise_url
                 )
-                offer_assignments.append(new_offer_assignment)
-                # Start async email task. For MULTI_USE_PER_CUSTOMER, a single email is sent
-                email_code_pair = frozenset((new_offer_assignment.user_email, new_offer_assignment.code))
-                if not notify_learners:
-                    continue
-                if email_code_pair not in emails_already_sent:
-                    # subscribe the user for nudge email if enable_nudge_emails flag is on.
-                    if enable_nudge_emails:
-                        CodeAssignmentNudgeEmails.subscribe_nudge_emails(
-                            user_email=user_detail['email'],
-                            code=code,
-                            base_enterprise_url=base_enterprise_url,
-                        )
-                    sender_alias = get_enterprise_customer_sender_alias(site, enterprise_customer_uuid)
-                    reply_to = get_enterprise_customer_reply_to_email(site, enterprise_customer_uuid)
-                    self._trigger_email_sending_task(
-                        subject, greeting, closing, new_offer_assignment, voucher_usage_type, sender_alias,
-                        reply_to, base_enterprise_url, attachments=files,
-                    )
-                    # Create a record of the email sent
-                    create_offer_assignment_email_sent_record(
-                        enterprise_customer_uuid,
-                        ASSIGN,
-                        template,
-                        code=code,
-                        user_email=user_detail['email'],
-                        receiver_id=user_detail.get('lms_user_id'),
-                        sender_id=sender_id
-                    )
-                    emails_already_sent.add(email_code_pair)
+            sender_alias = get_enterprise_customer_sender_alias(site, enterprise_customer_uuid)
+            reply_to = get_enterprise_customer_reply_to_email(site, enterprise_customer_uuid)
+            self._trigger_email_sending_tasks(
+                subject, greeting, closing, list(emailed_offer_assignments.values()), voucher_usage_type,
+                sender_alias, reply_to, base_enterprise_url, attachments=files,
+            )
+            # Create a record of the emails sent
+            create_offer_assignment_email_sent_records(
+                enterprise_customer_uuid,
+                ASSIGN,
+                template,
+                [
+                    (code, user_email, receiver_ids[(user_email, code)])
+                    for user_email, code in emailed_offer_assignments
+                ],
+                sender_id=sender_id,
+            )
+
         validated_data['offer_assignments'] = offer_assignments
         return validated_data
 
@@ -1946,7 +2174,7 @@ class CouponCodeAssignmentSerializer(serializers.Serializer):  # pylint: disable
             existing_assignments_for_users = OfferAssignment.objects.filter(user_email__in=emails).exclude(
                 status__in=[OFFER_ASSIGNMENT_REVOKED]
             )
-            existing_applications_for_users = VoucherApplication.objects.select_related('user').filter(
+            existing_applications_for_users = VoucherApplication.objects.select_related('user', 'voucher').filter(
                 user__email__in=emails
             )
             codes_to_exclude = (
@@ -1966,10 +2194,11 @@ class CouponCodeAssignmentSerializer(serializers.Serializer):  # pylint: disable
             vouchers = vouchers.exclude(code__in=codes_to_exclude)
 
         vouchers = vouchers.all()
-        prefetch_related_objects(vouchers, 'offers', 'offers__condition', 'offers__offerassignment_set')
+        prefetch_related_objects(vouchers, 'offers', 'offers__condition')
+        slots_available_for_assignment = Voucher.get_slots_available_for_assignment(vouchers)
         total_slots = 0
         for voucher in vouchers:
-            available_slots = voucher.slots_available_for_assignment
+            available_slots = slots_available_for_assignment[voucher.code]
             # If there are no available slots for this voucher, skip it.
             if available_slots < 1:
                 continue
@@ -2006,42 +2235,33 @@ class CouponCodeAssignmentSerializer(serializers.Serializer):  # pylint: disable
         attrs['enterprise_customer_uuid'] = enterprise_customer_uuid
         return attrs
 
-    def _trigger_email_sending_task(self, subject, greeting, closing, assigned_offer, voucher_usage_type, sender_alias,
-                                    reply_to, base_enterprise_url='', attachments=None):
+    def _trigger_email_sending_tasks(self, subject, greeting, closing, assigned_offers, voucher_usage_type,
+                                     sender_alias, reply_to, base_enterprise_url='', attachments=None):
         """
-        Schedule async task to send email to the learner who has been assigned the code.
+        Schedule async tasks to send emails to the learners who have been assigned the codes.
         """
         coupon = self.context.get('coupon')
-        code_expiration_date = retrieve_end_date(coupon)
-        redemptions_remaining = (
-            assigned_offer.offer.max_global_applications if voucher_usage_type == Voucher.MULTI_USE_PER_CUSTOMER else 1
-        )
-        try:
-            send_assigned_offer_email(
-                subject=subject,
-                greeting=greeting,
-                closing=closing,
-                offer_assignment_id=assigned_offer.id,
-                learner_email=assigned_offer.user_email,
-                code=assigned_offer.code,
-                redemptions_remaining=redemptions_remaining,
-                code_expiration_date=code_expiration_date.strftime('%d %B, %Y %H:%M %Z'),
-                sender_alias=sender_alias,
-                reply_to=reply_to,
-                base_enterprise_url=base_enterprise_url,
-                attachments=attachments,
-            )
-        except Exception as exc:  # pylint: disable=broad-except
-            logger.exception(  # pylint: disable=logging-too-many-args
-                '[Offer Assignment] Email for offer_assignment_id: %d with subject %r, '
-                'greeting %r closing %r and attachments %r, raised exception: %r',
-                assigned_offer.id,
-                subject,
-                greeting,
-                closing,
-                attachments,
-                exc
-            )
+        code_expiration_date = retrieve_end_date(coupon).strftime('%d %B, %Y %H:%M %Z')
+        send_assigned_offer_emails([
+            {
+                'subject': subject,
+                'greeting': greeting,
+                'closing': closing,
+                'offer_assignment_id': assigned_offer.id,
+                'learner_email': assigned_offer.user_email,
+                'code': assigned_offer.code,
+                'redemptions_remaining': (
+                    assigned_offer.offer.max_global_applications
+                    if voucher_usage_type == Voucher.MULTI_USE_PER_CUSTOMER else 1
+                ),
+                'code_expiration_date': code_expiration_date,
+                'sender_alias': sender_alias,
+                'reply_to': reply_to,
+                'base_enterprise_url': base_enterprise_url,
+                'attachments': attachments,
+            }
+            for assigned_offer in assigned_offers
+        ])
 
 
 class RefundedOrderCreateVoucherSerializer(serializers.Serializer):  # pylint: disable=abstract-method
@@ -2,21 +2,30 @@ import datetime
 from unittest import mock
 from uuid import uuid4
 
+from django.db import connection
 from django.test import RequestFactory
-from oscar.core.loading import get_model
+from django.test.utils import CaptureQueriesContext
+from oscar.core.loading import get_class, get_model
 from testfixtures import LogCapture
 
 from ecommerce.coupons.tests.mixins import CouponMixin
+from ecommerce.courses.tests.factories import CourseFactory
 from ecommerce.extensions.api.serializers import (
     CouponCodeAssignmentSerializer,
     CouponCodeRemindSerializer,
     CouponCodeRevokeSerializer,
     OrderSerializer
 )
+from ecommerce.extensions.offer.constants import ASSIGN
 from ecommerce.extensions.test import factories
 from ecommerce.tests.testcases import TestCase
 
+Applicator = get_class('offer.applicator', 'Applicator')
 OfferAssignment = get_model('offer', 'OfferAssignment')
+OfferAssignmentEmailSentRecord = get_model('offer', 'OfferAssignmentEmailSentRecord')
+Order = get_model('order', 'Order')
+OrderDiscount = get_model('order', 'OrderDiscount')
+SourceType = get_model('payment', 'SourceType')
 Voucher = get_model('voucher', 'Voucher')
 
 
@@ -125,6 +134,66 @@ class OrderSerializerTests(TestCase):
                 serializer.get_product_tracking(order)
                 logger.check_present(*expected)
 
+    def test_get_total_before_discounts_incl_tax(self):
+        """ Verify the total before discounts is the one of the order, summed from its prefetched lines. """
+        order = factories.create_order(site=self.site, user=self.user)
+        order.shipping_incl_tax = 5
+        order.save()
+        order.discounts.create(amount=3, category=OrderDiscount.SHIPPING)
+        order = Order.objects.prefetch_related('lines').get(id=order.id)
+        serializer = OrderSerializer(order, context={'request': RequestFactory(SERVER_NAME=self.site.domain).get('/')})
+
+        with self.assertNumQueries(0):
+            total = serializer.get_total_before_discounts_incl_tax(order)
+        self.assertEqual(total, str(order.total_before_discounts_incl_tax))
+
+    def _create_orders(self, count):
+        """ Creates orders of the same seat, bought with a voucher and paid with a card. """
+        seat = CourseFactory(partner=self.partner).create_or_update_seat('verified', True, 100)
+        voucher, seat = factories.prepare_voucher(
+            _range=factories.RangeFactory(products=[seat]), benefit_value=10, usage=Voucher.MULTI_USE
+        )
+        source_type, __ = SourceType.objects.get_or_create(name='cybersource')
+        for __ in range(count):
+            basket = factories.create_basket(owner=self.user, site=self.site, empty=True)
+            basket.add_product(seat)
+            basket.vouchers.add(voucher)
+            Applicator().apply(basket, user=self.user)
+            order = factories.create_order(basket=basket, user=self.user)
+            order.sources.create(
+                source_type=source_type, amount_allocated=order.total_incl_tax, card_type='visa', label='1111'
+            )
+
+    def _count_queries(self, orders):
+        request = RequestFactory(SERVER_NAME=self.site.domain).get('/')
+        request.user = self.user
+        request.site = self.site
+        with CaptureQueriesContext(connection) as queries:
+            data = OrderSerializer(orders, many=True, context={'request': request}).data
+        return len(queries), data
+
+    @mock.patch('ecommerce.extensions.checkout.views.ReceiptResponseView.get_metadata_for_enterprise_user')
+    def test_order_history_query_count(self, mock_enterprise_user):
+        """ Verify a page of orders is serialized with a number of queries that does not grow with the page. """
+        mock_enterprise_user.return_value = None
+        self._create_orders(3)
+        # Warm the caches, e.g. of waffle flags, which are shared by the requests.
+        self._count_queries(Order.objects.filter(user=self.user))
+        mock_enterprise_user.reset_mock()
+
+        single_order_queries, data = self._count_queries(Order.objects.filter(user=self.user)[:1])
+        self.assertEqual(len(data), 1)
+        mock_enterprise_user.reset_mock()
+
+        page_queries, data = self._count_queries(Order.objects.filter(user=self.user))
+        self.assertEqual(len(data), 3)
+        self.assertEqual(page_queries, single_order_queries)
+        self.assertEqual(mock_enterprise_user.call_count, 1)
+        for order in data:
+            self.assertEqual(order['basket_discounts'][0]['benefit_value'], 10)
+            self.assertEqual(order['payment_method'], 'Visa 1111')
+            self.assertEqual(len(order['vouchers']), 1)
+
 
 class CouponCodeSerializerTests(CouponMixin, TestCase):
     """ Test for coupon code serializers. """
@@ -175,16 +244,80 @@ class CouponCodeSerializerTests(CouponMixin, TestCase):
             user_email=self.email,
         )
 
-    @mock.patch('ecommerce.extensions.api.serializers.send_assigned_offer_email')
+    @mock.patch('ecommerce.extensions.api.serializers.get_enterprise_customer_reply_to_email', mock.Mock())
+    @mock.patch('ecommerce.extensions.api.serializers.get_enterprise_customer_sender_alias', mock.Mock())
+    @mock.patch('ecommerce.extensions.api.serializers.send_assigned_offer_emails')
+    def test_bulk_assignment(self, mock_assign_email):
+        """ Verify codes are assigned to every user, with one email and one email record per user. """
+        coupon = self.create_coupon(
+            title='Bulk assignment coupon',
+            enterprise_customer='af4b351f-5f1c-4fc3-af41-48bb38fcb161',
+            enterprise_customer_catalog='8212a8d8-c6b1-4023-8754-4d687c43d72f',
+            quantity=4,
+        )
+        users = [{'email': 'learner{}@example.com'.format(index), 'lms_user_id': index} for index in range(3)]
+        serializer = CouponCodeAssignmentSerializer(
+            data={'users': users},
+            context={'coupon': coupon, 'subject': self.SUBJECT, 'greeting': self.GREETING, 'closing': self.CLOSING},
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        assignments = OfferAssignment.objects.filter(code__in=coupon.attr.coupon_vouchers.vouchers.values('code'))
+        assert sorted(assignment.user_email for assignment in assignments) == [user['email'] for user in users]
+        assert len({assignment.code for assignment in assignments}) == 3
+        assert OfferAssignment.history.filter(id__in=[assignment.id for assignment in assignments]).count() == 3
+
+        assert mock_assign_email.call_count == 1
+        emails = mock_assign_email.call_args[0][0]
+        assert {(email['offer_assignment_id'], email['learner_email'], email['code']) for email in emails} == {
+            (assignment.id, assignment.user_email, assignment.code) for assignment in assignments
+        }
+
+        records = OfferAssignmentEmailSentRecord.objects.filter(email_type=ASSIGN)
+        assert {(record.user_email, record.receiver_id) for record in records} == {
+            (user['email'], user['lms_user_id']) for user in users
+        }
+
+    @mock.patch('ecommerce.extensions.api.serializers.get_enterprise_customer_reply_to_email', mock.Mock())
+    @mock.patch('ecommerce.extensions.api.serializers.get_enterprise_customer_sender_alias', mock.Mock())
+    @mock.patch('ecommerce.extensions.api.serializers.send_assigned_offer_emails')
+    def test_bulk_assignment_ignores_concurrent_assignments(self, mock_assign_email):
+        """ Verify codes assigned by another request at the same time are not emailed as part of this one. """
+        coupon = self.create_coupon(
+            title='Bulk assignment coupon',
+            enterprise_customer='af4b351f-5f1c-4fc3-af41-48bb38fcb161',
+            enterprise_customer_catalog='8212a8d8-c6b1-4023-8754-4d687c43d72f',
+            quantity=4,
+        )
+        users = [{'email': 'learner{}@example.com'.format(index), 'lms_user_id': index} for index in range(2)]
+        serializer = CouponCodeAssignmentSerializer(
+            data={'users': users},
+            context={'coupon': coupon, 'subject': self.SUBJECT, 'greeting': self.GREETING, 'closing': self.CLOSING},
+        )
+        serializer.is_valid(raise_exception=True)
+
+        now = datetime.datetime.now(datetime.timezone.utc)
+        voucher = coupon.attr.coupon_vouchers.vouchers.first()
+        OfferAssignment.objects.create(
+            offer=voucher.best_offer, code=voucher.code, user_email='other@example.com', assignment_date=now
+        )
+        with mock.patch('ecommerce.extensions.api.serializers.timezone.now', return_value=now):
+            serializer.save()
+
+        emails = mock_assign_email.call_args[0][0]
+        assert sorted(email['learner_email'] for email in emails) == [user['email'] for user in users]
+
+    @mock.patch('ecommerce.extensions.api.serializers.send_assigned_offer_emails')
     def test_send_assigned_offer_email_args(self, mock_assign_email):
         """ Test that the code_expiration_date passed is equal to coupon batch end date """
         serializer = CouponCodeAssignmentSerializer(data=self.code_assignment_serializer_data,
                                                     context={'coupon': self.coupon})
-        serializer._trigger_email_sending_task(  # pylint: disable=protected-access
+        serializer._trigger_email_sending_tasks(  # pylint: disable=protected-access
             subject=self.SUBJECT,
             greeting=self.GREETING,
             closing=self.CLOSING,
-            assigned_offer=self.offer_assignment,
+            assigned_offers=[self.offer_assignment],
             voucher_usage_type=Voucher.MULTI_USE_PER_CUSTOMER,
             sender_alias=self.SENDER_ALIAS,
             reply_to=self.REPLY_TO,
@@ -193,7 +326,8 @@ class CouponCodeSerializerTests(CouponMixin, TestCase):
         expected_expiration_date = self.coupon.attr.coupon_vouchers.vouchers.first().end_datetime
 
         assert mock_assign_email.call_count == 1
-        assign_email_args = mock_assign_email.call_args[1]
+        assert len(mock_assign_email.call_args[0][0]) == 1
+        assign_email_args = mock_assign_email.call_args[0][0][0]
         assert assign_email_args['subject'] == self.SUBJECT
         assert assign_email_args['greeting'] == self.GREETING
         assert assign_email_args['closing'] == self.CLOSING
@@ -202,20 +336,21 @@ class CouponCodeSerializerTests(CouponMixin, TestCase):
         assert assign_email_args['code'] == self.offer_assignment.code
         assert assign_email_args['code_expiration_date'] == expected_expiration_date.strftime('%d %B, %Y %H:%M %Z')
         assert assign_email_args['base_enterprise_url'] == ''
+        assert assign_email_args['redemptions_remaining'] == self.offer_assignment.offer.max_global_applications
         assert assign_email_args['sender_alias'] == self.SENDER_ALIAS
         assert assign_email_args['reply_to'] == self.REPLY_TO
         assert assign_email_args['attachments'] == self.ATTACHMENTS
 
-    @mock.patch('ecommerce.extensions.api.serializers.send_assigned_offer_email')
+    @mock.patch('ecommerce.extensions.api.serializers.send_assigned_offer_emails')
     def test_send_assigned_offer_email_args_with_enterprise_url(self, mock_assign_email):
         """ Test that the code_expiration_date passed is equal to coupon batch end date """
         serializer = CouponCodeAssignmentSerializer(data=self.code_assignment_serializer_data,
                                                     context={'coupon': self.coupon})
-        serializer._trigger_email_sending_task(  # pylint: disable=protected-access
+        serializer._trigger_email_sending_tasks(  # pylint: disable=protected-access
             subject=self.SUBJECT,
             greeting=self.GREETING,
             closing=self.CLOSING,
-            assigned_offer=self.offer_assignment,
+            assigned_offers=[self.offer_assignment],
             voucher_usage_type=Voucher.MULTI_USE_PER_CUSTOMER,
             sender_alias=self.SENDER_ALIAS,
             reply_to=self.REPLY_TO,
@@ -225,7 +360,8 @@ class CouponCodeSerializerTests(CouponMixin, TestCase):
         expected_expiration_date = self.coupon.attr.coupon_vouchers.vouchers.first().end_datetime
 
         assert mock_assign_email.call_count == 1
-        assign_email_args = mock_assign_email.call_args[1]
+        assert len(mock_assign_email.call_args[0][0]) == 1
+        assign_email_args = mock_assign_email.call_args[0][0][0]
         assert assign_email_args['subject'] == self.SUBJECT
         assert assign_email_args['greeting'] == self.GREETING
         assert assign_email_args['closing'] == self.CLOSING
@@ -301,15 +437,15 @@ class CouponCodeSerializerTests(CouponMixin, TestCase):
             base_enterprise_url=self.BASE_ENTERPRISE_URL,
         )
 
-    @mock.patch('ecommerce.extensions.api.serializers.send_assigned_offer_email')
+    @mock.patch('ecommerce.extensions.offer.utils.send_offer_assignment_email')
     def test_send_assignment_email_error(self, mock_email):
         """ Test that we log an appropriate message if the code assignment email cannot be sent. """
-        mock_email.side_effect = Exception('Ignore me - assignment')
+        mock_email.delay.side_effect = Exception('Ignore me - assignment')
         serializer = CouponCodeAssignmentSerializer(data=self.code_assignment_serializer_data,
                                                     context={'coupon': self.coupon})
         expected = [
             (
-                self.LOGGER_NAME,
+                'ecommerce.extensions.offer.utils',
                 'ERROR',
                 '[Offer Assignment] Email for offer_assignment_id: {} with subject \'{}\', greeting \'{}\' closing '
                 '\'{}\' and attachments {}, raised exception: {}'.format(
@@ -323,12 +459,12 @@ class CouponCodeSerializerTests(CouponMixin, TestCase):
             ),
         ]
 
-        with LogCapture(self.LOGGER_NAME) as log:
-            serializer._trigger_email_sending_task(  # pylint: disable=protected-access
+        with LogCapture('ecommerce.extensions.offer.utils') as log:
+            serializer._trigger_email_sending_tasks(  # pylint: disable=protected-access
                 subject=self.SUBJECT,
                 greeting=self.GREETING,
                 closing=self.CLOSING,
-                assigned_offer=self.offer_assignment,
+                assigned_offers=[self.offer_assignment],
                 voucher_usage_type=Voucher.MULTI_USE_PER_CUSTOMER,
                 sender_alias=self.SENDER_ALIAS,
                 reply_to=self.REPLY_TO,
@@ -1007,3 +1007,126 @@ class BasketCalculateViewTests(ProgramTestMixin, ThrottlingMixin, TestCase):
         self.client.logout()
         self.client.login(username=user.username, password=self.password)
         return user
+
+
+@ddt.ddt
+class BasketCalculateBatchViewTests(ThrottlingMixin, TestCase):
+    def setUp(self):
+        super(BasketCalculateBatchViewTests, self).setUp()
+        self.products = ProductFactory.create_batch(3, stockrecords__partner=self.partner, categories=[])
+        self.skus = [product.stockrecords.first().partner_sku for product in self.products]
+        self.path = reverse('api:v2:baskets:calculate_batch')
+        self.range = factories.RangeFactory(includes_all_products=True)
+        self.product_total = sum(product.stockrecords.first().price for product in self.products)
+        self.user = self.create_user(is_staff=True)
+        self.client.login(username=self.user.username, password=self.password)
+
+    def _post(self, baskets):
+        return self.client.post(self.path, json.dumps({'baskets': baskets}), JSON_CONTENT_TYPE)
+
+    def test_no_authentication(self):
+        """ Verify that un-authenticated users are rejected """
+        self.client.logout()
+        response = self._post([{'skus': self.skus, 'is_anonymous': True}])
+        self.assertEqual(response.status_code, 401)
+
+    @ddt.data(None, [], {}, ['foo'])
+    def test_invalid_baskets(self, baskets):
+        """ Verify bad response when the baskets parameter is missing or malformed """
+        response = self._post(baskets)
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(BASKET_CALCULATE_BATCH_MAX_SIZE=1)
+    def test_too_many_baskets(self):
+        """ Verify bad response when more baskets than allowed are requested """
+        response = self._post([{'skus': self.skus, 'is_anonymous': True}] * 2)
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_calculate(self):
+        """ Verify every requested basket is calculated, in order, with per-basket errors. """
+        voucher, _ = prepare_voucher(_range=self.range, benefit_type=Benefit.FIXED, benefit_value=5)
+        other_user = self.create_user()
+
+        response = self._post([
+            {'skus': self.skus, 'is_anonymous': True},
+            {'skus': self.skus, 'code': voucher.code, 'username': other_user.username},
+            {'skus': ['foo']},
+            {'skus': self.skus[:1], 'username': other_user.username, 'is_anonymous': True},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [
+            {
+                'status': 200,
+                'data': {
+                    'total_incl_tax_excl_discounts': self.product_total,
+                    'total_incl_tax': self.product_total,
+                    'currency': 'GBP'
+                }
+            },
+            {
+                'status': 200,
+                'data': {
+                    'total_incl_tax_excl_discounts': self.product_total,
+                    'total_incl_tax': self.product_total - 5,
+                    'currency': 'GBP'
+                }
+            },
+            {'status': 400, 'error': 'Products with SKU(s) [foo] do not exist.'},
+            {'status': 400, 'error': 'Provide username or is_anonymous query param, but not both'},
+        ])
+
+    def test_batch_calculate_nonstaff_other_username(self):
+        """ Verify a non-staff user may not calculate baskets for other users. """
+        nonstaff_user = self.create_user()
+        self.client.login(username=nonstaff_user.username, password=self.password)
+
+        response = self._post([
+            {'skus': self.skus, 'username': nonstaff_user.username},
+            {'skus': self.skus, 'username': self.user.username},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['status'], 200)
+        self.assertEqual(response.data['results'][1], {'status': 403, 'error': 'Unauthorized user credentials'})
+
+    @mock.patch(
+        'ecommerce.extensions.api.v2.views.baskets.BasketCalculateBatchView._calculate_temporary_basket_atomic'
+    )
+    def test_batch_calculate_shares_work(self, mock_calculate_basket):
+        """ Verify identical baskets are calculated once and anonymous results are cached. """
+        mock_calculate_basket.return_value = {'Test Succeeded': True}
+
+        response = self._post([
+            {'skus': self.skus, 'is_anonymous': True},
+            {'skus': list(reversed(self.skus)), 'is_anonymous': 'true'},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_calculate_basket.call_count, 1)
+        self.assertEqual(
+            response.data['results'],
+            [{'status': 200, 'data': {'Test Succeeded': True}}] * 2
+        )
+
+        mock_calculate_basket.reset_mock()
+        response = self._post([{'skus': self.skus, 'is_anonymous': True}])
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(mock_calculate_basket.called, msg='The cache should be hit.')
+
+    @mock.patch(
+        'ecommerce.extensions.api.v2.views.baskets.BasketCalculateBatchView._calculate_temporary_basket_atomic'
+    )
+    def test_batch_calculate_error(self, mock_calculate_basket):
+        """ Verify a basket whose calculation fails is reported as an error without failing the batch. """
+        mock_calculate_basket.side_effect = [Exception('Test Failed'), {'Test Succeeded': True}]
+
+        response = self._post([
+            {'skus': self.skus, 'is_anonymous': True},
+            {'skus': self.skus[:1], 'is_anonymous': True},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [
+            {'status': 500, 'error': 'Failed to calculate the basket.'},
+            {'status': 200, 'data': {'Test Succeeded': True}},
+        ])
@@ -14,8 +14,10 @@ import pytz
 import responses
 import rules  # pylint: disable=unused-import
 from django.conf import settings
+from django.db import connection
 from django.db.models.signals import post_delete
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.http import urlencode  # pylint: disable=unused-import
@@ -1890,6 +1892,83 @@ class EnterpriseCouponViewSetRbacTests(
         assert len(results) == 1
         assert results[0]['id'] == effective_coupon.id
 
+    def _get_coupon_overview(self, enterprise_customer_uuid, query_params=None):
+        """
+        Return the overview response of the enterprise coupons, and the number of queries it took.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_response(
+                'GET',
+                reverse(
+                    'api:v2:enterprise-coupons-overview',
+                    kwargs={'enterprise_id': enterprise_customer_uuid},
+                ),
+                query_params,
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json(), len(queries)
+
+    def _create_overview_coupons(self, enterprise_customer_uuid, count):
+        return [
+            self.create_coupon(
+                enterprise_customer=enterprise_customer_uuid,
+                enterprise_customer_catalog='aaaaaaaa-2c44-487b-9b6a-24eee973f9a4',
+                quantity=4,
+                title='Overview coupon {}'.format(uuid4()),
+            )
+            for __ in range(count)
+        ]
+
+    def test_coupon_overview_data(self):
+        """
+        Test that the overview of a page of coupons matches the overview of each coupon on its own.
+        """
+        enterprise_customer_uuid = self.data['enterprise_customer']['id']
+        coupons = self._create_overview_coupons(enterprise_customer_uuid, 2)
+        vouchers = list(coupons[0].attr.coupon_vouchers.vouchers.order_by('id'))
+        vouchers[0].num_orders = 1
+        vouchers[0].save()
+        offer = vouchers[1].enterprise_offer
+        OfferAssignment.objects.create(offer=offer, code=vouchers[1].code, user_email='assigned@example.com')
+        bounced_assignment = OfferAssignment.objects.create(
+            offer=offer, code=vouchers[2].code, user_email='bounced@example.com', status=OFFER_ASSIGNMENT_EMAIL_BOUNCED
+        )
+        self.set_jwt_cookie(system_wide_role=SYSTEM_ENTERPRISE_LEARNER_ROLE, context=enterprise_customer_uuid)
+
+        results = {result['id']: result for result in self._get_coupon_overview(enterprise_customer_uuid)[0]['results']}
+
+        self.assertEqual(len(results), 2)
+        for coupon in coupons:
+            coupon_overview, __ = self._get_coupon_overview(enterprise_customer_uuid, {'coupon_id': coupon.id})
+            self.assertEqual(results[coupon.id], coupon_overview)
+        overview = results[coupons[0].id]
+        self.assertEqual(overview['num_codes'], 4)
+        self.assertEqual(overview['num_uses'], 1)
+        self.assertEqual(overview['max_uses'], 4)
+        self.assertEqual(overview['num_unassigned'], 1)
+        self.assertEqual(overview['errors'], [
+            {'id': bounced_assignment.id, 'user_email': 'bounced@example.com', 'code': vouchers[2].code}
+        ])
+        self.assertEqual(overview['enterprise_catalog_uuid'], 'aaaaaaaa-2c44-487b-9b6a-24eee973f9a4')
+        self.assertEqual(results[coupons[1].id]['num_unassigned'], 4)
+
+    def test_coupon_overview_queries(self):
+        """
+        Test that the number of queries of the overview does not grow with the number of coupons on the page.
+        """
+        enterprise_customer_uuid = self.data['enterprise_customer']['id']
+        self._create_overview_coupons(enterprise_customer_uuid, 2)
+        self.set_jwt_cookie(system_wide_role=SYSTEM_ENTERPRISE_LEARNER_ROLE, context=enterprise_customer_uuid)
+        self._get_coupon_overview(enterprise_customer_uuid)
+
+        response, num_queries = self._get_coupon_overview(enterprise_customer_uuid)
+        self.assertEqual(response['count'], 2)
+
+        self._create_overview_coupons(enterprise_customer_uuid, 3)
+        response, more_num_queries = self._get_coupon_overview(enterprise_customer_uuid)
+        self.assertEqual(response['count'], 5)
+        self.assertEqual(more_num_queries, num_queries)
+
     # @ddt.data(
     #     (
     #         '85b08dde-0877-4474-a4e9-8408fe47ce88',
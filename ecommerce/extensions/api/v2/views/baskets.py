@@ -23,6 +23,7 @@ from ecommerce.core.utils import get_cache_key
 from ecommerce.extensions.analytics.utils import audit_log
 from ecommerce.extensions.api import data as data_api
 from ecommerce.extensions.api import exceptions as api_exceptions
+from ecommerce.extensions.api.exceptions import BasketOwnerError
 from ecommerce.extensions.api.permissions import IsStaffOrOwner
 from ecommerce.extensions.api.serializers import BasketSerializer, OrderSerializer
 from ecommerce.extensions.api.throttles import ServiceUserThrottle
@@ -40,6 +41,7 @@ Order = get_model('order', 'Order')
 OrderNumberGenerator = get_class('order.utils', 'OrderNumberGenerator')
 Product = get_model('catalogue', 'Product')
 Selector = get_class('partner.strategy', 'Selector')
+StockRecord = get_model('partner', 'StockRecord')
 User = get_user_model()
 Voucher = get_model('voucher', 'Voucher')
 
@@ -372,7 +374,7 @@ class BasketCalculateView(generics.GenericAPIView):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    def _calculate_temporary_basket_atomic(self, user, request, products, voucher, skus, code):
+    def _calculate_temporary_basket_atomic(self, user, request, products, voucher, skus, code, bundle_id=None):
         response = None
         try:
             # We wrap this in an atomic operation so we never commit this to the db.
@@ -380,7 +382,6 @@ class BasketCalculateView(generics.GenericAPIView):
             with transaction.atomic():
                 basket = Basket(owner=user, site=request.site)
                 basket.strategy = Selector().strategy(user=user, request=request)
-                bundle_id = request.GET.get('bundle')
 
                 for product in products:
                     basket.add_product(product, 1)
@@ -455,16 +456,71 @@ class BasketCalculateView(generics.GenericAPIView):
         if not products:
             return HttpResponseBadRequest(_('Products with SKU(s) [{skus}] do not exist.').format(skus=', '.join(skus)))
 
-        basket_owner = request.user
-
         requested_username = request.GET.get('username', default='')
         is_anonymous = request.GET.get('is_anonymous', 'false').lower() == 'true'
 
+        try:
+            basket_owner = self._get_basket_owner(request, requested_username, is_anonymous)
+        except BasketOwnerError as error:
+            if error.status_code == status.HTTP_403_FORBIDDEN:
+                return HttpResponseForbidden(error.message)
+            return HttpResponseBadRequest(error.message)
+
+        # If we have a basket owner, ensure they have an LMS user id
+        try:
+            self._ensure_lms_user_id(basket_owner)
+        except MissingLmsUserIdException:
+            return self._report_bad_request(
+                api_exceptions.LMS_USER_ID_NOT_FOUND_DEVELOPER_MESSAGE.format(user_id=basket_owner.id),
+                api_exceptions.LMS_USER_ID_NOT_FOUND_USER_MESSAGE
+            )
+
+        use_default_basket = basket_owner is None
+        cache_key = None
+        bundle_id = request.GET.get('bundle')
+        if use_default_basket:
+            # For an anonymous user we can directly get the cached price, because
+            # there can't be any enrollments or entitlements.
+            # We want bundle_id to be in the cache_key, since calls without bundle_id will produce different results
+            cache_key = self._get_anonymous_cache_key(request, skus, bundle_id)
+            cached_response = TieredCache.get_cached_response(cache_key)
+            if cached_response.is_found:
+                return Response(cached_response.value)
+
+        response = self._calculate_temporary_basket_atomic(
+            basket_owner, request, products, voucher, skus, code, bundle_id=bundle_id
+        )
+        if response and use_default_basket:
+            TieredCache.set_all_tiers(cache_key, response, settings.ANONYMOUS_BASKET_CALCULATE_CACHE_TIMEOUT)
+
+        return Response(response)
+
+    def _get_basket_owner(self, request, requested_username, is_anonymous, users_by_username=None):
+        """
+        Determine the user whose basket should be calculated.
+
+        Arguments:
+            request (Request): The incoming request.
+            requested_username (str): Username of the user for which to calculate the basket, if any.
+            is_anonymous (bool): Whether the anonymous (default) basket should be calculated.
+            users_by_username (dict): Optional mapping of usernames to already fetched users. When
+                provided, it is used instead of querying the database for the requested user.
+
+        Returns:
+            User: The basket owner, or None if the anonymous basket should be calculated.
+
+        Raises:
+            BasketOwnerError: If the parameters conflict or the requesting user may not act
+                on behalf of the requested user.
+        """
+        basket_owner = request.user
         use_default_basket = is_anonymous
 
         # validate query parameters
         if requested_username and is_anonymous:
-            return HttpResponseBadRequest(_('Provide username or is_anonymous query param, but not both'))
+            raise BasketOwnerError(
+                status.HTTP_400_BAD_REQUEST, _('Provide username or is_anonymous query param, but not both')
+            )
         if not requested_username and not is_anonymous:
             logger.warning("Request to Basket Calculate must supply either username or is_anonymous query"
                            " param. Requesting user=%s. Future versions of this API will treat this "
@@ -476,55 +532,204 @@ class BasketCalculateView(generics.GenericAPIView):
             if basket_owner.username.lower() == requested_username.lower():
                 pass
             elif basket_owner.is_staff:
-                try:
-                    basket_owner = User.objects.get(username=requested_username)
-                except User.DoesNotExist:
+                if users_by_username is not None:
+                    basket_owner = users_by_username.get(requested_username)
+                else:
+                    basket_owner = User.objects.filter(username=requested_username).first()
+                if basket_owner is None:
                     # This case represents a user who is logged in to marketing, but
                     # doesn't yet have an account in ecommerce. These users have
                     # never purchased before.
                     use_default_basket = True
             else:
-                return HttpResponseForbidden('Unauthorized user credentials')
+                raise BasketOwnerError(status.HTTP_403_FORBIDDEN, 'Unauthorized user credentials')
 
-        if basket_owner.username == self.MARKETING_USER and not use_default_basket:
+        if basket_owner and basket_owner.username == self.MARKETING_USER and not use_default_basket:
             # For legacy requests that predate is_anonymous parameter, we will calculate
             # an anonymous basket if the calculated user is the marketing user.
             # TODO: LEARNER-5057: Remove this special case for the marketing user
             # once logs show no more requests with no parameters (see above).
             use_default_basket = True
 
-        if use_default_basket:
-            basket_owner = None
+        return None if use_default_basket else basket_owner
+
+    def _ensure_lms_user_id(self, basket_owner):
+        """ Ensure the basket owner, if any, has an LMS user id. Raises MissingLmsUserIdException otherwise. """
+        if basket_owner:
+            called_from = u'calculation of basket total'
+            basket_owner.add_lms_user_id('ecommerce_missing_lms_user_id_calculate_basket_total', called_from)
+
+    def _get_anonymous_cache_key(self, request, skus, bundle_id):
+        return get_cache_key(
+            site_domain=request.site,
+            resource_name='calculate',
+            skus=skus,
+            bundle_id=bundle_id
+        )
+
+
+class BasketCalculateBatchView(BasketCalculateView):
+    """
+    Calculate basket totals for many SKU sets in a single request.
+
+    Product, voucher and user lookups are performed once for the whole batch, and
+    identical baskets within a batch are only calculated once.
+    """
+
+    def post(self, request):
+        """ Calculate basket totals for a list of baskets.
+
+        Request Body:
+            baskets (list): Each item is an object accepting the same parameters as the
+                GET calculate endpoint:
+                    skus (list): SKU(s) to calculate
+                    code (string): Optional voucher code to apply to the basket.
+                    username (string): Optional username of a user for which to calculate the basket.
+                    is_anonymous (bool): Optional, whether to calculate the anonymous basket.
+                    bundle (string): Optional bundle (program) identifier.
+
+        Returns:
+            JSON: {
+                    'results': [
+                        {
+                            'status': 200,
+                            'data': {
+                                'total_incl_tax_excl_discounts': basket.total_incl_tax_excl_discounts,
+                                'total_incl_tax': basket.total_incl_tax,
+                                'currency': basket.currency
+                            }
+                        },
+                        {
+                            'status': 400,
+                            'error': 'No SKUs provided.'
+                        },
+                        ...
+                    ]
+                }
+
+            Results are returned in the same order as the requested baskets.
+        """
+        DEFAULT_REQUEST_CACHE.set(TEMPORARY_BASKET_CACHE_KEY, True)
+
+        baskets = request.data.get('baskets')
+        if not baskets or not isinstance(baskets, list) or not all(isinstance(item, dict) for item in baskets):
+            return HttpResponseBadRequest(_('A list of baskets must be provided.'))
+        if len(baskets) > settings.BASKET_CALCULATE_BATCH_MAX_SIZE:
+            return HttpResponseBadRequest(
+                _('No more than {max_size} baskets may be calculated at once.').format(
+                    max_size=settings.BASKET_CALCULATE_BATCH_MAX_SIZE
+                )
+            )
+
+        partner = get_partner_for_site(request)
+        baskets = [self._parse_batch_item(item) for item in baskets]
+        products_by_sku = self._get_products_by_sku(
+            partner, {sku for item in baskets for sku in item['skus']}
+        )
+        vouchers_by_code = Voucher.objects.filter(
+            code__in={item['code'] for item in baskets if item['code']}
+        ).in_bulk(field_name='code')
+        users_by_username = {}
+        if request.user.is_staff:
+            users_by_username = User.objects.filter(
+                username__in={item['username'] for item in baskets if item['username']}
+            ).in_bulk(field_name='username')
+
+        results = []
+        calculated = {}
+        for item in baskets:
+            results.append(self._calculate_batch_item(
+                request, item, products_by_sku, vouchers_by_code, users_by_username, calculated
+            ))
+
+        return Response({'results': results})
+
+    def _parse_batch_item(self, item):
+        skus = item.get('skus') or []
+        if not isinstance(skus, list):
+            skus = [skus]
+        is_anonymous = item.get('is_anonymous', False)
+        if not isinstance(is_anonymous, bool):
+            is_anonymous = str(is_anonymous).lower() == 'true'
+
+        return {
+            'skus': sorted(str(sku) for sku in skus),
+            'code': item.get('code') or None,
+            'username': item.get('username') or '',
+            'is_anonymous': is_anonymous,
+            'bundle': item.get('bundle') or None,
+        }
+
+    def _get_products_by_sku(self, partner, skus):
+        """ Return a dict mapping each known SKU to its product, with stock records prefetched. """
+        products_by_sku = {}
+        products = Product.objects.filter(
+            stockrecords__partner=partner, stockrecords__partner_sku__in=skus
+        ).prefetch_related('stockrecords').distinct()
+        for product in products:
+            for stockrecord in product.stockrecords.all():
+                if stockrecord.partner_id == partner.id and stockrecord.partner_sku in skus:
+                    products_by_sku[stockrecord.partner_sku] = product
+        return products_by_sku
+
+    def _calculate_batch_item(self, request, item, products_by_sku, vouchers_by_code, users_by_username, calculated):
+        skus = item['skus']
+        if not skus:
+            return self._batch_error(status.HTTP_400_BAD_REQUEST, _('No SKUs provided.'))
+
+        products = []
+        for sku in skus:
+            product = products_by_sku.get(sku)
+            if product and product not in products:
+                products.append(product)
+        if not products:
+            return self._batch_error(
+                status.HTTP_400_BAD_REQUEST,
+                _('Products with SKU(s) [{skus}] do not exist.').format(skus=', '.join(skus))
+            )
 
-        # If we have a basket owner, ensure they have an LMS user id
         try:
-            if basket_owner:
-                called_from = u'calculation of basket total'
-                basket_owner.add_lms_user_id('ecommerce_missing_lms_user_id_calculate_basket_total', called_from)
-        except MissingLmsUserIdException:
-            return self._report_bad_request(
-                api_exceptions.LMS_USER_ID_NOT_FOUND_DEVELOPER_MESSAGE.format(user_id=basket_owner.id),
-                api_exceptions.LMS_USER_ID_NOT_FOUND_USER_MESSAGE
+            basket_owner = self._get_basket_owner(
+                request, item['username'], item['is_anonymous'], users_by_username=users_by_username
             )
+            self._ensure_lms_user_id(basket_owner)
+        except BasketOwnerError as error:
+            return self._batch_error(error.status_code, error.message)
+        except MissingLmsUserIdException:
+            developer_message = api_exceptions.LMS_USER_ID_NOT_FOUND_DEVELOPER_MESSAGE.format(user_id=basket_owner.id)
+            logger.error(developer_message)
+            return self._batch_error(status.HTTP_400_BAD_REQUEST, api_exceptions.LMS_USER_ID_NOT_FOUND_USER_MESSAGE)
+
+        code = item['code']
+        bundle_id = item['bundle']
+        key = (tuple(skus), code, basket_owner.id if basket_owner else None, bundle_id)
+        if key in calculated:
+            return calculated[key]
 
         cache_key = None
-        bundle_id = request.GET.get('bundle')
-        if use_default_basket:
-            # For an anonymous user we can directly get the cached price, because
-            # there can't be any enrollments or entitlements.
-            # We want bundle_id to be in the cache_key, since calls without bundle_id will produce different results
-            cache_key = get_cache_key(
-                site_domain=request.site,
-                resource_name='calculate',
-                skus=skus,
-                bundle_id=bundle_id
-            )
+        response = None
+        if basket_owner is None:
+            cache_key = self._get_anonymous_cache_key(request, skus, bundle_id)
             cached_response = TieredCache.get_cached_response(cache_key)
             if cached_response.is_found:
-                return Response(cached_response.value)
+                response = cached_response.value
 
-        response = self._calculate_temporary_basket_atomic(basket_owner, request, products, voucher, skus, code)
-        if response and use_default_basket:
-            TieredCache.set_all_tiers(cache_key, response, settings.ANONYMOUS_BASKET_CALCULATE_CACHE_TIMEOUT)
+        if response is None:
+            try:
+                response = self._calculate_temporary_basket_atomic(
+                    basket_owner, request, products, vouchers_by_code.get(code), skus, code, bundle_id=bundle_id
+                )
+            except Exception:  # pylint: disable=broad-except
+                # The failure was logged while calculating; report it for this basket only.
+                calculated[key] = self._batch_error(
+                    status.HTTP_500_INTERNAL_SERVER_ERROR, _('Failed to calculate the basket.')
+                )
+                return calculated[key]
+            if response and cache_key:
+                TieredCache.set_all_tiers(cache_key, response, settings.ANONYMOUS_BASKET_CALCULATE_CACHE_TIMEOUT)
 
-        return Response(response)
+        calculated[key] = {'status': status.HTTP_200_OK, 'data': response}
+        return calculated[key]
+
+    def _batch_error(self, status_code, message):
+        return {'status': status_code, 'error': str(message)}
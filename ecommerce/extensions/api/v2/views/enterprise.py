@@ -78,6 +78,8 @@ from ecommerce.extensions.offer.models import delete_file_from_s3_with_key
 from ecommerce.extensions.offer.utils import update_assignments_for_multi_use_per_customer
 from ecommerce.extensions.voucher.utils import (
     create_enterprise_vouchers,
+    get_not_redeemed_assignments,
+    get_vouchers_with_unassigned_slots,
     update_voucher_offer,
     update_voucher_with_enterprise_offer
 )
@@ -465,35 +467,17 @@ class EnterpriseCouponViewSet(CouponViewSet):
         """
         Returns a queryset containing Vouchers with slots that have not been assigned.
         Unique Vouchers will be included in the final queryset for all types.
-        """
-
-        prefetch_related_objects(vouchers, 'offers', 'offers__condition', 'offers__offerassignment_set')
-        vouchers_with_slots = []
-        for voucher in vouchers:
-            slots_available = voucher.slots_available_for_assignment
-            if slots_available == 0:
-                continue
 
-            vouchers_with_slots.append(voucher.id)
-
-        return Voucher.objects.filter(id__in=vouchers_with_slots).values('code').order_by('code')
+        Slots are counted in the database, so paginating the queryset only loads one page of vouchers.
+        """
+        return get_vouchers_with_unassigned_slots(vouchers).values('code').order_by('code')
 
     def _get_not_redeemed_usages(self, vouchers):
         """
         Returns a queryset containing unique code and user_email pairs from OfferAssignments.
         Only code and user_email pairs that have no corresponding VoucherApplication are returned.
         """
-        prefetch_related_objects(vouchers, 'applications', 'applications__user', 'offers', 'offers__condition',
-                                 'offers__offerassignment_set')
-        not_redeemed_assignments = []
-        for voucher in vouchers:
-            assignments = voucher.not_redeemed_assignment_ids
-            if assignments:
-                not_redeemed_assignments.extend(assignments)
-
-        return OfferAssignment.objects.filter(
-            id__in=not_redeemed_assignments
-        ).values('code', 'user_email').order_by('user_email').distinct()
+        return get_not_redeemed_assignments(vouchers).values('code', 'user_email').order_by('user_email').distinct()
 
     def _get_partial_redeemed_usages(self, vouchers):
         """
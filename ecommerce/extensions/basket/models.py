@@ -53,6 +53,14 @@ class Basket(AbstractBasket):
 
         return basket
 
+    def all_lines(self):
+        """ Return a cached set of basket lines, loaded with the attribute snapshots of their products. """
+        if self.id is not None and self._lines is None:
+            self._lines = super(Basket, self).all_lines().select_related(  # pylint: disable=bad-super-call
+                'product__attribute_snapshot'
+            )
+        return super(Basket, self).all_lines()  # pylint: disable=bad-super-call
+
     def flush(self):
         """Remove all products in basket and fire Segment 'Product Removed' Analytic event for each"""
         cached_response = DEFAULT_REQUEST_CACHE.get_cached_response(TEMPORARY_BASKET_CACHE_KEY)
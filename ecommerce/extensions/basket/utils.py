@@ -43,6 +43,7 @@ ORGANIZATION_ATTRIBUTE_TYPE = 'organization'
 ENTERPRISE_CATALOG_ATTRIBUTE_TYPE = 'enterprise_catalog_uuid'
 StockRecord = get_model('partner', 'StockRecord')
 OrderLine = get_model('order', 'Line')
+ProductAttributeSnapshot = get_model('catalogue', 'ProductAttributeSnapshot')
 Refund = get_model('refund', 'Refund')
 Voucher = get_model('voucher', 'Voucher')
 
@@ -277,11 +278,15 @@ def _find_seat_enrollment_toggle_sku(product, target_structure):
     # SKU from the corresponding Enrollment Code product.  If the basket is in multi-purchase mode,
     # we are working with an Enrollment Code product and must present the 'buy single' switch link
     # and SKU from the corresponding Seat product.
-    product_cert_type = getattr(product.attr, 'certificate_type', None)
-    product_seat_type = getattr(product.attr, 'seat_type', None)
-    for stock_record in stock_records:
-        stock_record_cert_type = getattr(stock_record.product.attr, 'certificate_type', None)
-        stock_record_seat_type = getattr(stock_record.product.attr, 'seat_type', None)
+    snapshot = product.get_attribute_snapshot()
+    product_cert_type = snapshot.certificate_type
+    product_seat_type = snapshot.seat_type
+    stock_records = list(stock_records.select_related('product'))
+    for stock_record, stock_record_snapshot in zip(
+            stock_records, ProductAttributeSnapshot.load(stock_record.product for stock_record in stock_records)
+    ):
+        stock_record_cert_type = stock_record_snapshot.certificate_type
+        stock_record_seat_type = stock_record_snapshot.seat_type
         if (product_seat_type and product_seat_type == stock_record_cert_type) or \
                 (product_cert_type and product_cert_type == stock_record_seat_type):
             return stock_record.partner_sku
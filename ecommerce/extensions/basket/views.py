@@ -263,7 +263,7 @@ class BasketLogicMixin:
         course = None
 
         if product.is_seat_product:
-            course_data['course_key'] = CourseKey.from_string(product.attr.course_key)
+            course_data['course_key'] = CourseKey.from_string(product.get_attribute_snapshot().course_key)
 
         try:
             course = get_course_info_from_catalog(self.request.site, product)
@@ -348,7 +348,7 @@ class BasketLogicMixin:
         assert product.is_enrollment_code_product
 
         if self.request.basket.num_items == 1:
-            course_key = CourseKey.from_string(product.attr.course_key)
+            course_key = CourseKey.from_string(product.get_attribute_snapshot().course_key)
             if course and course.get('marketing_url', None):
                 course_about_url = course['marketing_url']
             else:
@@ -385,9 +385,9 @@ class BasketLogicMixin:
     @newrelic.agent.function_trace()
     def _get_certificate_type(self, product):
         if product.is_seat_product or product.is_course_entitlement_product:
-            return product.attr.certificate_type
+            return product.get_attribute_snapshot().certificate_type
         elif product.is_enrollment_code_product:
-            return product.attr.seat_type
+            return product.get_attribute_snapshot().seat_type
         return None
 
     @newrelic.agent.function_trace()
@@ -682,7 +682,7 @@ class PaymentApiLogicMixin(BasketLogicMixin):
     def _add_products(self, response, lines_data):
         response['products'] = [
             {
-                'course_key': getattr(line_data['line'].product.attr, 'course_key', None),
+                'course_key': line_data['line'].product.get_attribute_snapshot().course_key,
                 'sku': line_data['sku'],
                 'title': line_data['product_title'],
                 'product_type': line_data['line'].product.get_product_class().name,
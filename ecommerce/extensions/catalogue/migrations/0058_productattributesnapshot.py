@@ -0,0 +1,26 @@
+# Generated by Django 3.2.25 on 2026-10-17 05:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0057_auto_20231205_1034'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductAttributeSnapshot',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='attribute_snapshot', serialize=False, to='catalogue.product')),
+                ('certificate_type', models.CharField(blank=True, max_length=255, null=True)),
+                ('course_key', models.CharField(blank=True, max_length=255, null=True)),
+                ('credit_provider', models.CharField(blank=True, max_length=255, null=True)),
+                ('id_verification_required', models.BooleanField(null=True)),
+                ('seat_type', models.CharField(blank=True, max_length=255, null=True)),
+                ('uuid', models.CharField(blank=True, max_length=255, null=True)),
+            ],
+        ),
+    ]
@@ -1,9 +1,12 @@
 
 
-from django.core.exceptions import ValidationError
+from collections import defaultdict
+
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.core.validators import validate_email
 from django.db import models
-from django.db.models.signals import post_init, post_save
+from django.db.models import prefetch_related_objects
+from django.db.models.signals import post_delete, post_init, post_save
 from django.dispatch import receiver
 from django.utils.translation import ugettext_lazy as _
 from oscar.apps.catalogue.abstract_models import (
@@ -97,6 +100,13 @@ class Product(AbstractProduct):
             CertificateType.UNPAID_EXECUTIVE_EDUCATION
         ]
 
+    def get_attribute_snapshot(self):
+        """ Returns the ProductAttributeSnapshot of this product, creating it if it does not exist yet. """
+        try:
+            return self.attribute_snapshot
+        except ObjectDoesNotExist:
+            return ProductAttributeSnapshot.load([self])[0]
+
     def save(self, *args, **kwargs):
         try:
             if not isinstance(self.attr.note, str) and self.attr.note is not None:
@@ -155,6 +165,115 @@ class ProductAttributeValue(AbstractProductAttributeValue):
     history = CreateSafeHistoricalRecords()
 
 
+class ProductAttributeSnapshot(models.Model):
+    """
+    Copy of the seat and entitlement attribute values of a product, including those inherited from its parent.
+
+    Reading these attributes through product.attr loads every attribute value of each product. Snapshots are
+    loaded with the product, or for a list of products with load, and are updated when attribute values change.
+    Snapshots that do not exist yet are created when they are first read.
+    """
+    # Attribute codes, and the fields they are copied to.
+    ATTRIBUTE_FIELDS = {
+        'certificate_type': 'certificate_type',
+        'course_key': 'course_key',
+        'credit_provider': 'credit_provider',
+        'id_verification_required': 'id_verification_required',
+        'seat_type': 'seat_type',
+        'UUID': 'uuid',
+    }
+
+    product = models.OneToOneField(
+        'catalogue.Product', related_name='attribute_snapshot', primary_key=True, on_delete=models.CASCADE
+    )
+    certificate_type = models.CharField(max_length=255, null=True, blank=True)
+    course_key = models.CharField(max_length=255, null=True, blank=True)
+    credit_provider = models.CharField(max_length=255, null=True, blank=True)
+    id_verification_required = models.BooleanField(null=True)
+    seat_type = models.CharField(max_length=255, null=True, blank=True)
+    uuid = models.CharField(max_length=255, null=True, blank=True)
+
+    def __str__(self):
+        return 'Attribute snapshot of product [{}]'.format(self.product_id)
+
+    @classmethod
+    def build(cls, products):
+        """
+        Returns unsaved snapshots of the products, built from their attribute values with a single query.
+        """
+        product_ids = {product.id for product in products} | {product.parent_id for product in products}
+        values = defaultdict(dict)
+        for value in ProductAttributeValue.objects.filter(
+                product_id__in=product_ids - {None}, attribute__code__in=cls.ATTRIBUTE_FIELDS
+        ).select_related('attribute'):
+            values[value.product_id][value.attribute.code] = value.value
+
+        snapshots = []
+        for product in products:
+            if product.pk:
+                attributes = dict(values[product.parent_id]) if product.parent_id else {}
+                attributes.update(values[product.id])
+            else:
+                attributes = {code: getattr(product.attr, code, None) for code in cls.ATTRIBUTE_FIELDS}
+            snapshots.append(cls(product=product, **{
+                field: attributes.get(code) for code, field in cls.ATTRIBUTE_FIELDS.items()
+            }))
+        return snapshots
+
+    @classmethod
+    def load(cls, products):
+        """
+        Attaches its snapshot to every product, creating the snapshots that do not exist yet.
+
+        Returns:
+            list: The snapshots of the products, in the same order.
+        """
+        products = list(products)
+        prefetch_related_objects([product for product in products if product.pk], 'attribute_snapshot')
+
+        missing = []
+        for product in products:
+            try:
+                product.attribute_snapshot
+            except ObjectDoesNotExist:
+                missing.append(product)
+
+        if missing:
+            snapshots = cls.build(missing)
+            cls.objects.bulk_create([snapshot for snapshot in snapshots if snapshot.product.pk], ignore_conflicts=True)
+            for product, snapshot in zip(missing, snapshots):
+                product.attribute_snapshot = snapshot
+
+        return [product.attribute_snapshot for product in products]
+
+    @classmethod
+    def refresh(cls, product):
+        """
+        Updates the existing snapshots of a product and of its children from their attribute values.
+        """
+        products = [product]
+        if product.is_parent:
+            products.extend(product.children.all())
+        existing = set(cls.objects.filter(product__in=products).values_list('product_id', flat=True))
+        products = [product for product in products if product.id in existing]
+        if not products:
+            return
+
+        for snapshot in cls.build(products):
+            cls.objects.filter(product_id=snapshot.product_id).update(**{
+                field: getattr(snapshot, field) for field in cls.ATTRIBUTE_FIELDS.values()
+            })
+            snapshot.product.attribute_snapshot = snapshot
+
+
+@receiver(post_save, sender=ProductAttributeValue)
+@receiver(post_delete, sender=ProductAttributeValue)
+def refresh_product_attribute_snapshot(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """ Updates the attribute snapshots of a product when one of its attribute values changes. """
+    if not kwargs.get('raw', False) and instance.attribute.code in ProductAttributeSnapshot.ATTRIBUTE_FIELDS:
+        ProductAttributeSnapshot.refresh(instance.product)
+
+
 class Catalog(models.Model):
     name = models.CharField(max_length=255)
     partner = models.ForeignKey('partner.Partner', related_name='catalogs', on_delete=models.CASCADE)
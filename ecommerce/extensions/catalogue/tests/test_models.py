@@ -7,11 +7,13 @@ from oscar.core.loading import get_model
 from oscar.test import factories
 
 from ecommerce.coupons.tests.mixins import CouponMixin
+from ecommerce.courses.tests.factories import CourseFactory
 from ecommerce.extensions.catalogue.tests.mixins import DiscoveryTestMixin
 from ecommerce.extensions.voucher.models import CouponVouchers
 from ecommerce.tests.testcases import TestCase
 
 Product = get_model('catalogue', 'Product')
+ProductAttributeSnapshot = get_model('catalogue', 'ProductAttributeSnapshot')
 ProductClass = get_model('catalogue', 'ProductClass')
 
 
@@ -122,3 +124,66 @@ class ProductTests(CouponMixin, DiscoveryTestMixin, TestCase):
 
         exception = ve.exception
         self.assertIn('Notification email must be a valid email address.', exception.message)
+
+
+class ProductAttributeSnapshotTests(DiscoveryTestMixin, TestCase):
+    """ Tests for ProductAttributeSnapshot. """
+
+    def setUp(self):
+        super(ProductAttributeSnapshotTests, self).setUp()
+        self.course = CourseFactory(id='course-v1:test+snapshot+run', partner=self.partner)
+        self.seat = self.course.create_or_update_seat('verified', True, 100, credit_provider='test-provider')
+
+    def test_get_attribute_snapshot(self):
+        """ Verify the snapshot copies the seat attributes, including those inherited from the parent product. """
+        seat = Product.objects.get(id=self.seat.id)
+        snapshot = seat.get_attribute_snapshot()
+
+        self.assertEqual(snapshot.certificate_type, seat.attr.certificate_type)
+        self.assertEqual(snapshot.course_key, seat.attr.course_key)
+        self.assertEqual(snapshot.credit_provider, seat.attr.credit_provider)
+        self.assertEqual(snapshot.id_verification_required, seat.attr.id_verification_required)
+        self.assertIsNone(snapshot.seat_type)
+        self.assertTrue(ProductAttributeSnapshot.objects.filter(product=seat).exists())
+
+        parent_snapshot = seat.parent.get_attribute_snapshot()
+        self.assertEqual(parent_snapshot.course_key, self.course.id)
+        self.assertIsNone(parent_snapshot.certificate_type)
+
+        with self.assertNumQueries(0):
+            seat.get_attribute_snapshot()
+
+    def test_attribute_change_updates_snapshot(self):
+        """ Verify changing and deleting attribute values updates existing snapshots. """
+        self.seat.get_attribute_snapshot()
+
+        self.seat.attr.id_verification_required = False
+        self.seat.attr.credit_provider = None
+        self.seat.save()
+
+        snapshot = ProductAttributeSnapshot.objects.get(product=self.seat)
+        self.assertFalse(snapshot.id_verification_required)
+        self.assertIsNone(snapshot.credit_provider)
+        self.assertEqual(self.seat.get_attribute_snapshot().id_verification_required, False)
+
+    def test_load(self):
+        """ Verify the snapshots of many products are loaded, and created, with a constant number of queries. """
+        seats = [
+            self.course.create_or_update_seat(certificate_type, False, 100)
+            for certificate_type in ('audit', 'professional', 'honor')
+        ]
+        seats = list(Product.objects.filter(id__in=[seat.id for seat in seats]).order_by('id'))
+
+        with self.assertNumQueries(3):
+            snapshots = ProductAttributeSnapshot.load(seats)
+        self.assertEqual([snapshot.certificate_type for snapshot in snapshots], ['audit', 'professional', 'honor'])
+
+        seats = list(Product.objects.filter(id__in=[seat.id for seat in seats]).order_by('id'))
+        with self.assertNumQueries(1):
+            ProductAttributeSnapshot.load(seats)
+
+    def test_delete_product(self):
+        """ Verify products with snapshots can be deleted. """
+        self.seat.get_attribute_snapshot()
+        self.seat.delete()
+        self.assertFalse(ProductAttributeSnapshot.objects.filter(product_id=self.seat.id).exists())
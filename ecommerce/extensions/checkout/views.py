@@ -236,7 +236,8 @@ class ReceiptResponseView(ThankYouView):
         return get_object_or_404(Order, **kwargs)
 
     def get_payment_method(self, order):
-        source = order.sources.first()
+        # Read from the sources, rather than with first(), so sources prefetched for a list of orders are used.
+        source = next(iter(order.sources.all()), None)
         if source:
             if source.card_type:
                 return '{type} {number}'.format(
@@ -248,7 +249,7 @@ class ReceiptResponseView(ThankYouView):
 
     def order_contains_credit_seat(self, order):
         for line in order.lines.all():
-            if getattr(line.product.attr, 'credit_provider', None):
+            if line.product.get_attribute_snapshot().credit_provider:
                 return True
         return False
 
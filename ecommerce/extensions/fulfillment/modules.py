@@ -9,6 +9,7 @@ import abc
 import datetime
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlencode, urljoin
 
 import requests
@@ -16,6 +17,8 @@ import waffle
 from django.conf import settings
 from django.urls import reverse
 from getsmarter_api_clients.geag import GetSmarterEnterpriseApiClient
+from oscar.apps.order.exceptions import InvalidLineStatus
+from oscar.apps.order.signals import order_line_status_changed
 from oscar.core.loading import get_model
 from requests.exceptions import ConnectionError as ReqConnectionError  # pylint: disable=ungrouped-imports
 from requests.exceptions import Timeout
@@ -49,6 +52,7 @@ from ecommerce.notifications.notifications import send_notification
 
 BasketAttributeType = get_model('basket', 'BasketAttributeType')
 Benefit = get_model('offer', 'Benefit')
+Line = get_model('order', 'Line')
 Option = get_model('catalogue', 'Option')
 Product = get_model('catalogue', 'Product')
 Range = get_model('offer', 'Range')
@@ -190,8 +194,8 @@ class EnrollmentFulfillmentModule(EnterpriseDiscountMixin, BaseFulfillmentModule
             messages if the LMS user id cannot be found.
     """
 
-    def _post_to_enrollment_api(self, data, user, usage):
-        enrollment_api_url = get_lms_enrollment_api_url()
+    def _post_to_enrollment_api(self, data, user, usage, enrollment_api_url=None):
+        enrollment_api_url = enrollment_api_url or get_lms_enrollment_api_url()
         timeout = settings.ENROLLMENT_FULFILLMENT_TIMEOUT
         headers = {
             'Content-Type': 'application/json',
@@ -274,6 +278,83 @@ class EnrollmentFulfillmentModule(EnterpriseDiscountMixin, BaseFulfillmentModule
         """
         return [line for line in lines if self.supports_line(line)]
 
+    def _post_enrollments(self, order, enrollments):
+        """ Post enrollments to the Enrollment API.
+
+        Posts are sent concurrently by up to ENROLLMENT_FULFILLMENT_MAX_WORKERS threads. With a single worker they
+        are sent one after another, and no more are sent after a post fails with an unexpected exception.
+
+        Arguments:
+            order (Order): The order being fulfilled.
+            enrollments (list): The POST data of each enrollment.
+
+        Returns:
+            A list of (response, exception) tuples, in the order of the enrollments. Enrollments that were not
+            posted are left out.
+        """
+        # The URL depends on the current request, which threads cannot see.
+        enrollment_api_url = get_lms_enrollment_api_url()
+
+        def post(data):
+            try:
+                return self._post_to_enrollment_api(
+                    data, user=order.user, usage='fulfill enrollment', enrollment_api_url=enrollment_api_url
+                ), None
+            except Exception as exc:  # pylint: disable=broad-except
+                return None, exc
+
+        max_workers = min(settings.ENROLLMENT_FULFILLMENT_MAX_WORKERS, len(enrollments))
+        logger.info("Posting %d enrollment(s) to enrollment api for order [%s]", len(enrollments), order.number)
+        if max_workers > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(post, enrollments))
+        else:
+            results = []
+            for data in enrollments:
+                results.append(post(data))
+                if results[-1][1] is not None and not isinstance(results[-1][1], (ReqConnectionError, Timeout)):
+                    break
+        logger.info("Finished posting to enrollment api for order [%s]", order.number)
+        return results
+
+    def _get_request_error_status(self, order, line, exc):
+        """ Log a network problem or time out while fulfilling a line, and return the status of the line. """
+        if isinstance(exc, Timeout):
+            logger.error("Unable to fulfill line [%d] of order [%s] due to a request time out", line.id, order.number)
+            order.notes.create(message='Fulfillment of order failed due to a request time out.', note_type='Error')
+            return LINE.FULFILLMENT_TIMEOUT_ERROR
+
+        logger.error("Unable to fulfill line [%d] of order [%s] due to a network problem", line.id, order.number)
+        order.notes.create(message='Fulfillment of order failed due to a network problem.', note_type='Error')
+        return LINE.FULFILLMENT_NETWORK_ERROR
+
+    def _set_line_statuses(self, line_statuses):
+        """ Set the statuses of lines with a single query.
+
+        Behaves like calling Line.set_status for each line: unchanged statuses are skipped, invalid transitions
+        raise InvalidLineStatus and order_line_status_changed is sent for every changed line.
+
+        Arguments:
+            line_statuses (list): (line, status) tuples.
+        """
+        changed = []
+        for line, new_status in line_statuses:
+            if new_status == line.status:
+                continue
+            if new_status not in line.available_statuses():
+                raise InvalidLineStatus(
+                    "'{new_status}' is not a valid status (current status: '{status}')".format(
+                        new_status=new_status, status=line.status
+                    )
+                )
+            changed.append((line, line.status))
+            line.status = new_status
+
+        if changed:
+            Line.objects.bulk_update([line for line, __ in changed], ['status'])
+        for line, old_status in changed:
+            order_line_status_changed.send(sender=line, line=line, old_status=old_status, new_status=line.status)
+
     def fulfill_product(self, order, lines, email_opt_in=False):  # pylint: disable=too-many-statements
         """ Fulfills the purchase of a 'seat' by enrolling the associated student.
 
@@ -281,6 +362,9 @@ class EnrollmentFulfillmentModule(EnterpriseDiscountMixin, BaseFulfillmentModule
         certificate types. May result in an error if the Enrollment API cannot be reached, or if there is
         additional business logic errors when trying to enroll the student.
 
+        Enrollments of the lines are posted concurrently when ENROLLMENT_FULFILLMENT_MAX_WORKERS is greater than
+        one, and the statuses of the lines are saved together once every enrollment was posted.
+
         Args:
             order (Order): The Order associated with the lines to be fulfilled. The user associated with the order
                 is presumed to be the student to enroll in a course.
@@ -300,67 +384,79 @@ class EnrollmentFulfillmentModule(EnterpriseDiscountMixin, BaseFulfillmentModule
             logger.error(
                 'EDX_API_KEY must be set to use the EnrollmentFulfillmentModule'
             )
-            for line in lines:
-                line.set_status(LINE.FULFILLMENT_CONFIGURATION_ERROR)
+            self._set_line_statuses([(line, LINE.FULFILLMENT_CONFIGURATION_ERROR) for line in lines])
 
             return order, lines
 
-        for line in lines:
-            try:
-                mode = mode_for_product(line.product)
-                course_key = line.product.attr.course_key
-            except AttributeError:
-                logger.error("Supported Seat Product does not have required attributes, [certificate_type, course_key]")
-                line.set_status(LINE.FULFILLMENT_CONFIGURATION_ERROR)
-                continue
-            try:
-                provider = line.product.attr.credit_provider
-            except AttributeError:
-                logger.error("Seat [%d] has no credit_provider attribute. Defaulted to None.", line.product.id)
-                provider = None
-
-            data = {
-                'user': order.user.username,
-                'is_active': True,
-                'mode': mode,
-                'course_details': {
-                    'course_id': course_key
-                },
-                'enrollment_attributes': [
-                    {
-                        'namespace': 'order',
-                        'name': 'order_number',
-                        'value': order.number
+        line_statuses = []
+        enrollments = []
+        try:
+            for line in lines:
+                try:
+                    mode = mode_for_product(line.product)
+                    course_key = line.product.attr.course_key
+                except AttributeError:
+                    logger.error(
+                        "Supported Seat Product does not have required attributes, [certificate_type, course_key]"
+                    )
+                    line_statuses.append((line, LINE.FULFILLMENT_CONFIGURATION_ERROR))
+                    continue
+                try:
+                    provider = line.product.attr.credit_provider
+                except AttributeError:
+                    logger.error("Seat [%d] has no credit_provider attribute. Defaulted to None.", line.product.id)
+                    provider = None
+
+                data = {
+                    'user': order.user.username,
+                    'is_active': True,
+                    'mode': mode,
+                    'course_details': {
+                        'course_id': course_key
                     },
-                    {
-                        'namespace': 'order',
-                        'name': 'date_placed',
-                        'value': order.date_placed.strftime(ISO_8601_FORMAT)
-                    }
-                ]
-            }
-            if provider:
-                data['enrollment_attributes'].append(
-                    {
-                        'namespace': 'credit',
-                        'name': 'provider_id',
-                        'value': provider
-                    }
-                )
-            try:
-                logger.info("Adding enterprise data to enrollment api post for order [%s]", order.number)
-                self._add_enterprise_data_to_enrollment_api_post(data, order)
-                logger.info("Updating orderline with enterprise discount metadata for order [%s]", order.number)
-                self.update_orderline_with_enterprise_discount_metadata(order, line)
-
-                # Post to the Enrollment API. The LMS will take care of posting a new EnterpriseCourseEnrollment to
-                # the Enterprise service if the user+course has a corresponding EnterpriseCustomerUser.
-                logger.info("Posting to enrollment api for order [%s]", order.number)
-                response = self._post_to_enrollment_api(data, user=order.user, usage='fulfill enrollment')
-                logger.info("Finished posting to enrollment api for order [%s]", order.number)
-
-                if response.status_code == status.HTTP_200_OK:
-                    line.set_status(LINE.COMPLETE)
+                    'enrollment_attributes': [
+                        {
+                            'namespace': 'order',
+                            'name': 'order_number',
+                            'value': order.number
+                        },
+                        {
+                            'namespace': 'order',
+                            'name': 'date_placed',
+                            'value': order.date_placed.strftime(ISO_8601_FORMAT)
+                        }
+                    ]
+                }
+                if provider:
+                    data['enrollment_attributes'].append(
+                        {
+                            'namespace': 'credit',
+                            'name': 'provider_id',
+                            'value': provider
+                        }
+                    )
+                try:
+                    logger.info("Adding enterprise data to enrollment api post for order [%s]", order.number)
+                    self._add_enterprise_data_to_enrollment_api_post(data, order)
+                    logger.info("Updating orderline with enterprise discount metadata for order [%s]", order.number)
+                    self.update_orderline_with_enterprise_discount_metadata(order, line)
+                except (ReqConnectionError, Timeout) as exc:
+                    line_statuses.append((line, self._get_request_error_status(order, line, exc)))
+                    continue
+
+                enrollments.append((line, data, mode, course_key, provider))
+
+            # Post to the Enrollment API. The LMS will take care of posting a new EnterpriseCourseEnrollment to
+            # the Enterprise service if the user+course has a corresponding EnterpriseCustomerUser.
+            results = self._post_enrollments(order, [data for __, data, __, __, __ in enrollments])
+
+            for (line, __, mode, course_key, provider), (response, exc) in zip(enrollments, results):
+                if exc is not None:
+                    if not isinstance(exc, (ReqConnectionError, Timeout)):
+                        raise exc
+                    line_statuses.append((line, self._get_request_error_status(order, line, exc)))
+                elif response.status_code == status.HTTP_200_OK:
+                    line_statuses.append((line, LINE.COMPLETE))
 
                     audit_log(
                         'line_fulfilled',
@@ -374,8 +470,7 @@ class EnrollmentFulfillmentModule(EnterpriseDiscountMixin, BaseFulfillmentModule
                     )
                 else:
                     try:
-                        data = response.json()
-                        reason = data.get('message')
+                        reason = response.json().get('message')
                     except Exception:  # pylint: disable=broad-except
                         reason = '(No detail provided.)'
 
@@ -384,19 +479,10 @@ class EnrollmentFulfillmentModule(EnterpriseDiscountMixin, BaseFulfillmentModule
                         line.id, order.number, response.status_code, reason
                     )
                     order.notes.create(message=reason, note_type='Error')
-                    line.set_status(LINE.FULFILLMENT_SERVER_ERROR)
-            except ReqConnectionError:
-                logger.error(
-                    "Unable to fulfill line [%d] of order [%s] due to a network problem", line.id, order.number
-                )
-                order.notes.create(message='Fulfillment of order failed due to a network problem.', note_type='Error')
-                line.set_status(LINE.FULFILLMENT_NETWORK_ERROR)
-            except Timeout:
-                logger.error(
-                    "Unable to fulfill line [%d] of order [%s] due to a request time out", line.id, order.number
-                )
-                order.notes.create(message='Fulfillment of order failed due to a request time out.', note_type='Error')
-                line.set_status(LINE.FULFILLMENT_TIMEOUT_ERROR)
+                    line_statuses.append((line, LINE.FULFILLMENT_SERVER_ERROR))
+        finally:
+            self._set_line_statuses(line_statuses)
+
         logger.info("Finished fulfilling 'Seat' product types for order [%s]", order.number)
         return order, lines
 
@@ -11,7 +11,9 @@ import ddt
 import mock
 import responses
 from django.conf import settings
+from django.db import connection
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from oscar.core.loading import get_class, get_model
 from oscar.test import factories
 from requests.exceptions import ConnectionError as ReqConnectionError
@@ -334,6 +336,65 @@ class EnrollmentFulfillmentModuleTests(
         EnrollmentFulfillmentModule().fulfill_product(self.order, list(self.order.lines.all()))
         self.assertEqual(LINE.FULFILLMENT_SERVER_ERROR, self.order.lines.all()[0].status)
 
+    def create_multi_line_order(self, course_ids):
+        """ Create an order with a verified seat of each course. """
+        basket = factories.BasketFactory(owner=self.user, site=self.site)
+        for course_id in course_ids:
+            course = CourseFactory(id=course_id, name=course_id, partner=self.partner)
+            basket.add_product(course.create_or_update_seat('verified', False, 100), 1)
+        return create_order(number=3, basket=basket, user=self.user)
+
+    @responses.activate
+    @ddt.data(1, 4)
+    def test_enrollment_module_fulfill_multiple_lines(self, max_workers):
+        """ Test that every line of a multi-line order is posted, classified, and saved with a single update. """
+        course_statuses = {
+            'course-v1:test+complete+1': LINE.COMPLETE,
+            'course-v1:test+complete+2': LINE.COMPLETE,
+            'course-v1:test+server+error': LINE.FULFILLMENT_SERVER_ERROR,
+            'course-v1:test+network+error': LINE.FULFILLMENT_NETWORK_ERROR,
+            'course-v1:test+timeout+error': LINE.FULFILLMENT_TIMEOUT_ERROR,
+        }
+
+        def enrollment_callback(request):
+            course_id = json.loads(request.body)['course_details']['course_id']
+            if course_id.endswith('network+error'):
+                raise ReqConnectionError()
+            if course_id.endswith('timeout+error'):
+                raise Timeout()
+            if course_id.endswith('server+error'):
+                return 500, {}, json.dumps({'message': 'Oops!'})
+            return 200, {}, '{}'
+
+        responses.add_callback(
+            responses.POST, get_lms_enrollment_api_url(), callback=enrollment_callback, content_type=JSON
+        )
+        order = self.create_multi_line_order(course_statuses)
+
+        with override_settings(ENROLLMENT_FULFILLMENT_MAX_WORKERS=max_workers):
+            with CaptureQueriesContext(connection) as queries:
+                __, lines = EnrollmentFulfillmentModule().fulfill_product(order, list(order.lines.all()))
+
+        self.assertEqual(len(responses.calls), len(course_statuses))
+        self.assertEqual(
+            {line.product.attr.course_key: line.status for line in lines},
+            course_statuses
+        )
+        self.assertEqual(
+            {line.product.attr.course_key: line.status for line in order.lines.all()},
+            course_statuses
+        )
+        line_updates = [query for query in queries if query['sql'].startswith('UPDATE "order_line"')]
+        self.assertEqual(len(line_updates), 1)
+        self.assertEqual(order.notes.filter(note_type='Error').count(), 3)
+
+    @mock.patch('requests.post', mock.Mock(side_effect=ValueError))
+    def test_enrollment_module_unexpected_error(self):
+        """ Test that an unexpected error is raised, without changing the status of the line. """
+        with self.assertRaises(ValueError):
+            EnrollmentFulfillmentModule().fulfill_product(self.order, list(self.order.lines.all()))
+        self.assertEqual(LINE.OPEN, self.order.lines.get().status)
+
     @responses.activate
     def test_revoke_product(self):
         """ The method should call the Enrollment API to un-enroll the student, and return True. """
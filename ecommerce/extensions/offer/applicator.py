@@ -7,6 +7,7 @@ from oscar.apps.offer.applicator import Applicator as OscarApplicator
 from oscar.core.loading import get_model
 
 from ecommerce.enterprise.api import get_enterprise_id_for_user
+from ecommerce.extensions.offer.index import get_offer_index
 
 logger = logging.getLogger(__name__)
 BUNDLE = 'bundle_identifier'
@@ -79,13 +80,7 @@ class Applicator(OscarApplicator):
 
         Excludes: Bundle and Enterprise offers.
         """
-        ConditionalOffer = get_model('offer', 'ConditionalOffer')
-        qs = ConditionalOffer.active.filter(
-            offer_type=ConditionalOffer.SITE,
-            condition__program_uuid__isnull=True,
-            condition__enterprise_customer_uuid__isnull=True,
-        )
-        return qs.select_related('condition', 'benefit')
+        return get_offer_index().get_site_offers()
 
     def _get_enterprise_offers(self, site, user):
         """
@@ -93,12 +88,7 @@ class Applicator(OscarApplicator):
         """
         enterprise_id = get_enterprise_id_for_user(site, user)
         if enterprise_id:
-            ConditionalOffer = get_model('offer', 'ConditionalOffer')
-            offers = ConditionalOffer.active.filter(
-                offer_type=ConditionalOffer.SITE,
-                condition__enterprise_customer_uuid=enterprise_id
-            )
-            return offers.select_related('condition', 'benefit')
+            return get_offer_index().get_enterprise_offers(enterprise_id)
 
         return []
 
@@ -114,7 +104,6 @@ class Applicator(OscarApplicator):
         """
         BasketAttribute = get_model('basket', 'BasketAttribute')
         BasketAttributeType = get_model('basket', 'BasketAttributeType')
-        ConditionalOffer = get_model('offer', 'ConditionalOffer')
 
         bundle_attributes = BasketAttribute.objects.filter(
             basket=basket,
@@ -122,9 +111,6 @@ class Applicator(OscarApplicator):
         )
         program_uuid = bundle_id if bundle_attributes.count() == 0 else bundle_attributes.first().value_text
         if program_uuid:
-            offers = ConditionalOffer.active.filter(
-                offer_type=ConditionalOffer.SITE, condition__program_uuid=program_uuid
-            )
-            return offers.select_related('condition', 'benefit')
+            return get_offer_index().get_program_offers(program_uuid)
 
         return []
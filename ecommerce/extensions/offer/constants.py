@@ -11,6 +11,9 @@ OFFER_ASSIGNMENT_REVOKED = 'REVOKED'
 
 OFFER_MAX_USES_DEFAULT = 10000
 
+# Number of rows written by each query when codes are assigned in bulk.
+OFFER_ASSIGNMENT_BATCH_SIZE = 500
+
 # Coupon code filters
 VOUCHER_NOT_ASSIGNED = 'unassigned'
 VOUCHER_NOT_REDEEMED = 'unredeemed'
@@ -0,0 +1,136 @@
+"""
+In-process index of active site offers.
+
+Building the list of candidate offers for a basket used to take two or three SQL queries per
+basket apply. The index loads every open site offer once per process and buckets it by
+enterprise customer UUID and program UUID, so that candidate lookups are dictionary reads.
+
+Each index is stamped with a version kept in the shared cache. Saving or deleting an offer,
+condition, benefit or range bumps that version (see ``ecommerce.extensions.offer.signals``),
+which makes every process rebuild its index on its next lookup. Saves that only record the
+usage of an offer without usage limits leave the index as it is.
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict
+from copy import copy
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.timezone import now
+from oscar.core.loading import get_model
+
+logger = logging.getLogger(__name__)
+
+OFFER_INDEX_VERSION_CACHE_KEY = 'offer_index_version'
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _normalize_uuid(value):
+    """ Return the canonical string form of a UUID, or None if the value is not a valid UUID. """
+    if not value:
+        return None
+    try:
+        return str(value if isinstance(value, uuid.UUID) else uuid.UUID(str(value)))
+    except ValueError:
+        return None
+
+
+class OfferIndex:
+    """ Open site offers, bucketed by the enterprise customer or program they are restricted to. """
+
+    def __init__(self, version, offers):
+        self.version = version
+        self.built_at = time.time()
+        self.site_offers = []
+        self.enterprise_offers = defaultdict(list)
+        self.program_offers = defaultdict(list)
+
+        for offer in offers:
+            condition = offer.condition
+            # Offers restricted to both a program and an enterprise customer are in both buckets.
+            if condition.program_uuid:
+                self.program_offers[_normalize_uuid(condition.program_uuid)].append(offer)
+            if condition.enterprise_customer_uuid:
+                self.enterprise_offers[_normalize_uuid(condition.enterprise_customer_uuid)].append(offer)
+            if not condition.program_uuid and not condition.enterprise_customer_uuid:
+                self.site_offers.append(offer)
+
+    @classmethod
+    def build(cls, version):
+        ConditionalOffer = get_model('offer', 'ConditionalOffer')
+        offers = ConditionalOffer.objects.filter(
+            offer_type=ConditionalOffer.SITE,
+            status=ConditionalOffer.OPEN,
+        ).select_related('condition', 'benefit')
+        return cls(version, offers)
+
+    @property
+    def is_expired(self):
+        return time.time() - self.built_at > settings.OFFER_INDEX_MAX_AGE
+
+    def get_site_offers(self):
+        """ Return active site offers that are not restricted to an enterprise customer or program. """
+        return self._active(self.site_offers)
+
+    def get_enterprise_offers(self, enterprise_customer_uuid):
+        """ Return active site offers restricted to the given enterprise customer. """
+        return self._active(self.enterprise_offers.get(_normalize_uuid(enterprise_customer_uuid), []))
+
+    def get_program_offers(self, program_uuid):
+        """ Return active site offers restricted to the given program. """
+        return self._active(self.program_offers.get(_normalize_uuid(program_uuid), []))
+
+    @staticmethod
+    def _active(offers):
+        """
+        Filter offers to those within their date range, mirroring ``ConditionalOffer.active``.
+
+        Copies are returned so that per-basket state set on an offer never leaks into other requests.
+        """
+        cutoff = now()
+        return [
+            copy(offer) for offer in offers
+            if (offer.start_datetime is None or offer.start_datetime <= cutoff) and
+            (offer.end_datetime is None or offer.end_datetime >= cutoff)
+        ]
+
+
+def _get_current_version():
+    version = cache.get(OFFER_INDEX_VERSION_CACHE_KEY)
+    if version is None:
+        # The version has never been set, or was evicted. Start a new one so every process rebuilds.
+        version = uuid.uuid4().hex
+        cache.add(OFFER_INDEX_VERSION_CACHE_KEY, version, None)
+        version = cache.get(OFFER_INDEX_VERSION_CACHE_KEY, version)
+    return version
+
+
+def get_offer_index():
+    """
+    Return the offer index for the current process, rebuilding it if it is out of date.
+
+    Returns:
+        OfferIndex
+    """
+    global _index  # pylint: disable=global-statement
+
+    version = _get_current_version()
+    index = _index
+    if index is None or index.version != version or index.is_expired:
+        with _index_lock:
+            index = _index
+            if index is None or index.version != version or index.is_expired:
+                index = OfferIndex.build(version)
+                _index = index
+                logger.debug('Rebuilt offer index at version [%s].', version)
+    return index
+
+
+def invalidate_offer_index():
+    """ Mark the offer index of every process as out of date. """
+    cache.set(OFFER_INDEX_VERSION_CACHE_KEY, uuid.uuid4().hex, None)
@@ -0,0 +1,64 @@
+"""
+This command rebuilds the offer user discount ledger from order discounts.
+"""
+
+
+import logging
+
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+from oscar.core.loading import get_model
+
+ConditionalOffer = get_model('offer', 'ConditionalOffer')
+OfferUserDiscount = get_model('offer', 'OfferUserDiscount')
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Rebuild OfferUserDiscount for every offer with a per user discount limit.
+
+    The ledger is kept up to date as orders and refunds are completed, so this is only needed to
+    fill it for existing orders, or to correct it after order discounts were changed by hand.
+
+    Example:
+
+        ./manage.py rebuild_offer_user_discounts --offer-id 123
+    """
+
+    help = 'Rebuild the offer user discount ledger from order discounts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--offer-id',
+            action='append',
+            dest='offer_ids',
+            default=None,
+            help='Only rebuild the ledger of this offer. May be repeated.',
+            type=int,
+        )
+        parser.add_argument(
+            '--batch-size',
+            dest='batch_size',
+            default=1000,
+            help='Number of ledger rows to insert per query.',
+            type=int,
+        )
+
+    def handle(self, *args, **options):
+        offers = ConditionalOffer.objects.filter(max_user_discount__isnull=False)
+        if options['offer_ids']:
+            offers = offers.filter(id__in=options['offer_ids'])
+
+        for offer_id in offers.order_by('id').values_list('id', flat=True):
+            totals = OfferUserDiscount.get_discounts([offer_id]).filter(order__user__isnull=False).order_by().values(
+                'order__user_id'
+            ).annotate(total=Sum('amount'))
+            with transaction.atomic():
+                OfferUserDiscount.objects.filter(offer_id=offer_id).delete()
+                ledger = OfferUserDiscount.objects.bulk_create([
+                    OfferUserDiscount(offer_id=offer_id, user_id=item['order__user_id'], total=item['total'])
+                    for item in totals
+                ], batch_size=options['batch_size'])
+            logger.info('Rebuilt the discount ledger of offer [%d] for %d user(s).', offer_id, len(ledger))
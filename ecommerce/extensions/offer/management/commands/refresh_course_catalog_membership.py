@@ -0,0 +1,135 @@
+"""
+This command refreshes the local copy of Discovery Service course catalog membership.
+"""
+
+
+import logging
+from datetime import timedelta
+from urllib.parse import urljoin
+
+from django.core.management import BaseCommand, CommandError
+from django.utils import timezone
+from oscar.core.loading import get_model
+
+from ecommerce.core.models import SiteConfiguration
+from ecommerce.courses.models import Course
+
+CourseCatalogMembership = get_model('offer', 'CourseCatalogMembership')
+Range = get_model('offer', 'Range')
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Refresh CourseCatalogMembership for every course catalog used by a range.
+
+    Only course runs that have no membership row yet, whose course changed since the row was
+    written, or whose row is older than --refresh-after seconds are sent to the Discovery Service.
+
+    Example:
+
+        ./manage.py refresh_course_catalog_membership --site-domain ecommerce.example.com
+    """
+
+    help = 'Refresh the local course catalog membership table from the Discovery Service.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--site-domain',
+            dest='site_domain',
+            default=None,
+            help='Only refresh membership for the site with this domain.',
+            type=str,
+        )
+        parser.add_argument(
+            '--refresh-after',
+            dest='refresh_after',
+            default=60 * 60 * 24,
+            help='Re-check course runs whose membership was last refreshed more than this many seconds ago.',
+            type=int,
+        )
+        parser.add_argument(
+            '--batch-size',
+            dest='batch_size',
+            default=100,
+            help='Number of course runs to check per Discovery Service request.',
+            type=int,
+        )
+
+    def handle(self, *args, **options):
+        site_configurations = SiteConfiguration.objects.select_related('site', 'partner')
+        if options['site_domain']:
+            site_configurations = site_configurations.filter(site__domain=options['site_domain'])
+            if not site_configurations:
+                raise CommandError('No site configuration found for domain [{}].'.format(options['site_domain']))
+
+        catalog_ids = sorted(set(
+            Range.objects.filter(course_catalog__isnull=False).values_list('course_catalog', flat=True)
+        ))
+        if not catalog_ids:
+            logger.info('No ranges use a course catalog. Nothing to refresh.')
+            return
+
+        stale_before = timezone.now() - timedelta(seconds=options['refresh_after'])
+        for site_configuration in site_configurations:
+            courses = dict(Course.objects.filter(partner=site_configuration.partner).values_list('id', 'modified'))
+            for catalog_id in catalog_ids:
+                try:
+                    self._refresh_catalog(
+                        site_configuration, catalog_id, courses, stale_before, options['batch_size']
+                    )
+                except Exception:  # pylint: disable=broad-except
+                    logger.exception(
+                        'Failed to refresh membership of course catalog [%d] for site [%s].',
+                        catalog_id, site_configuration.site.domain
+                    )
+
+    def _refresh_catalog(self, site_configuration, catalog_id, courses, stale_before, batch_size):
+        site = site_configuration.site
+        refreshed = dict(
+            CourseCatalogMembership.objects.filter(site=site, catalog_id=catalog_id).values_list(
+                'course_run_id', 'modified'
+            )
+        )
+        course_run_ids = [
+            course_run_id for course_run_id, course_modified in courses.items()
+            if course_run_id not in refreshed or refreshed[course_run_id] < stale_before or
+            (course_modified and course_modified > refreshed[course_run_id])
+        ]
+
+        logger.info(
+            'Refreshing membership of %d course run(s) in course catalog [%d] for site [%s].',
+            len(course_run_ids), catalog_id, site.domain
+        )
+
+        api_client = site_configuration.oauth_api_client
+        discovery_api_url = urljoin(
+            f"{site_configuration.discovery_api_url}/", f"catalogs/{catalog_id}/contains/"
+        )
+        for start in range(0, len(course_run_ids), batch_size):
+            batch = course_run_ids[start:start + batch_size]
+            response = api_client.get(discovery_api_url, params={'course_run_id': ','.join(batch)})
+            response.raise_for_status()
+            membership = response.json()['courses']
+            self._save_membership(site, catalog_id, batch, membership, refreshed)
+
+    def _save_membership(self, site, catalog_id, course_run_ids, membership, refreshed):
+        modified = timezone.now()
+        existing = CourseCatalogMembership.objects.filter(site=site, catalog_id=catalog_id)
+        for is_member in (True, False):
+            existing.filter(
+                course_run_id__in=[
+                    course_run_id for course_run_id in course_run_ids
+                    if course_run_id in refreshed and bool(membership.get(course_run_id)) is is_member
+                ]
+            ).update(is_member=is_member, modified=modified)
+
+        CourseCatalogMembership.objects.bulk_create([
+            CourseCatalogMembership(
+                site=site,
+                catalog_id=catalog_id,
+                course_run_id=course_run_id,
+                is_member=bool(membership.get(course_run_id)),
+            )
+            for course_run_id in course_run_ids if course_run_id not in refreshed
+        ])
@@ -0,0 +1,53 @@
+
+
+from django.core.management import call_command
+from oscar.core.loading import get_model
+from oscar.test.factories import OrderDiscountFactory, OrderFactory
+
+from ecommerce.extensions.fulfillment.status import ORDER
+from ecommerce.extensions.test.factories import EnterpriseOfferFactory
+from ecommerce.tests.factories import UserFactory
+from ecommerce.tests.testcases import TestCase
+
+OfferUserDiscount = get_model('offer', 'OfferUserDiscount')
+
+
+class RebuildOfferUserDiscountsTests(TestCase):
+    """Tests for rebuild_offer_user_discounts management command."""
+
+    def setUp(self):
+        super(RebuildOfferUserDiscountsTests, self).setUp()
+        self.user = UserFactory()
+        self.other_user = UserFactory()
+        self.offer = EnterpriseOfferFactory(partner=self.partner, max_user_discount=150)
+        self.other_offer = EnterpriseOfferFactory(partner=self.partner, max_user_discount=150)
+        for user, offer, amount in (
+                (self.user, self.offer, 10),
+                (self.user, self.offer, 20),
+                (self.other_user, self.offer, 40),
+                (self.user, self.other_offer, 80),
+        ):
+            OrderDiscountFactory(order=OrderFactory(user=user, status=ORDER.COMPLETE), offer_id=offer.id, amount=amount)
+
+    def _ledger(self):
+        return {
+            (row.offer_id, row.user_id): row.total for row in OfferUserDiscount.objects.all()
+        }
+
+    def test_rebuild(self):
+        """Test that the ledger of every offer with a per user limit is rebuilt from order discounts."""
+        OfferUserDiscount.objects.create(offer=self.offer, user=self.user, total=1000)
+
+        call_command('rebuild_offer_user_discounts')
+
+        self.assertEqual(self._ledger(), {
+            (self.offer.id, self.user.id): 30,
+            (self.offer.id, self.other_user.id): 40,
+            (self.other_offer.id, self.user.id): 80,
+        })
+
+    def test_rebuild_offer(self):
+        """Test that only the ledger of the given offer is rebuilt."""
+        call_command('rebuild_offer_user_discounts', offer_ids=[self.other_offer.id])
+
+        self.assertEqual(self._ledger(), {(self.other_offer.id, self.user.id): 80})
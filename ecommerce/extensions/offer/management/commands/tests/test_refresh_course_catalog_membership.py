@@ -0,0 +1,91 @@
+
+
+import json
+from datetime import timedelta
+from urllib.parse import parse_qs, urlparse
+
+import responses
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils.timezone import now
+from oscar.core.loading import get_model
+from oscar.test import factories
+
+from ecommerce.coupons.tests.mixins import DiscoveryMockMixin
+from ecommerce.courses.tests.factories import CourseFactory
+from ecommerce.tests.testcases import TestCase
+
+CourseCatalogMembership = get_model('offer', 'CourseCatalogMembership')
+
+
+class RefreshCourseCatalogMembershipTests(DiscoveryMockMixin, TestCase):
+    """Tests for refresh_course_catalog_membership management command."""
+
+    def setUp(self):
+        super(RefreshCourseCatalogMembershipTests, self).setUp()
+        factories.RangeFactory(course_catalog=1, course_seat_types='verified')
+        self.course_in_catalog = CourseFactory(partner=self.partner)
+        self.course_not_in_catalog = CourseFactory(partner=self.partner)
+        self.mock_access_token_response()
+        responses.add(
+            responses.GET,
+            '{}catalogs/1/contains/'.format(self.site_configuration.discovery_api_url),
+            json={'courses': {self.course_in_catalog.id: True, self.course_not_in_catalog.id: False}},
+        )
+
+    def _contains_requests(self):
+        return [call for call in responses.calls if '/contains/' in call.request.url]
+
+    def _membership(self):
+        return dict(CourseCatalogMembership.objects.filter(
+            site=self.site, catalog_id=1
+        ).values_list('course_run_id', 'is_member'))
+
+    @responses.activate
+    def test_refresh(self):
+        """Test that membership of every course run of the site's partner is stored."""
+        call_command('refresh_course_catalog_membership', site_domain=self.site.domain)
+
+        self.assertEqual(self._membership(), {
+            self.course_in_catalog.id: True,
+            self.course_not_in_catalog.id: False,
+        })
+        self.assertEqual(len(self._contains_requests()), 1)
+
+    @responses.activate
+    def test_refresh_is_incremental(self):
+        """Test that only missing, stale or changed course runs are re-checked."""
+        call_command('refresh_course_catalog_membership', site_domain=self.site.domain)
+        responses.calls.reset()  # pylint: disable=no-member
+
+        call_command('refresh_course_catalog_membership', site_domain=self.site.domain)
+        self.assertEqual(len(self._contains_requests()), 0)
+
+        CourseCatalogMembership.objects.filter(course_run_id=self.course_in_catalog.id).update(
+            modified=now() - timedelta(days=2), is_member=False
+        )
+        call_command('refresh_course_catalog_membership', site_domain=self.site.domain)
+
+        requests = self._contains_requests()
+        self.assertEqual(len(requests), 1)
+        self.assertEqual(
+            parse_qs(urlparse(requests[0].request.url).query)['course_run_id'], [self.course_in_catalog.id]
+        )
+        self.assertTrue(self._membership()[self.course_in_catalog.id])
+
+    @responses.activate
+    def test_discovery_failure(self):
+        """Test that a Discovery Service failure does not store membership."""
+        responses.replace(
+            responses.GET,
+            '{}catalogs/1/contains/'.format(self.site_configuration.discovery_api_url),
+            body=json.dumps({}),
+            status=500,
+        )
+        call_command('refresh_course_catalog_membership', site_domain=self.site.domain)
+        self.assertEqual(self._membership(), {})
+
+    def test_unknown_site(self):
+        """Test that an unknown site domain raises an error."""
+        with self.assertRaises(CommandError):
+            call_command('refresh_course_catalog_membership', site_domain='unknown.example.com')
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.25 on 2026-10-17 04:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sites', '0002_alter_domain_unique'),
+        ('offer', '0055_auto_20231108_1355'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseCatalogMembership',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('catalog_id', models.PositiveIntegerField(help_text='Course Catalog ID from the Discovery Service.')),
+                ('course_run_id', models.CharField(max_length=255)),
+                ('is_member', models.BooleanField()),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='sites.site')),
+            ],
+            options={
+                'unique_together': {('site', 'catalog_id', 'course_run_id')},
+            },
+        ),
+    ]
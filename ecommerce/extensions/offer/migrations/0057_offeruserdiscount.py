@@ -0,0 +1,31 @@
+# Generated by Django 3.2.25 on 2026-10-17 05:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('offer', '0056_coursecatalogmembership'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OfferUserDiscount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('offer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_discounts', to='offer.conditionaloffer')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='offer_discounts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('offer', 'user')},
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.2.25 on 2026-10-17 06:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('offer', '0057_offeruserdiscount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OfferUtilization',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('total_discount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('num_orders', models.PositiveIntegerField(default=0)),
+                ('offer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='utilization', to='offer.conditionaloffer')),
+            ],
+            options={
+                'get_latest_by': 'modified',
+                'abstract': False,
+            },
+        ),
+    ]
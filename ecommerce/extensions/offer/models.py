@@ -1,6 +1,7 @@
 import logging
 import re
 from datetime import datetime
+from decimal import Decimal
 from urllib.parse import urljoin
 
 import boto3
@@ -11,9 +12,10 @@ from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ObjectDoesNotExist
-from django.db import models
+from django.db import models, transaction
 from django.db.models.signals import post_delete
 from django.dispatch import receiver
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from django_extensions.db.models import TimeStampedModel
 from edx_django_utils.cache import TieredCache
@@ -31,12 +33,20 @@ from requests.exceptions import RequestException, Timeout
 from simple_history.models import HistoricalRecords
 from threadlocals.threadlocals import get_current_request
 
-from ecommerce.core.utils import get_cache_key, log_message_and_raise_validation_error
+from ecommerce.core.utils import (
+    CallCoalescer,
+    get_cache_key,
+    get_many_cached_responses,
+    log_message_and_raise_validation_error,
+    set_many_all_tiers
+)
+from ecommerce.extensions.fulfillment.status import ORDER
 from ecommerce.extensions.offer.constants import (
     EMAIL_TEMPLATE_TYPES,
     NUDGE_EMAIL_CYCLE,
     NUDGE_EMAIL_TEMPLATE_TYPES,
     OFFER_ASSIGNED,
+    OFFER_ASSIGNMENT_BATCH_SIZE,
     OFFER_ASSIGNMENT_EMAIL_BOUNCED,
     OFFER_ASSIGNMENT_EMAIL_PENDING,
     OFFER_ASSIGNMENT_REVOKED,
@@ -46,6 +56,7 @@ from ecommerce.extensions.offer.constants import (
     OfferUsageEmailTypes
 )
 from ecommerce.extensions.offer.utils import format_assigned_offer_email
+from ecommerce.extensions.refund.status import REFUND
 
 OFFER_PRIORITY_ENTERPRISE = 10
 OFFER_PRIORITY_VOUCHER = 20
@@ -55,8 +66,11 @@ LIMIT = models.Q(app_label='offer', model='offerassignmentemailtemplates') | \
 
 logger = logging.getLogger(__name__)
 
+ProductAttributeSnapshot = get_model('catalogue', 'ProductAttributeSnapshot')
 Voucher = get_model('voucher', 'Voucher')
 
+_catalog_query_contains_coalescer = CallCoalescer()
+
 
 class Benefit(AbstractBenefit):
     history = HistoricalRecords()
@@ -83,47 +97,85 @@ class Benefit(AbstractBenefit):
 
     def _filter_for_paid_course_products(self, lines, applicable_range):
         """" Filters out products that aren't seats or entitlements or that don't have a paid certificate type. """
-        return [
+        lines = [
             line for line in lines
-            if (line.product.is_seat_product or line.product.is_course_entitlement_product) and
-            hasattr(line.product.attr, 'certificate_type') and
-            line.product.attr.certificate_type.lower() in applicable_range.course_seat_types
+            if line.product.is_seat_product or line.product.is_course_entitlement_product
+        ]
+        snapshots = ProductAttributeSnapshot.load(line.product for line in lines)
+        return [
+            line for line, snapshot in zip(lines, snapshots)
+            if snapshot.certificate_type and snapshot.certificate_type.lower() in applicable_range.course_seat_types
         ]
 
     def _identify_uncached_product_identifiers(self, lines, domain, partner_code, query):
         """
         Checks the cache to see if each line is in the catalog range specified by the given query
         and tracks identifiers for which discovery service data is still needed.
+
+        The cache is read with a single multi-get for all lines.
         """
         uncached_course_run_ids = []
         uncached_course_uuids = []
+        applicable_lines = []
 
-        applicable_lines = lines
-        for line in applicable_lines:
+        line_cache_keys = []
+        for line in lines:
             if line.product.is_seat_product:
                 product_id = line.product.course.id
             else:  # All lines passed to this method should either have a seat or an entitlement product
-                product_id = line.product.attr.UUID
+                product_id = line.product.get_attribute_snapshot().uuid
 
-            cache_key = get_cache_key(
+            line_cache_keys.append((line, product_id, get_cache_key(
                 site_domain=domain,
                 partner_code=partner_code,
                 resource='catalog_query.contains',
                 course_id=product_id,
                 query=query
-            )
-            in_catalog_range_cached_response = TieredCache.get_cached_response(cache_key)
+            )))
+
+        cached_values = get_many_cached_responses(cache_key for __, __, cache_key in line_cache_keys)
 
-            if not in_catalog_range_cached_response.is_found:
+        for line, product_id, cache_key in line_cache_keys:
+            if cache_key not in cached_values:
+                metadata = {'id': product_id, 'cache_key': cache_key, 'line': line}
                 if line.product.is_seat_product:
-                    uncached_course_run_ids.append({'id': product_id, 'cache_key': cache_key, 'line': line})
+                    uncached_course_run_ids.append(metadata)
                 else:
-                    uncached_course_uuids.append({'id': product_id, 'cache_key': cache_key, 'line': line})
-            elif not in_catalog_range_cached_response.value:
-                applicable_lines.remove(line)
+                    uncached_course_uuids.append(metadata)
+                applicable_lines.append(line)
+            elif cached_values[cache_key]:
+                applicable_lines.append(line)
 
         return uncached_course_run_ids, uncached_course_uuids, applicable_lines
 
+    @staticmethod
+    def _get_catalog_query_membership(site, query, course_run_ids, course_uuids):
+        """
+        Ask the Discovery Service which of the given course runs and courses match the catalog query.
+
+        Concurrent calls in this process for the same question share a single request.
+
+        Returns:
+            dict: Membership (bool) keyed by course run ID or course UUID.
+        """
+        partner_code = site.siteconfiguration.partner.short_code
+        discovery_api_url = urljoin(f"{site.siteconfiguration.discovery_api_url}/", "catalog/query_contains/")
+        params = {
+            "course_run_ids": ','.join(course_run_ids),
+            "course_uuids": ','.join(course_uuids),
+            "query": query,
+            "partner": partner_code
+        }
+
+        def fetch():
+            response = site.siteconfiguration.oauth_api_client.get(discovery_api_url, params=params)
+            response.raise_for_status()
+            return response.json()
+
+        return _catalog_query_contains_coalescer.call(
+            (discovery_api_url, partner_code, query, params['course_run_ids'], params['course_uuids']), fetch
+        )
+
     def get_applicable_lines(self, offer, basket, range=None):  # pylint: disable=redefined-builtin
         """
         Returns the basket lines for which the benefit is applicable.
@@ -143,23 +195,13 @@ class Benefit(AbstractBenefit):
 
             if course_run_ids or course_uuids:
                 # Hit Discovery Service to determine if remaining courses and runs are in the range.
-                api_client = site.siteconfiguration.oauth_api_client
-                discovery_api_url = urljoin(
-                    f"{site.siteconfiguration.discovery_api_url}/",
-                    "catalog/query_contains/"
-                )
                 try:
-                    response = api_client.get(
-                        discovery_api_url,
-                        params={
-                            "course_run_ids": ','.join([metadata['id'] for metadata in course_run_ids]),
-                            "course_uuids": ','.join([metadata['id'] for metadata in course_uuids]),
-                            "query": query,
-                            "partner": partner_code
-                        }
+                    response = self._get_catalog_query_membership(
+                        site,
+                        query,
+                        list(dict.fromkeys(str(metadata['id']) for metadata in course_run_ids)),
+                        list(dict.fromkeys(str(metadata['id']) for metadata in course_uuids)),
                     )
-                    response.raise_for_status()
-                    response = response.json()
                 except (ReqConnectionError, RequestException, Timeout) as err:  # pylint: disable=bare-except
                     logger.exception(
                         '[Code Redemption Failure] Unable to apply benefit because we failed to query the '
@@ -180,18 +222,20 @@ class Benefit(AbstractBenefit):
                 )
 
                 # Cache range-state individually for each course or run identifier and remove lines not in the range.
+                in_range_values = {}
                 for metadata in course_run_ids + course_uuids:
                     in_range = response[str(metadata['id'])]
 
                     # Convert to int, because this is what memcached will return, and the request cache should return
                     # the same value.
                     # Note: once the TieredCache is fixed to handle this case, we could remove this line.
-                    in_range = int(in_range)
-                    TieredCache.set_all_tiers(metadata['cache_key'], in_range, settings.COURSES_API_CACHE_TIMEOUT)
+                    in_range_values[metadata['cache_key']] = int(in_range)
 
                     if not in_range:
                         applicable_lines.remove(metadata['line'])
 
+                set_many_all_tiers(in_range_values, settings.COURSES_API_CACHE_TIMEOUT)
+
             logger.info(
                 "Basket [%s] with offer [%s] has applicable lines: %s",
                 basket.id,
@@ -512,6 +556,10 @@ class Range(AbstractRange):
         if cached_response.is_found:
             return cached_response.value
 
+        is_member = CourseCatalogMembership.get_membership(request.site, self.course_catalog, product.course_id)
+        if is_member is not None:
+            return {'courses': {product.course_id: is_member}}
+
         api_client = request.site.siteconfiguration.oauth_api_client
         discovery_api_url = urljoin(
             f"{request.site.siteconfiguration.discovery_api_url}/",
@@ -575,6 +623,259 @@ class Range(AbstractRange):
         return super(Range, self).all_products()  # pylint: disable=bad-super-call
 
 
+class CourseCatalogMembership(TimeStampedModel):
+    """
+    Local copy of whether a course run belongs to a Discovery Service course catalog.
+
+    Ranges using ``course_catalog`` consult this table before calling the Discovery Service's
+    catalog contains endpoint. It is kept up to date by the ``refresh_course_catalog_membership``
+    management command; rows that have not been refreshed within
+    ``COURSE_CATALOG_MEMBERSHIP_MAX_AGE`` seconds are ignored.
+    """
+    site = models.ForeignKey('sites.Site', on_delete=models.CASCADE)
+    catalog_id = models.PositiveIntegerField(help_text=_('Course Catalog ID from the Discovery Service.'))
+    course_run_id = models.CharField(max_length=255)
+    is_member = models.BooleanField()
+
+    class Meta:
+        unique_together = (('site', 'catalog_id', 'course_run_id'),)
+
+    def __str__(self):
+        return '{catalog_id}: {course_run_id}'.format(catalog_id=self.catalog_id, course_run_id=self.course_run_id)
+
+    @classmethod
+    def get_membership(cls, site, catalog_id, course_run_id):
+        """
+        Returns:
+            bool: Whether the course run belongs to the catalog, or None if that is not known locally.
+        """
+        fresh_after = timezone.now() - relativedelta(seconds=settings.COURSE_CATALOG_MEMBERSHIP_MAX_AGE)
+        return cls.objects.filter(
+            site=site, catalog_id=catalog_id, course_run_id=course_run_id, modified__gte=fresh_after
+        ).values_list('is_member', flat=True).first()
+
+
+class OfferDiscountSummary(TimeStampedModel):
+    """
+    Base class of the tables summarizing the discounts offers gave on complete orders, which are read instead of
+    aggregating order discounts every time. Summaries are updated when orders are completed, and computed from
+    order discounts when they are missing.
+    """
+
+    class Meta(TimeStampedModel.Meta):
+        abstract = True
+
+    @classmethod
+    def get_offer_ids(cls):
+        """
+        Returns:
+            QuerySet: The ids of the offers summarized.
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def get_discounts(cls, offer_ids):
+        """
+        Returns:
+            QuerySet: The discounts of the offers on complete orders.
+        """
+        OrderDiscount = get_model('order', 'OrderDiscount')
+        return OrderDiscount.objects.filter(offer_id__in=offer_ids, order__status=ORDER.COMPLETE)
+
+    @classmethod
+    def _record_order_discount(cls, order, offer_id, amount):
+        """
+        Update the summary of an offer with the discount a newly completed order received from it.
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def record_order(cls, order):
+        """
+        Add the discounts of a newly completed order to the summaries of its offers.
+        """
+        discounts = order.discounts.filter(
+            offer_id__in=cls.get_offer_ids()
+        ).order_by().values('offer_id').annotate(amount=models.Sum('amount'))
+        for discount in discounts:
+            cls._record_order_discount(order, discount['offer_id'], discount['amount'])
+
+
+class OfferUserDiscount(OfferDiscountSummary):
+    """
+    Ledger of the total discount a user received from an offer on complete, unrefunded orders.
+
+    Per user spend limits of enterprise offers are checked against this table instead of aggregating
+    order discounts every time an offer is evaluated. Rows are only kept for offers with a
+    ``max_user_discount``, and are deleted when it changes; they are recomputed when orders are completed and
+    when refunds are completed, created when they are first read, and rebuilt by the
+    ``rebuild_offer_user_discounts`` management command.
+    """
+    offer = models.ForeignKey('offer.ConditionalOffer', related_name='user_discounts', on_delete=models.CASCADE)
+    user = models.ForeignKey('core.User', related_name='offer_discounts', on_delete=models.CASCADE)
+    total = models.DecimalField(decimal_places=2, max_digits=12, default=0)
+
+    class Meta:
+        unique_together = (('offer', 'user'),)
+
+    def __str__(self):
+        return '{offer_id}-{user_id}: {total}'.format(offer_id=self.offer_id, user_id=self.user_id, total=self.total)
+
+    @classmethod
+    def get_offer_ids(cls):
+        return ConditionalOffer.objects.filter(max_user_discount__isnull=False).values('id')
+
+    @classmethod
+    def get_discounts(cls, offer_ids):
+        """
+        Returns:
+            QuerySet: The discounts of the offers on complete orders without a complete refund.
+        """
+        return super().get_discounts(offer_ids).exclude(order__refunds__status=REFUND.COMPLETE)
+
+    @classmethod
+    def refresh(cls, offer_id, user_id):
+        """
+        Recompute the ledger row of a user and offer from order discounts.
+
+        Returns:
+            Decimal: The total discount the user received from the offer.
+        """
+        with transaction.atomic():
+            # The row is locked before the discounts are aggregated, so that concurrent refreshes aggregate
+            # after each other.
+            ledger = cls.objects.select_for_update().filter(offer_id=offer_id, user_id=user_id).first()
+            total = cls.get_discounts([offer_id]).filter(order__user_id=user_id).aggregate(
+                total=models.Sum('amount')
+            )['total'] or Decimal('0.00')
+            if ledger is None:
+                # A row created meanwhile was computed after this total, and is kept.
+                ledger, __ = cls.objects.get_or_create(offer_id=offer_id, user_id=user_id, defaults={'total': total})
+            else:
+                ledger.total = total
+                ledger.save(update_fields=['total', 'modified'])
+        return ledger.total
+
+    @classmethod
+    def get_total(cls, offer, user):
+        """
+        Returns:
+            Decimal: The total discount the user received from the offer.
+        """
+        total = cls.objects.filter(offer_id=offer.id, user_id=user.id).values_list('total', flat=True).first()
+        if total is None:
+            total = cls.refresh(offer.id, user.id)
+        return total
+
+    @classmethod
+    def record_order(cls, order):
+        if order.user_id:
+            super().record_order(order)
+
+    @classmethod
+    def _record_order_discount(cls, order, offer_id, amount):  # pylint: disable=unused-argument
+        # Rows are recomputed rather than incremented: a row created from order discounts once the order was
+        # saved as complete already counts it.
+        cls.refresh(offer_id, order.user_id)
+
+    @classmethod
+    def refresh_order(cls, order):
+        """
+        Recompute the ledger rows of the offers an order received discounts from, e.g. after a refund.
+        """
+        offer_ids = set(order.discounts.filter(offer_id__isnull=False).values_list('offer_id', flat=True))
+        for offer_id in cls.objects.filter(offer_id__in=offer_ids, user_id=order.user_id).values_list(
+                'offer_id', flat=True
+        ):
+            cls.refresh(offer_id, order.user_id)
+
+
+class OfferUtilization(OfferDiscountSummary):
+    """
+    Summary of the discount an enterprise offer gave, and of the number of complete orders it was used on.
+
+    Offer usage alerts read this table instead of aggregating the order discounts of every offer. Rows are
+    updated when orders are completed, and created when they are first read. ``modified`` is the last time
+    the row was updated.
+    """
+    offer = models.OneToOneField('offer.ConditionalOffer', related_name='utilization', on_delete=models.CASCADE)
+    total_discount = models.DecimalField(decimal_places=2, max_digits=12, default=0)
+    num_orders = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return '{offer_id}: {total_discount} on {num_orders} order(s)'.format(
+            offer_id=self.offer_id, total_discount=self.total_discount, num_orders=self.num_orders
+        )
+
+    @classmethod
+    def get_offer_ids(cls):
+        return ConditionalOffer.objects.filter(condition__enterprise_customer_uuid__isnull=False).values('id')
+
+    @classmethod
+    def _aggregate(cls, offer_ids):
+        """
+        Returns:
+            dict: (total discount, number of orders) of every offer with discounts, by offer id.
+        """
+        totals = cls.get_discounts(offer_ids).order_by().values('offer_id').annotate(
+            total_discount=models.Sum('amount'), num_orders=models.Count('order_id', distinct=True)
+        )
+        return {item['offer_id']: (item['total_discount'], item['num_orders']) for item in totals}
+
+    @classmethod
+    def refresh(cls, offer_id):
+        """
+        Recompute the summary of an offer from order discounts.
+
+        Returns:
+            OfferUtilization
+        """
+        total_discount, num_orders = cls._aggregate([offer_id]).get(offer_id, (Decimal('0.00'), 0))
+        utilization, __ = cls.objects.update_or_create(
+            offer_id=offer_id, defaults={'total_discount': total_discount, 'num_orders': num_orders}
+        )
+        return utilization
+
+    @classmethod
+    def get_utilizations(cls, offers):
+        """
+        Returns the summaries of the given offers, computing the missing ones with a single aggregate query.
+
+        Returns:
+            dict: OfferUtilization by offer id.
+        """
+        offer_ids = [offer.id for offer in offers]
+        utilizations = {utilization.offer_id: utilization for utilization in cls.objects.filter(offer_id__in=offer_ids)}
+        missing_offer_ids = [offer_id for offer_id in offer_ids if offer_id not in utilizations]
+        if missing_offer_ids:
+            totals = cls._aggregate(missing_offer_ids)
+            missing = []
+            for offer_id in missing_offer_ids:
+                total_discount, num_orders = totals.get(offer_id, (Decimal('0.00'), 0))
+                missing.append(cls(offer_id=offer_id, total_discount=total_discount, num_orders=num_orders))
+            # Rows created concurrently, e.g. by an order completed meanwhile, are kept.
+            cls.objects.bulk_create(missing, ignore_conflicts=True)
+            utilizations.update({utilization.offer_id: utilization for utilization in missing})
+        return utilizations
+
+    @classmethod
+    def get_utilization(cls, offer):
+        """
+        Returns:
+            OfferUtilization: The summary of the offer.
+        """
+        return cls.get_utilizations([offer])[offer.id]
+
+    @classmethod
+    def _record_order_discount(cls, order, offer_id, amount):
+        if not cls.objects.filter(offer_id=offer_id).update(
+                total_discount=models.F('total_discount') + amount,
+                num_orders=models.F('num_orders') + 1,
+                modified=timezone.now(),
+        ):
+            cls.refresh(offer_id)
+
+
 class Condition(AbstractCondition):
     enterprise_customer_uuid = models.UUIDField(
         null=True,
@@ -837,14 +1138,17 @@ class CodeAssignmentNudgeEmailTemplates(AbstractBaseEmailTemplate):
             )
         return nudge_email_template
 
-    def get_email_content(self, user_email, code, base_enterprise_url=''):
+    def get_email_content(self, user_email, code, base_enterprise_url='', voucher=None):
         """
         Return the formatted email body and subject.
+
+        The voucher of the code is looked up unless it is given, e.g. when it was loaded along with the vouchers of
+        other nudge emails.
         """
         email_body = None
-        voucher_qs = Voucher.objects.filter(code=code)
-        if voucher_qs.exists():
-            voucher = voucher_qs.first()
+        if voucher is None:
+            voucher = Voucher.objects.filter(code=code).first()
+        if voucher is not None:
             offer = voucher.best_offer
             max_usage_limit = offer.max_global_applications or OFFER_MAX_USES_DEFAULT
 
@@ -916,6 +1220,48 @@ class CodeAssignmentNudgeEmails(TimeStampedModel):
                     user_email, code, email_type, base_enterprise_url,
                 )
 
+    @classmethod
+    def bulk_subscribe_nudge_emails(cls, user_email_codes, base_enterprise_url=''):
+        """
+        Subscribe the nudge email cycle for each of the given (user email, code) pairs, with a fixed number of queries.
+        """
+        user_email_codes = set(user_email_codes)
+        if not user_email_codes:
+            return
+
+        now_datetime = datetime.now()
+        nudge_emails = []
+        for days, email_type in NUDGE_EMAIL_CYCLE.items():
+            email_template = CodeAssignmentNudgeEmailTemplates.get_nudge_email_template(email_type=email_type)
+            if not email_template:
+                logger.warning(
+                    'Unable to create nudge emails for %d user emails, email_type: %s, base_enterprise_url: %s',
+                    len(user_email_codes), email_type, base_enterprise_url,
+                )
+                continue
+
+            existing = set(cls.objects.filter(
+                email_template=email_template,
+                code__in={code for __, code in user_email_codes},
+                user_email__in={user_email for user_email, __ in user_email_codes},
+            ).values_list('user_email', 'code'))
+            nudge_emails.extend(
+                cls(
+                    code=code,
+                    user_email=user_email,
+                    email_template=email_template,
+                    email_date=now_datetime + relativedelta(days=int(days)),
+                    options={'base_enterprise_url': base_enterprise_url},
+                )
+                for user_email, code in user_email_codes - existing
+            )
+
+        cls.objects.bulk_create(nudge_emails, batch_size=OFFER_ASSIGNMENT_BATCH_SIZE)
+        logger.info(
+            'Created %d nudge emails for %d user emails, base_enterprise_url: %s',
+            len(nudge_emails), len(user_email_codes), base_enterprise_url,
+        )
+
     @classmethod
     def unsubscribe_from_nudging(cls, codes, user_emails):
         """
@@ -0,0 +1,140 @@
+import logging
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import DEFERRED
+from django.db.models.signals import class_prepared, post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+from oscar.apps.order.signals import order_status_changed
+from oscar.core.loading import get_class, get_model
+
+from ecommerce.extensions.fulfillment.status import ORDER
+from ecommerce.extensions.offer.index import invalidate_offer_index
+
+Benefit = get_model('offer', 'Benefit')
+Condition = get_model('offer', 'Condition')
+ConditionalOffer = get_model('offer', 'ConditionalOffer')
+OfferUserDiscount = get_model('offer', 'OfferUserDiscount')
+OfferUtilization = get_model('offer', 'OfferUtilization')
+Range = get_model('offer', 'Range')
+post_refund = get_class('refund.signals', 'post_refund')
+
+logger = logging.getLogger(__name__)
+
+# Models the offer index is built from, and the offer fields that only count its usage.
+OFFER_INDEX_MODELS = (ConditionalOffer, Condition, Benefit, Range)
+OFFER_USAGE_FIELDS = ('num_applications', 'total_discount', 'num_orders')
+
+
+def _is_usage_update(offer, update_fields=None):
+    """
+    Returns whether saving an offer only changes its usage counters, e.g. when Oscar records its usage on an
+    order, or a refund credits it back.
+
+    The counters of offers with a global application or discount limit are checked against those limits, so
+    they are never considered a usage update.
+    """
+    if update_fields is not None:
+        return set(update_fields) <= set(OFFER_USAGE_FIELDS)
+    if offer.pk is None or offer.max_global_applications or offer.max_discount:
+        return False
+    field_names = [
+        field.attname for field in ConditionalOffer._meta.concrete_fields  # pylint: disable=protected-access
+        if field.name not in OFFER_USAGE_FIELDS
+    ]
+    saved = ConditionalOffer.objects.filter(pk=offer.pk).values(*field_names).first()
+    return saved is not None and all(saved[name] == getattr(offer, name) for name in field_names)
+
+
+def check_offer_usage_update(sender, instance, update_fields=None, **kwargs):  # pylint: disable=unused-argument
+    """
+    Flag offers whose save only changes their usage counters, so the offer index is not invalidated for them.
+    """
+    instance._is_offer_usage_update = _is_usage_update(instance, update_fields)  # pylint: disable=protected-access
+
+
+def invalidate_offer_index_on_change(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Invalidate the offer index whenever an offer, or anything it is built from, changes.
+    """
+    if getattr(instance, '_is_offer_usage_update', False):
+        return
+    invalidate_offer_index()
+    # Other processes may rebuild from the old data before this transaction commits.
+    transaction.on_commit(invalidate_offer_index)
+
+
+def connect_offer_index_receivers(sender, **kwargs):  # pylint: disable=unused-argument
+    """
+    Connect the offer index receivers to a model if the index is built from it.
+
+    Conditions and benefits are usually saved through their proxy classes, which are connected as they are defined.
+    """
+    if not issubclass(sender, OFFER_INDEX_MODELS):
+        return
+    if issubclass(sender, ConditionalOffer):
+        pre_save.connect(check_offer_usage_update, sender=sender, dispatch_uid='offer_index_pre_save')
+    post_save.connect(invalidate_offer_index_on_change, sender=sender, dispatch_uid='offer_index_post_save')
+    post_delete.connect(invalidate_offer_index_on_change, sender=sender, dispatch_uid='offer_index_post_delete')
+
+
+for model in apps.get_models():
+    connect_offer_index_receivers(model)
+class_prepared.connect(connect_offer_index_receivers, dispatch_uid='offer_index_class_prepared')
+
+
+def _update_offer_discount_summary(update, order):
+    """
+    Update offer discount summaries with an order. Errors are logged rather than raised: the summaries are
+    recomputed when they are missing, and must never fail the order or refund that updates them.
+    """
+    try:
+        with transaction.atomic():
+            update(order)
+    except Exception:  # pylint: disable=broad-except
+        logger.exception('[%s] failed for order [%s].', update.__qualname__, order.number)
+
+
+@receiver(order_status_changed, dispatch_uid='offer_discounts_order_status_changed')
+def record_offer_discounts(sender, order, old_status, new_status, **kwargs):  # pylint: disable=unused-argument
+    """
+    Add the discounts of an order to the offer user discount ledger and to the utilization summaries of its
+    offers once the order is complete.
+    """
+    if new_status == ORDER.COMPLETE and old_status != ORDER.COMPLETE:
+        _update_offer_discount_summary(OfferUserDiscount.record_order, order)
+        _update_offer_discount_summary(OfferUtilization.record_order, order)
+
+
+@receiver(post_refund, dispatch_uid='offer_user_discount_post_refund')
+def refresh_offer_user_discounts(sender, refund, **kwargs):  # pylint: disable=unused-argument
+    """
+    Remove the discounts of a refunded order from the offer user discount ledger.
+    """
+    if refund.order.user_id:
+        _update_offer_discount_summary(OfferUserDiscount.refresh_order, refund.order)
+
+
+@receiver(post_init, sender=ConditionalOffer, dispatch_uid='offer_user_discount_post_init')
+def remember_max_user_discount(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Remember the per user discount limit an offer was loaded with, unless it was deferred.
+    """
+    instance._saved_max_user_discount = instance.__dict__.get(  # pylint: disable=protected-access
+        'max_user_discount', DEFERRED
+    )
+
+
+@receiver(post_save, sender=ConditionalOffer, dispatch_uid='offer_user_discount_post_save')
+def reset_offer_user_discounts(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+    """
+    Delete the ledger rows of an offer when its per user discount limit changes. Rows are not updated while an
+    offer has no limit, so rows kept from a previous limit would be stale; they are recomputed when next read.
+    """
+    saved_max_user_discount = getattr(instance, '_saved_max_user_discount', DEFERRED)
+    max_user_discount = instance.__dict__.get('max_user_discount', DEFERRED)
+    instance._saved_max_user_discount = max_user_discount  # pylint: disable=protected-access
+    if created or DEFERRED in (saved_max_user_discount, max_user_discount):
+        return
+    if saved_max_user_discount != max_user_discount:
+        OfferUserDiscount.objects.filter(offer_id=instance.id).delete()
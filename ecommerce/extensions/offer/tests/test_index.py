@@ -0,0 +1,144 @@
+import datetime
+from uuid import uuid4
+
+import mock
+from django.core.cache import cache
+from django.test import override_settings
+from django.utils.timezone import now
+from oscar.core.loading import get_model
+
+from ecommerce.extensions.offer import index
+from ecommerce.extensions.offer.index import OFFER_INDEX_VERSION_CACHE_KEY, get_offer_index, invalidate_offer_index
+from ecommerce.extensions.test.factories import ConditionalOfferFactory, ConditionFactory, ProgramOfferFactory
+from ecommerce.tests.testcases import TestCase
+
+ConditionalOffer = get_model('offer', 'ConditionalOffer')
+
+
+class OfferIndexTests(TestCase):
+    """ Tests for the in-process offer index. """
+
+    def setUp(self):
+        super(OfferIndexTests, self).setUp()
+        self.existing_site_offers = list(ConditionalOffer.active.filter(
+            offer_type=ConditionalOffer.SITE,
+            condition__program_uuid__isnull=True,
+            condition__enterprise_customer_uuid__isnull=True,
+        ))
+
+    def test_buckets(self):
+        """ Verify offers are bucketed by enterprise customer and program. """
+        enterprise_uuid = uuid4()
+        site_offer = ConditionalOfferFactory(condition=ConditionFactory(program_uuid=None))
+        enterprise_offer = ConditionalOfferFactory(
+            condition=ConditionFactory(program_uuid=None, enterprise_customer_uuid=enterprise_uuid)
+        )
+        program_offer = ProgramOfferFactory()
+
+        offer_index = get_offer_index()
+
+        self.assertCountEqual(offer_index.get_site_offers(), self.existing_site_offers + [site_offer])
+        self.assertEqual(offer_index.get_enterprise_offers(enterprise_uuid), [enterprise_offer])
+        self.assertEqual(offer_index.get_enterprise_offers(str(enterprise_uuid).upper()), [enterprise_offer])
+        self.assertEqual(offer_index.get_enterprise_offers(uuid4()), [])
+        self.assertEqual(offer_index.get_program_offers(program_offer.condition.program_uuid), [program_offer])
+        self.assertEqual(offer_index.get_program_offers('not-a-uuid'), [])
+
+    def test_enterprise_program_offers(self):
+        """ Verify offers restricted to both an enterprise customer and a program are in both buckets. """
+        enterprise_uuid = uuid4()
+        offer = ProgramOfferFactory(condition__enterprise_customer_uuid=enterprise_uuid)
+
+        offer_index = get_offer_index()
+
+        self.assertEqual(offer_index.get_enterprise_offers(enterprise_uuid), [offer])
+        self.assertEqual(offer_index.get_program_offers(offer.condition.program_uuid), [offer])
+        self.assertNotIn(offer, offer_index.get_site_offers())
+
+    def test_inactive_offers_excluded(self):
+        """ Verify offers outside of their date range, or not open, are not returned. """
+        ConditionalOfferFactory(end_datetime=now() - datetime.timedelta(days=1))
+        ConditionalOfferFactory(start_datetime=now() + datetime.timedelta(days=1))
+        ConditionalOfferFactory(status=ConditionalOffer.SUSPENDED)
+
+        self.assertCountEqual(get_offer_index().get_site_offers(), self.existing_site_offers)
+
+    def test_lookups_do_not_query(self):
+        """ Verify an up to date index answers lookups without touching the database. """
+        ConditionalOfferFactory()
+        get_offer_index()
+
+        with self.assertNumQueries(0):
+            get_offer_index().get_site_offers()
+            get_offer_index().get_enterprise_offers(uuid4())
+
+    def test_returns_copies(self):
+        """ Verify state set on a returned offer does not leak into later lookups. """
+        offer = ConditionalOfferFactory()
+        for site_offer in get_offer_index().get_site_offers():
+            site_offer.foo = 'bar'
+        site_offer = get_offer_index().get_site_offers()[0]
+        self.assertFalse(hasattr(site_offer, 'foo'))
+        self.assertIn(offer, get_offer_index().get_site_offers())
+
+    def test_invalidated_on_save(self):
+        """ Verify saving an offer, condition or benefit rebuilds the index. """
+        offer = ConditionalOfferFactory()
+        offer_index = get_offer_index()
+        self.assertIs(get_offer_index(), offer_index)
+
+        offer.priority += 1
+        for instance in (offer, offer.condition, offer.benefit):
+            instance.save()
+            self.assertIsNot(get_offer_index(), offer_index)
+            offer_index = get_offer_index()
+
+        offer.delete()
+        self.assertNotIn(offer, get_offer_index().get_site_offers())
+
+    def test_not_invalidated_on_usage(self):
+        """ Verify recording the usage of an offer without usage limits does not rebuild the index. """
+        offer = ConditionalOfferFactory(max_global_applications=None, max_discount=None)
+        offer_index = get_offer_index()
+
+        offer.record_usage({'freq': 1, 'discount': 10})
+        self.assertIs(get_offer_index(), offer_index)
+
+        offer.refresh_from_db()
+        offer.save(update_fields=['num_orders'])
+        self.assertIs(get_offer_index(), offer_index)
+
+    def test_invalidated_on_limited_usage(self):
+        """ Verify recording the usage of an offer limited by its usage rebuilds the index. """
+        offer = ConditionalOfferFactory(max_global_applications=2)
+        offer_index = get_offer_index()
+
+        offer.record_usage({'freq': 1, 'discount': 10})
+        self.assertIsNot(get_offer_index(), offer_index)
+
+    def test_invalidated_on_proxy_save(self):
+        """ Verify saving a condition through its proxy class rebuilds the index. """
+        offer = ProgramOfferFactory()
+        offer_index = get_offer_index()
+
+        offer.condition.proxy().save()
+        self.assertIsNot(get_offer_index(), offer_index)
+
+    def test_invalidated_when_version_evicted(self):
+        """ Verify the index is rebuilt if its version is no longer in the cache. """
+        offer_index = get_offer_index()
+        cache.delete(OFFER_INDEX_VERSION_CACHE_KEY)
+        self.assertIsNot(get_offer_index(), offer_index)
+
+    @override_settings(OFFER_INDEX_MAX_AGE=60)
+    def test_expired(self):
+        """ Verify the index is rebuilt once it is older than OFFER_INDEX_MAX_AGE. """
+        offer_index = get_offer_index()
+        with mock.patch.object(index.time, 'time', return_value=offer_index.built_at + 61):
+            self.assertIsNot(get_offer_index(), offer_index)
+
+    def test_invalidate(self):
+        """ Verify invalidate_offer_index changes the index version. """
+        offer_index = get_offer_index()
+        invalidate_offer_index()
+        self.assertNotEqual(get_offer_index().version, offer_index.version)
@@ -12,10 +12,12 @@ import mock
 import pytz
 import responses
 from botocore.exceptions import ClientError
+from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.db.models.signals import post_delete
 from django.utils.timezone import now
-from edx_django_utils.cache import TieredCache
+from edx_django_utils.cache import DEFAULT_REQUEST_CACHE, TieredCache
 from mock import patch
 from oscar.core.loading import get_model
 from oscar.test import factories
@@ -24,9 +26,13 @@ from requests.exceptions import RequestException, Timeout
 
 from ecommerce.coupons.tests.mixins import CouponMixin, DiscoveryMockMixin
 from ecommerce.extensions.catalogue.tests.mixins import DiscoveryTestMixin
+from ecommerce.extensions.fulfillment.status import ORDER
 from ecommerce.extensions.offer.constants import ASSIGN, DAY3, DAY10, DAY19, REMIND, REVOKE
 from ecommerce.extensions.offer.models import delete_files_from_s3
-from ecommerce.extensions.test.factories import CodeAssignmentNudgeEmailTemplatesFactory
+from ecommerce.extensions.refund.signals import post_refund
+from ecommerce.extensions.refund.status import REFUND
+from ecommerce.extensions.refund.tests.factories import RefundFactory
+from ecommerce.extensions.test.factories import CodeAssignmentNudgeEmailTemplatesFactory, EnterpriseOfferFactory
 from ecommerce.tests.factories import UserFactory
 from ecommerce.tests.testcases import TestCase
 
@@ -40,6 +46,9 @@ OfferAssignmentEmailSentRecord = get_model('offer', 'OfferAssignmentEmailSentRec
 Range = get_model('offer', 'Range')
 CodeAssignmentNudgeEmails = get_model('offer', 'CodeAssignmentNudgeEmails')
 CodeAssignmentNudgeEmailTemplates = get_model('offer', 'CodeAssignmentNudgeEmailTemplates')
+CourseCatalogMembership = get_model('offer', 'CourseCatalogMembership')
+OfferUserDiscount = get_model('offer', 'OfferUserDiscount')
+OfferUtilization = get_model('offer', 'OfferUtilization')
 
 NOW = datetime.now(pytz.UTC)
 
@@ -353,6 +362,29 @@ class RangeTests(CouponMixin, DiscoveryTestMixin, DiscoveryMockMixin, TestCase):
             _ = self.range.catalog_contains_product(self.product)
             self.assertEqual(mocked_set_all_tiers.call_count, 2)
 
+    @ddt.data(True, False)
+    def test_course_catalog_range_contains_product_from_membership_table(self, is_member):
+        """
+        Verify that "contains_product" answers from the local catalog membership table without
+        calling the Discovery Service, and ignores stale rows.
+        """
+        course, seat = self.create_course_and_seat()
+        self.range.catalog_query = None
+        self.range.course_seat_types = 'verified'
+        self.range.course_catalog = 1
+        self.range.save()
+        membership = CourseCatalogMembership.objects.create(
+            site=self.site, catalog_id=1, course_run_id=course.id, is_member=is_member
+        )
+
+        self.assertEqual(self.range.contains_product(seat), is_member)
+        self._assert_num_requests(0)
+
+        CourseCatalogMembership.objects.filter(id=membership.id).update(
+            modified=now() - timedelta(seconds=settings.COURSE_CATALOG_MEMBERSHIP_MAX_AGE + 1)
+        )
+        self.assertIsNone(CourseCatalogMembership.get_membership(self.site, 1, course.id))
+
 
 @ddt.ddt
 class ConditionalOfferTests(DiscoveryTestMixin, DiscoveryMockMixin, TestCase):
@@ -660,6 +692,214 @@ class BenefitTests(DiscoveryTestMixin, DiscoveryMockMixin, TestCase):
         responses.reset()
         self.assertEqual(self.benefit.get_applicable_lines(self.offer, basket), applicable_lines)
 
+    @responses.activate
+    def test_get_applicable_lines_excludes_all_cached_misses(self):
+        """ Assert that every line cached as outside of the range is excluded, using one cache round trip. """
+        basket = factories.BasketFactory(site=self.site, owner=self.user)
+        excluded_products = [self.create_entitlement_product() for __ in range(2)]
+        included_product = self.create_entitlement_product()
+        for product in excluded_products + [included_product]:
+            basket.add_product(product)
+
+        self.mock_access_token_response()
+        self.mock_catalog_query_contains_endpoint(
+            course_run_ids=[], course_uuids=[product.attr.UUID for product in excluded_products + [included_product]],
+            absent_ids=[product.attr.UUID for product in excluded_products],
+            query=self.benefit.range.catalog_query, discovery_api_url=self.site_configuration.discovery_api_url
+        )
+        # Populate the cache, then drop the request cache so the django cache is consulted.
+        self.benefit.get_applicable_lines(self.offer, basket)
+        DEFAULT_REQUEST_CACHE.clear()
+        responses.reset()
+
+        with mock.patch('django.core.cache.cache.get_many', wraps=cache.get_many) as mock_get_many:
+            applicable_lines = self.benefit.get_applicable_lines(self.offer, basket)
+
+        self.assertEqual(mock_get_many.call_count, 1)
+        self.assertEqual([line.product for __, line in applicable_lines], [included_product])
+
+
+class OfferUserDiscountTests(TestCase):
+    """ Tests for the OfferUserDiscount ledger. """
+
+    def setUp(self):
+        super(OfferUserDiscountTests, self).setUp()
+        self.user = UserFactory()
+        self.offer = EnterpriseOfferFactory(partner=self.partner, max_user_discount=150)
+
+    def _create_order(self, amount, status=ORDER.COMPLETE):
+        order = factories.OrderFactory(user=self.user, status=status)
+        factories.OrderDiscountFactory(order=order, offer_id=self.offer.id, amount=amount)
+        return order
+
+    def _get_ledger_total(self):
+        return OfferUserDiscount.objects.get(offer=self.offer, user=self.user).total
+
+    def test_get_total_creates_row(self):
+        """ Verify the ledger row is computed from complete, unrefunded orders when it is first read. """
+        self._create_order(10)
+        self._create_order(20)
+        refunded_order = self._create_order(40)
+        RefundFactory(order=refunded_order, user=self.user, status=REFUND.COMPLETE)
+        self._create_order(80, status=ORDER.OPEN)
+
+        self.assertEqual(OfferUserDiscount.get_total(self.offer, self.user), 30)
+        self.assertEqual(self._get_ledger_total(), 30)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(OfferUserDiscount.get_total(self.offer, self.user), 30)
+
+    def test_completed_order_is_recorded(self):
+        """ Verify the discounts of an order are added to the ledger when the order is completed. """
+        self._create_order(10)
+        OfferUserDiscount.get_total(self.offer, self.user)
+
+        order = self._create_order(25, status=ORDER.OPEN)
+        self.assertEqual(self._get_ledger_total(), 10)
+
+        order.set_status(ORDER.COMPLETE)
+        self.assertEqual(self._get_ledger_total(), 35)
+
+    def test_completed_order_creates_row(self):
+        """ Verify completing an order creates a missing ledger row from every order. """
+        self._create_order(10)
+        order = self._create_order(25, status=ORDER.OPEN)
+
+        order.set_status(ORDER.COMPLETE)
+        self.assertEqual(self._get_ledger_total(), 35)
+
+    def test_completed_order_is_not_counted_twice(self):
+        """ Verify an order already counted by a row created once it was saved as complete is not added again. """
+        self._create_order(10)
+        order = self._create_order(25, status=ORDER.OPEN)
+        order.status = ORDER.COMPLETE
+        order.save()
+        self.assertEqual(OfferUserDiscount.get_total(self.offer, self.user), 35)
+
+        OfferUserDiscount.record_order(order)
+        self.assertEqual(self._get_ledger_total(), 35)
+
+    def test_recording_error_is_logged(self):
+        """ Verify an error updating the ledger is logged, and does not fail the order. """
+        order = self._create_order(25, status=ORDER.OPEN)
+        with mock.patch.object(OfferUserDiscount, 'refresh', side_effect=Exception):
+            with self.assertLogs('ecommerce.extensions.offer.signals', level='ERROR'):
+                order.set_status(ORDER.COMPLETE)
+
+        self.assertEqual(order.status, ORDER.COMPLETE)
+        self.assertFalse(OfferUserDiscount.objects.exists())
+        self.assertEqual(OfferUtilization.objects.get(offer=self.offer).total_discount, 25)
+
+    def test_limit_change_deletes_rows(self):
+        """ Verify the ledger rows of an offer are deleted when its limit changes, as they are not kept without one. """
+        self._create_order(10)
+        self.assertEqual(OfferUserDiscount.get_total(self.offer, self.user), 10)
+
+        self.offer.max_user_discount = None
+        self.offer.save()
+        self.assertFalse(OfferUserDiscount.objects.exists())
+
+        self._create_order(25, status=ORDER.OPEN).set_status(ORDER.COMPLETE)
+        self.offer.max_user_discount = 150
+        self.offer.save()
+        self.assertEqual(OfferUserDiscount.get_total(self.offer, self.user), 35)
+
+    def test_usage_update_keeps_rows(self):
+        """ Verify saving an offer without changing its limit keeps its ledger rows. """
+        self._create_order(10)
+        OfferUserDiscount.get_total(self.offer, self.user)
+
+        offer = ConditionalOffer.objects.get(id=self.offer.id)
+        offer.record_usage({'discount': 10, 'freq': 1})
+        ConditionalOffer.objects.only('id').get(id=self.offer.id).save()
+        self.assertEqual(self._get_ledger_total(), 10)
+
+    def test_offer_without_limit_is_not_recorded(self):
+        """ Verify no ledger rows are kept for offers without a per user discount limit. """
+        self.offer.max_user_discount = None
+        self.offer.save()
+
+        order = self._create_order(25, status=ORDER.OPEN)
+        order.set_status(ORDER.COMPLETE)
+        self.assertFalse(OfferUserDiscount.objects.exists())
+
+    def test_refund_refreshes_row(self):
+        """ Verify the discounts of a refunded order are removed from the ledger. """
+        self._create_order(10)
+        order = self._create_order(25)
+        self.assertEqual(OfferUserDiscount.get_total(self.offer, self.user), 35)
+
+        refund = RefundFactory(order=order, user=self.user, status=REFUND.COMPLETE)
+        post_refund.send(sender=refund.__class__, refund=refund)
+        self.assertEqual(self._get_ledger_total(), 10)
+
+
+class OfferUtilizationTests(TestCase):
+    """ Tests for the OfferUtilization summary. """
+
+    def setUp(self):
+        super(OfferUtilizationTests, self).setUp()
+        self.offer = EnterpriseOfferFactory(partner=self.partner, max_discount=1000)
+
+    def _create_order(self, amount, status=ORDER.COMPLETE, offer=None):
+        order = factories.OrderFactory(status=status)
+        factories.OrderDiscountFactory(order=order, offer_id=(offer or self.offer).id, amount=amount)
+        return order
+
+    def _get_utilization(self):
+        utilization = OfferUtilization.objects.get(offer=self.offer)
+        return utilization.total_discount, utilization.num_orders
+
+    def test_get_utilizations_creates_rows(self):
+        """ Verify missing rows are computed from complete orders with a single aggregate query. """
+        other_offer = EnterpriseOfferFactory(partner=self.partner)
+        unused_offer = EnterpriseOfferFactory(partner=self.partner)
+        self._create_order(10)
+        self._create_order(20)
+        self._create_order(5, offer=other_offer)
+        refunded_order = self._create_order(40)
+        RefundFactory(order=refunded_order, status=REFUND.COMPLETE)
+        self._create_order(80, status=ORDER.OPEN)
+
+        with self.assertNumQueries(3):
+            utilizations = OfferUtilization.get_utilizations([self.offer, other_offer, unused_offer])
+        self.assertEqual(utilizations[self.offer.id].total_discount, 70)
+        self.assertEqual(utilizations[other_offer.id].total_discount, 5)
+        self.assertEqual(utilizations[unused_offer.id].num_orders, 0)
+        self.assertEqual(self._get_utilization(), (70, 3))
+
+        with self.assertNumQueries(1):
+            self.assertEqual(OfferUtilization.get_utilization(self.offer).total_discount, 70)
+
+    def test_completed_order_is_recorded(self):
+        """ Verify the discounts of an order are added to the summary when the order is completed. """
+        self._create_order(10)
+        OfferUtilization.get_utilization(self.offer)
+
+        order = self._create_order(25, status=ORDER.OPEN)
+        self.assertEqual(self._get_utilization(), (10, 1))
+
+        order.set_status(ORDER.COMPLETE)
+        self.assertEqual(self._get_utilization(), (35, 2))
+
+    def test_completed_order_creates_row(self):
+        """ Verify completing an order creates a missing summary from every order. """
+        self._create_order(10)
+        order = self._create_order(25, status=ORDER.OPEN)
+
+        order.set_status(ORDER.COMPLETE)
+        self.assertEqual(self._get_utilization(), (35, 2))
+
+    def test_refund_keeps_row(self):
+        """ Verify the discounts of a refunded order stay in the summary, as the order is still complete. """
+        self._create_order(10)
+        order = self._create_order(25)
+        self.assertEqual(OfferUtilization.get_utilization(self.offer).total_discount, 35)
+
+        refund = RefundFactory(order=order, status=REFUND.COMPLETE)
+        post_refund.send(sender=refund.__class__, refund=refund)
+        self.assertEqual(self._get_utilization(), (35, 2))
+
 
 @ddt.ddt
 class TestOfferAssignmentEmailSentRecord(TestCase):
@@ -737,6 +977,22 @@ class TestCodeAssignmentNudgeEmails(TestCase):
         assert nudge_email.is_subscribed
         assert nudge_email.options['base_enterprise_url'] == ''
 
+    def test_bulk_subscribe_nudge_emails(self):
+        """ Verify every user email and code is subscribed to the nudge email cycle once. """
+        CodeAssignmentNudgeEmails.subscribe_nudge_emails('foo@bar.com', 'foo')
+        user_email_codes = [('foo@bar.com', 'foo'), ('foo@bar.com', 'bar'), ('baz@bar.com', 'foo')]
+
+        with self.assertNumQueries(7):
+            CodeAssignmentNudgeEmails.bulk_subscribe_nudge_emails(user_email_codes, base_enterprise_url='https://a.b')
+
+        nudge_emails = CodeAssignmentNudgeEmails.objects.all()
+        assert nudge_emails.count() == 9
+        assert {(email.user_email, email.code) for email in nudge_emails} == set(user_email_codes)
+        assert nudge_emails.filter(options={'base_enterprise_url': 'https://a.b'}).count() == 6
+        day10 = nudge_emails.get(user_email='baz@bar.com', email_template__email_type=DAY10)
+        assert (day10.email_date - nudge_emails.get(user_email='baz@bar.com', email_template__email_type=DAY3)
+                .email_date).days == 7
+
 
 @ddt.ddt
 class TestTemplateFileAttachment(TestCase):
@@ -19,7 +19,7 @@ from ecommerce.extensions.offer.utils import (
     format_assigned_offer_email,
     format_benefit_value,
     format_email,
-    send_assigned_offer_email,
+    send_assigned_offer_emails,
     send_assigned_offer_reminder_email,
     send_revoked_offer_email
 )
@@ -132,7 +132,7 @@ class UtilTests(DiscoveryTestMixin, TestCase):
         ),
     )
     @ddt.unpack
-    def test_send_assigned_offer_email(
+    def test_send_assigned_offer_emails_args(
             self,
             subject,
             greeting,
@@ -147,20 +147,20 @@ class UtilTests(DiscoveryTestMixin, TestCase):
     ):
         """ Test that the offer assignment email message is sent to async task. """
         mock_email_task.delay.side_effect = side_effect
-        send_assigned_offer_email(
-            subject,
-            greeting,
-            closing,
-            tokens.get('offer_assignment_id'),
-            tokens.get('learner_email'),
-            tokens.get('code'),
-            tokens.get('redemptions_remaining'),
-            tokens.get('code_expiration_date'),
-            sender_alias,
-            reply_to,
-            base_enterprise_url,
-            attachments,
-        )
+        send_assigned_offer_emails([{
+            'subject': subject,
+            'greeting': greeting,
+            'closing': closing,
+            'offer_assignment_id': tokens.get('offer_assignment_id'),
+            'learner_email': tokens.get('learner_email'),
+            'code': tokens.get('code'),
+            'redemptions_remaining': tokens.get('redemptions_remaining'),
+            'code_expiration_date': tokens.get('code_expiration_date'),
+            'sender_alias': sender_alias,
+            'reply_to': reply_to,
+            'base_enterprise_url': base_enterprise_url,
+            'attachments': attachments,
+        }])
         mock_email_task.delay.assert_called_once_with(
             tokens.get('learner_email'),
             tokens.get('offer_assignment_id'),
@@ -214,7 +214,7 @@ class UtilTests(DiscoveryTestMixin, TestCase):
         ),
     )
     @ddt.unpack
-    def test_send_assigned_offer_email_via_braze(
+    def test_send_assigned_offer_emails_via_braze(
             self,
             subject,
             greeting,
@@ -233,20 +233,20 @@ class UtilTests(DiscoveryTestMixin, TestCase):
         switch.active = True
         switch.save()
         mock_email_task.delay.side_effect = side_effect
-        send_assigned_offer_email(
-            subject,
-            greeting,
-            closing,
-            tokens.get('offer_assignment_id'),
-            tokens.get('learner_email'),
-            tokens.get('code'),
-            tokens.get('redemptions_remaining'),
-            tokens.get('code_expiration_date'),
-            sender_alias,
-            reply_to,
-            base_enterprise_url,
-            attachments
-        )
+        send_assigned_offer_emails([{
+            'subject': subject,
+            'greeting': greeting,
+            'closing': closing,
+            'offer_assignment_id': tokens.get('offer_assignment_id'),
+            'learner_email': tokens.get('learner_email'),
+            'code': tokens.get('code'),
+            'redemptions_remaining': tokens.get('redemptions_remaining'),
+            'code_expiration_date': tokens.get('code_expiration_date'),
+            'sender_alias': sender_alias,
+            'reply_to': reply_to,
+            'base_enterprise_url': base_enterprise_url,
+            'attachments': attachments,
+        }])
         email_body = format_assigned_offer_email(
             greeting,
             closing,
@@ -268,19 +268,19 @@ class UtilTests(DiscoveryTestMixin, TestCase):
         )
 
     @mock.patch('ecommerce.extensions.offer.utils.send_offer_assignment_email')
-    def test_send_assigned_offer_email_without_base_ent_url_and_attachments(self, mock_email_task):
-        send_assigned_offer_email(
-            "You have mail",
-            "you",
-            "KTHXBAI",
-            42,
-            "bears@bearparty.com",
-            'BearsOnly',
-            1,
-            '2020-12-19',
-            'sender alias',
-            'edx@example.com',
-        )
+    def test_send_assigned_offer_emails_without_base_ent_url_and_attachments(self, mock_email_task):
+        send_assigned_offer_emails([{
+            'subject': "You have mail",
+            'greeting': "you",
+            'closing': "KTHXBAI",
+            'offer_assignment_id': 42,
+            'learner_email': "bears@bearparty.com",
+            'code': 'BearsOnly',
+            'redemptions_remaining': 1,
+            'code_expiration_date': '2020-12-19',
+            'sender_alias': 'sender alias',
+            'reply_to': 'edx@example.com',
+        }])
 
         mock_email_task.delay.assert_called_once_with(
             "bears@bearparty.com",
@@ -293,6 +293,76 @@ class UtilTests(DiscoveryTestMixin, TestCase):
             base_enterprise_url=''
         )
 
+    @mock.patch('ecommerce.extensions.offer.utils.send_offer_assignment_email')
+    def test_send_assigned_offer_emails(self, mock_email_task):
+        """ Test that a task is queued for each offer assignment email. """
+        emails = [
+            {
+                'subject': 'You have mail',
+                'greeting': 'you',
+                'closing': 'KTHXBAI',
+                'offer_assignment_id': offer_assignment_id,
+                'learner_email': 'bears{}@bearparty.com'.format(offer_assignment_id),
+                'code': 'BearsOnly',
+                'redemptions_remaining': 1,
+                'code_expiration_date': '2020-12-19',
+                'sender_alias': 'sender alias',
+                'reply_to': 'edx@example.com',
+                'base_enterprise_url': 'https://bears.party',
+            }
+            for offer_assignment_id in range(3)
+        ]
+
+        send_assigned_offer_emails(emails)
+
+        self.assertEqual(mock_email_task.delay.call_args_list, [
+            mock.call(
+                email['learner_email'],
+                email['offer_assignment_id'],
+                'You have mail',
+                format_assigned_offer_email(
+                    'you', 'KTHXBAI', email['learner_email'], 'BearsOnly', 1, '2020-12-19', 'https://bears.party'
+                ),
+                'sender alias',
+                'edx@example.com',
+                attachments=[],
+                base_enterprise_url='https://bears.party',
+            )
+            for email in emails
+        ])
+
+    @mock.patch('ecommerce.extensions.offer.utils.send_offer_assignment_email')
+    def test_send_assigned_offer_emails_error(self, mock_email_task):
+        """ Test that an email which cannot be queued is logged, and the following emails are still queued. """
+        mock_email_task.delay.side_effect = [Exception('Ignore me - assignment'), None]
+        emails = [
+            {
+                'subject': 'You have mail',
+                'greeting': 'you',
+                'closing': 'KTHXBAI',
+                'offer_assignment_id': offer_assignment_id,
+                'learner_email': 'bears{}@bearparty.com'.format(offer_assignment_id),
+                'code': 'BearsOnly',
+                'redemptions_remaining': 1,
+                'code_expiration_date': '2020-12-19',
+                'sender_alias': 'sender alias',
+                'reply_to': 'edx@example.com',
+            }
+            for offer_assignment_id in range(2)
+        ]
+
+        with self.assertLogs('ecommerce.extensions.offer.utils', level='ERROR') as logs:
+            send_assigned_offer_emails(emails)
+
+        self.assertEqual(mock_email_task.delay.call_count, 2)
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('[Offer Assignment] Email for offer_assignment_id: 0 ', logs.records[0].getMessage())
+
+    @mock.patch('ecommerce.extensions.offer.utils.send_offer_assignment_email')
+    def test_send_assigned_offer_emails_without_emails(self, mock_email_task):
+        send_assigned_offer_emails([])
+        mock_email_task.delay.assert_not_called()
+
     @mock.patch('ecommerce.extensions.offer.utils.send_offer_update_email')
     @ddt.data(
         (
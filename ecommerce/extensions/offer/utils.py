@@ -158,58 +158,54 @@ def format_assigned_offer_email(
     return format_email(email_template, placeholder_dict, greeting, closing, base_enterprise_url)
 
 
-def send_assigned_offer_email(
-        subject,
-        greeting,
-        closing,
-        offer_assignment_id,
-        learner_email,
-        code,
-        redemptions_remaining,
-        code_expiration_date,
-        sender_alias,
-        reply_to,
-        base_enterprise_url='',
-        attachments=None):
+def send_assigned_offer_emails(assigned_offer_emails):
     """
+    Sends the offer assignment emails of codes assigned in bulk, with one send_offer_assignment_email task each.
+    An email that cannot be sent is logged, and the others are still sent.
+
     Arguments:
-        *subject*
-            The email subject
-        *email_greeting*
-            The email greeting (prefix)
-        *email_closing*
-            The email closing (suffix)
-        *offer_assignment_id*
-            Primary key of the entry in the offer_assignment model.
-        *learner_email*
-            Email of the customer who will receive the code.
-        *code*
-            Code for the user.
-        *redemptions_remaining*
-            Number of times the code can be redeemed.
-        *code_expiration_date*
-            Date till code is valid.
-        *attachments*
-            Attachments to be sent with email.
+        *assigned_offer_emails*
+            Dicts holding, for each email, its subject, greeting, closing, offer_assignment_id, learner_email,
+            code, redemptions_remaining, code_expiration_date, sender_alias, reply_to, and optionally its
+            base_enterprise_url and attachments.
     """
-    attachments = [] if attachments is None else attachments
-    email_body = format_assigned_offer_email(
-        greeting,
-        closing,
-        learner_email,
-        code,
-        redemptions_remaining,
-        code_expiration_date,
-        base_enterprise_url
-    )
-
     if settings.DEBUG:  # pragma: no cover
         # Avoid breaking devstack when no such service is available.
-        logger.warning("Skipping email task 'send_assigned_offer_email' because DEBUG=true.")  # pragma: no cover
+        logger.warning("Skipping email task 'send_assigned_offer_emails' because DEBUG=true.")  # pragma: no cover
         return  # pragma: no cover
 
-    send_offer_assignment_email.delay(learner_email, offer_assignment_id, subject, email_body, sender_alias,
-                                      reply_to, attachments=attachments, base_enterprise_url=base_enterprise_url)
+    for email in assigned_offer_emails:
+        try:
+            email_body = format_assigned_offer_email(
+                email['greeting'],
+                email['closing'],
+                email['learner_email'],
+                email['code'],
+                email['redemptions_remaining'],
+                email['code_expiration_date'],
+                email.get('base_enterprise_url', ''),
+            )
+            send_offer_assignment_email.delay(
+                email['learner_email'],
+                email['offer_assignment_id'],
+                email['subject'],
+                email_body,
+                email['sender_alias'],
+                email['reply_to'],
+                attachments=email.get('attachments') or [],
+                base_enterprise_url=email.get('base_enterprise_url', ''),
+            )
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.exception(  # pylint: disable=logging-too-many-args
+                '[Offer Assignment] Email for offer_assignment_id: %d with subject %r, '
+                'greeting %r closing %r and attachments %r, raised exception: %r',
+                email['offer_assignment_id'],
+                email['subject'],
+                email['greeting'],
+                email['closing'],
+                email.get('attachments'),
+                exc
+            )
 
 
 def send_revoked_offer_email(
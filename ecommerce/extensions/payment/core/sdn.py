@@ -4,7 +4,9 @@ import io
 import logging
 import re
 import string
+import threading
 import unicodedata
+from collections import defaultdict
 from datetime import datetime, timezone
 from urllib.parse import urlencode
 
@@ -24,6 +26,11 @@ BasketAttribute = get_model('basket', 'BasketAttribute')
 BasketAttributeType = get_model('basket', 'BasketAttributeType')
 
 COUNTRY_CODES = {country.alpha_2 for country in pycountry.countries}
+SDN_FALLBACK_SOURCE = 'Specially Designated Nationals (SDN) - Treasury Department'
+SDN_FALLBACK_TYPE = 'Individual'
+
+_sdn_fallback_matcher = None
+_sdn_fallback_matcher_lock = threading.Lock()
 
 
 def checkSDN(request, name, city, country):
@@ -88,18 +95,94 @@ def checkSDNFallback(name, city, country):
         3. Punctuation between words or at the beginning/end of a given word doesn’t matter
         4. If a subset of words match, it still counts as a match
         5. Capitalization doesn’t matter
+
+    The comparison is answered by an in-memory SDNFallbackMatcher built from the current import.
     """
-    hit_count = 0
-    records = SDNFallbackData.get_current_records_and_filter_by_source_and_type(
-        'Specially Designated Nationals (SDN) - Treasury Department', 'Individual'
-    )
-    records = records.filter(countries__contains=country)
-    processed_name, processed_city = process_text(name), process_text(city)
-    for record in records:
-        record_names, record_addresses = set(record.names.split()), set(record.addresses.split())
-        if (processed_name.issubset(record_names) and processed_city.issubset(record_addresses)):
-            hit_count = hit_count + 1
-    return hit_count
+    return get_sdn_fallback_matcher().count_hits(name, city, country)
+
+
+class SDNFallbackMatcher:
+    """
+    Inverted token index over the SDN fallback records of one SDNFallbackMetadata import.
+
+    For every country a record lists, each of the record's name and address tokens maps to the
+    ids of the records containing it. A record matches a query when every query name token is
+    one of its names and every query city token is one of its addresses, so the matching records
+    are the intersection of the id sets of the query tokens. Queries without a country are
+    matched against every record, under the ALL_COUNTRIES key.
+    """
+    ALL_COUNTRIES = None
+
+    def __init__(self, records, version=None):
+        """
+        Args:
+            records (iterable): (id, names, addresses, countries) tuples, with the same processed,
+                space separated values as stored in SDNFallbackData.
+            version (tuple): Id and import timestamp of the SDNFallbackMetadata the records belong to.
+        """
+        self.version = version
+        self._country_records = defaultdict(set)
+        self._name_tokens = defaultdict(set)
+        self._address_tokens = defaultdict(set)
+
+        for record_id, names, addresses, countries in records:
+            names, addresses = set(names.split()), set(addresses.split())
+            for country in [self.ALL_COUNTRIES] + countries.split():
+                self._country_records[country].add(record_id)
+                for token in names:
+                    self._name_tokens[(country, token)].add(record_id)
+                for token in addresses:
+                    self._address_tokens[(country, token)].add(record_id)
+
+    @classmethod
+    def build(cls, metadata_id, import_timestamp):
+        """ Build a matcher from the SDN individuals imported with the given SDNFallbackMetadata. """
+        records = SDNFallbackData.objects.filter(
+            sdn_fallback_metadata_id=metadata_id, source=SDN_FALLBACK_SOURCE, sdn_type=SDN_FALLBACK_TYPE
+        ).values_list('id', 'names', 'addresses', 'countries')
+        return cls(records.iterator(), version=(metadata_id, import_timestamp))
+
+    def count_hits(self, name, city, country):
+        """
+        Returns:
+            int: The number of records in the country, or in any country if none is given, matching both
+                the name and the city.
+        """
+        country = country or self.ALL_COUNTRIES
+        candidates = self._country_records.get(country)
+        for index, text in ((self._name_tokens, name), (self._address_tokens, city)):
+            for token in process_text(text) or ():
+                if not candidates:
+                    return 0
+                candidates = candidates & index.get((country, token), set())
+        return len(candidates) if candidates else 0
+
+
+def get_sdn_fallback_matcher():
+    """
+    Return the SDN fallback matcher of this process, rebuilding it if a new import has become current.
+
+    Raises:
+        SDNFallbackDataEmptyError: If no SDN fallback data has been imported.
+    """
+    global _sdn_fallback_matcher  # pylint: disable=global-statement
+
+    current_metadata = SDNFallbackMetadata.objects.filter(
+        import_state='Current'
+    ).values_list('id', 'import_timestamp').first()
+    if current_metadata is None:
+        # Logs that the data needs to be imported and raises SDNFallbackDataEmptyError.
+        SDNFallbackData.get_current_records_and_filter_by_source_and_type(SDN_FALLBACK_SOURCE, SDN_FALLBACK_TYPE)
+
+    matcher = _sdn_fallback_matcher
+    if matcher is None or matcher.version != current_metadata:
+        with _sdn_fallback_matcher_lock:
+            matcher = _sdn_fallback_matcher
+            if matcher is None or matcher.version != current_metadata:
+                matcher = SDNFallbackMatcher.build(*current_metadata)
+                _sdn_fallback_matcher = matcher
+                logger.info('SDNFallback: Built SDN fallback matcher for metadata id %s.', current_metadata[0])
+    return matcher
 
 
 class SDNClient:
@@ -285,32 +368,43 @@ def populate_sdn_fallback_metadata(sdn_csv_string):
     return metadata_entry
 
 
-def populate_sdn_fallback_data(sdn_csv_string, metadata_entry):
+def process_sdn_csv(sdn_csv_string):
     """
-    Process CSV data and create SDNFallbackData records
+    Process CSV data into the field values stored in SDNFallbackData
 
     Args:
         sdn_csv_string (str): String of the sdn csv
-        metadata_entry (SDNFallbackMetadata): Instance of the current SDNFallbackMetadata class
+
+    Yields:
+        dict: source, sdn_type, names, addresses and countries of each row
     """
     sdn_csv_reader = csv.DictReader(io.StringIO(sdn_csv_string))
-    processed_records = []
     for row in sdn_csv_reader:
         sdn_source, sdn_type, names, addresses, alt_names, ids = (
             row['source'] or '', row['type'] or '', row['name'] or '',
             row['addresses'] or '', row['alt_names'] or '', row['ids'] or ''
         )
-        processed_names = ' '.join(process_text(' '.join(filter(None, [names, alt_names]))))
-        processed_addresses = ' '.join(process_text(addresses))
-        countries = extract_country_information(addresses, ids)
-        processed_records.append(SDNFallbackData(
-            sdn_fallback_metadata=metadata_entry,
-            source=sdn_source,
-            sdn_type=sdn_type,
-            names=processed_names,
-            addresses=processed_addresses,
-            countries=countries
-        ))
+        yield {
+            'source': sdn_source,
+            'sdn_type': sdn_type,
+            'names': ' '.join(process_text(' '.join(filter(None, [names, alt_names])))),
+            'addresses': ' '.join(process_text(addresses)),
+            'countries': extract_country_information(addresses, ids),
+        }
+
+
+def populate_sdn_fallback_data(sdn_csv_string, metadata_entry):
+    """
+    Process CSV data and create SDNFallbackData records
+
+    Args:
+        sdn_csv_string (str): String of the sdn csv
+        metadata_entry (SDNFallbackMetadata): Instance of the current SDNFallbackMetadata class
+    """
+    processed_records = [
+        SDNFallbackData(sdn_fallback_metadata=metadata_entry, **fields)
+        for fields in process_sdn_csv(sdn_csv_string)
+    ]
     # Bulk create should be more efficient for a few thousand records without needing to use SQL directly.
     SDNFallbackData.objects.bulk_create(processed_records)
 
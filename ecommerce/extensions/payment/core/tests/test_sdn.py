@@ -16,9 +16,11 @@ from requests.exceptions import HTTPError, Timeout
 from ecommerce.core.models import User
 from ecommerce.extensions.payment.core.sdn import (
     SDNClient,
+    SDNFallbackMatcher,
     checkSDN,
     checkSDNFallback,
     extract_country_information,
+    get_sdn_fallback_matcher,
     populate_sdn_fallback_data,
     populate_sdn_fallback_data_and_metadata,
     populate_sdn_fallback_metadata,
@@ -520,6 +522,54 @@ Port Andrewport, OR 39456, EE",,,,,,,,,,,,,,http://douglas.com/,Misty Johnson,CV
         self.assertEqual(sdn_fallback_hit_count, 2)
 
 
+class SDNFallbackMatcherTests(TestCase):
+    """ Tests for the in-memory SDN fallback matcher. """
+
+    def test_count_hits(self):
+        """ Verify a record matches when all name and city tokens are among its names and addresses. """
+        matcher = SDNFallbackMatcher([
+            (1, 'juan m de la cruz wendy', 'north kristinaport hi', 'SN'),
+            (2, 'juan cruz', 'north kristinaport hi', 'SN IQ'),
+            (3, 'juan cruz', 'north kristinaport hi', ''),
+        ])
+        self.assertEqual(matcher.count_hits('Juan Cruz', 'Kristinaport', 'SN'), 2)
+        self.assertEqual(matcher.count_hits('Juan Cruz', 'Kristinaport', 'IQ'), 1)
+        self.assertEqual(matcher.count_hits('Wendy', 'North, HI', 'SN'), 1)
+        self.assertEqual(matcher.count_hits('Juan Wendy', 'Kristinaport', 'IQ'), 0)
+        self.assertEqual(matcher.count_hits('Juan', 'Springfield', 'SN'), 0)
+        self.assertEqual(matcher.count_hits('Juan', 'Kristinaport', 'US'), 0)
+
+    def test_count_hits_without_country(self):
+        """ Verify a check without a country is matched against the records of every country. """
+        matcher = SDNFallbackMatcher([
+            (1, 'juan cruz', 'north kristinaport hi', 'SN'),
+            (2, 'juan cruz', 'north kristinaport hi', 'IQ'),
+            (3, 'juan cruz', 'north kristinaport hi', ''),
+            (4, 'sarah jones', 'north kristinaport hi', 'SN'),
+        ])
+        self.assertEqual(matcher.count_hits('Juan Cruz', 'Kristinaport', ''), 3)
+        self.assertEqual(matcher.count_hits('Juan Cruz', 'Kristinaport', None), 3)
+        self.assertEqual(matcher.count_hits('Sarah', 'Springfield', ''), 0)
+
+    def test_rebuilt_for_new_import(self):
+        """ Verify the matcher is reused until a new SDN csv is imported. """
+        # pylint: disable=line-too-long
+        csv_string = """_id,source,entity_number,type,programs,name,title,addresses,federal_register_notice,start_date,end_date,standard_order,license_requirement,license_policy,call_sign,vessel_type,gross_tonnage,gross_registered_tonnage,vessel_flag,vessel_owner,remarks,source_list_url,alt_names,citizenships,dates_of_birth,nationalities,places_of_birth,source_information_url,ids
+94734218,Specially Designated Nationals (SDN) - Treasury Department,96663868,Individual,material,{name},Dr.,"17472 Christie Stream Apt. 976 North Kristinaport, HI 91033, SN",,,,,,,,,,,,,,https://www.juarez-collier.org/,,DJ,1944-03-05,Faroe Islands,PK,http://richardson-richardson.org/,CI"""
+        # pylint: enable=line-too-long
+        populate_sdn_fallback_data_and_metadata(csv_string.format(name='Juan Cruz'))
+        matcher = get_sdn_fallback_matcher()
+        self.assertEqual(checkSDNFallback('Juan', 'Kristinaport', 'SN'), 1)
+
+        with self.assertNumQueries(1):
+            self.assertIs(get_sdn_fallback_matcher(), matcher)
+
+        populate_sdn_fallback_data_and_metadata(csv_string.format(name='Sarah Jones'))
+        self.assertIsNot(get_sdn_fallback_matcher(), matcher)
+        self.assertEqual(checkSDNFallback('Juan', 'Kristinaport', 'SN'), 0)
+        self.assertEqual(checkSDNFallback('Sarah', 'Kristinaport', 'SN'), 1)
+
+
 class SDNFallbackTestsWithoutSetup(TestCase):
     def test_SDNFallback_empty_data(self):
         """
@@ -0,0 +1,168 @@
+"""
+Django management command to refund the transactions made against many baskets.
+"""
+import json
+
+from django.contrib.sites.models import Site
+from django.core.management.base import BaseCommand, CommandError
+
+from ecommerce.management.models import RefundJournal, RefundJournalEntry
+from ecommerce.management.utils import BulkRefundRunner
+
+
+class Command(BaseCommand):
+    """
+    Refund the transactions made against baskets, as the management view does, with a BulkRefundRunner.
+
+    The progress of a run is recorded in a refund journal, whose ID is printed first. A run that was interrupted
+    is resumed with --resume; transactions refunded, or being refunded, by another run are skipped.
+
+    Example:
+
+        ./manage.py refund_basket_transactions --basket-ids-file baskets.txt --rate-limit cybersource=5
+        ./manage.py refund_basket_transactions --resume 12 --report refunds.json
+    """
+
+    help = 'Refund the transactions made against baskets.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--basket-ids',
+            help='Comma-separated list of the IDs of the baskets to refund.'
+        )
+        parser.add_argument(
+            '--basket-ids-file',
+            help='Path of a file with the ID of a basket to refund on each line.'
+        )
+        parser.add_argument(
+            '--site-id',
+            type=int,
+            default=None,
+            help='ID of the site of the baskets. Defaults to the current site.'
+        )
+        parser.add_argument(
+            '--resume',
+            type=int,
+            dest='journal_id',
+            default=None,
+            help='ID of the refund journal of an interrupted run to resume, instead of refunding baskets.'
+        )
+        parser.add_argument(
+            '--retry-interrupted',
+            action='store_true',
+            help='When resuming, also issue the credits that were in progress when the run was interrupted. Only '
+                 'use it once these transactions were checked not to be refunded.'
+        )
+        parser.add_argument(
+            '--max-workers',
+            type=int,
+            default=None,
+            help='Number of credits issued at the same time. Defaults to BULK_REFUND_MAX_WORKERS.'
+        )
+        parser.add_argument(
+            '--max-retries',
+            type=int,
+            default=None,
+            help='Number of times a credit that failed before reaching the payment processor is retried. '
+                 'Defaults to BULK_REFUND_MAX_RETRIES.'
+        )
+        parser.add_argument(
+            '--rate-limit',
+            action='append',
+            dest='rate_limits',
+            default=None,
+            help='Maximum number of credits issued per second by a payment processor, as processor=rate. May be '
+                 'repeated. Defaults to BULK_REFUND_RATE_LIMITS.'
+        )
+        parser.add_argument(
+            '--report',
+            help='Path of a file to write the summary report to, as JSON.'
+        )
+
+    def handle(self, *args, **options):
+        runner = BulkRefundRunner(
+            self._get_site(options),
+            max_workers=options['max_workers'],
+            max_retries=options['max_retries'],
+            rate_limits=self._parse_rate_limits(options['rate_limits']),
+        )
+
+        if options['journal_id']:
+            try:
+                journal = RefundJournal.objects.get(id=options['journal_id'])
+            except RefundJournal.DoesNotExist:
+                raise CommandError(  # pylint: disable=raise-missing-from
+                    'Refund journal [{}] does not exist.'.format(options['journal_id'])
+                )
+        else:
+            journal = runner.create_journal(self._get_basket_ids(options))
+        self.stdout.write('Refund journal: {}'.format(journal.id))
+
+        summary = runner.run(journal, retry_interrupted=options['retry_interrupted'])
+
+        for processor_name, statuses in sorted(summary['processors'].items()):
+            self.stdout.write('{processor_name}: {statuses}'.format(
+                processor_name=processor_name or '-', statuses=self._format_statuses(statuses)
+            ))
+        for basket_id, processor_name, transaction_id, error in summary['failures']:
+            self.stdout.write('Failed to refund [{}] transaction [{}] of basket [{}]: {}'.format(
+                processor_name, transaction_id, basket_id, error
+            ))
+        if summary['statuses'][RefundJournalEntry.IN_PROGRESS]:
+            self.stdout.write(self.style.WARNING(
+                '{} transaction(s) were in progress when a previous run was interrupted. Check whether they were '
+                'refunded, then run with --resume {} --retry-interrupted to refund them.'.format(
+                    summary['statuses'][RefundJournalEntry.IN_PROGRESS], journal.id
+                )
+            ))
+        self.stdout.write('Total: {}'.format(self._format_statuses(summary['statuses'])))
+
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8') as report:
+                json.dump(summary, report, indent=2)
+
+    @staticmethod
+    def _get_site(options):
+        if options['journal_id']:
+            journal = RefundJournal.objects.filter(id=options['journal_id']).select_related('site').first()
+            if journal:
+                return journal.site
+        if options['site_id']:
+            return Site.objects.get(id=options['site_id'])
+        return Site.objects.get_current()
+
+    @staticmethod
+    def _get_basket_ids(options):
+        values = []
+        if options['basket_ids']:
+            values += options['basket_ids'].split(',')
+        if options['basket_ids_file']:
+            with open(options['basket_ids_file'], encoding='utf-8') as basket_ids_file:
+                values += basket_ids_file.read().split()
+        try:
+            basket_ids = [int(value.strip()) for value in values if value.strip()]
+        except ValueError:
+            raise CommandError('Basket IDs must be integers.')  # pylint: disable=raise-missing-from
+        if not basket_ids:
+            raise CommandError('Provide the baskets to refund with --basket-ids or --basket-ids-file, or a refund '
+                               'journal to resume with --resume.')
+        return basket_ids
+
+    @staticmethod
+    def _parse_rate_limits(values):
+        if values is None:
+            return None
+        rate_limits = {}
+        for value in values:
+            processor_name, __, rate = value.partition('=')
+            try:
+                rate_limits[processor_name] = float(rate)
+            except ValueError:
+                raise CommandError(  # pylint: disable=raise-missing-from
+                    'Rate limits must be given as processor=rate, not [{}].'.format(value)
+                )
+        return rate_limits
+
+    @staticmethod
+    def _format_statuses(statuses):
+        return ', '.join('{} {}'.format(count, status) for status, count in statuses.items() if count) or 'nothing'
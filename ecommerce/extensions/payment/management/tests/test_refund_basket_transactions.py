@@ -0,0 +1,76 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+import mock
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from ecommerce.extensions.payment.models import PaymentProcessorResponse
+from ecommerce.extensions.payment.processors.paypal import Paypal
+from ecommerce.extensions.test.factories import create_basket
+from ecommerce.management.models import RefundJournal, RefundJournalEntry
+from ecommerce.tests.testcases import TestCase
+
+
+class RefundBasketTransactionsCommandTests(TestCase):
+    def setUp(self):
+        super(RefundBasketTransactionsCommandTests, self).setUp()
+        self.baskets = [create_basket(site=self.site) for __ in range(3)]
+        for basket in self.baskets:
+            PaymentProcessorResponse.objects.create(
+                basket=basket, transaction_id='PAY-{}'.format(basket.id), processor_name=Paypal.NAME
+            )
+
+    def call_command(self, *args):
+        stdout = StringIO()
+        call_command('refund_basket_transactions', *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_refund(self):
+        """ Verify the transactions of the baskets are refunded and summarized. """
+        basket_ids = ','.join(str(basket.id) for basket in self.baskets)
+        with mock.patch.object(Paypal, 'issue_credit', return_value='REFUND') as mock_issue_credit:
+            output = self.call_command('--basket-ids', basket_ids, '--max-workers', '2', '--rate-limit', 'paypal=100')
+
+        assert mock_issue_credit.call_count == 3
+        journal = RefundJournal.objects.get()
+        assert 'Refund journal: {}'.format(journal.id) in output
+        assert 'paypal: 3 succeeded' in output
+        assert 'Total: 3 succeeded' in output
+
+    def test_resume_with_report(self):
+        """ Verify a journal is resumed, and its summary written to the report. """
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        basket_ids_path = os.path.join(directory, 'baskets.txt')
+        with open(basket_ids_path, 'w', encoding='utf-8') as basket_ids_file:
+            basket_ids_file.write('\n'.join(str(basket.id) for basket in self.baskets))
+
+        with mock.patch.object(Paypal, 'issue_credit', side_effect=Exception('Declined')):
+            output = self.call_command('--basket-ids-file', basket_ids_path, '--max-retries', '0')
+        journal = RefundJournal.objects.get()
+        assert 'Failed to refund [paypal] transaction [PAY-{0}] of basket [{0}]'.format(self.baskets[0].id) in output
+        journal.entries.update(status=RefundJournalEntry.PENDING)
+
+        report = os.path.join(directory, 'report.json')
+        with mock.patch.object(Paypal, 'issue_credit', return_value='REFUND'):
+            self.call_command('--resume', str(journal.id), '--report', report)
+        with open(report, encoding='utf-8') as report_file:
+            summary = json.load(report_file)
+        assert summary['journal_id'] == journal.id
+        assert summary['statuses'][RefundJournalEntry.SUCCEEDED] == 3
+        assert summary['failures'] == []
+
+    def test_invalid_arguments(self):
+        """ Verify the command fails without baskets, with an unknown journal or with invalid rate limits. """
+        for args in (
+                (),
+                ('--basket-ids', 'a,b'),
+                ('--resume', '404'),
+                ('--basket-ids', '1', '--rate-limit', 'paypal'),
+        ):
+            with self.assertRaises(CommandError):
+                self.call_command(*args)
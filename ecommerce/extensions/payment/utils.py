@@ -24,6 +24,12 @@ def get_basket_program_uuid(basket):
     Returns:
         string: The program UUID if the basket is associated with a bundled purchase, otherwise None.
     """
+    if 'basketattribute_set' in getattr(basket, '_prefetched_objects_cache', {}):
+        # Answer from the prefetched attributes instead of querying per basket.
+        for attribute in basket.basketattribute_set.all():
+            if attribute.attribute_type.name == 'bundle_identifier':
+                return attribute.value_text
+        return None
     try:
         attribute_type = BasketAttributeType.objects.get(name='bundle_identifier')
     except BasketAttributeType.DoesNotExist:
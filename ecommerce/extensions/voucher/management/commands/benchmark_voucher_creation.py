@@ -0,0 +1,69 @@
+"""
+Django management command to compare creating vouchers one at a time with the bulk path used by create_vouchers.
+"""
+import datetime
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from oscar.core.loading import get_model
+
+from ecommerce.extensions.voucher.utils import create_new_voucher, create_new_vouchers
+
+Voucher = get_model('voucher', 'Voucher')
+
+
+class Command(BaseCommand):
+    """
+    Time the creation of vouchers with generated codes, one voucher at a time and in bulk.
+
+    Everything is created inside a transaction that is rolled back, so no vouchers are left behind.
+
+    Example:
+
+        ./manage.py benchmark_voucher_creation --quantity 5000
+    """
+
+    help = 'Benchmark creating vouchers one at a time against creating them in bulk.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--quantity',
+            dest='quantity',
+            default=1000,
+            help='Number of vouchers to create with each path.',
+            type=int,
+        )
+
+    def handle(self, *args, **options):
+        quantity = options['quantity']
+        voucher_kwargs = {
+            'end_datetime': timezone.now() + datetime.timedelta(days=30),
+            'name': 'Benchmark voucher',
+            'start_datetime': timezone.now(),
+            'voucher_type': Voucher.SINGLE_USE,
+        }
+
+        self.stdout.write('Creating {} vouchers with codes of length {}.'.format(
+            quantity, settings.VOUCHER_CODE_LENGTH
+        ))
+        self._report('One at a time', lambda: [
+            create_new_voucher(code=None, **voucher_kwargs) for __ in range(quantity)
+        ], quantity)
+        self._report('Bulk', lambda: create_new_vouchers(quantity=quantity, **voucher_kwargs), quantity)
+
+    def _report(self, label, create, quantity):
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                vouchers = create()
+                seconds = time.perf_counter() - start
+            created = len({voucher.code for voucher in vouchers})
+            transaction.set_rollback(True)
+
+        self.stdout.write('{}: {:.3f}s, {} queries, {} distinct codes'.format(label, seconds, len(queries), created))
+        if created != quantity:
+            self.stdout.write(self.style.ERROR('{}: expected {} distinct codes.'.format(label, quantity)))
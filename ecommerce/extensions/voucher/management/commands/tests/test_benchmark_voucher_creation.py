@@ -0,0 +1,23 @@
+from io import StringIO
+
+from django.core.management import call_command
+from oscar.core.loading import get_model
+
+from ecommerce.tests.testcases import TestCase
+
+Voucher = get_model('voucher', 'Voucher')
+
+
+class BenchmarkVoucherCreationTests(TestCase):
+    """Tests for benchmark_voucher_creation management command."""
+
+    def test_benchmark(self):
+        """Test that both paths are reported and no vouchers are left behind."""
+        out = StringIO()
+        call_command('benchmark_voucher_creation', quantity=5, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('One at a time:', output)
+        self.assertIn('Bulk:', output)
+        self.assertEqual(output.count('5 distinct codes'), 2)
+        self.assertFalse(Voucher.objects.exists())
@@ -5,11 +5,13 @@ import logging
 
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import models
+from django.db.models import Count
 from django.utils.translation import ugettext_lazy as _
 from oscar.apps.voucher.abstract_models import (  # pylint: disable=ungrouped-imports
     AbstractVoucher,
     AbstractVoucherApplication
 )
+from oscar.core.loading import get_model
 from simple_history.models import HistoricalRecords
 
 from ecommerce.core.utils import log_message_and_raise_validation_error
@@ -103,6 +105,13 @@ class Voucher(AbstractVoucher):
 
     @property
     def original_offer(self):
+        if 'offers' in getattr(self, '_prefetched_objects_cache', {}):
+            # Answer from the prefetched offers, in their default ordering, instead of querying per voucher.
+            offers = list(self.offers.all())
+            for offer in offers:
+                if offer.condition.range_id is not None:
+                    return offer
+            return sorted(offers, key=lambda offer: offer.date_created)[0]
         try:
             return self.offers.filter(condition__range__isnull=False)[0]
         except (IndexError, ObjectDoesNotExist):
@@ -141,6 +150,40 @@ class Voucher(AbstractVoucher):
 
         return self.calculate_available_slots(enterprise_offer.max_global_applications, num_assignments)
 
+    @classmethod
+    def get_slots_available_for_assignment(cls, vouchers):
+        """
+        Calculate the number of available slots left for each of the vouchers, counting their existing
+        assignments with a single grouped query.
+
+        The offers of the vouchers, and their conditions, should be prefetched.
+
+        Returns:
+            dict: The number of available slots, None for vouchers without an enterprise offer, keyed on voucher code.
+        """
+        OfferAssignment = get_model('offer', 'OfferAssignment')
+        enterprise_offers = {voucher.code: voucher.enterprise_offer for voucher in vouchers}
+        offer_ids = {offer.id for offer in enterprise_offers.values() if offer}
+        # Redeemed OfferAssignments are excluded in favor of using num_orders on each voucher.
+        assignment_counts = OfferAssignment.objects.filter(
+            offer_id__in=offer_ids, code__in=enterprise_offers
+        ).exclude(
+            status__in=[OFFER_REDEEMED, OFFER_ASSIGNMENT_REVOKED]
+        ).values('offer_id', 'code').annotate(count=Count('id')).values_list('offer_id', 'code', 'count')
+        num_assignments = {(offer_id, code): count for offer_id, code, count in assignment_counts}
+
+        slots = {}
+        for voucher in vouchers:
+            enterprise_offer = enterprise_offers[voucher.code]
+            # Assignment is only valid for Vouchers linked to an enterprise offer.
+            if not enterprise_offer:
+                slots[voucher.code] = None
+                continue
+            slots[voucher.code] = voucher.calculate_available_slots(
+                enterprise_offer.max_global_applications, num_assignments.get((enterprise_offer.id, voucher.code), 0)
+            )
+        return slots
+
     @property
     def not_redeemed_assignment_ids(self):
         """Returns offer assignments ids for the voucher that are available for redemption."""
@@ -165,3 +165,31 @@ class VoucherTests(TestCase):
             factories.OfferAssignmentFactory(offer=enterprise_offer, code=voucher.code, **assignment_data)
 
         assert voucher.slots_available_for_assignment == expected
+
+    def test_get_slots_available_for_assignment(self):
+        """ Verify the slots of several vouchers are those of each voucher, counted with one grouped query. """
+        enterprise_offer = factories.EnterpriseOfferFactory(max_global_applications=10)
+        vouchers = []
+        for index, (usage, num_orders, num_assignments) in enumerate([
+                (Voucher.MULTI_USE, 3, 2),
+                (Voucher.MULTI_USE, 0, 0),
+                (Voucher.SINGLE_USE, 0, 1),
+        ]):
+            voucher = Voucher.objects.create(**dict(
+                self.data, name='Slots {}'.format(index), code='SLOTS{}'.format(index), usage=usage,
+                num_orders=num_orders
+            ))
+            voucher.offers.add(enterprise_offer)
+            factories.OfferAssignmentFactory.create_batch(num_assignments, offer=enterprise_offer, code=voucher.code)
+            vouchers.append(voucher)
+        factories.OfferAssignmentFactory(offer=enterprise_offer, code='SLOTS1', status=OFFER_ASSIGNMENT_REVOKED)
+        vouchers.append(Voucher.objects.create(**dict(self.data, name='No offer', code='NOOFFER')))
+
+        vouchers = list(Voucher.objects.filter(id__in=[voucher.id for voucher in vouchers]).prefetch_related(
+            'offers__condition'
+        ))
+        with self.assertNumQueries(1):
+            slots = Voucher.get_slots_available_for_assignment(vouchers)
+
+        assert slots == {voucher.code: voucher.slots_available_for_assignment for voucher in vouchers}
+        assert slots == {'SLOTS0': 5, 'SLOTS1': 10, 'SLOTS2': 0, 'NOOFFER': None}
@@ -4,10 +4,12 @@
 import uuid
 
 import ddt
+import mock
 import responses
 from django.core.exceptions import ValidationError
-from django.db import IntegrityError
+from django.db import IntegrityError, connection
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils.translation import ugettext_lazy as _
 from factory.fuzzy import FuzzyText
 from oscar.templatetags.currency_filters import currency
@@ -30,13 +32,28 @@ from ecommerce.extensions.api import exceptions
 from ecommerce.extensions.catalogue.tests.mixins import DiscoveryTestMixin
 from ecommerce.extensions.fulfillment.modules import CouponFulfillmentModule
 from ecommerce.extensions.fulfillment.status import LINE
+from ecommerce.extensions.offer.constants import (
+    OFFER_ASSIGNED,
+    OFFER_ASSIGNMENT_EMAIL_PENDING,
+    OFFER_ASSIGNMENT_REVOKED,
+    OFFER_REDEEMED
+)
 from ecommerce.extensions.offer.models import OFFER_PRIORITY_VOUCHER
-from ecommerce.extensions.test.factories import create_order, prepare_voucher
+from ecommerce.extensions.test.factories import (
+    EnterpriseOfferFactory,
+    OfferAssignmentFactory,
+    create_order,
+    prepare_voucher
+)
 from ecommerce.extensions.voucher.utils import (
+    create_new_vouchers,
     create_vouchers,
     generate_coupon_report,
+    get_not_redeemed_assignments,
     get_voucher_and_products_from_code,
     get_voucher_discount_info,
+    get_vouchers_with_unassigned_slots,
+    stream_coupon_report,
     update_voucher_offer
 )
 from ecommerce.tests.factories import UserFactory
@@ -53,6 +70,7 @@ ProductCategory = get_model('catalogue', 'ProductCategory')
 ProductClass = get_model('catalogue', 'ProductClass')
 StockRecord = get_model('partner', 'StockRecord')
 Voucher = get_model('voucher', 'Voucher')
+VoucherApplication = get_model('voucher', 'VoucherApplication')
 
 VOUCHER_CODE = "XMASC0DE"
 VOUCHER_CODE_LENGTH = 1
@@ -293,6 +311,43 @@ class UtilTests(CouponMixin, DiscoveryMockMixin, DiscoveryTestMixin, LmsApiMockM
             voucher = create_vouchers(**self.data)
             self.assertTrue(Voucher.objects.filter(code__iexact=voucher[0].code).exists())
 
+    def test_create_vouchers_in_bulk(self):
+        """
+        Test that vouchers with generated codes are created with a number of queries that does not grow with quantity.
+        """
+        def count_queries(quantity):
+            self.data['quantity'] = quantity
+            with CaptureQueriesContext(connection) as queries:
+                vouchers = create_vouchers(**self.data)
+            self.assertEqual(len({voucher.code for voucher in vouchers}), quantity)
+            for voucher in vouchers:
+                self.assertEqual(voucher.offers.count(), 1)
+            return len(queries)
+
+        self.data['voucher_type'] = Voucher.SINGLE_USE
+        # The first call also creates the range, condition, benefit and offer.
+        count_queries(1)
+        self.assertEqual(count_queries(20), count_queries(2))
+
+    @override_settings(VOUCHER_CODE_LENGTH=VOUCHER_CODE_LENGTH)
+    def test_create_new_vouchers_skips_existing_codes(self):
+        """ Test that generated codes which are already in use, or repeated within the batch, are replaced. """
+        VoucherFactory(code='A')
+        codes = iter('AABAC')
+        with mock.patch(
+            'ecommerce.extensions.voucher.utils._random_code_string', side_effect=lambda length: next(codes)
+        ):
+            vouchers = create_new_vouchers(
+                end_datetime=self.data['end_datetime'],
+                name='Tešt voucher',
+                quantity=2,
+                start_datetime=self.data['start_datetime'],
+                voucher_type=Voucher.SINGLE_USE,
+            )
+
+        self.assertCountEqual([voucher.code for voucher in vouchers], ['B', 'C'])
+        self.assertTrue(all(voucher.pk for voucher in vouchers))
+
     @override_settings(VOUCHER_CODE_LENGTH=0)
     def test_nonpositive_voucher_code_length(self):
         """
@@ -492,6 +547,44 @@ class UtilTests(CouponMixin, DiscoveryMockMixin, DiscoveryTestMixin, LmsApiMockM
         self.assertNotIn('Course Seat Types', field_names)
         self.assertNotIn('Redeemed For Course ID', field_names)
 
+    def test_stream_coupon_report_pagination(self):
+        """ Verify streaming the report in small pages yields the same rows as generating it at once. """
+        self.setup_coupons_for_report()
+        vouchers = self.coupon_vouchers.first().vouchers.all()
+        self.use_voucher('TESTORDER1', vouchers[1], self.user)
+        self.use_voucher('TESTORDER2', vouchers[2], UserFactory())
+
+        field_names, rows = generate_coupon_report(self.coupon_vouchers)
+        streamed_field_names, streamed_rows = stream_coupon_report(self.coupon_vouchers, batch_size=1)
+
+        self.assertEqual(streamed_field_names, field_names)
+        self.assertEqual(list(streamed_rows), rows)
+        self.assertEqual(
+            [row['Code'] for row in rows[1:] if not row['Order Number']],
+            [voucher.code for voucher in vouchers]
+        )
+
+    def test_stream_coupon_report_queries(self):
+        """ Verify the number of queries does not grow with the number of vouchers or redemptions. """
+        self.setup_coupons_for_report()
+
+        def count_report_queries():
+            with CaptureQueriesContext(connection) as queries:
+                __, rows = stream_coupon_report(CouponVouchers.objects.filter(coupon=self.coupon))
+                list(rows)
+            return len(queries)
+
+        vouchers = self.coupon_vouchers.first().vouchers.all()
+        self.use_voucher('TESTORDER1', vouchers[1], self.user)
+        expected_queries = count_report_queries()
+
+        self.data.update({'quantity': 5})
+        self.coupon_vouchers.first().vouchers.add(*create_vouchers(**self.data))
+        for index, voucher in enumerate(self.coupon_vouchers.first().vouchers.all()[:4]):
+            self.use_voucher('TESTORDER{}'.format(index + 2), voucher, UserFactory())
+
+        self.assertEqual(count_report_queries(), expected_queries)
+
     def test_report_for_dynamic_coupon_with_fixed_benefit_type(self):
         """ Verify the coupon report contains correct data for coupon with fixed benefit type. """
         dynamic_coupon = self.create_coupon(
@@ -764,3 +857,52 @@ class UtilTests(CouponMixin, DiscoveryMockMixin, DiscoveryTestMixin, LmsApiMockM
 
         self.assertIn('Program UUID', field_names)
         self.assertEqual(rows[0]['Program UUID'], program_uuid)
+
+
+@ddt.ddt
+class EnterpriseOfferUsageTests(TestCase):
+    """ Verify the database-computed code usages match the Voucher model properties. """
+
+    def create_voucher(self, usage, max_global_applications, num_orders, assignment_statuses, redeemed_by=()):
+        code = uuid.uuid4().hex[:12].upper()
+        voucher = VoucherFactory(code=code, name=code, usage=usage, num_orders=num_orders)
+        offer = EnterpriseOfferFactory(max_global_applications=max_global_applications)
+        voucher.offers.add(offer)
+        for index, status in enumerate(assignment_statuses):
+            OfferAssignmentFactory(
+                offer=offer, code=voucher.code, status=status, user_email='{}{}@example.com'.format(voucher.code, index)
+            )
+        for index in redeemed_by:
+            user = UserFactory(email='{}{}@example.com'.format(voucher.code, index))
+            VoucherApplication.objects.create(voucher=voucher, user=user, order=OrderFactory(user=user))
+        return voucher
+
+    @ddt.data(Voucher.SINGLE_USE, Voucher.MULTI_USE_PER_CUSTOMER, Voucher.MULTI_USE, Voucher.ONCE_PER_CUSTOMER)
+    def test_matches_model_properties(self, usage):
+        vouchers = [
+            self.create_voucher(usage, None, 0, []),
+            self.create_voucher(usage, 0, 0, []),
+            self.create_voucher(usage, 2, 0, [OFFER_ASSIGNED, OFFER_ASSIGNMENT_EMAIL_PENDING]),
+            self.create_voucher(usage, 2, 1, [OFFER_REDEEMED, OFFER_ASSIGNMENT_REVOKED]),
+            self.create_voucher(usage, 3, 1, [OFFER_ASSIGNED, OFFER_REDEEMED], redeemed_by=[1]),
+            self.create_voucher(usage, 3, 1, [OFFER_ASSIGNED, OFFER_ASSIGNED], redeemed_by=[0]),
+            self.create_voucher(usage, 1, 2, [OFFER_ASSIGNED]),
+        ]
+        # A voucher without an enterprise offer.
+        voucher = self.create_voucher(usage, None, 0, [])
+        voucher.offers.set([ConditionalOfferFactory()])
+        vouchers.append(voucher)
+
+        queryset = Voucher.objects.filter(id__in=[voucher.id for voucher in vouchers])
+
+        self.assertCountEqual(
+            get_vouchers_with_unassigned_slots(queryset).values_list('id', flat=True),
+            [voucher.id for voucher in vouchers if voucher.slots_available_for_assignment != 0]
+        )
+        self.assertCountEqual(
+            get_not_redeemed_assignments(queryset).values_list('id', flat=True),
+            [
+                assignment_id for voucher in vouchers
+                for assignment_id in voucher.not_redeemed_assignment_ids or []
+            ]
+        )
@@ -6,11 +6,15 @@ import datetime
 import hashlib
 import logging
 import uuid
+from collections import defaultdict
 from decimal import Decimal, DecimalException
 
 import dateutil.parser
 import pytz
 from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, ExpressionWrapper, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, NullIf
 from django.urls import reverse
 from django.utils.translation import ugettext_lazy as _
 from edx_django_utils.cache import TieredCache
@@ -24,7 +28,7 @@ from ecommerce.enterprise.benefits import BENEFIT_MAP as ENTERPRISE_BENEFIT_MAP
 from ecommerce.enterprise.conditions import AssignableEnterpriseCustomerCondition
 from ecommerce.enterprise.utils import get_enterprise_customer
 from ecommerce.extensions.api import exceptions
-from ecommerce.extensions.offer.constants import OFFER_MAX_USES_DEFAULT
+from ecommerce.extensions.offer.constants import OFFER_ASSIGNMENT_REVOKED, OFFER_MAX_USES_DEFAULT, OFFER_REDEEMED
 from ecommerce.extensions.offer.models import OFFER_PRIORITY_VOUCHER
 from ecommerce.extensions.offer.utils import get_benefit_type, get_discount_percentage, get_discount_value
 from ecommerce.invoice.models import Invoice
@@ -39,6 +43,7 @@ Benefit = get_model('offer', 'Benefit')
 Condition = get_model('offer', 'Condition')
 ConditionalOffer = get_model('offer', 'ConditionalOffer')
 CouponVouchers = get_model('voucher', 'CouponVouchers')
+OfferAssignment = get_model('offer', 'OfferAssignment')
 Order = get_model('order', 'Order')
 Product = get_model('catalogue', 'Product')
 ProductCategory = get_model('catalogue', 'ProductCategory')
@@ -48,6 +53,10 @@ Voucher = get_model('voucher', 'Voucher')
 VoucherApplication = get_model('voucher', 'VoucherApplication')
 VoucherOffer = get_model('voucher', 'Voucher_offers')
 
+COUPON_REPORT_BATCH_SIZE = 1000
+VOUCHER_CODE_BATCH_SIZE = 500
+VOUCHER_CODE_MAX_ATTEMPTS = 3
+
 
 def _add_redemption_course_ids(new_row_to_append, header_row, redemption_course_ids):
     if any(row in [_('Catalog Query'), _('Program UUID')] for row in header_row):
@@ -247,16 +256,100 @@ def _get_redemption_course_ids(voucher_application):
     return redemption_course_ids
 
 
-def generate_coupon_report(coupon_vouchers):
+def _iter_coupon_vouchers(coupon_voucher, batch_size):
     """
-    Generate coupon report data
+    Yield the vouchers of a coupon in their default (newest first) order, one keyset-paginated query at a time.
+
+    Offers and their conditions are prefetched for every page, so that Voucher.best_offer does not
+    need further queries to build the voucher rows.
+    """
+    vouchers = coupon_voucher.vouchers.order_by('-date_created', '-id').prefetch_related('offers__condition')
+    page = list(vouchers[:batch_size])
+    while page:
+        yield page
+        last = page[-1]
+        page = list(vouchers.filter(
+            Q(date_created__lt=last.date_created) | Q(date_created=last.date_created, id__lt=last.id)
+        )[:batch_size])
+
+
+def _get_voucher_applications(vouchers):
+    """
+    Return the applications of the given vouchers, newest first, keyed by voucher id.
+    """
+    applications = defaultdict(list)
+    redeemed_voucher_ids = [voucher.id for voucher in vouchers if voucher.num_orders > 0]
+    if redeemed_voucher_ids:
+        voucher_applications = VoucherApplication.objects.filter(
+            voucher_id__in=redeemed_voucher_ids
+        ).order_by('-date_created').select_related('user', 'order').prefetch_related('order__lines__product')
+        for application in voucher_applications:
+            applications[application.voucher_id].append(application)
+    return applications
+
+
+def _get_coupon_report_header_row(coupon_voucher, clients):
+    """
+    Return the row holding the data shared by every voucher of the coupon.
+    """
+    coupon = coupon_voucher.coupon
+    if coupon.id not in clients:
+        raise Invoice.DoesNotExist('No invoice found for coupon [{}].'.format(coupon.id))
+    header_row = _get_info_for_coupon_report(coupon, coupon_voucher.vouchers.first())
+    header_row[_('Client')] = clients[coupon.id]
+    return header_row
+
+
+def _iter_coupon_report_rows(coupon_vouchers, header_rows, batch_size):
+    """
+    Yield the report rows of every coupon: its header row, then a row per voucher followed by a row per redemption.
+    """
+    first_header_row = header_rows[0]
+    for coupon_voucher, header_row in zip(coupon_vouchers, header_rows):
+        yield header_row
+
+        for vouchers in _iter_coupon_vouchers(coupon_voucher, batch_size):
+            voucher_applications = _get_voucher_applications(vouchers)
+            for voucher in vouchers:
+                row = _get_voucher_info_for_coupon_report(voucher)
+
+                for item in (_('Order Number'), _('Redeemed By Username'),):
+                    row[item] = ''
+
+                yield row
+
+                for application in voucher_applications[voucher.id]:
+                    redemption_course_ids = _get_redemption_course_ids(application)
+                    redemption_user_username = application.user.username
+
+                    new_row = row.copy()
+                    _add_redemption_course_ids(new_row, first_header_row, redemption_course_ids)
+                    new_row.update({
+                        _('Status'): _('Redeemed'),
+                        _('Order Number'): application.order.number,
+                        _('Redeemed By Username'): redemption_user_username,
+                        _('Maximum Coupon Usage'): 1,
+                        _('Redemption Count'): 1,
+                    })
+                    yield new_row
+
+
+def stream_coupon_report(coupon_vouchers, batch_size=COUPON_REPORT_BATCH_SIZE):
+    """
+    Generate coupon report data lazily.
+
+    The header row of every coupon is built up front, so that errors such as a missing stock record
+    are raised before any row is returned. Voucher rows are then generated from keyset-paginated
+    queries of batch_size vouchers, each with a single query for their applications, so memory
+    use does not grow with the number of vouchers.
 
     Args:
         coupon_vouchers (List[CouponVouchers]): List of coupon_vouchers the report should be generated for
+        batch_size (int): Number of vouchers to load per query
 
     Returns:
         List[str]
-        List[dict]
+        Iterator[dict]
     """
 
     field_names = [
@@ -288,48 +381,22 @@ def generate_coupon_report(coupon_vouchers):
         _('Coupon Expiry Date'),
         _('Email Domains'),
     ]
-    rows = []
-
-    for coupon_voucher in coupon_vouchers:
-        coupon = coupon_voucher.coupon
-        client = Invoice.objects.get(order__lines__product=coupon).business_client.name
-        rows.append(_get_info_for_coupon_report(coupon, coupon_voucher.vouchers.first()))
-        rows[0][_('Client')] = client
-
-        for voucher in coupon_voucher.vouchers.all().prefetch_related('offers'):
-            row = _get_voucher_info_for_coupon_report(voucher)
-
-            for item in (_('Order Number'), _('Redeemed By Username'),):
-                row[item] = ''
-
-            rows.append(row)
 
-            if voucher.num_orders > 0:
-                voucher_applications = VoucherApplication.objects.filter(
-                    voucher=voucher).prefetch_related('user', 'order__lines')
-
-                for application in voucher_applications:
-                    redemption_course_ids = _get_redemption_course_ids(application)
-                    redemption_user_username = application.user.username
-
-                    new_row = row.copy()
-                    _add_redemption_course_ids(new_row, rows[0], redemption_course_ids)
-                    new_row.update({
-                        _('Status'): _('Redeemed'),
-                        _('Order Number'): application.order.number,
-                        _('Redeemed By Username'): redemption_user_username,
-                        _('Maximum Coupon Usage'): 1,
-                        _('Redemption Count'): 1,
-                    })
-                    rows.append(new_row)
+    coupon_vouchers = list(coupon_vouchers)
+    clients = dict(
+        Invoice.objects.filter(
+            order__lines__product__in=[coupon_voucher.coupon_id for coupon_voucher in coupon_vouchers]
+        ).values_list('order__lines__product', 'business_client__name')
+    )
+    header_rows = [_get_coupon_report_header_row(coupon_voucher, clients) for coupon_voucher in coupon_vouchers]
 
-    if _('Program UUID') in rows[0]:
+    if _('Program UUID') in header_rows[0]:
         field_names.remove(_('Course ID'))
         field_names.remove(_('Organization'))
         field_names.remove(_('Catalog Query'))
         field_names.remove(_('Course Seat Types'))
         field_names.remove(_('Redeemed For Course ID'))
-    elif _('Catalog Query') in rows[0]:
+    elif _('Catalog Query') in header_rows[0]:
         field_names.remove(_('Course ID'))
         field_names.remove(_('Organization'))
         field_names.remove(_('Program UUID'))
@@ -340,7 +407,22 @@ def generate_coupon_report(coupon_vouchers):
         field_names.remove(_('Redeemed For Course IDs'))
         field_names.remove(_('Program UUID'))
 
-    return field_names, rows
+    return field_names, _iter_coupon_report_rows(coupon_vouchers, header_rows, batch_size)
+
+
+def generate_coupon_report(coupon_vouchers):
+    """
+    Generate coupon report data
+
+    Args:
+        coupon_vouchers (List[CouponVouchers]): List of coupon_vouchers the report should be generated for
+
+    Returns:
+        List[str]
+        List[dict]
+    """
+    field_names, rows = stream_coupon_report(coupon_vouchers)
+    return field_names, list(rows)
 
 
 def generate_offer_name(coupon_id, benefit_type, benefit_value, offer_number=None, is_enterprise=False):
@@ -488,6 +570,12 @@ def get_or_create_enterprise_offer(
     return offer
 
 
+def _random_code_string(length):
+    h = hashlib.sha256()
+    h.update(uuid.uuid4().bytes)
+    return base64.b32encode(h.digest())[0:length].decode('utf-8')
+
+
 def _generate_code_string(length):
     """
     Create a string of random characters of specified length
@@ -504,15 +592,49 @@ def _generate_code_string(length):
     if length < 1:
         raise ValueError("Voucher code length must be a positive number.")
 
-    h = hashlib.sha256()
-    h.update(uuid.uuid4().bytes)
-    voucher_code = base64.b32encode(h.digest())[0:length].decode('utf-8')
+    voucher_code = _random_code_string(length)
     if Voucher.objects.filter(code__iexact=voucher_code).exists():
         return _generate_code_string(length)
 
     return voucher_code
 
 
+def _generate_code_strings(length, count):
+    """
+    Create distinct strings of random characters of specified length that are not used by any voucher
+
+    Candidates are generated VOUCHER_CODE_BATCH_SIZE at a time and checked for collisions with a single
+    query per batch. Generated codes only contain upper case characters, which is how Voucher.save
+    stores every code, so an exact match finds every collision.
+
+    Args:
+        length (int): Defines the length of randomly generated strings.
+        count (int): Number of strings to generate.
+
+    Raises:
+        ValueError raised if length is less than one.
+
+    Returns:
+        List[str]
+    """
+    if length < 1:
+        raise ValueError("Voucher code length must be a positive number.")
+
+    voucher_codes = []
+    generated = set()
+    while len(voucher_codes) < count:
+        candidates = set()
+        for __ in range(min(count - len(voucher_codes), VOUCHER_CODE_BATCH_SIZE)):
+            candidate = _random_code_string(length)
+            if candidate not in generated:
+                candidates.add(candidate)
+        generated.update(candidates)
+        candidates.difference_update(Voucher.objects.filter(code__in=candidates).values_list('code', flat=True))
+        voucher_codes.extend(candidates)
+
+    return voucher_codes[:count]
+
+
 def create_new_voucher(code, end_datetime, name, start_datetime, voucher_type):
     """
     Creates a voucher.
@@ -549,6 +671,66 @@ def create_new_voucher(code, end_datetime, name, start_datetime, voucher_type):
     return voucher
 
 
+def create_new_vouchers(end_datetime, name, quantity, start_datetime, voucher_type):
+    """
+    Creates vouchers with randomly generated codes in bulk.
+
+    Codes are generated and checked for collisions in batches, and vouchers are inserted
+    VOUCHER_CODE_BATCH_SIZE at a time with bulk_create. If another process takes one of the codes
+    between the check and the insert, the batch is retried with new codes.
+
+    Args:
+        end_datetime (datetime): Voucher end date.
+        name (str): Voucher name.
+        quantity (int): Number of vouchers to create.
+        start_datetime (datetime): Voucher start date.
+        voucher_type (str): Voucher usage.
+
+    Returns:
+        List[Voucher]
+    """
+    if not isinstance(start_datetime, datetime.datetime):
+        start_datetime = dateutil.parser.parse(start_datetime)
+
+    if not isinstance(end_datetime, datetime.datetime):
+        end_datetime = dateutil.parser.parse(end_datetime)
+
+    vouchers = []
+    while len(vouchers) < quantity:
+        batch_size = min(quantity - len(vouchers), VOUCHER_CODE_BATCH_SIZE)
+        for attempt in range(1, VOUCHER_CODE_MAX_ATTEMPTS + 1):
+            batch = []
+            for voucher_code in _generate_code_strings(settings.VOUCHER_CODE_LENGTH, batch_size):
+                voucher = Voucher(
+                    name=name[:128 - len(voucher_code)] + voucher_code,
+                    code=voucher_code,
+                    usage=voucher_type,
+                    start_datetime=start_datetime,
+                    end_datetime=end_datetime,
+                )
+                # bulk_create does not call Voucher.save, which is where vouchers are validated.
+                voucher.clean()
+                batch.append(voucher)
+            try:
+                with transaction.atomic():
+                    Voucher.objects.bulk_create(batch)
+                break
+            except IntegrityError:
+                if attempt == VOUCHER_CODE_MAX_ATTEMPTS:
+                    raise
+                logger.warning(
+                    'Voucher code collision while creating [%d] vouchers. Retrying with new codes.', batch_size
+                )
+
+        # Not every database backend sets primary keys on objects passed to bulk_create.
+        created = dict(Voucher.objects.filter(code__in=[voucher.code for voucher in batch]).values_list('code', 'id'))
+        for voucher in batch:
+            voucher.id = created[voucher.code]
+        vouchers.extend(batch)
+
+    return vouchers
+
+
 def create_vouchers_and_attach_offers(
         code,
         end_datetime,
@@ -577,17 +759,29 @@ def create_vouchers_and_attach_offers(
     Returns:
         List[Voucher]
     """
-    vouchers = []
-    voucher_offers = []
-    enterprise_voucher_offers = []
-    for i in range(quantity):
-        voucher = create_new_voucher(
+    if code:
+        vouchers = [
+            create_new_voucher(
+                end_datetime=end_datetime,
+                start_datetime=start_datetime,
+                voucher_type=voucher_type,
+                code=code,
+                name=name
+            )
+            for __ in range(quantity)
+        ]
+    else:
+        vouchers = create_new_vouchers(
             end_datetime=end_datetime,
+            name=name,
+            quantity=quantity,
             start_datetime=start_datetime,
             voucher_type=voucher_type,
-            code=code,
-            name=name
         )
+
+    voucher_offers = []
+    enterprise_voucher_offers = []
+    for i, voucher in enumerate(vouchers):
         voucher_offers.append(
             VoucherOffer(voucher=voucher, conditionaloffer=offers[i] if len(offers) > 1 else offers[0])
         )
@@ -598,10 +792,9 @@ def create_vouchers_and_attach_offers(
                     conditionaloffer=enterprise_offers[i] if len(enterprise_offers) > 1 else enterprise_offers[0]
                 )
             )
-        vouchers.append(voucher)
 
-    VoucherOffer.objects.bulk_create(voucher_offers)
-    VoucherOffer.objects.bulk_create(enterprise_voucher_offers)
+    VoucherOffer.objects.bulk_create(voucher_offers, batch_size=VOUCHER_CODE_BATCH_SIZE)
+    VoucherOffer.objects.bulk_create(enterprise_voucher_offers, batch_size=VOUCHER_CODE_BATCH_SIZE)
     return vouchers
 
 
@@ -852,6 +1045,95 @@ def create_vouchers(
     )
 
 
+def annotate_enterprise_offer_usage(vouchers):
+    """
+    Annotate vouchers with the usage of their enterprise offer, computed in the database.
+
+    This mirrors Voucher.enterprise_offer and Voucher.slots_available_for_assignment:
+
+        enterprise_offer_id: The voucher's enterprise offer, or None.
+        enterprise_max_global_applications: max_global_applications of that offer.
+        num_active_assignments: Assignments of the voucher's code for that offer that are neither
+            redeemed nor revoked.
+        remaining_slots: For multi-use vouchers, the number of slots left for assignment.
+
+    Args:
+        vouchers (QuerySet): Vouchers to annotate.
+
+    Returns:
+        QuerySet
+    """
+    enterprise_offers = ConditionalOffer.objects.filter(
+        vouchers=OuterRef('pk'),
+        condition__enterprise_customer_uuid__isnull=False,
+    ).order_by('-priority', 'pk')
+    active_assignments = OfferAssignment.objects.filter(
+        offer_id=OuterRef('enterprise_offer_id'),
+        code=OuterRef('code'),
+    ).exclude(
+        status__in=[OFFER_REDEEMED, OFFER_ASSIGNMENT_REVOKED]
+    ).order_by().values('code').annotate(count=Count('id')).values('count')
+
+    return vouchers.annotate(
+        enterprise_offer_id=Subquery(enterprise_offers.values('id')[:1]),
+        enterprise_max_global_applications=Subquery(enterprise_offers.values('max_global_applications')[:1]),
+    ).annotate(
+        num_active_assignments=Coalesce(Subquery(active_assignments, output_field=IntegerField()), 0),
+    ).annotate(
+        remaining_slots=ExpressionWrapper(
+            Coalesce(NullIf(F('enterprise_max_global_applications'), 0), OFFER_MAX_USES_DEFAULT) -
+            F('num_orders') - F('num_active_assignments'),
+            output_field=IntegerField()
+        ),
+    )
+
+
+def get_vouchers_with_unassigned_slots(vouchers):
+    """
+    Return the vouchers that have slots left for assignment, without loading them.
+
+    Equivalent to keeping the vouchers whose slots_available_for_assignment is not 0. Vouchers
+    without an enterprise offer have no assignment slots to count, and are always included.
+
+    Args:
+        vouchers (QuerySet): Vouchers to filter.
+
+    Returns:
+        QuerySet
+    """
+    per_customer_usages = [Voucher.SINGLE_USE, Voucher.MULTI_USE_PER_CUSTOMER]
+    return annotate_enterprise_offer_usage(vouchers).filter(
+        Q(enterprise_offer_id__isnull=True) |
+        Q(usage__in=per_customer_usages, num_orders=0, num_active_assignments=0) |
+        (~Q(usage__in=per_customer_usages) & ~Q(remaining_slots=0))
+    )
+
+
+def get_not_redeemed_assignments(vouchers):
+    """
+    Return the assignments of the vouchers that are still available for redemption, without loading the vouchers.
+
+    Equivalent to collecting not_redeemed_assignment_ids for every voucher: assignments of a voucher's
+    code for its enterprise offer that are neither redeemed nor revoked, and whose user has not
+    redeemed the voucher.
+
+    Args:
+        vouchers (QuerySet): Vouchers whose assignments should be returned.
+
+    Returns:
+        QuerySet
+    """
+    return OfferAssignment.objects.filter(
+        Exists(annotate_enterprise_offer_usage(vouchers).filter(
+            code=OuterRef('code'), enterprise_offer_id=OuterRef('offer_id')
+        ))
+    ).exclude(
+        status__in=[OFFER_REDEEMED, OFFER_ASSIGNMENT_REVOKED]
+    ).exclude(
+        Exists(VoucherApplication.objects.filter(voucher__code=OuterRef('code'), user__email=OuterRef('user_email')))
+    )
+
+
 def get_voucher_discount_info(benefit, price):
     """
     Get discount info that will describe the effect that benefit has on product price.
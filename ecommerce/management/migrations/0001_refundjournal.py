@@ -0,0 +1,53 @@
+# Generated by Django 3.2.25 on 2026-10-17 06:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('sites', '0002_alter_domain_unique'),
+        ('basket', '0017_alter_lineattribute_value'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RefundJournal',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='refund_journals', to='sites.site')),
+            ],
+            options={
+                'get_latest_by': 'modified',
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='RefundJournalEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('processor_name', models.CharField(max_length=255)),
+                ('transaction_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('currency', models.CharField(max_length=12)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('in_progress', 'In progress'), ('succeeded', 'Succeeded'), ('failed', 'Failed'), ('skipped', 'Skipped, refunded by another journal')], db_index=True, default='pending', max_length=32)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('refund_transaction_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('basket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='basket.basket')),
+                ('journal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='management.refundjournal')),
+            ],
+            options={
+                'verbose_name_plural': 'refund journal entries',
+                'index_together': {('processor_name', 'transaction_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+
+
+from django.contrib.sites.models import Site
+from django.db import models
+from django.utils.translation import ugettext_lazy as _
+from django_extensions.db.models import TimeStampedModel
+
+
+class RefundJournal(TimeStampedModel):
+    """
+    Progress of a bulk refund of basket transactions, so an interrupted run can be resumed.
+     .. no_pii:
+    """
+
+    site = models.ForeignKey(Site, on_delete=models.CASCADE, related_name='refund_journals')
+
+    def __str__(self):
+        return '{id}: {site}'.format(id=self.id, site=self.site.domain)
+
+
+class RefundJournalEntry(TimeStampedModel):
+    """
+    A basket transaction to refund as part of a bulk refund, and the outcome of issuing its credit.
+
+    Credits are issued for pending entries only. An entry is in progress while its credit is being issued; an
+    entry left in progress by an interrupted run may or may not have been credited. An entry is skipped when
+    another entry refunded, or is refunding, the same transaction.
+     .. no_pii:
+    """
+    PENDING = 'pending'
+    IN_PROGRESS = 'in_progress'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    SKIPPED = 'skipped'
+    STATUS_CHOICES = (
+        (PENDING, _('Pending')),
+        (IN_PROGRESS, _('In progress')),
+        (SUCCEEDED, _('Succeeded')),
+        (FAILED, _('Failed')),
+        (SKIPPED, _('Skipped, refunded by another journal')),
+    )
+
+    journal = models.ForeignKey(RefundJournal, on_delete=models.CASCADE, related_name='entries')
+    basket = models.ForeignKey('basket.Basket', on_delete=models.CASCADE, related_name='+')
+    processor_name = models.CharField(max_length=255)
+    transaction_id = models.CharField(max_length=255, null=True, blank=True)
+    amount = models.DecimalField(decimal_places=2, max_digits=12)
+    currency = models.CharField(max_length=12)
+    status = models.CharField(max_length=32, choices=STATUS_CHOICES, default=PENDING, db_index=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    refund_transaction_id = models.CharField(max_length=255, null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        index_together = ('processor_name', 'transaction_id')
+        verbose_name_plural = 'refund journal entries'
+
+    def __str__(self):
+        return '{processor_name} transaction [{transaction_id}] of basket [{basket_id}]: {status}'.format(
+            processor_name=self.processor_name,
+            transaction_id=self.transaction_id,
+            basket_id=self.basket_id,
+            status=self.status,
+        )
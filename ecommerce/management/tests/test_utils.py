@@ -5,6 +5,7 @@ from django.db import transaction
 from django.test import override_settings
 from oscar.core.loading import get_class, get_model
 from oscar.test.factories import ProductFactory, RangeFactory, create_order
+from requests.exceptions import ConnectTimeout, ReadTimeout
 
 from ecommerce.extensions.basket.utils import prepare_basket
 from ecommerce.extensions.fulfillment.status import ORDER
@@ -13,8 +14,10 @@ from ecommerce.extensions.payment.constants import CARD_TYPES
 from ecommerce.extensions.payment.models import PaymentProcessorResponse
 from ecommerce.extensions.payment.processors.cybersource import Cybersource
 from ecommerce.extensions.payment.processors.paypal import Paypal
+from ecommerce.extensions.payment.processors.stripe import Stripe
 from ecommerce.extensions.test.factories import create_basket, prepare_voucher
-from ecommerce.management.utils import FulfillFrozenBaskets, refund_basket_transactions
+from ecommerce.management.models import RefundJournalEntry
+from ecommerce.management.utils import BulkRefundRunner, FulfillFrozenBaskets, refund_basket_transactions
 from ecommerce.tests.factories import UserFactory
 from ecommerce.tests.testcases import TestCase
 
@@ -26,6 +29,7 @@ OrderCreator = get_class('order.utils', 'OrderCreator')
 Order = get_model('order', 'Order')
 PaymentEvent = get_model('order', 'PaymentEvent')
 Source = get_model('payment', 'Source')
+GatewayError = get_class('payment.exceptions', 'GatewayError')
 
 
 class RefundBasketTransactionsTests(TestCase):
@@ -56,6 +60,135 @@ class RefundBasketTransactionsTests(TestCase):
         assert refund_basket_transactions(self.site, [basket.id]) == (0, 1,)
 
 
+def gateway_error(exc):
+    """ Returns a GatewayError raised while handling exc, as payment processors raise them. """
+    error = GatewayError('Failed to issue credit.')
+    error.__context__ = exc
+    return error
+
+
+@mock.patch('ecommerce.management.utils.RETRY_BACKOFF_SECONDS', 0)
+class BulkRefundRunnerTests(TestCase):
+    def setUp(self):
+        super(BulkRefundRunnerTests, self).setUp()
+        self.basket = create_basket(site=self.site)
+        for transaction_id in ('PAY-1', 'PAY-2'):
+            PaymentProcessorResponse.objects.create(
+                basket=self.basket, transaction_id=transaction_id, processor_name=Paypal.NAME
+            )
+        self.runner = BulkRefundRunner(self.site, max_workers=2, max_retries=1)
+
+    def get_statuses(self, journal):
+        return dict(journal.entries.values_list('transaction_id', 'status'))
+
+    def test_journal(self):
+        """ Verify a run records the outcome of every credit, and a rerun only issues the failed ones. """
+        with mock.patch.object(Paypal, 'issue_credit', side_effect=[gateway_error(ValueError()), 'REFUND-2']):
+            journal = self.runner.create_journal([self.basket.id])
+            summary = self.runner.run(journal)
+
+        assert self.get_statuses(journal) == {
+            'PAY-1': RefundJournalEntry.FAILED, 'PAY-2': RefundJournalEntry.SUCCEEDED
+        }
+        assert summary['statuses'][RefundJournalEntry.SUCCEEDED] == 1
+        assert summary['processors'][Paypal.NAME][RefundJournalEntry.FAILED] == 1
+        assert summary['failures'] == [
+            (self.basket.id, Paypal.NAME, 'PAY-1', "GatewayError('Failed to issue credit.')")
+        ]
+
+        with mock.patch.object(Paypal, 'issue_credit', return_value='REFUND-1') as mock_issue_credit:
+            journal = self.runner.create_journal([self.basket.id])
+            self.runner.run(journal)
+            mock_issue_credit.assert_called_once_with(
+                self.basket.order_number, self.basket, 'PAY-1', self.basket.total_excl_tax, self.basket.currency
+            )
+        assert self.get_statuses(journal) == {
+            'PAY-1': RefundJournalEntry.SUCCEEDED, 'PAY-2': RefundJournalEntry.SKIPPED
+        }
+
+    def test_resume(self):
+        """ Verify resuming a journal only issues pending credits, and interrupted ones when asked to. """
+        with mock.patch.object(Paypal, 'issue_credit', return_value='REFUND') as mock_issue_credit:
+            journal = self.runner.create_journal([self.basket.id])
+            journal.entries.filter(transaction_id='PAY-1').update(status=RefundJournalEntry.IN_PROGRESS)
+
+            summary = self.runner.run(journal)
+            assert mock_issue_credit.call_count == 1
+            assert summary['statuses'][RefundJournalEntry.IN_PROGRESS] == 1
+
+            self.runner.run(journal)
+            assert mock_issue_credit.call_count == 1
+
+            summary = self.runner.run(journal, retry_interrupted=True)
+            assert mock_issue_credit.call_count == 2
+            assert summary['statuses'][RefundJournalEntry.SUCCEEDED] == 2
+
+    def test_other_journals(self):
+        """ Verify transactions that another journal is yet to refund, or is refunding, are skipped. """
+        other_journal = self.runner.create_journal([self.basket.id])
+        other_journal.entries.filter(transaction_id='PAY-2').update(status=RefundJournalEntry.IN_PROGRESS)
+
+        with mock.patch.object(Paypal, 'issue_credit', return_value='REFUND') as mock_issue_credit:
+            journal = self.runner.create_journal([self.basket.id])
+            summary = self.runner.run(journal)
+            mock_issue_credit.assert_not_called()
+        assert summary['statuses'][RefundJournalEntry.SKIPPED] == 2
+
+    def test_resume_after_other_journal(self):
+        """ Verify resuming a journal skips the transactions another journal refunded, or is refunding, meanwhile. """
+        journal = self.runner.create_journal([self.basket.id])
+        journal.entries.update(status=RefundJournalEntry.FAILED)
+        other_journal = self.runner.create_journal([self.basket.id])
+        other_journal.entries.filter(transaction_id='PAY-2').update(status=RefundJournalEntry.IN_PROGRESS)
+        with mock.patch.object(Paypal, 'issue_credit', return_value='REFUND'):
+            self.runner.run(other_journal)
+        journal.entries.update(status=RefundJournalEntry.PENDING)
+
+        with mock.patch.object(Paypal, 'issue_credit', return_value='REFUND') as mock_issue_credit:
+            self.runner.run(journal)
+            mock_issue_credit.assert_not_called()
+        assert self.get_statuses(journal) == {
+            'PAY-1': RefundJournalEntry.SKIPPED, 'PAY-2': RefundJournalEntry.SKIPPED
+        }
+
+    def test_retries(self):
+        """ Verify only credits that could not have been issued are retried. """
+        journal = self.runner.create_journal([self.basket.id])
+        journal.entries.filter(transaction_id='PAY-2').delete()
+        with mock.patch.object(Paypal, 'issue_credit', side_effect=[gateway_error(ConnectTimeout()), 'REFUND-1']):
+            self.runner.run(journal)
+        entry = journal.entries.get()
+        assert entry.status == RefundJournalEntry.SUCCEEDED
+        assert (entry.attempts, entry.refund_transaction_id) == (2, 'REFUND-1')
+
+        entry.status = RefundJournalEntry.PENDING
+        entry.save()
+        with mock.patch.object(Paypal, 'issue_credit', side_effect=[gateway_error(ReadTimeout()), 'REFUND-1']):
+            self.runner.run(journal)
+        entry.refresh_from_db()
+        assert (entry.status, entry.attempts) == (RefundJournalEntry.FAILED, 3)
+
+    def test_retries_stripe(self):
+        """ Verify Stripe credits that may have been issued are not retried either, as partial refunds add up. """
+        PaymentProcessorResponse.objects.filter(basket=self.basket).update(processor_name=Stripe.NAME)
+        with mock.patch.object(Stripe, 'issue_credit', side_effect=gateway_error(ReadTimeout())) as mock_issue_credit:
+            journal = self.runner.create_journal([self.basket.id])
+            self.runner.run(journal)
+        assert mock_issue_credit.call_count == 2
+        assert set(journal.entries.values_list('attempts', flat=True)) == {1}
+
+    def test_rate_limits(self):
+        """ Verify credits are spaced out by the rate limit of their processor. """
+        runner = BulkRefundRunner(self.site, rate_limits={Paypal.NAME: 0.01})
+        assert runner._rate_limiters[Paypal.NAME].interval == 100  # pylint: disable=protected-access
+        assert runner._rate_limiters[Stripe.NAME].interval == 0  # pylint: disable=protected-access
+
+        with mock.patch.object(Paypal, 'issue_credit', return_value='REFUND'), \
+                mock.patch('ecommerce.core.utils.time.sleep') as mock_sleep:
+            runner.run(runner.create_journal([self.basket.id]))
+        assert mock_sleep.call_count == 1
+
+
 @override_settings(FULFILLMENT_MODULES=['ecommerce.extensions.fulfillment.tests.modules.FakeFulfillmentModule', ])
 class FulfillFrozenBasketsTests(TestCase):
     """ Test Fulfill Frozen Basket class"""
@@ -1,15 +1,23 @@
 
 
 import logging
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
-from django.db.models import Q
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Q
 from oscar.apps.partner import strategy
 from oscar.core.loading import get_class, get_model
+from requests.exceptions import ConnectTimeout
 
+from ecommerce.core.utils import RateLimiter
 from ecommerce.extensions.checkout.mixins import EdxOrderPlacementMixin
 from ecommerce.extensions.payment.constants import CYBERSOURCE_CARD_TYPE_MAP, STRIPE_CARD_TYPE_MAP
 from ecommerce.extensions.payment.helpers import get_processor_class_by_name
 from ecommerce.extensions.payment.processors import HandledProcessorResponse
+from ecommerce.management.models import RefundJournal, RefundJournalEntry
 
 logger = logging.getLogger(__name__)
 
@@ -19,9 +27,11 @@ EventHandler = get_class('order.processing', 'EventHandler')
 NoShippingRequired = get_class('shipping.methods', 'NoShippingRequired')
 Order = get_model('order', 'Order')
 OrderTotalCalculator = get_class('checkout.calculators', 'OrderTotalCalculator')
+PaymentProcessorResponse = get_model('payment', 'PaymentProcessorResponse')
 ShippingEventType = get_model('order', 'ShippingEventType')
 
 SHIPPING_EVENT_NAME = 'Shipped'
+RETRY_BACKOFF_SECONDS = 1
 
 _payment_processors = {}
 
@@ -38,40 +48,274 @@ def _get_payment_processor(site, name):
 
 
 def refund_basket_transactions(site, basket_ids):
-    baskets = Basket.objects.filter(site=site, id__in=basket_ids)
+    """
+    Refund the transactions of the baskets with a BulkRefundRunner.
+
+    Returns:
+        tuple: The number of transactions refunded, and of transactions that could not be refunded.
+    """
+    runner = BulkRefundRunner(site)
+    journal = runner.create_journal(basket_ids)
+    summary = runner.run(journal)
+    success_count = summary['statuses'][RefundJournalEntry.SUCCEEDED]
+    failure_count = summary['statuses'][RefundJournalEntry.FAILED]
 
-    success_count = 0
-    failure_count = 0
+    msg = 'Finished refunding basket transactions. [{success_count}] transactions were successfully refunded. ' \
+          '[{failure_count}] attempts failed.'.format(success_count=success_count, failure_count=failure_count)
+    logger.info('%s Progress was recorded in refund journal [%d].', msg, journal.id)
+
+    return success_count, failure_count
+
+
+class BulkRefundRunner:
+    """
+    Refunds the transactions of many baskets, recording its progress in a RefundJournal.
+
+    Credits are issued by a pool of threads, optionally limited to a number of credits per second for each
+    payment processor. The journal holds a transaction of every basket, with the amount to credit computed when
+    the journal is created. A run issues the credits of the pending entries only, so an interrupted run is resumed
+    by running its journal again. A transaction that another journal refunded, or is refunding, is skipped.
+
+    A credit that fails is retried with an exponential backoff when it could not have been issued, i.e. when no
+    connection could be made to the processor.
+
+    Arguments:
+        site (Site): Site of the baskets.
+        max_workers (int): Number of credits issued at the same time.
+        max_retries (int): Number of times a credit that failed is retried.
+        rate_limits (dict): Maximum number of credits issued per second, by payment processor name.
+    """
+
+    def __init__(self, site, max_workers=None, max_retries=None, rate_limits=None):
+        self.site = site
+        self.max_workers = max_workers or settings.BULK_REFUND_MAX_WORKERS
+        self.max_retries = settings.BULK_REFUND_MAX_RETRIES if max_retries is None else max_retries
+        rate_limits = settings.BULK_REFUND_RATE_LIMITS if rate_limits is None else rate_limits
+        self._rate_limiters = defaultdict(RateLimiter)
+        self._rate_limiters.update({name: RateLimiter(rate) for name, rate in rate_limits.items()})
+
+    def create_journal(self, basket_ids):
+        """
+        Creates the journal of a refund of the transactions made against the baskets.
+
+        Offers are applied to the baskets again to compute the amount to credit. Transactions that another journal
+        refunded, is refunding or is yet to refund are skipped.
 
-    for basket in baskets:
-        basket.strategy = strategy.Default()
-        Applicator().apply(basket, basket.owner, None)
+        Returns:
+            RefundJournal
+        """
+        baskets = Basket.objects.filter(site=self.site, id__in=basket_ids).select_related('owner').order_by('id')
+        transactions = defaultdict(set)
+        for basket_id, processor_name, transaction_id in PaymentProcessorResponse.objects.filter(
+                basket__in=baskets
+        ).values_list('basket_id', 'processor_name', 'transaction_id'):
+            transactions[basket_id].add((processor_name, transaction_id))
+        refunded = set(RefundJournalEntry.objects.filter(
+            status__in=(RefundJournalEntry.SUCCEEDED, RefundJournalEntry.IN_PROGRESS, RefundJournalEntry.PENDING),
+            transaction_id__in={transaction_id for items in transactions.values() for __, transaction_id in items},
+        ).values_list('processor_name', 'transaction_id'))
+
+        entries = []
+        for basket in baskets:
+            basket.strategy = strategy.Default()
+            Applicator().apply(basket, basket.owner, None)
+            basket_transactions = sorted(transactions[basket.id], key=lambda item: (item[0], item[1] or ''))
+            for processor_name, transaction_id in basket_transactions:
+                entries.append(RefundJournalEntry(
+                    basket=basket,
+                    processor_name=processor_name,
+                    transaction_id=transaction_id,
+                    amount=basket.total_excl_tax,
+                    currency=basket.currency,
+                    status=(
+                        RefundJournalEntry.SKIPPED if (processor_name, transaction_id) in refunded
+                        else RefundJournalEntry.PENDING
+                    ),
+                ))
+
+        with transaction.atomic():
+            journal = RefundJournal.objects.create(site=self.site)
+            for entry in entries:
+                entry.journal = journal
+            RefundJournalEntry.objects.bulk_create(entries)
+        logger.info(
+            'Created refund journal [%d] for %d transaction(s) of %d basket(s).', journal.id, len(entries), len(baskets)
+        )
+        return journal
 
-        logger.info('Refunding transactions for basket [%d]...', basket.id)
-        transactions = set(
-            list(basket.paymentprocessorresponse_set.values_list('processor_name', 'transaction_id')))
+    def run(self, journal, retry_interrupted=False):
+        """
+        Issues the credits of the pending entries of the journal.
+
+        Arguments:
+            journal (RefundJournal): Journal to run, or to resume.
+            retry_interrupted (bool): Whether to issue again the credits of entries left in progress by an
+                interrupted run. Only use it once the transactions were checked not to be refunded.
 
-        for processor_name, transaction_id in transactions:
+        Returns:
+            dict: The summary of the journal, see get_summary.
+        """
+        statuses = [RefundJournalEntry.PENDING]
+        if retry_interrupted:
+            statuses.append(RefundJournalEntry.IN_PROGRESS)
+        entries = iter(list(journal.entries.filter(status__in=statuses).select_related(
+            'basket__site__siteconfiguration__partner'
+        ).order_by('id')))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {}
+
+            def submit():
+                """ Submits the next entry that can be credited. Returns False when none is left. """
+                for entry in entries:
+                    if not self._start(entry, statuses):
+                        continue
+                    try:
+                        payment_processor = _get_payment_processor(self.site, entry.processor_name)
+                    except Exception as exc:  # pylint: disable=broad-except
+                        logger.exception('Failed to load the payment processor of refund journal entry [%d].',
+                                         entry.id)
+                        self._record_result(entry, 0, None, exc)
+                        continue
+                    future = executor.submit(
+                        self._issue_credit, payment_processor, entry, entry.basket.order_number
+                    )
+                    futures[future] = entry
+                    return True
+                return False
+
+            # Keep at most max_workers credits in progress, so few entries are left in progress if the run stops.
+            for __ in range(self.max_workers):
+                if not submit():
+                    break
+            while futures:
+                done, __ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._record_result(futures.pop(future), *future.result())
+                    submit()
+
+        summary = self.get_summary(journal)
+        logger.info('Finished running refund journal [%d]: %s', journal.id, summary['statuses'])
+        return summary
+
+    @staticmethod
+    def _start(entry, statuses):
+        """
+        Marks an entry in progress, unless its transaction was refunded, or is being refunded, by another entry.
+
+        The entries of the transaction are locked, so concurrent runs, of this journal or of others, do not credit
+        it twice. An entry whose transaction another entry refunded or is refunding is skipped.
+
+        Returns:
+            bool: Whether the credit of the entry can be issued.
+        """
+        with transaction.atomic():
+            locked = RefundJournalEntry.objects.select_for_update().filter(id=entry.id)
+            if entry.transaction_id is not None:
+                locked = RefundJournalEntry.objects.select_for_update().filter(
+                    processor_name=entry.processor_name, transaction_id=entry.transaction_id
+                )
+            locked_statuses = dict(locked.values_list('id', 'status'))
+            entry_status = locked_statuses.pop(entry.id, None)
+            other_statuses = set(locked_statuses.values())
+
+            if entry_status not in statuses:
+                # Another run of the journal started the entry meanwhile.
+                return False
+            if other_statuses & {RefundJournalEntry.SUCCEEDED, RefundJournalEntry.IN_PROGRESS}:
+                logger.info('Skipping [%s] transaction [%s] made against basket [%d], which another refund journal '
+                            'refunded or is refunding.', entry.processor_name, entry.transaction_id, entry.basket_id)
+                entry.status = RefundJournalEntry.SKIPPED
+            else:
+                entry.status = RefundJournalEntry.IN_PROGRESS
+            entry.save(update_fields=['status', 'modified'])
+        return entry.status == RefundJournalEntry.IN_PROGRESS
+
+    def _issue_credit(self, payment_processor, entry, order_number):
+        """
+        Issues the credit of an entry, retrying it when it could not have been issued.
+
+        Returns:
+            tuple: The number of attempts, the refund transaction ID and the error of the last attempt, if any.
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            self._rate_limiters[entry.processor_name].wait()
+            logger.info('Issuing credit for [%s] transaction [%s] made against basket [%d]...', entry.processor_name,
+                        entry.transaction_id, entry.basket_id)
             try:
-                logger.info('Issuing credit for [%s] transaction [%s] made against basket [%d]...', processor_name,
-                            transaction_id, basket.id)
-                payment_processor = _get_payment_processor(site, processor_name)
-                payment_processor.issue_credit(basket.order_number, basket, transaction_id, basket.total_excl_tax,
-                                               basket.currency)
-                success_count += 1
-                logger.info('Successfully issued credit for [%s] transaction [%s] made against basket [%d].',
-                            processor_name, transaction_id, basket.id)
-            except Exception:  # pylint: disable=broad-except
-                failure_count += 1
-                logger.exception('Failed to issue credit for [%s] transaction [%s] made against basket [%d].',
-                                 processor_name, transaction_id, basket.id)
-        logger.info('Finished processing refunds for basket [%d].', basket.id)
+                refund_transaction_id = payment_processor.issue_credit(
+                    order_number, entry.basket, entry.transaction_id, entry.amount, entry.currency
+                )
+                return attempt, refund_transaction_id, None
+            except Exception as exc:  # pylint: disable=broad-except
+                if attempt > self.max_retries or not self._can_retry(exc):
+                    logger.exception('Failed to issue credit for [%s] transaction [%s] made against basket [%d].',
+                                     entry.processor_name, entry.transaction_id, entry.basket_id)
+                    return attempt, None, exc
+                logger.warning('Retrying credit for [%s] transaction [%s] made against basket [%d]: %s',
+                               entry.processor_name, entry.transaction_id, entry.basket_id, exc)
+                time.sleep(RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+            finally:
+                # Processors record their responses from this thread, which has a database connection of its own.
+                connection.close()
 
-    msg = 'Finished refunding basket transactions. [{success_count}] transactions were successfully refunded. ' \
-          '[{failure_count}] attempts failed.'.format(success_count=success_count, failure_count=failure_count)
-    logger.info(msg)
+    @staticmethod
+    def _can_retry(exc):
+        """
+        Returns whether a credit that raised exc can be issued again without refunding the transaction twice.
 
-    return success_count, failure_count
+        Processors wrap their errors in a GatewayError, so the errors it was raised from are checked as well.
+        """
+        while exc is not None:
+            if isinstance(exc, ConnectTimeout):
+                return True
+            exc = exc.__cause__ or exc.__context__
+        return False
+
+    @staticmethod
+    def _record_result(entry, attempts, refund_transaction_id, error):
+        entry.attempts += attempts
+        if error is None:
+            entry.status = RefundJournalEntry.SUCCEEDED
+            entry.refund_transaction_id = refund_transaction_id
+            entry.error = ''
+            logger.info('Successfully issued credit for [%s] transaction [%s] made against basket [%d].',
+                        entry.processor_name, entry.transaction_id, entry.basket_id)
+        else:
+            entry.status = RefundJournalEntry.FAILED
+            entry.error = repr(error)
+        entry.save(update_fields=['status', 'attempts', 'refund_transaction_id', 'error', 'modified'])
+
+    @staticmethod
+    def get_summary(journal):
+        """
+        Returns the summary report of a journal.
+
+        Returns:
+            dict: The number of entries of each status, overall ('statuses') and by payment processor
+                ('processors'), and the basket ID, processor name, transaction ID and error of every failed
+                entry ('failures').
+        """
+        no_entries = {status: 0 for status, __ in RefundJournalEntry.STATUS_CHOICES}
+        statuses = dict(no_entries)
+        processors = defaultdict(lambda: dict(no_entries))
+        for processor_name, status, count in journal.entries.order_by().values_list(
+                'processor_name', 'status'
+        ).annotate(count=Count('id')):
+            statuses[status] += count
+            processors[processor_name][status] = count
+
+        failures = list(journal.entries.filter(status=RefundJournalEntry.FAILED).order_by('id').values_list(
+            'basket_id', 'processor_name', 'transaction_id', 'error'
+        ))
+        return {
+            'journal_id': journal.id,
+            'statuses': statuses,
+            'processors': dict(processors),
+            'failures': failures,
+        }
 
 
 class FulfillFrozenBaskets(EdxOrderPlacementMixin):
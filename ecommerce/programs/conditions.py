@@ -10,10 +10,10 @@ from oscar.core.loading import get_model
 from requests.exceptions import ConnectionError as ReqConnectionError
 from requests.exceptions import HTTPError, RequestException, Timeout
 
-from ecommerce.core.utils import deprecated_traverse_pagination, get_cache_key
+from ecommerce.core.utils import get_cache_key, traverse_pagination
 from ecommerce.extensions.offer.decorators import check_condition_applicability
 from ecommerce.extensions.offer.mixins import SingleItemConsumptionConditionMixin
-from ecommerce.programs.utils import get_program
+from ecommerce.programs.utils import get_compiled_program
 
 Condition = get_model('offer', 'Condition')
 logger = logging.getLogger(__name__)
@@ -30,20 +30,10 @@ class ProgramCourseRunSeatsCondition(SingleItemConsumptionConditionMixin, Condit
 
     def _get_applicable_skus(self, site_configuration):
         """ SKUs to which this condition applies. """
-        program_skus = set()
-        program = get_program(self.program_uuid, site_configuration)
-        if program:
-            applicable_seat_types = program['applicable_seat_types']
-
-            for course in program['courses']:
-                for course_run in course['course_runs']:
-                    program_skus.update(
-                        {seat['sku'] for seat in course_run['seats'] if seat['type'] in applicable_seat_types}
-                    )
-                for entitlement in course['entitlements']:
-                    if entitlement['mode'].lower() in applicable_seat_types:
-                        program_skus.add(entitlement['sku'])
-        return program_skus
+        compiled_program = get_compiled_program(self.program_uuid, site_configuration)
+        if compiled_program:
+            return compiled_program.applicable_skus
+        return frozenset()
 
     def _get_lms_resource_for_user(self, basket, resource_name, client, endpoint):
         cache_key = get_cache_key(
@@ -90,22 +80,13 @@ class ProgramCourseRunSeatsCondition(SingleItemConsumptionConditionMixin, Condit
                     basket, 'entitlements', client, entitlements_api_url
                 )
                 if isinstance(response, dict):
-                    entitlements = deprecated_traverse_pagination(
-                        response, client, entitlements_api_url
+                    entitlements = traverse_pagination(
+                        response, client, entitlements_api_url, prefetch=True
                     )
                 else:
                     entitlements = response
         return enrollments, entitlements
 
-    def _has_entitlements(self, program):
-        """
-        Determines whether an entitlement product exists for any course in the program.
-        """
-        for course in program['courses']:
-            if course['entitlements']:
-                return True
-        return False
-
     @check_condition_applicability()
     def is_satisfied(self, offer, basket):  # pylint: disable=unused-argument
         """
@@ -120,54 +101,21 @@ class ProgramCourseRunSeatsCondition(SingleItemConsumptionConditionMixin, Condit
         """
         basket_skus = {line.stockrecord.partner_sku for line in basket.all_lines()}
         try:
-            program = get_program(self.program_uuid, basket.site.siteconfiguration)
+            compiled_program = get_compiled_program(self.program_uuid, basket.site.siteconfiguration)
         except (HTTPError, RequestException, Timeout):
             return False
 
-        if program and program['status'] == 'active':
-            applicable_seat_types = program['applicable_seat_types']
-        else:
+        if not (compiled_program and compiled_program.is_active):
             return False
 
-        retrieve_entitlements = self._has_entitlements(program)
-        enrollments, entitlements = self._get_user_ownership_data(basket, retrieve_entitlements)
+        enrollments, entitlements = self._get_user_ownership_data(basket, compiled_program.has_entitlements)
 
-        for course in program['courses']:
-            # If the user is already enrolled in a course, we do not need to check their basket for it
-            if any(enrollment['course_details']['course_id'] in [run['key'] for run in course['course_runs']] and
-                   enrollment['mode'] in applicable_seat_types for enrollment in enrollments):
-                continue
-            if any(course['uuid'] == entitlement['course_uuid'] and
-                   entitlement['mode'] in applicable_seat_types for entitlement in entitlements):
-                continue
+        # If the user is already enrolled in, or entitled to, a course we do not need to check their basket for it.
+        owned_courses = compiled_program.get_enrolled_courses(enrollments)
+        owned_courses |= compiled_program.get_entitled_courses(entitlements)
 
-            # If the  basket has no SKUs left, but we still have courses over which
-            # to iterate, the user cannot meet the condition that all courses be represented.
-            if not basket_skus:
-                return False
-
-            # Get all of the SKUs that can satisfy this course
-            skus = set()
-            for course_run in course['course_runs']:
-                skus.update({seat['sku'] for seat in course_run['seats'] if seat['type'] in applicable_seat_types})
-            for entitlement in course['entitlements']:
-                if entitlement['mode'].lower() in applicable_seat_types:
-                    skus.add(entitlement['sku'])
-
-            # The lack of a difference in the set of SKUs in the basket and the course indicates that
-            # that there is no intersection. Therefore, the basket contains no SKUs for the current course.
-            # Because the user is also not enrolled in the course, it follows that the program condition is not met.
-            diff = basket_skus.difference(skus)
-            if diff == basket_skus:
-                return False
-
-            # If there is a difference between the basket SKUs and course SKUs, it represents the basket SKUs
-            # minus the SKUs for the current course. Since we have already verified the course is represented,
-            # its SKUs can be safely removed from the set of SKUs in the basket being checked. Note that this
-            # does NOT affect the actual basket, just our copy of its SKUs.
-            basket_skus = diff
-
-        return True
+        # Every other course must be represented in the basket by one of its SKUs.
+        return compiled_program.covers_courses(basket_skus, owned_courses)
 
     def can_apply_condition(self, line):
         """ Determines whether the condition can be applied to a given basket line. """
@@ -0,0 +1,234 @@
+"""
+Django management command to compare the compiled program SKU index with the original program condition checks.
+"""
+import random
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+
+from ecommerce.programs.utils import CompiledProgram
+
+APPLICABLE_SEAT_TYPES = ['verified', 'professional', 'credit']
+
+
+def get_applicable_skus(program):
+    """ The original ProgramCourseRunSeatsCondition._get_applicable_skus, evaluated for every basket line. """
+    program_skus = set()
+    applicable_seat_types = program['applicable_seat_types']
+    for course in program['courses']:
+        for course_run in course['course_runs']:
+            program_skus.update(
+                {seat['sku'] for seat in course_run['seats'] if seat['type'] in applicable_seat_types}
+            )
+        for entitlement in course['entitlements']:
+            if entitlement['mode'].lower() in applicable_seat_types:
+                program_skus.add(entitlement['sku'])
+    return program_skus
+
+
+def is_satisfied_by_walking(program, basket_skus, enrollments, entitlements):
+    """
+    The original ProgramCourseRunSeatsCondition.is_satisfied check, which walks the program courses
+    and scans the enrollments and entitlements for each of them.
+    """
+    applicable_seat_types = program['applicable_seat_types']
+    for course in program['courses']:
+        if any(enrollment['course_details']['course_id'] in [run['key'] for run in course['course_runs']] and
+               enrollment['mode'] in applicable_seat_types for enrollment in enrollments):
+            continue
+        if any(course['uuid'] == entitlement['course_uuid'] and
+               entitlement['mode'] in applicable_seat_types for entitlement in entitlements):
+            continue
+
+        if not basket_skus:
+            return False
+
+        skus = set()
+        for course_run in course['course_runs']:
+            skus.update({seat['sku'] for seat in course_run['seats'] if seat['type'] in applicable_seat_types})
+        for entitlement in course['entitlements']:
+            if entitlement['mode'].lower() in applicable_seat_types:
+                skus.add(entitlement['sku'])
+
+        diff = basket_skus.difference(skus)
+        if diff == basket_skus:
+            return False
+        basket_skus = diff
+
+    return True
+
+
+def is_satisfied_by_index(compiled_program, basket_skus, enrollments, entitlements):
+    """ ProgramCourseRunSeatsCondition.is_satisfied, using the compiled program. """
+    owned_courses = compiled_program.get_enrolled_courses(enrollments)
+    owned_courses |= compiled_program.get_entitled_courses(entitlements)
+    return compiled_program.covers_courses(basket_skus, owned_courses)
+
+
+class Command(BaseCommand):
+    """
+    Time the program offer condition on a generated program, with the original checks and with the
+    compiled program SKU index, and verify both give the same answers.
+
+    Every check evaluates the condition for a basket, then the applicability of each of its lines.
+
+    Example:
+
+        ./manage.py benchmark_program_condition --courses 30 --enrollments 5000
+    """
+
+    help = 'Benchmark the program offer condition against the compiled program SKU index.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--courses',
+            type=int,
+            default=30,
+            help='Number of courses of the generated program.'
+        )
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=5,
+            help='Number of course runs of each course.'
+        )
+        parser.add_argument(
+            '--enrollments',
+            type=int,
+            default=5000,
+            help='Number of enrollments of the learner, most of them in courses outside of the program.'
+        )
+        parser.add_argument(
+            '--checks',
+            type=int,
+            default=200,
+            help='Number of baskets to check.'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed used to build the program, enrollments and baskets.'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        program = self._build_program(options['courses'], options['runs'], rng)
+        enrollments, entitlements = self._build_ownership(program, options['enrollments'], rng)
+        baskets = self._build_baskets(program, options['checks'], rng)
+
+        start = time.perf_counter()
+        walk_results = [
+            (
+                is_satisfied_by_walking(program, basket_skus, enrollments, entitlements),
+                [sku in get_applicable_skus(program) for sku in basket_skus],
+            )
+            for basket_skus in baskets
+        ]
+        walk_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        compiled_program = CompiledProgram(program)
+        compile_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index_results = [
+            (
+                is_satisfied_by_index(compiled_program, basket_skus, enrollments, entitlements),
+                [sku in compiled_program.applicable_skus for sku in basket_skus],
+            )
+            for basket_skus in baskets
+        ]
+        index_seconds = time.perf_counter() - start
+
+        mismatches = sum(1 for walk, index in zip(walk_results, index_results) if walk != index)
+        checks = max(len(baskets), 1)
+
+        self.stdout.write('Program courses: {}, enrollments: {}, entitlements: {}'.format(
+            options['courses'], len(enrollments), len(entitlements)
+        ))
+        self.stdout.write('Checks: {} ({} satisfied)'.format(
+            len(baskets), sum(1 for satisfied, __ in walk_results if satisfied)
+        ))
+        self.stdout.write('Compile: {:.3f}ms'.format(1000 * compile_seconds))
+        self.stdout.write('Program walk: {:.3f}s ({:.3f}ms per check)'.format(
+            walk_seconds, 1000 * walk_seconds / checks
+        ))
+        self.stdout.write('Compiled index: {:.3f}s ({:.3f}ms per check)'.format(
+            index_seconds, 1000 * index_seconds / checks
+        ))
+        if mismatches:
+            self.stdout.write(self.style.ERROR('{} check(s) returned different results.'.format(mismatches)))
+        else:
+            self.stdout.write(self.style.SUCCESS('All checks returned the same results.'))
+
+    @staticmethod
+    def _build_program(course_count, run_count, rng):
+        courses = []
+        for course_index in range(course_count):
+            course_runs = []
+            for run_index in range(run_count):
+                key = 'course-v1:bench+C{}+R{}'.format(course_index, run_index)
+                course_runs.append({
+                    'key': key,
+                    'seats': [
+                        {'type': seat_type, 'sku': '{}-{}'.format(seat_type, key)}
+                        for seat_type in ('audit', 'verified')
+                    ],
+                })
+            entitlements = []
+            if rng.random() < 0.5:
+                entitlements.append({'mode': 'verified', 'sku': 'entitlement-C{}'.format(course_index)})
+            courses.append({
+                'key': 'bench+C{}'.format(course_index),
+                'uuid': str(uuid.UUID(int=rng.getrandbits(128))),
+                'course_runs': course_runs,
+                'entitlements': entitlements,
+            })
+
+        return {
+            'uuid': str(uuid.UUID(int=rng.getrandbits(128))),
+            'status': 'active',
+            'courses': courses,
+            'applicable_seat_types': APPLICABLE_SEAT_TYPES,
+        }
+
+    @staticmethod
+    def _build_ownership(program, enrollment_count, rng):
+        """ Enrollments are mostly outside of the program; a few program courses are owned. """
+        courses = program['courses']
+        enrollments = [
+            {
+                'course_details': {'course_id': 'course-v1:other+C{}+R0'.format(index)},
+                'mode': rng.choice(['audit', 'verified']),
+            }
+            for index in range(enrollment_count)
+        ]
+        for course in rng.sample(courses, min(2, len(courses))):
+            enrollments.append({
+                'course_details': {'course_id': rng.choice(course['course_runs'])['key']},
+                'mode': 'verified',
+            })
+        rng.shuffle(enrollments)
+
+        entitlements = [
+            {'course_uuid': course['uuid'], 'mode': 'verified'}
+            for course in rng.sample(courses, min(2, len(courses)))
+        ]
+        return enrollments, entitlements
+
+    @staticmethod
+    def _build_baskets(program, count, rng):
+        """ Baskets with a seat of every program course, some missing one course or holding unrelated SKUs. """
+        baskets = []
+        for index in range(count):
+            skus = set()
+            for course in program['courses']:
+                skus.add(rng.choice(rng.choice(course['course_runs'])['seats'][1:])['sku'])
+            if index % 3 == 1:
+                skus.discard(rng.choice(sorted(skus)))
+            elif index % 3 == 2:
+                skus.add('unrelated-{}'.format(index))
+            baskets.append(skus)
+        return baskets
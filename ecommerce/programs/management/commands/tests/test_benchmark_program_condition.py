@@ -0,0 +1,21 @@
+"""
+Tests for Django management command to benchmark the program offer condition.
+"""
+from io import StringIO
+
+from django.core.management import call_command
+
+from ecommerce.tests.testcases import TestCase
+
+
+class TestBenchmarkProgramConditionCommand(TestCase):
+
+    def test_handle(self):
+        """ Verify the original checks and the compiled program index agree on every check. """
+        out = StringIO()
+        call_command('benchmark_program_condition', '--courses=5', '--enrollments=50', '--checks=30', stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('Program courses: 5, enrollments: 52, entitlements: 2', output)
+        self.assertIn('Checks: 30', output)
+        self.assertIn('All checks returned the same results.', output)
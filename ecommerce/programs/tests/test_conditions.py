@@ -130,7 +130,7 @@ class ProgramCourseRunSeatsConditionTests(ProgramTestMixin, TestCase):
         # Verify the user enrollments are cached
         basket.site.siteconfiguration.enable_partial_program = True
         responses.reset()
-        with mock.patch('ecommerce.programs.conditions.get_program',
+        with mock.patch('ecommerce.programs.utils.get_program',
                         return_value=program):
             self.assertTrue(self.condition.is_satisfied(offer, basket))
 
@@ -141,7 +141,7 @@ class ProgramCourseRunSeatsConditionTests(ProgramTestMixin, TestCase):
         basket = BasketFactory(site=self.site, owner=UserFactory())
         basket.add_product(self.test_product)
 
-        with mock.patch('ecommerce.programs.conditions.get_program',
+        with mock.patch('ecommerce.programs.utils.get_program',
                         side_effect=value):
             self.assertFalse(self.condition.is_satisfied(offer, basket))
 
@@ -240,7 +240,7 @@ class ProgramCourseRunSeatsConditionTests(ProgramTestMixin, TestCase):
         # Verify the user enrollments are cached
         basket.site.siteconfiguration.enable_partial_program = True
         responses.reset()
-        with mock.patch('ecommerce.programs.conditions.get_program',
+        with mock.patch('ecommerce.programs.utils.get_program',
                         return_value=program):
             self.assertTrue(self.condition.is_satisfied(offer, basket))
 
@@ -271,7 +271,7 @@ class ProgramCourseRunSeatsConditionTests(ProgramTestMixin, TestCase):
                 if seat.attr.id_verification_required:
                     basket.add_product(seat)
 
-        with mock.patch('ecommerce.programs.conditions.deprecated_traverse_pagination') as mock_processing_entitlements:
+        with mock.patch('ecommerce.programs.conditions.traverse_pagination') as mock_processing_entitlements:
             self.assertFalse(self.condition.is_satisfied(offer, basket))
             mock_processing_entitlements.assert_not_called()
 
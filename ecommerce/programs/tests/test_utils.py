@@ -11,7 +11,7 @@ from testfixtures import LogCapture
 
 from ecommerce.programs.api import ProgramsApiClient
 from ecommerce.programs.tests.mixins import ProgramTestMixin
-from ecommerce.programs.utils import get_program
+from ecommerce.programs.utils import CompiledProgram, get_compiled_program, get_program
 from ecommerce.tests.testcases import TestCase
 
 LOGGER_NAME = 'ecommerce.programs.utils'
@@ -50,3 +50,85 @@ class UtilTests(ProgramTestMixin, TestCase):
                 self.assertIsNone(response)
                 msg = 'Failed to retrieve program details for {}'.format(self.program_uuid)
                 logger.check((LOGGER_NAME, 'DEBUG', msg))
+
+
+class CompiledProgramTests(ProgramTestMixin, TestCase):
+    def setUp(self):
+        super(CompiledProgramTests, self).setUp()
+        self.program = {
+            'uuid': str(uuid.uuid4()),
+            'status': 'active',
+            'applicable_seat_types': ['verified'],
+            'courses': [
+                {
+                    'uuid': 'course-{}'.format(index),
+                    'course_runs': [{
+                        'key': 'course-v1:org+C{}+run'.format(index),
+                        'seats': [
+                            {'type': 'audit', 'sku': 'audit-{}'.format(index)},
+                            {'type': 'verified', 'sku': 'verified-{}'.format(index)},
+                        ],
+                    }],
+                    'entitlements': [{'mode': 'Verified', 'sku': 'entitlement-{}'.format(index)}] if index == 2 else [],
+                }
+                for index in range(3)
+            ],
+        }
+        # A SKU sold by the first two courses only counts for the first one.
+        self.program['courses'][1]['course_runs'][0]['seats'].append({'type': 'verified', 'sku': 'verified-0'})
+        self.compiled_program = CompiledProgram(self.program)
+
+    def test_applicable_skus(self):
+        """ Verify only the SKUs of applicable seat types and entitlement modes are applicable. """
+        self.assertTrue(self.compiled_program.is_active)
+        self.assertTrue(self.compiled_program.has_entitlements)
+        self.assertEqual(
+            self.compiled_program.applicable_skus,
+            {'verified-0', 'verified-1', 'verified-2', 'entitlement-2'}
+        )
+
+    def test_covers_courses(self):
+        """ Verify each SKU covers the first course, in program order, that is not owned and sells it. """
+        self.assertTrue(self.compiled_program.covers_courses({'verified-0', 'verified-1', 'entitlement-2'}))
+        self.assertFalse(self.compiled_program.covers_courses({'verified-0', 'verified-2'}))
+        self.assertFalse(self.compiled_program.covers_courses({'audit-0', 'verified-1', 'verified-2'}))
+        self.assertTrue(self.compiled_program.covers_courses({'verified-0', 'verified-2'}, owned_courses={0}))
+
+    def test_owned_courses(self):
+        """ Verify enrollments and entitlements in applicable modes mark their courses as owned. """
+        enrollments = [
+            {'course_details': {'course_id': 'course-v1:org+C0+run'}, 'mode': 'verified'},
+            {'course_details': {'course_id': 'course-v1:org+C1+run'}, 'mode': 'audit'},
+            {'course_details': {'course_id': 'course-v1:org+other+run'}, 'mode': 'verified'},
+        ]
+        entitlements = [
+            {'course_uuid': 'course-2', 'mode': 'verified'},
+            {'course_uuid': 'course-1', 'mode': 'audit'},
+        ]
+        self.assertEqual(self.compiled_program.get_enrolled_courses(enrollments), {0})
+        self.assertEqual(self.compiled_program.get_entitled_courses(entitlements), {2})
+
+    def test_entitlements_read_until_every_course_is_owned(self):
+        """ Verify entitlements are no longer read once every course of the program is owned. """
+        entitlements = iter(
+            [{'course_uuid': 'course-{}'.format(index), 'mode': 'verified'} for index in range(3)] + [None]
+        )
+        self.assertEqual(self.compiled_program.get_entitled_courses(entitlements), {0, 1, 2})
+        self.assertIsNone(next(entitlements))
+
+    @responses.activate
+    def test_get_compiled_program(self):
+        """ Verify the compiled program is cached, and not cached when the program is not found. """
+        program_uuid = uuid.uuid4()
+        discovery_api_url = self.site.siteconfiguration.discovery_api_url
+        with mock.patch('ecommerce.programs.utils.get_program', return_value=None):
+            self.assertIsNone(get_compiled_program(program_uuid, self.site.siteconfiguration))
+
+        data = self.mock_program_detail_endpoint(program_uuid, discovery_api_url)
+        compiled_program = get_compiled_program(program_uuid, self.site.siteconfiguration)
+        self.assertEqual(compiled_program.course_count, len(data['courses']))
+
+        with mock.patch('ecommerce.programs.utils.get_program') as mock_get_program:
+            cached_program = get_compiled_program(program_uuid, self.site.siteconfiguration)
+            mock_get_program.assert_not_called()
+        self.assertEqual(cached_program.applicable_skus, compiled_program.applicable_skus)
@@ -2,6 +2,8 @@
 
 import logging
 
+from django.conf import settings
+from edx_django_utils.cache import TieredCache
 from requests.exceptions import ConnectionError as ReqConnectionError
 from requests.exceptions import HTTPError, Timeout
 
@@ -34,3 +36,110 @@ def get_program(program_uuid, siteconfiguration):
         log.debug("Failed to retrieve program details for %s", program_uuid)
 
     return response
+
+
+class CompiledProgram:
+    """
+    The parts of a program's details needed to evaluate program offers, indexed for set operations.
+
+    Courses are numbered in the order the program lists them, which is the order in which
+    ProgramCourseRunSeatsCondition assigns basket SKUs to them.
+    """
+
+    def __init__(self, program):
+        self.uuid = program.get('uuid')
+        self.status = program.get('status')
+        self.applicable_seat_types = frozenset(program.get('applicable_seat_types') or [])
+        self.course_count = len(program['courses'])
+        self.has_entitlements = False
+
+        # Indices of the courses each SKU, course run key and course UUID belongs to.
+        self.courses_by_sku = {}
+        self.course_by_run_key = {}
+        self.course_by_uuid = {}
+
+        for index, course in enumerate(program['courses']):
+            self.course_by_uuid[course['uuid']] = index
+            skus = set()
+            for course_run in course['course_runs']:
+                self.course_by_run_key[course_run['key']] = index
+                skus.update(
+                    seat['sku'] for seat in course_run['seats'] if seat['type'] in self.applicable_seat_types
+                )
+            for entitlement in course['entitlements']:
+                self.has_entitlements = True
+                if entitlement['mode'].lower() in self.applicable_seat_types:
+                    skus.add(entitlement['sku'])
+            for sku in skus:
+                self.courses_by_sku.setdefault(sku, []).append(index)
+
+        self.applicable_skus = frozenset(self.courses_by_sku)
+
+    @property
+    def is_active(self):
+        return self.status == 'active'
+
+    def get_enrolled_courses(self, enrollments):
+        """ Indices of the courses in which one of the given LMS enrollments is in an applicable mode. """
+        return {
+            self.course_by_run_key[enrollment['course_details']['course_id']]
+            for enrollment in enrollments
+            if enrollment['mode'] in self.applicable_seat_types and
+            enrollment['course_details']['course_id'] in self.course_by_run_key
+        }
+
+    def get_entitled_courses(self, entitlements):
+        """
+        Indices of the courses for which one of the given LMS entitlements is in an applicable mode.
+
+        Entitlements are only read until every course of the program is covered.
+        """
+        entitled_courses = set()
+        for entitlement in entitlements:
+            index = self.course_by_uuid.get(entitlement['course_uuid'])
+            if index is not None and entitlement['mode'] in self.applicable_seat_types:
+                entitled_courses.add(index)
+                if len(entitled_courses) == self.course_count:
+                    break
+        return entitled_courses
+
+    def covers_courses(self, skus, owned_courses=frozenset()):
+        """
+        Returns whether every course of the program is either owned or has one of the given SKUs.
+
+        Each SKU only counts for the first course, in program order, that is not owned and sells it,
+        so a SKU shared by several courses cannot cover more than one of them.
+        """
+        covered_courses = set(owned_courses)
+        for sku in skus:
+            for index in self.courses_by_sku.get(sku, ()):
+                if index not in owned_courses:
+                    covered_courses.add(index)
+                    break
+        return len(covered_courses) == self.course_count
+
+
+def get_compiled_program(program_uuid, siteconfiguration):
+    """
+    Returns the CompiledProgram of the program identified by the program_uuid.
+
+    It is cached next to the program details, for ``settings.PROGRAM_CACHE_TIMEOUT`` seconds.
+
+    Returns:
+        CompiledProgram
+        None if the program is not found or another error occurs
+    """
+    cache_key = '{site_domain}-program-{uuid}-compiled'.format(
+        site_domain=siteconfiguration.site.domain, uuid=program_uuid
+    )
+    compiled_program_cached_response = TieredCache.get_cached_response(cache_key)
+    if compiled_program_cached_response.is_found:
+        return compiled_program_cached_response.value
+
+    program = get_program(program_uuid, siteconfiguration)
+    if not program:
+        return None
+
+    compiled_program = CompiledProgram(program)
+    TieredCache.set_all_tiers(cache_key, compiled_program, settings.PROGRAM_CACHE_TIMEOUT)
+    return compiled_program
@@ -278,6 +278,15 @@ CREDIT_PROVIDER_CACHE_TIMEOUT = 600
 # Anonymous User Calculate Cache timeout
 ANONYMOUS_BASKET_CALCULATE_CACHE_TIMEOUT = 3600  # Value is in seconds.
 
+# Rows of the local course catalog membership table older than this are ignored.
+COURSE_CATALOG_MEMBERSHIP_MAX_AGE = 60 * 60 * 48  # Value is in seconds.
+
+# Maximum age of the in-process offer index before it is rebuilt, even if no offer changed.
+OFFER_INDEX_MAX_AGE = 300  # Value is in seconds.
+
+# Maximum number of baskets that may be calculated in a single batch calculate request
+BASKET_CALCULATE_BATCH_MAX_SIZE = 100
+
 # LMS API settings used for fetching information from LMS
 LMS_API_CACHE_TIMEOUT = 30  # Value is in seconds.
 
@@ -664,6 +673,8 @@ EDX_DRF_EXTENSIONS = {
 # created for the Enrollment code products.
 ENROLLMENT_CODE_EXIPRATION_DATE = datetime.datetime.now() + datetime.timedelta(weeks=520)
 ENROLLMENT_FULFILLMENT_TIMEOUT = 7
+# Number of threads posting the enrollments of an order to the LMS. With 1, enrollments are posted one at a time.
+ENROLLMENT_FULFILLMENT_MAX_WORKERS = 1
 
 # Affiliate cookie key
 AFFILIATE_COOKIE_KEY = 'affiliate_id'
@@ -854,6 +865,10 @@ CACHES = {
 BACKEND_SERVICE_EDX_OAUTH2_KEY = "ecommerce-backend-service-key"
 BACKEND_SERVICE_EDX_OAUTH2_SECRET = "ecommerce-backend-service-secret"
 BACKEND_SERVICE_EDX_OAUTH2_PROVIDER_URL = "http://127.0.0.1:8000/oauth2"
+# Connection pools and retries of the OAuth API clients shared by every caller in a process.
+OAUTH_API_CLIENT_POOL_CONNECTIONS = 10  # Number of hosts to keep connections to.
+OAUTH_API_CLIENT_POOL_MAXSIZE = 10  # Number of connections to keep open per host.
+OAUTH_API_CLIENT_MAX_RETRIES = 1  # Retries of connections that could not be established.
 EXTRA_APPS = []
 API_ROOT = None
 
@@ -862,11 +877,20 @@ ECOMMERCE_MICROFRONTEND_URL = os.environ.get('ECOMMERCE_MICROFRONTEND_URL')
 # Needed to link to the payment micro-frontend
 PAYMENT_MICROFRONTEND_URL = None
 
+# Bulk refunds of basket transactions, from the management view and the refund_basket_transactions command.
+BULK_REFUND_MAX_WORKERS = 4  # Number of credits issued at the same time.
+BULK_REFUND_MAX_RETRIES = 2  # Retries of credits that failed before reaching the payment processor.
+BULK_REFUND_RATE_LIMITS = {}  # Maximum number of credits issued per second, by payment processor name.
+
 # For Enterprise purchases to send purchase information to HubSpot for marketing leads
 HUBSPOT_FORMS_API_URI = "SET-ME-PLEASE"
 HUBSPOT_PORTAL_ID = "SET-ME-PLEASE"
 HUBSPOT_SALES_LEAD_FORM_GUID = "SET-ME-PLEASE"
 
+# How far behind the current time an incremental sync_hubspot run stops, so carts not yet on the read replica are
+# picked up by the next run.
+HUBSPOT_SYNC_SAFETY_MARGIN = datetime.timedelta(minutes=5)
+
 # To check government purchase restriction lists
 SDN_CHECK_API_URL = "https://data.trade.gov/consolidated_screening_list/v1/search"
 SDN_CHECK_API_KEY = "sdn search key here"
@@ -891,3 +915,9 @@ CAMPAIGN_IDS_BY_EMAIL_TYPE = {
     OfferUsageEmailTypes.LOW_BALANCE: BRAZE_OFFER_LOW_BALANCE_CAMPAIGN,
     OfferUsageEmailTypes.OUT_OF_BALANCE: BRAZE_OFFER_NO_BALANCE_CAMPAIGN
 }
+
+# Braze events are queued in process and sent in batches by a background thread.
+BRAZE_EVENT_QUEUE_SIZE = 1000  # Events queued beyond this are dropped.
+BRAZE_EVENT_BATCH_SIZE = 75  # Maximum number of events of a users/track request.
+BRAZE_EVENT_FLUSH_INTERVAL = 1  # Seconds to wait for more events before sending a partial batch.
+BRAZE_EVENT_TIMEOUT = 5  # Seconds to wait for a users/track response.